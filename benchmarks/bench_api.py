@@ -0,0 +1,430 @@
+#!/usr/bin/env python3
+"""
+Load test the HTTP API with a realistic request mix and performance budgets.
+
+Seeds synthetic boards through the import endpoint, then has concurrent
+clients issue a weighted mix of operations against them:
+
+- ``board``: full board read, as every page load and refresh does
+- ``move``: move a card to another column
+- ``search``: search-as-you-type over card titles and descriptions
+- ``import``: bulk NDJSON import of a batch of cards
+
+``--target asgi`` drives the application in-process through httpx's ASGI
+transport (no server or sockets, so it measures the app itself);
+``--target uvicorn`` starts a local uvicorn server and drives it over HTTP.
+
+Prints throughput and p50/p95/p99 per operation and can write them as JSON
+(``--output``). Exits non-zero when an operation's p95 exceeds its budget
+(US-010: API responses under 100 ms; bulk imports have none, and moves get
+an allowance on SQLite) or, with ``--baseline``, is more than
+``--threshold`` slower than the committed baseline. ``--save-baseline``
+writes the results as the new baseline.
+
+Uses a throwaway SQLite database and the in-process Redis stand-in unless
+--database-url or REDIS_ENABLED say otherwise.
+
+Usage:
+    python benchmarks/bench_api.py [--target asgi|uvicorn] [--boards 5] [--cards 2000]
+        [--requests 2000] [--concurrency 4] [--output results.json]
+        [--baseline benchmarks/baseline.json] [--threshold 0.25] [--save-baseline]
+        [--mix board=55,move=25,search=18,import=2]
+"""
+import argparse
+import asyncio
+import contextlib
+import json
+import logging
+import os
+import platform
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from collections import Counter
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, AsyncIterator, Dict, List, NamedTuple, Optional
+
+import httpx
+from sqlalchemy.engine import make_url
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+BASELINE = ROOT / "benchmarks" / "baseline.json"
+
+# Share of requests per operation.
+MIX = {"board": 55, "move": 25, "search": 18, "import": 2}
+
+# p95 latency budgets in ms (US-010); bulk imports are exempt.
+BUDGETS_MS = {"board": 100.0, "move": 100.0, "search": 100.0}
+
+# SQLite has one write lock for the whole database, so a move also waits for
+# the writes in flight on every other board, bulk imports included. US-010's
+# budget is for PostgreSQL; against SQLite moves get this allowance instead.
+SQLITE_BUDGETS_MS = {**BUDGETS_MS, "move": 150.0}
+
+# p95 changes smaller than this are noise, whatever the relative change.
+MIN_REGRESSION_MS = 2.0
+
+IMPORT_CARDS = 100
+WORDS = (
+    "export invoice login timeout dashboard payment search upload webhook report "
+    "billing cache session profile settings mobile sync email migration onboarding"
+).split()
+
+
+class Board(NamedTuple):
+    id: str
+    column_ids: List[str]
+    task_ids: List[str]
+
+
+def budgets_for(database_url: str) -> Dict[str, float]:
+    """The p95 budgets a run against ``database_url`` is held to."""
+    if make_url(database_url).get_backend_name() == "sqlite":
+        return SQLITE_BUDGETS_MS
+    return BUDGETS_MS
+
+
+def parse_mix(value: str) -> Dict[str, int]:
+    """Parse ``board=50,move=25,...`` into operation weights."""
+    mix = {}
+    for item in value.split(","):
+        name, _, weight = item.partition("=")
+        if name.strip() not in MIX:
+            raise argparse.ArgumentTypeError(f"Unknown operation: {name.strip()}")
+        mix[name.strip()] = int(weight)
+    return mix
+
+
+def card_title(rng: random.Random) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(4)).capitalize()
+
+
+def ndjson_cards(rng: random.Random, column_ids: List[str], cards: int) -> bytes:
+    """NDJSON task lines for an import into existing columns."""
+    return "".join(
+        json.dumps(
+            {
+                "type": "task",
+                "title": card_title(rng),
+                "description": f"{card_title(rng)}. {card_title(rng)}.",
+                "column_id": column_ids[i % len(column_ids)],
+                "metadata": {"points": i % 8, "labels": [rng.choice(WORDS)]},
+            }
+        )
+        + "\n"
+        for i in range(cards)
+    ).encode()
+
+
+async def seed(
+    client: httpx.AsyncClient, boards: int, cards: int, columns: int = 5
+) -> List[Board]:
+    """Create ``boards`` boards of ``cards`` cards each through the API."""
+    rng = random.Random(0)
+    seeded = []
+    for b in range(boards):
+        response = await client.post("/api/projects", json={"name": f"Load test {b}"})
+        response.raise_for_status()
+        project_id = response.json()["id"]
+        for name in ("Backlog", "To Do", "In Progress", "Review", "Done")[:columns]:
+            response = await client.post(
+                f"/api/projects/{project_id}/columns", json={"name": name}
+            )
+            response.raise_for_status()
+        board = (await client.get(f"/api/projects/{project_id}/board")).json()
+        column_ids = [column["id"] for column in board["columns"]]
+        response = await client.post(
+            f"/api/projects/{project_id}/import",
+            content=ndjson_cards(rng, column_ids, cards),
+        )
+        response.raise_for_status()
+        board = (await client.get(f"/api/projects/{project_id}/board")).json()
+        task_ids = [
+            task["id"] for column in board["columns"] for task in column["tasks"]
+        ]
+        seeded.append(Board(project_id, column_ids, task_ids))
+    return seeded
+
+
+async def request(
+    client: httpx.AsyncClient, operation: str, rng: random.Random, boards: List[Board]
+) -> httpx.Response:
+    board = rng.choice(boards)
+    if operation == "board":
+        return await client.get(f"/api/projects/{board.id}/board")
+    if operation == "move":
+        return await client.put(
+            f"/api/tasks/{rng.choice(board.task_ids)}/move",
+            json={"column_id": rng.choice(board.column_ids)},
+        )
+    if operation == "search":
+        word = rng.choice(WORDS)
+        query = f"{rng.choice(WORDS)} {word[: rng.randint(2, len(word))]}"
+        return await client.get(
+            "/api/search/tasks", params={"q": query, "project_id": board.id}
+        )
+    if operation == "import":
+        body = ndjson_cards(rng, board.column_ids, IMPORT_CARDS)
+        return await client.post(f"/api/projects/{board.id}/import", content=body)
+    raise ValueError(f"Unknown operation: {operation}")
+
+
+async def drive(
+    client: httpx.AsyncClient,
+    boards: List[Board],
+    requests: int,
+    concurrency: int,
+    mix: Dict[str, int] = MIX,
+) -> Dict[str, Any]:
+    """Issue ``requests`` requests from ``concurrency`` clients; return the summary."""
+    names, weights = list(mix), list(mix.values())
+    schedule = random.Random(1).choices(names, weights, k=requests)
+    latencies: Dict[str, List[float]] = {name: [] for name in names}
+    errors: Dict[str, Counter] = {name: Counter() for name in names}
+    position = 0
+
+    async def worker(index: int) -> None:
+        nonlocal position
+        rng = random.Random(100 + index)
+        while position < len(schedule):
+            operation = schedule[position]
+            position += 1
+            start = time.perf_counter()
+            response = await request(client, operation, rng, boards)
+            latencies[operation].append(time.perf_counter() - start)
+            if response.status_code >= 400:
+                errors[operation][response.status_code] += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker(index) for index in range(concurrency)))
+    return summarize(latencies, errors, time.perf_counter() - start)
+
+
+def percentile(ordered: List[float], q: float) -> float:
+    """Nearest-rank percentile of an ascending list."""
+    if not ordered:
+        return 0.0
+    return ordered[
+        min(len(ordered) - 1, max(0, int(round(q / 100 * len(ordered))) - 1))
+    ]
+
+
+def summarize(
+    latencies: Dict[str, List[float]], errors: Dict[str, Counter], seconds: float
+) -> Dict[str, Any]:
+    operations = {}
+    for name, values in latencies.items():
+        ordered = sorted(values)
+        operations[name] = {
+            "requests": len(ordered),
+            "errors": sum(errors[name].values()),
+            "error_statuses": {
+                str(code): count for code, count in errors[name].items()
+            },
+            "throughput_rps": round(len(ordered) / seconds, 1) if seconds else 0.0,
+            "mean_ms": round(sum(ordered) / len(ordered) * 1000, 2) if ordered else 0.0,
+            **{
+                f"p{q}_ms": round(percentile(ordered, q) * 1000, 2)
+                for q in (50, 95, 99)
+            },
+        }
+    total = sum(len(values) for values in latencies.values())
+    return {
+        "seconds": round(seconds, 3),
+        "requests": total,
+        "throughput_rps": round(total / seconds, 1) if seconds else 0.0,
+        "operations": operations,
+    }
+
+
+def check(
+    results: Dict[str, Any],
+    baseline: Optional[Dict[str, Any]] = None,
+    threshold: float = 0.25,
+    budgets: Dict[str, float] = BUDGETS_MS,
+) -> List[str]:
+    """Return a line per failed check: errors, budgets and baseline regressions."""
+    failures = []
+    for name, stats in results["operations"].items():
+        if stats["errors"]:
+            statuses = ", ".join(
+                f"{n}x {code}" for code, n in stats["error_statuses"].items()
+            )
+            failures.append(f"{name}: {stats['errors']} failed requests ({statuses})")
+        budget = budgets.get(name)
+        if budget is not None and stats["p95_ms"] > budget:
+            failures.append(
+                f"{name}: p95 {stats['p95_ms']:.1f} ms over the {budget:.0f} ms budget"
+            )
+        if baseline is None or name not in baseline["operations"]:
+            continue
+        before = baseline["operations"][name]["p95_ms"]
+        limit = max(before * (1 + threshold), before + MIN_REGRESSION_MS)
+        if stats["p95_ms"] > limit:
+            failures.append(
+                f"{name}: p95 {stats['p95_ms']:.1f} ms regressed from {before:.1f} ms "
+                f"(more than {threshold:.0%})"
+            )
+    return failures
+
+
+def format_results(results: Dict[str, Any]) -> str:
+    lines = [
+        f"{results['requests']} requests in {results['seconds']:.2f}s "
+        f"({results['throughput_rps']:.0f} req/s)",
+        "",
+        f"{'operation':>10} {'requests':>9} {'errors':>7} {'req/s':>8} "
+        f"{'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'budget':>7}",
+    ]
+    budgets = results.get("budgets_ms", BUDGETS_MS)
+    for name, stats in results["operations"].items():
+        budget = budgets.get(name)
+        lines.append(
+            f"{name:>10} {stats['requests']:>9} {stats['errors']:>7} "
+            f"{stats['throughput_rps']:>8.1f} {stats['p50_ms']:>8.2f} "
+            f"{stats['p95_ms']:>8.2f} "
+            f"{stats['p99_ms']:>8.2f} {budget or '-':>7}"
+        )
+    return "\n".join(lines)
+
+
+@contextlib.asynccontextmanager
+async def asgi_client() -> AsyncIterator[httpx.AsyncClient]:
+    """A client for the app in this process, with its lifespan running."""
+    from src.main import create_app
+
+    app = create_app()
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        # Nothing crosses a wire, so don't spend the app's loop decompressing.
+        headers = {"Accept-Encoding": "identity"}
+        async with httpx.AsyncClient(
+            transport=transport, base_url="http://bench", headers=headers
+        ) as client:
+            yield client
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+@contextlib.asynccontextmanager
+async def uvicorn_client(concurrency: int) -> AsyncIterator[httpx.AsyncClient]:
+    """A client for a local uvicorn server started for the run."""
+    port = free_port()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "src.main:app", "--port", str(port)]
+        + ["--log-level", "warning", "--no-access-log"],
+        cwd=ROOT,
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    limits = httpx.Limits(
+        max_connections=concurrency, max_keepalive_connections=concurrency
+    )
+    try:
+        async with httpx.AsyncClient(
+            base_url=base_url, limits=limits, timeout=30
+        ) as client:
+            for _ in range(200):
+                if server.poll() is not None:
+                    raise RuntimeError(
+                        f"uvicorn exited with status {server.returncode}"
+                    )
+                with contextlib.suppress(httpx.TransportError):
+                    if (await client.get("/health")).status_code == 200:
+                        break
+                await asyncio.sleep(0.05)
+            else:
+                raise RuntimeError("uvicorn did not become ready")
+            yield client
+    finally:
+        server.terminate()
+        server.wait(timeout=10)
+
+
+async def run(args: argparse.Namespace) -> Dict[str, Any]:
+    client_context = (
+        asgi_client() if args.target == "asgi" else uvicorn_client(args.concurrency)
+    )
+    async with client_context as client:
+        start = time.perf_counter()
+        boards = await seed(client, args.boards, args.cards)
+        print(
+            f"Seeded {args.boards} boards of {args.cards} cards in "
+            f"{time.perf_counter() - start:.1f}s\n"
+        )
+        results = await drive(client, boards, args.requests, args.concurrency, args.mix)
+    results.update(
+        target=args.target,
+        database=make_url(os.environ["DATABASE_URL"]).get_backend_name(),
+        budgets_ms=budgets_for(os.environ["DATABASE_URL"]),
+        boards=args.boards,
+        cards=args.cards,
+        concurrency=args.concurrency,
+        mix=args.mix,
+        python=platform.python_version(),
+        machine=platform.machine(),
+        recorded_at=datetime.now(timezone.utc).isoformat(timespec="seconds"),
+    )
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--target", choices=("asgi", "uvicorn"), default="asgi")
+    parser.add_argument("--boards", type=int, default=5)
+    parser.add_argument("--cards", type=int, default=2000)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument(
+        "--mix", type=parse_mix, default=MIX, help="Weights per operation"
+    )
+    parser.add_argument("--output", type=Path, help="Write the results as JSON")
+    parser.add_argument(
+        "--baseline", type=Path, help="Fail on p95 regressions against this"
+    )
+    parser.add_argument("--threshold", type=float, default=0.25)
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--database-url")
+    args = parser.parse_args()
+
+    url = args.database_url
+    if url is None:
+        path = Path(tempfile.mkdtemp()) / f"bench-{uuid.uuid4()}.db"
+        url = f"sqlite+aiosqlite:///{path}"
+    os.environ["DATABASE_URL"] = url
+    os.environ.setdefault("REDIS_ENABLED", "false")
+    os.environ.setdefault("ENABLE_METRICS", "false")
+    os.environ.setdefault("RATE_LIMIT_ENABLED", "false")
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+
+    results = asyncio.run(run(args))
+    print(format_results(results))
+    if args.output:
+        args.output.write_text(json.dumps(results, indent=2) + "\n")
+    if args.save_baseline:
+        BASELINE.write_text(json.dumps(results, indent=2) + "\n")
+        print(f"\nSaved baseline to {BASELINE.relative_to(ROOT)}")
+
+    baseline = json.loads(args.baseline.read_text()) if args.baseline else None
+    if baseline is not None:
+        setup = ("target", "database", "boards", "cards", "concurrency", "mix")
+        if any(baseline.get(key) != results[key] for key in setup):
+            print("\nWarning: the baseline was recorded with different settings")
+    failures = check(results, baseline, args.threshold, results["budgets_ms"])
+    if failures:
+        print("\nFAILED:\n" + "\n".join(f"  {failure}" for failure in failures))
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
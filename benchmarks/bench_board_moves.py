@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Benchmark card-move latency in the board engine as columns grow.
+
+Fills a column with N cards for N in 100..100k and times random moves
+within the column and into a second column. Rank-based moves should show
+flat per-move latency across sizes.
+
+Usage:
+    python benchmarks/bench_board_moves.py [--moves 20000] \
+        [--sizes 100,1000,10000,100000]
+"""
+import argparse
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from src.board.engine import BoardEngine  # noqa: E402
+
+
+def bench_size(size: int, moves: int, seed: int = 42) -> dict:
+    """Time ``moves`` random moves on a column holding ``size`` cards."""
+    rng = random.Random(seed)
+    engine = BoardEngine()
+    project = engine.create_project("bench")
+    todo = engine.create_column(project.id, "To Do")
+    doing = engine.create_column(project.id, "Doing")
+    task_ids = [
+        engine.create_task(project.id, todo.id, f"card {i}").id for i in range(size)
+    ]
+    engine.create_task(project.id, doing.id, "anchor")
+
+    samples = []
+    for _ in range(moves):
+        task_id = rng.choice(task_ids)
+        anchor = rng.choice(task_ids)
+        start = time.perf_counter_ns()
+        if anchor == task_id:
+            engine.move_task(task_id, doing.id)
+            engine.move_task(task_id, todo.id)
+        else:
+            engine.move_task(task_id, todo.id, after_id=anchor)
+        samples.append(time.perf_counter_ns() - start)
+        if engine.pending_rebalance:
+            engine.rebalance_pending()
+
+    samples.sort()
+    return {
+        "size": size,
+        "median_us": statistics.median(samples) / 1000,
+        "p99_us": samples[int(len(samples) * 0.99)] / 1000,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--moves", type=int, default=20000)
+    parser.add_argument("--sizes", default="100,1000,10000,100000")
+    args = parser.parse_args()
+
+    print(f"{'cards/column':>12} {'median µs':>10} {'p99 µs':>10}")
+    for size in (int(s) for s in args.sizes.split(",")):
+        result = bench_size(size, args.moves)
+        print(
+            f"{result['size']:>12} {result['median_us']:>10.2f} "
+            f"{result['p99_us']:>10.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+Benchmark response compression for a large board payload.
+
+Encodes one board of N cards (default 10k) and, for each content coding at
+the per-request and the cached (precompressed snapshot) level, reports the
+compressed size, the compression time and the time to send the body over a
+slow link (default 10 Mbit/s, a typical VPN).
+
+Usage:
+    python benchmarks/bench_compression.py [--cards 10000] [--mbits 10]
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from benchmarks.bench_responses import make_board  # noqa: E402
+from src.board import schemas  # noqa: E402
+from src.core.compression import compress, encodings  # noqa: E402
+
+
+def timed(encoding: str, payload: bytes, cached: bool, repeat: int = 3):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        body = compress(encoding, payload, cached)
+        best = min(best, time.perf_counter() - start)
+    return body, best
+
+
+def run(cards: int, mbits: float) -> None:
+    engine, project_id = make_board(cards)
+    payload = schemas.encode_board(engine, project_id)
+    wire = mbits * 1_000_000 / 8  # bytes per second
+
+    print(f"{cards} cards, {len(payload)} bytes, {mbits:g} Mbit/s link\n")
+    print(
+        f"{'coding':>14} {'bytes':>10} {'ratio':>7} "
+        f"{'compress ms':>12} {'transfer ms':>12}"
+    )
+    transfer = len(payload) / wire * 1000
+    print(f"{'identity':>14} {len(payload):>10} {1:>7.1f} {0:>12.1f} {transfer:>12.1f}")
+    for encoding in encodings("br,zstd,gzip"):
+        for cached in (False, True):
+            body, seconds = timed(encoding, payload, cached)
+            label = f"{encoding} ({'cached' if cached else 'live'})"
+            print(
+                f"{label:>14} {len(body):>10} {len(payload) / len(body):>7.1f}"
+                f" {seconds * 1000:>12.1f} {len(body) / wire * 1000:>12.1f}"
+            )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--cards", type=int, default=10000)
+    parser.add_argument("--mbits", type=float, default=10.0)
+    args = parser.parse_args()
+    run(args.cards, args.mbits)
+
+
+if __name__ == "__main__":
+    main()
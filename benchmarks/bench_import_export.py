@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Benchmark streaming board import and export throughput in rows/s.
+
+Generates an NDJSON board of N cards, streams it into a fresh project
+through the import path (validated, multi-row INSERTs, one transaction),
+then streams it back out through the server-side cursor export. Peak RSS
+is printed after each phase; it should stay flat as N grows.
+
+Uses a throwaway SQLite database unless --database-url points elsewhere.
+
+Usage:
+    python benchmarks/bench_import_export.py [--cards 200000] [--columns 5]
+        [--batch-size 1000] [--database-url postgresql+asyncpg://...]
+"""
+import argparse
+import asyncio
+import json
+import os
+import resource
+import sys
+import tempfile
+import time
+import uuid
+from pathlib import Path
+from typing import AsyncIterator, List
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+
+def peak_rss_mb() -> float:
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+async def ndjson_board(
+    cards: int, columns: int, chunk_lines: int = 1000
+) -> AsyncIterator[bytes]:
+    """Yield an export-format board in chunks, as a client upload would arrive."""
+    column_ids: List[str] = [str(uuid.uuid4()) for _ in range(columns)]
+    yield "".join(
+        json.dumps({"type": "column", "id": cid, "name": f"Column {i}"}) + "\n"
+        for i, cid in enumerate(column_ids)
+    ).encode()
+    lines = []
+    for i in range(cards):
+        lines.append(
+            json.dumps(
+                {
+                    "type": "task",
+                    "title": f"Card {i}",
+                    "description": "Migrated card",
+                    "column_id": column_ids[i % columns],
+                    "metadata": {"points": i % 8},
+                }
+            )
+        )
+        if len(lines) == chunk_lines:
+            yield ("\n".join(lines) + "\n").encode()
+            lines = []
+    if lines:
+        yield "\n".join(lines).encode()
+
+
+async def run(cards: int, columns: int, batch_size: int) -> None:
+    from src.board import transfer
+    from src.board.engine import BoardEngine
+    from src.board.service import BoardService
+    from src.board.tables import metadata
+    from src.core.database import create_tables, dispose_engine
+
+    await create_tables(metadata)
+    service = BoardService(BoardEngine())
+    project = await service.create_project("bench")
+
+    print(f"{'phase':>8} {'rows':>9} {'seconds':>8} {'rows/s':>10} {'peak RSS MB':>12}")
+    result = await transfer.import_board(
+        service, project.id, ndjson_board(cards, columns), batch_size
+    )
+    rows = result.columns + result.tasks
+    print(
+        f"{'import':>8} {rows:>9} {result.seconds:>8.2f} "
+        f"{result.rows_per_second:>10.0f} {peak_rss_mb():>12.1f}"
+    )
+
+    start = time.perf_counter()
+    exported = 0
+    async for chunk in transfer.export_board(service.sessions, project.id, batch_size):
+        exported += chunk.count(b"\n")
+    elapsed = time.perf_counter() - start
+    print(
+        f"{'export':>8} {exported:>9} {elapsed:>8.2f} "
+        f"{exported / elapsed:>10.0f} {peak_rss_mb():>12.1f}"
+    )
+    await dispose_engine()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--cards", type=int, default=200000)
+    parser.add_argument("--columns", type=int, default=5)
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--database-url")
+    args = parser.parse_args()
+
+    url = args.database_url
+    if url is None:
+        url = f"sqlite+aiosqlite:///{Path(tempfile.mkdtemp()) / 'bench.db'}"
+    os.environ["DATABASE_URL"] = url
+    asyncio.run(run(args.cards, args.columns, args.batch_size))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+Benchmark the request overhead of logging.
+
+Serves an in-process route that logs ``--records`` INFO records per request
+(with ``%`` arguments and an ``extra`` field) and reports request latency
+and CPU time per request for each logging setup:
+
+- ``off``: the level is WARNING, so the records are discarded by the logger.
+- ``sync``: a plain ``StreamHandler`` rendering JSON and writing on the
+  request's thread, as with ``logging.basicConfig``.
+- ``queued``: ``configure_logging``; the request only enqueues records and
+  the listener thread renders and writes them.
+- ``sampled``: ``queued`` with ``log_sample_rates`` keeping 10% of requests.
+
+The sink discards output; ``--sink-latency-ms`` makes each write block for
+that long, like stdout piped to a slow collector. CPU time covers all
+threads, so the listener's rendering counts towards ``queued``.
+
+Usage:
+    python benchmarks/bench_logging.py [--requests 2000] [--records 5] \
+        [--sink-latency-ms 0]
+"""
+import argparse
+import asyncio
+import io
+import logging
+import statistics
+import sys
+import time
+from pathlib import Path
+
+import httpx
+from fastapi import FastAPI
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from src.core import logs, tracing  # noqa: E402
+from src.core.config import Settings  # noqa: E402
+
+
+class Sink(io.TextIOBase):
+    """Counts written lines, optionally blocking on every write."""
+
+    def __init__(self, latency: float):
+        self.latency = latency
+        self.lines = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, text: str) -> int:
+        if self.latency:
+            time.sleep(self.latency)
+        self.lines += text.count("\n")
+        return len(text)
+
+
+def make_app(records: int) -> FastAPI:
+    app = FastAPI()
+    app.add_middleware(tracing.CorrelationMiddleware)
+    log = logging.getLogger("bench")
+
+    @app.get("/work/{item}")
+    async def work(item: int):
+        for step in range(records):
+            log.info("Processed item %d step %d", item, step, extra={"step": step})
+        return {"item": item}
+
+    return app
+
+
+def configure(mode: str, sink: Sink) -> None:
+    logs.shutdown_logging()
+    root = logging.getLogger()
+    for handler in root.handlers[:]:
+        root.removeHandler(handler)
+    if mode == "sync":
+        handler = logging.StreamHandler(sink)
+        handler.setFormatter(logs.StructuredFormatter())
+        handler.addFilter(tracing.CorrelationFilter())
+        root.addHandler(handler)
+        root.setLevel(logging.INFO)
+    elif mode in ("queued", "sampled"):
+        rates = "/work=0.1" if mode == "sampled" else ""
+        logs.configure_logging(Settings(log_sample_rates=rates), sink)
+    else:
+        root.setLevel(logging.WARNING)
+
+
+async def measure(client: httpx.AsyncClient, requests: int):
+    for item in range(20):  # warm up, including the renderer's first use
+        await client.get(f"/work/{item}")
+    latencies = []
+    cpu_start = time.process_time()
+    for item in range(requests):
+        start = time.perf_counter()
+        response = await client.get(f"/work/{item}")
+        latencies.append(time.perf_counter() - start)
+        assert response.status_code == 200
+    cpu = (time.process_time() - cpu_start) / requests
+    latencies.sort()
+    p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+    return statistics.median(latencies), p95, cpu
+
+
+async def run(requests: int, records: int, latency: float) -> None:
+    app = make_app(records)
+    transport = httpx.ASGITransport(app=app)
+    print(
+        f"{requests} requests, {records} records each, "
+        f"sink latency {latency * 1000:g} ms\n"
+    )
+    print(f"{'logging':>8} {'p50 ms':>9} {'p95 ms':>9} {'CPU ms/req':>11} {'lines':>8}")
+    async with httpx.AsyncClient(
+        transport=transport, base_url="http://bench"
+    ) as client:
+        for mode in ("off", "sync", "queued", "sampled"):
+            sink = Sink(latency)
+            configure(mode, sink)
+            p50, p95, cpu = await measure(client, requests)
+            # Let the listener finish before counting what was written.
+            logs.shutdown_logging()
+            timings = f"{p50 * 1000:>9.3f} {p95 * 1000:>9.3f} {cpu * 1000:>11.3f}"
+            print(f"{mode:>8} {timings} {sink.lines:>8}")
+    configure("off", Sink(0))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--records", type=int, default=5)
+    parser.add_argument("--sink-latency-ms", type=float, default=0.0)
+    args = parser.parse_args()
+    asyncio.run(run(args.requests, args.records, args.sink_latency_ms / 1000))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+"""
+Benchmark vectorized flow reports against a pure-Python loop.
+
+Generates N synthetic task transitions across many projects and three years
+(tasks move between todo, doing and done, are sometimes reopened and
+sometimes deleted), then builds the same report - completions, cycle time
+histograms, exact percentiles and rolling throughput per project - with
+``src.board.reports.flow_report`` and with a plain loop over the events,
+and checks that both agree. Timings exclude decoding rows from the database.
+
+Usage:
+    python benchmarks/bench_reports.py [--transitions 5000000] [--projects 200]
+"""
+import argparse
+import bisect
+import math
+import sys
+import time
+import uuid
+from datetime import date, timedelta
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from src.board.analytics import PERCENTILES  # noqa: E402
+from src.board.reports import (  # noqa: E402
+    HISTOGRAM_HOURS,
+    STATE_CODES,
+    Transitions,
+    flow_report,
+)
+
+TODO, DOING, DONE, DELETED = (
+    STATE_CODES[s] for s in ("todo", "doing", "done", "deleted")
+)
+DAY_US = 86400 * 10**6
+
+
+def synthetic(
+    count: int, projects: int, start: date, days: int, seed: int = 42
+) -> Transitions:
+    """About ``count`` events: 2-7 per task, created uniformly over ``days``."""
+    rng = np.random.default_rng(seed)
+    lengths = rng.integers(2, 8, size=count // 4)
+    lengths = lengths[: np.searchsorted(np.cumsum(lengths), count) + 1]
+    tasks = len(lengths)
+    task = np.repeat(np.arange(tasks, dtype=np.int64), lengths)
+    first = np.ones(len(task), dtype=bool)
+    first[1:] = task[1:] != task[:-1]
+    state = rng.choice([TODO, DOING, DONE], size=len(task), p=[0.15, 0.45, 0.4]).astype(
+        np.int8
+    )
+    state[first] = TODO
+    last = np.cumsum(lengths) - 1
+    state[last[rng.random(tasks) < 0.05]] = DELETED
+
+    created = np.datetime64(start, "us") + rng.integers(0, days * DAY_US, size=tasks)
+    gaps = rng.exponential(36 * 3600 * 10**6, size=len(task)).astype(np.int64)
+    gaps[first] = 0
+    offsets = np.cumsum(gaps)
+    offsets -= np.repeat(offsets[first], lengths)
+    at = np.repeat(created, lengths) + offsets.astype("timedelta64[us]")
+    project = np.repeat(rng.integers(0, projects, size=tasks).astype(np.int32), lengths)
+    return Transitions(
+        task, project, state, at, [uuid.uuid4() for _ in range(projects)]
+    )
+
+
+def python_report(
+    rows, projects: int, since: date, span: int, interval: int, window: int
+):
+    """The same report with a loop per event, on plain Python lists."""
+    task, project, state, at = rows
+    first_us = (
+        date(since.year, since.month, since.day) - date(1970, 1, 1)
+    ).days * DAY_US
+    hours = [[] for _ in range(projects)]
+    daily = [[0] * span for _ in range(projects)]
+    current = previous = created = started = None
+    for t, p, s, a in zip(task, project, state, at):
+        if t != current:
+            current, previous, created, started = t, None, a, None
+        if s == DONE and previous is not None and previous not in (DONE, DELETED):
+            day = (a - first_us) // DAY_US
+            if 0 <= day < span:
+                hours[p].append(
+                    max(0, a - (started if started is not None else created)) / 3.6e9
+                )
+                daily[p][day] += 1
+        if started is None and s in (DOING, DONE):
+            started = a
+        previous = s
+
+    report = []
+    ends = [min(end, span) for end in range(interval, span + interval, interval)]
+    for p in range(projects):
+        values = sorted(hours[p])
+        histogram = [0] * (len(HISTOGRAM_HOURS) + 1)
+        for value in values:
+            histogram[bisect.bisect_left(HISTOGRAM_HOURS, value)] += 1
+        percentiles = [
+            values[max(0, math.ceil(len(values) * q / 100) - 1)] if values else 0
+            for q in PERCENTILES
+        ]
+        running = [0]
+        for count in daily[p]:
+            running.append(running[-1] + count)
+        throughput = []
+        begin = 0
+        for end in ends:
+            rolling = (running[end] - running[max(0, end - window)]) / min(window, end)
+            throughput.append((running[end] - running[begin], rolling))
+            begin = end
+        report.append((len(values), percentiles, histogram, throughput))
+    return report
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--transitions", type=int, default=5000000)
+    parser.add_argument("--projects", type=int, default=200)
+    parser.add_argument("--interval", type=int, default=7)
+    parser.add_argument("--window", type=int, default=28)
+    args = parser.parse_args()
+
+    start = date(2022, 1, 1)
+    transitions = synthetic(args.transitions, args.projects, start, days=3 * 365)
+    since, until = start + timedelta(days=30), start + timedelta(days=3 * 365 - 1)
+    print(
+        f"{len(transitions.task)} transitions, {transitions.task[-1] + 1} tasks, "
+        f"{args.projects} projects, {since} to {until}"
+    )
+
+    began = time.perf_counter()
+    report = flow_report(transitions, since, until, args.interval, args.window)
+    vectorized = time.perf_counter() - began
+
+    rows = (
+        transitions.task.tolist(),
+        transitions.project.tolist(),
+        transitions.state.tolist(),
+        transitions.at.astype(np.int64).tolist(),
+    )
+    span = (until - since).days + 1
+    began = time.perf_counter()
+    expected = python_report(
+        rows, args.projects, since, span, args.interval, args.window
+    )
+    loop = time.perf_counter() - began
+
+    by_id = {flow.project_id: flow for flow in report.projects}
+    for project_id, (count, percentiles, histogram, throughput) in zip(
+        transitions.projects, expected
+    ):
+        flow = by_id[project_id]
+        assert flow.completed == count
+        if count:
+            assert list(flow.percentiles.values()) == [round(v, 3) for v in percentiles]
+        assert [b.count for b in flow.histogram] == histogram
+        assert [(t.completed, t.rolling_per_day) for t in flow.throughput] == [
+            (c, round(r, 3)) for c, r in throughput
+        ]
+
+    print(
+        f"{report.total.completed} completions, p50 {report.total.percentiles['p50']}h"
+    )
+    print(f"{'vectorized':>12} {vectorized:>8.2f}s")
+    print(f"{'python loop':>12} {loop:>8.2f}s  ({loop / vectorized:.1f}x slower)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+Benchmark board response serialization on a large board.
+
+Serves one board of N cards (default 10k, over 5 columns) through four
+in-process routes and reports request latency and CPU time per request:
+
+- ``response_model``: FastAPI's default path; the route returns the board
+  as models and FastAPI validates, converts and ``json.dumps`` it.
+- ``model_dump_json``: the board built as validated models and dumped by
+  pydantic-core (the board route before orjson encoding).
+- ``orjson``: ``schemas.encode_board`` writing engine objects directly.
+- ``snapshot``: bytes encoded once and served from memory, as the board
+  cache does for repeat reads.
+
+Usage:
+    python benchmarks/bench_responses.py [--cards 10000] [--requests 200]
+"""
+import argparse
+import asyncio
+import statistics
+import sys
+import time
+from pathlib import Path
+
+import httpx
+from fastapi import FastAPI, Response
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from src.board import schemas  # noqa: E402
+from src.board.engine import BoardEngine  # noqa: E402
+from src.core.responses import JSONBytesResponse  # noqa: E402
+
+
+def make_board(cards: int):
+    engine = BoardEngine()
+    project = engine.create_project("bench", "A large board")
+    columns = [
+        engine.create_column(project.id, name).id for name in ("A", "B", "C", "D", "E")
+    ]
+    for i in range(cards):
+        engine.create_task(
+            project.id,
+            columns[i % len(columns)],
+            f"Card {i}: investigate the flaky export job",
+            description="Steps to reproduce, expected and actual behaviour." * 2,
+            metadata={
+                "points": i % 8,
+                "labels": ["backend", "bug"],
+                "sprint": f"S{i % 12}",
+            },
+        )
+    return engine, project.id
+
+
+def validated_board(engine: BoardEngine, project_id) -> schemas.Board:
+    columns = [
+        schemas.BoardColumn(
+            id=column.id,
+            project_id=column.project_id,
+            name=column.name,
+            rank=column.rank,
+            color=column.color,
+            tasks=[
+                schemas.Task.model_validate(task)
+                for task in engine.iter_tasks(column.id)
+            ],
+        )
+        for column in engine.iter_columns(project_id)
+    ]
+    project = schemas.Project.model_validate(engine.get_project(project_id))
+    return schemas.Board(project=project, columns=columns)
+
+
+def make_app(engine: BoardEngine, project_id) -> FastAPI:
+    app = FastAPI()
+    snapshot = schemas.encode_board(engine, project_id)
+
+    @app.get("/response_model", response_model=schemas.Board)
+    async def default_path():
+        return validated_board(engine, project_id)
+
+    @app.get("/model_dump_json")
+    async def pydantic_path():
+        payload = validated_board(engine, project_id).model_dump_json().encode()
+        return Response(payload, media_type="application/json")
+
+    @app.get("/orjson")
+    async def orjson_path():
+        return JSONBytesResponse(schemas.encode_board(engine, project_id))
+
+    @app.get("/snapshot")
+    async def snapshot_path():
+        return JSONBytesResponse(snapshot)
+
+    return app
+
+
+async def measure(client: httpx.AsyncClient, path: str, requests: int):
+    await client.get(path)  # warm up
+    latencies = []
+    cpu_start = time.process_time()
+    for _ in range(requests):
+        start = time.perf_counter()
+        response = await client.get(path)
+        latencies.append(time.perf_counter() - start)
+        assert response.status_code == 200
+    cpu = (time.process_time() - cpu_start) / requests
+    latencies.sort()
+    p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+    return len(response.content), statistics.median(latencies), p95, cpu
+
+
+async def run(cards: int, requests: int) -> None:
+    engine, project_id = make_board(cards)
+    app = make_app(engine, project_id)
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(
+        transport=transport, base_url="http://bench"
+    ) as client:
+        bodies = {
+            path: (await client.get(path)).json()
+            for path in ("/response_model", "/model_dump_json", "/orjson")
+        }
+        assert (
+            bodies["/orjson"] == bodies["/response_model"] == bodies["/model_dump_json"]
+        )
+        print(f"{cards} cards, {requests} requests per route\n")
+        print(
+            f"{'route':>16} {'bytes':>10} {'p50 ms':>9} {'p95 ms':>9} "
+            f"{'CPU ms/req':>11}"
+        )
+        for path in ("/response_model", "/model_dump_json", "/orjson", "/snapshot"):
+            size, p50, p95, cpu = await measure(client, path, requests)
+            timings = f"{p50 * 1000:>9.2f} {p95 * 1000:>9.2f} {cpu * 1000:>11.2f}"
+            print(f"{path[1:]:>16} {size:>10} {timings}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--cards", type=int, default=10000)
+    parser.add_argument("--requests", type=int, default=200)
+    args = parser.parse_args()
+    asyncio.run(run(args.cards, args.requests))
+
+
+if __name__ == "__main__":
+    main()
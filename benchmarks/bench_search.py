@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Benchmark the local inverted search index on a synthetic card corpus.
+
+Builds an index of N cards whose titles and descriptions draw words from a
+Zipf-distributed vocabulary, then times type-ahead queries (a partial last
+word, optionally after a full word) against a substring scan of the same
+corpus, which is what ``LIKE '%q%'`` does.
+
+Usage:
+    python benchmarks/bench_search.py [--cards 500000] [--queries 2000] \
+        [--vocabulary 30000]
+"""
+import argparse
+import random
+import resource
+import statistics
+import string
+import sys
+import time
+import uuid
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from src.board.search import InvertedIndex  # noqa: E402
+
+
+def make_vocabulary(size: int, rng: random.Random):
+    words = set()
+    while len(words) < size:
+        words.add("".join(rng.choices(string.ascii_lowercase, k=rng.randint(3, 10))))
+    words = sorted(words)
+    rng.shuffle(words)
+    weights = [1 / (rank + 1) for rank in range(size)]
+    return words, weights
+
+
+def percentile(samples, fraction: float) -> float:
+    return samples[min(len(samples) - 1, int(len(samples) * fraction))]
+
+
+def report(name: str, samples_ns) -> None:
+    samples = sorted(sample / 1e6 for sample in samples_ns)
+    print(
+        f"{name:>22} {statistics.median(samples):>9.3f} "
+        f"{percentile(samples, 0.95):>9.3f} {percentile(samples, 0.99):>9.3f}"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--cards", type=int, default=500000)
+    parser.add_argument("--queries", type=int, default=2000)
+    parser.add_argument("--vocabulary", type=int, default=30000)
+    parser.add_argument("--scan-queries", type=int, default=20)
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    words, weights = make_vocabulary(args.vocabulary, rng)
+    projects = [uuid.uuid4() for _ in range(50)]
+    cards = [
+        (
+            " ".join(rng.choices(words, weights, k=rng.randint(3, 8))).capitalize(),
+            " ".join(rng.choices(words, weights, k=rng.randint(8, 20))),
+        )
+        for _ in range(args.cards)
+    ]
+
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    index = InvertedIndex()
+    start = time.perf_counter()
+    for title, description in cards:
+        index.add(uuid.uuid4(), rng.choice(projects), title, description)
+    build = time.perf_counter() - start
+    rss_after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    print(
+        f"indexed {len(index)} cards in {build:.1f}s "
+        f"({len(index) / build:.0f} cards/s, "
+        f"+{(rss_after - rss_before) / 1024:.0f} MB peak RSS)"
+    )
+
+    def prefix_query() -> str:
+        word = rng.choices(words, weights)[0]
+        return word[: rng.randint(2, len(word))]
+
+    queries = {
+        "prefix": [prefix_query() for _ in range(args.queries)],
+        "word + prefix": [
+            f"{rng.choices(words, weights)[0]} {prefix_query()}"
+            for _ in range(args.queries)
+        ],
+    }
+
+    print(f"\n{'query (ms)':>22} {'p50':>9} {'p95':>9} {'p99':>9}")
+    for name, batch in queries.items():
+        samples = []
+        for query in batch:
+            begin = time.perf_counter_ns()
+            index.search(query)
+            samples.append(time.perf_counter_ns() - begin)
+        report(name, samples)
+
+    samples = []
+    for query in queries["prefix"][: args.scan_queries]:
+        begin = time.perf_counter_ns()
+        matches = [t for t, d in cards if query in t.lower() or query in d]
+        matches.sort(key=len)
+        samples.append(time.perf_counter_ns() - begin)
+    report("substring scan", samples)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""
+Board analytics API routes: velocity, burndown and cycle time.
+"""
+from datetime import date
+from typing import Optional
+from uuid import UUID
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.board import analytics, schemas, store
+from src.board.service import BoardService, get_board_service
+
+router = APIRouter(prefix="/api/projects", tags=["analytics"])
+
+
+async def _check_project(session: AsyncSession, project_id: UUID) -> None:
+    if await store.get_project_row(session, project_id) is None:
+        raise HTTPException(status_code=404, detail=f"Project {project_id} not found")
+
+
+@router.get("/{project_id}/velocity", response_model=schemas.Velocity)
+async def get_velocity(
+    project_id: UUID, service: BoardService = Depends(get_board_service)
+):
+    """Tasks and story points completed per sprint."""
+    async with service.sessions() as session:
+        await _check_project(session, project_id)
+        sprints = await analytics.velocity(session, project_id)
+    return schemas.Velocity(project_id=project_id, sprints=sprints)
+
+
+@router.get("/{project_id}/burndown", response_model=schemas.Burndown)
+async def get_burndown(
+    project_id: UUID,
+    sprint: Optional[str] = Query(None, max_length=100, description="Only this sprint"),
+    until: Optional[date] = Query(
+        None, description="Last day to report (default today)"
+    ),
+    service: BoardService = Depends(get_board_service),
+):
+    """Remaining and completed tasks and points per day."""
+    async with service.sessions() as session:
+        await _check_project(session, project_id)
+        days = await analytics.burndown(session, project_id, sprint, until)
+    return schemas.Burndown(project_id=project_id, sprint=sprint, days=days)
+
+
+@router.get("/{project_id}/cycle-time", response_model=schemas.CycleTime)
+async def get_cycle_time(
+    project_id: UUID,
+    sprint: Optional[str] = Query(None, max_length=100, description="Only this sprint"),
+    since: Optional[date] = Query(None, description="First completion day to include"),
+    until: Optional[date] = Query(None, description="Last completion day to include"),
+    service: BoardService = Depends(get_board_service),
+):
+    """Cycle time from first leaving the first column to reaching a done column."""
+    async with service.sessions() as session:
+        await _check_project(session, project_id)
+        count, mean, percentiles = await analytics.cycle_time(
+            session, project_id, sprint, since, until
+        )
+    return schemas.CycleTime(
+        project_id=project_id,
+        sprint=sprint,
+        since=since,
+        until=until,
+        count=count,
+        mean_hours=mean,
+        percentiles=percentiles,
+    )
@@ -0,0 +1,118 @@
+"""
+Task attachment routes: streamed uploads, listings, ranged downloads.
+"""
+from typing import List, Optional
+from uuid import UUID
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request, status
+
+from src.board import schemas
+from src.board.service import BoardService, get_board_service
+from src.core.attachments import (
+    AttachmentStore,
+    UploadTooLargeError,
+    download,
+    get_attachment_store,
+)
+
+from .board import board_errors
+
+router = APIRouter(prefix="/api", tags=["attachments"])
+
+# ``type/subtype`` made of RFC 6838 name characters, optionally with parameters
+MEDIA_TYPE = r"^[\w!#$&^.+-]+/[\w!#$&^.+-]+\s*(;.*)?$"
+
+
+def too_large(limit: int) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+        detail=f"Attachments are limited to {limit} bytes",
+    )
+
+
+@router.post(
+    "/tasks/{task_id}/attachments", response_model=schemas.Attachment, status_code=201
+)
+async def upload_attachment(
+    task_id: UUID,
+    request: Request,
+    filename: str = Query(..., min_length=1, max_length=255),
+    content_type: str = Header(
+        "application/octet-stream", max_length=255, pattern=MEDIA_TYPE
+    ),
+    content_length: Optional[int] = Header(None),
+    service: BoardService = Depends(get_board_service),
+    store: AttachmentStore = Depends(get_attachment_store),
+):
+    """
+    Attach the request body to a task as ``filename``.
+
+    The body is the raw file (not a multipart form); it is streamed to disk
+    and hashed as it arrives. Bodies over ``max_upload_size`` get 413, from
+    ``Content-Length`` before anything is read or once the stream passes it.
+    """
+    if content_length is not None and content_length > store.max_size:
+        raise too_large(store.max_size)
+    if content_type.lower().startswith("multipart/"):
+        raise HTTPException(
+            status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+            detail="Send the file as the request body, not as a multipart form",
+        )
+    with board_errors():
+        await service.task(task_id)
+    try:
+        return await store.save(task_id, filename, content_type, request.stream())
+    except UploadTooLargeError as exc:
+        raise too_large(exc.limit)
+
+
+@router.get("/tasks/{task_id}/attachments", response_model=List[schemas.Attachment])
+async def list_attachments(
+    task_id: UUID,
+    service: BoardService = Depends(get_board_service),
+    store: AttachmentStore = Depends(get_attachment_store),
+):
+    """List a task's attachments, oldest first."""
+    with board_errors():
+        await service.task(task_id)
+    return await store.list_for_task(task_id)
+
+
+@router.api_route(
+    "/attachments/{attachment_id}",
+    methods=["GET", "HEAD"],
+    responses={
+        200: {"content": {"application/octet-stream": {}}},
+        206: {"description": "The requested byte range"},
+        304: {"description": "Unchanged since the given ETag"},
+        416: {"description": "Range outside the file"},
+        410: {"description": "The stored content is missing"},
+    },
+)
+async def download_attachment(
+    attachment_id: UUID,
+    range_: Optional[str] = Header(None, alias="Range"),
+    if_range: Optional[str] = Header(None),
+    if_none_match: Optional[str] = Header(None),
+    store: AttachmentStore = Depends(get_attachment_store),
+):
+    """Download an attachment, or one byte range of it."""
+    attachment = await store.get(attachment_id)
+    if attachment is None:
+        raise HTTPException(
+            status_code=404, detail=f"Attachment {attachment_id} not found"
+        )
+    return download(
+        attachment, store.blob_path(attachment.sha256), range_, if_range, if_none_match
+    )
+
+
+@router.delete("/attachments/{attachment_id}", status_code=204)
+async def delete_attachment(
+    attachment_id: UUID, store: AttachmentStore = Depends(get_attachment_store)
+):
+    """Remove an attachment."""
+    if not await store.delete(attachment_id):
+        raise HTTPException(
+            status_code=404, detail=f"Attachment {attachment_id} not found"
+        )
@@ -0,0 +1,424 @@
+"""
+Kanban board API routes: projects, columns, tasks, card moves, filtered
+task listings, batched task operations and bulk NDJSON export/import.
+"""
+import logging
+from contextlib import contextmanager
+from typing import Any, Iterator, List, Optional, Union
+from uuid import UUID
+
+from fastapi import (
+    APIRouter,
+    Depends,
+    Header,
+    HTTPException,
+    Query,
+    Request,
+    Response,
+    status,
+)
+from fastapi.responses import StreamingResponse
+
+from src.board import filters, schemas, store, transfer
+from src.board.engine import BoardError, NotFoundError
+from src.board.filters import FilterCompiler, get_filter_compiler
+from src.board.service import BatchError, BoardService, ConflictError, get_board_service
+from src.core import compression
+from src.core.cache import BoardCache, get_board_cache
+from src.core.config import settings
+from src.core.hub import BoardHub, get_board_hub
+from src.core.metrics import TASKS_CREATED
+from src.core.responses import JSONBytesResponse, encode
+from src.core.tracing import span
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(prefix="/api", tags=["board"])
+
+
+@contextmanager
+def board_errors() -> Iterator[None]:
+    """Translate board engine errors into HTTP errors."""
+    try:
+        yield
+    except BatchError as exc:
+        code = 404 if isinstance(exc.error, NotFoundError) else 400
+        raise HTTPException(
+            status_code=code, detail={"index": exc.index, "error": str(exc.error)}
+        )
+    except NotFoundError as exc:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(exc))
+    except ConflictError as exc:
+        # Only after a retry also found the board changed; the client can try again.
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(exc))
+    except transfer.InvalidImportError as exc:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail={"line": exc.line, "errors": exc.errors},
+        )
+    except BoardError as exc:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc))
+
+
+class BoardNotifier:
+    """Invalidates cached snapshots and broadcasts an event after a board write."""
+
+    def __init__(
+        self,
+        cache: BoardCache = Depends(get_board_cache),
+        hub: BoardHub = Depends(get_board_hub),
+    ):
+        self.cache = cache
+        self.hub = hub
+
+    async def __call__(
+        self,
+        project_id: UUID,
+        version: int,
+        event_type: str,
+        data: Optional[Any] = None,
+    ) -> None:
+        try:
+            await self.cache.invalidate(project_id)
+        except Exception:
+            logger.warning("Failed to invalidate board %s", project_id, exc_info=True)
+        try:
+            await self.hub.publish(project_id, event_type, version, data)
+        except Exception:
+            logger.warning(
+                "Failed to publish %s for board %s",
+                event_type,
+                project_id,
+                exc_info=True,
+            )
+
+
+def task_data(task) -> dict:
+    return schemas.Task.model_validate(task).model_dump(mode="json")
+
+
+@router.post("/projects", response_model=schemas.Project, status_code=201)
+async def create_project(
+    payload: schemas.ProjectCreate, service: BoardService = Depends(get_board_service)
+):
+    """Create a new project board."""
+    return await service.create_project(payload.name, payload.description)
+
+
+@router.get("/projects/{project_id}", response_model=schemas.Project)
+async def get_project(
+    project_id: UUID, service: BoardService = Depends(get_board_service)
+):
+    """Get project details."""
+    with board_errors():
+        return await service.project(project_id)
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Evaluate an If-None-Match header against an ETag (weak comparison)."""
+    if not if_none_match:
+        return False
+    candidates = [value.strip() for value in if_none_match.split(",")]
+    return "*" in candidates or etag in (
+        value.removeprefix("W/") for value in candidates
+    )
+
+
+@router.get(
+    "/projects/{project_id}/board",
+    response_model=Union[schemas.Board, schemas.BoardDelta],
+    responses={304: {"description": "Board unchanged since the given ETag"}},
+)
+async def get_board(
+    project_id: UUID,
+    since: Optional[int] = Query(
+        None, ge=0, description="Return only changes after this board version"
+    ),
+    if_none_match: Optional[str] = Header(None),
+    accept_encoding: Optional[str] = Header(None),
+    service: BoardService = Depends(get_board_service),
+    cache: BoardCache = Depends(get_board_cache),
+):
+    """
+    Get the full kanban board, columns and tasks in display order.
+
+    With ``since`` only columns and tasks changed after that version are
+    returned (plus deleted task ids); if the change log no longer reaches
+    back that far the full board is returned instead. Full responses carry a
+    strong ``ETag`` and honour ``If-None-Match`` with 304. Compressed full
+    responses are served from precompressed variants cached with the snapshot.
+    """
+    with board_errors():
+        project = await service.project(project_id)
+    engine = service.engine
+    revision = project.revision
+
+    if since is not None:
+        changes = engine.changes_since(project_id, since)
+        if changes is not None:
+            return JSONBytesResponse(
+                schemas.encode_delta(engine, project_id, since, changes)
+            )
+
+    def build() -> bytes:
+        with span("board.encode", {"board.project_id": str(project_id)}) as current:
+            payload = schemas.encode_board(engine, project_id)
+            current.set_attribute("board.bytes", len(payload))
+            return payload
+
+    # Cached only if no other worker wrote to the board after this copy's revision
+    snapshot = await cache.get_or_build(
+        project_id, build, lambda: service.is_current(project_id, revision)
+    )
+    encoding = None
+    # Without a cached snapshot (version -1) the middleware compresses instead.
+    if (
+        snapshot.version >= 0
+        and len(snapshot.payload) >= settings.compression_minimum_size
+    ):
+        encoding = compression.negotiate(accept_encoding, compression.encodings())
+    etag = compression.variant_etag(snapshot.etag, encoding)
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if settings.compression_enabled:
+        headers["Vary"] = "Accept-Encoding"
+    if etag_matches(if_none_match, etag) or etag_matches(if_none_match, snapshot.etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    if encoding is None:
+        return JSONBytesResponse(snapshot.payload, headers=headers)
+    headers["Content-Encoding"] = encoding
+    payload = await cache.get_or_compress(project_id, snapshot, encoding)
+    return JSONBytesResponse(payload, headers=headers)
+
+
+@router.get(
+    "/projects/{project_id}/export",
+    response_class=StreamingResponse,
+    responses={200: {"content": {"application/x-ndjson": {}}}},
+)
+async def export_board(
+    project_id: UUID, service: BoardService = Depends(get_board_service)
+):
+    """
+    Stream the board as NDJSON: a project line, one line per column, then
+    one line per task in column and rank order.
+    """
+    async with service.sessions() as session:
+        if await store.get_project_row(session, project_id) is None:
+            raise HTTPException(
+                status_code=404, detail=f"Project {project_id} not found"
+            )
+    return StreamingResponse(
+        transfer.export_board(service.sessions, project_id, settings.export_batch_size),
+        media_type="application/x-ndjson",
+        headers={
+            "Content-Disposition": f'attachment; filename="board-{project_id}.ndjson"'
+        },
+    )
+
+
+@router.post("/projects/{project_id}/import", response_model=schemas.ImportResult)
+async def import_board(
+    project_id: UUID,
+    request: Request,
+    service: BoardService = Depends(get_board_service),
+    notify: BoardNotifier = Depends(),
+):
+    """
+    Append the columns and tasks of an NDJSON export to this board.
+
+    The body is streamed and validated line by line; the first invalid line
+    aborts the whole import with 422 and nothing is written.
+    """
+    with board_errors():
+        result = await transfer.import_board(
+            service, project_id, request.stream(), settings.import_batch_size
+        )
+        project = await service.project(project_id)
+    await notify(project_id, project.version, "board.imported", result.model_dump())
+    return result
+
+
+@router.post(
+    "/projects/{project_id}/columns", response_model=schemas.Column, status_code=201
+)
+async def create_column(
+    project_id: UUID,
+    payload: schemas.ColumnCreate,
+    service: BoardService = Depends(get_board_service),
+    notify: BoardNotifier = Depends(),
+):
+    """Append a column to the board."""
+    with board_errors():
+        column = await service.create_column(project_id, payload.name, payload.color)
+    await notify(
+        project_id,
+        (await service.project(project_id)).version,
+        "column.created",
+        schemas.Column.model_validate(column).model_dump(mode="json"),
+    )
+    return column
+
+
+@router.post(
+    "/projects/{project_id}/tasks", response_model=schemas.Task, status_code=201
+)
+async def create_task(
+    project_id: UUID,
+    payload: schemas.TaskCreate,
+    service: BoardService = Depends(get_board_service),
+    notify: BoardNotifier = Depends(),
+):
+    """Create a task at the bottom of its column."""
+    with board_errors():
+        task = await service.create_task(
+            project_id,
+            payload.column_id,
+            payload.title,
+            description=payload.description,
+            metadata=payload.metadata,
+            user_story_id=payload.user_story_id,
+        )
+    TASKS_CREATED.inc()
+    version = (await service.project(project_id)).version
+    await notify(project_id, version, "task.created", task_data(task))
+    return task
+
+
+@router.get("/tasks", response_model=List[schemas.Task])
+async def list_tasks(
+    filter_: str = Query(
+        "{}",
+        alias="filter",
+        max_length=filters.MAX_FILTER_LENGTH,
+        description="JSON filter over task fields and metadata paths",
+    ),
+    limit: int = Query(100, ge=1, le=1000),
+    after: Optional[UUID] = Query(
+        None, description="Return tasks with ids after this one"
+    ),
+    service: BoardService = Depends(get_board_service),
+    compiler: FilterCompiler = Depends(get_filter_compiler),
+):
+    """List tasks matching a filter, across boards, in id order."""
+    with board_errors():
+        query = compiler.query(filters.parse_filter(filter_), after)
+    async with service.sessions() as session:
+        rows = await store.find_tasks(
+            session, query.statement, query.params, query.residual, limit
+        )
+    return JSONBytesResponse(encode([row._mapping for row in rows]))
+
+
+@router.get("/tasks/filter-indexes", response_model=List[schemas.IndexRecommendation])
+async def recommend_filter_indexes(
+    top: int = Query(
+        12, ge=1, le=100, description="Most-used filter shapes to consider"
+    ),
+    compiler: FilterCompiler = Depends(get_filter_compiler),
+):
+    """PostgreSQL indexes that would let the most-used task filters run fully in SQL."""
+    return filters.recommend_indexes(compiler.usage, top)
+
+
+@router.get("/tasks/{task_id}", response_model=schemas.Task)
+async def get_task(task_id: UUID, service: BoardService = Depends(get_board_service)):
+    """Get task details."""
+    with board_errors():
+        return await service.task(task_id)
+
+
+@router.put("/tasks/{task_id}", response_model=schemas.Task)
+async def update_task(
+    task_id: UUID,
+    payload: schemas.TaskUpdate,
+    service: BoardService = Depends(get_board_service),
+    notify: BoardNotifier = Depends(),
+):
+    """Update task fields."""
+    with board_errors():
+        task = await service.update_task(
+            task_id, **payload.model_dump(exclude_unset=True)
+        )
+    version = (await service.project(task.project_id)).version
+    await notify(task.project_id, version, "task.updated", task_data(task))
+    return task
+
+
+@router.delete("/tasks/{task_id}", status_code=204)
+async def delete_task(
+    task_id: UUID,
+    service: BoardService = Depends(get_board_service),
+    notify: BoardNotifier = Depends(),
+):
+    """Delete a task."""
+    with board_errors():
+        task = await service.delete_task(task_id)
+    version = (await service.project(task.project_id)).version
+    await notify(
+        task.project_id,
+        version,
+        "task.deleted",
+        {"id": str(task.id), "column_id": str(task.column_id)},
+    )
+
+
+@router.put("/tasks/{task_id}/move", response_model=schemas.Task)
+async def move_task(
+    task_id: UUID,
+    payload: schemas.TaskMove,
+    service: BoardService = Depends(get_board_service),
+    notify: BoardNotifier = Depends(),
+):
+    """Move a task to a column, between its new neighbours."""
+    with board_errors():
+        task = await service.move_task(
+            task_id,
+            payload.column_id,
+            after_id=payload.after_id,
+            before_id=payload.before_id,
+        )
+    version = (await service.project(task.project_id)).version
+    await notify(task.project_id, version, "task.moved", task_data(task))
+    return task
+
+
+@router.post("/batch", response_model=schemas.BatchResponse)
+async def apply_batch(
+    payload: schemas.BatchRequest,
+    service: BoardService = Depends(get_board_service),
+    notify: BoardNotifier = Depends(),
+):
+    """
+    Apply an ordered list of task create/update/move/delete operations to
+    one board atomically.
+
+    The batch commits in one transaction with a single version bump, cache
+    invalidation and ``batch.applied`` event. If any operation fails nothing
+    is applied and the error names its ``index``.
+    """
+    with board_errors():
+        project, tasks = await service.apply_batch(
+            payload.project_id, payload.operations
+        )
+    results = [
+        schemas.BatchResult(
+            index=index,
+            op=operation.op,
+            task_id=task.id,
+            task=None
+            if operation.op == "delete"
+            else schemas.Task.model_validate(task),
+        )
+        for index, (operation, task) in enumerate(zip(payload.operations, tasks))
+    ]
+    TASKS_CREATED.inc(sum(operation.op == "create" for operation in payload.operations))
+    response = schemas.BatchResponse(
+        project_id=project.id, version=project.version, results=results
+    )
+    await notify(
+        project.id,
+        project.version,
+        "batch.applied",
+        response.model_dump(mode="json")["results"],
+    )
+    return response
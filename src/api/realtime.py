@@ -0,0 +1,58 @@
+"""
+WebSocket endpoint streaming live board updates.
+"""
+import asyncio
+from uuid import UUID
+
+from fastapi import APIRouter, Depends, WebSocket, WebSocketDisconnect, status
+
+from src.board.engine import NotFoundError
+from src.board.service import BoardService, get_board_service
+from src.core.hub import BoardHub, Subscriber, get_board_hub
+
+router = APIRouter(tags=["realtime"])
+
+
+async def _send_events(websocket: WebSocket, subscriber: Subscriber) -> None:
+    while True:
+        await websocket.send_text(await subscriber.get())
+
+
+async def _drain_client(websocket: WebSocket) -> None:
+    # Clients only listen; reading keeps pings flowing and detects disconnects.
+    while True:
+        message = await websocket.receive()
+        if message["type"] == "websocket.disconnect":
+            return
+
+
+@router.websocket("/ws/projects/{project_id}")
+async def board_updates(
+    websocket: WebSocket,
+    project_id: UUID,
+    service: BoardService = Depends(get_board_service),
+    hub: BoardHub = Depends(get_board_hub),
+):
+    """Stream task and column events for one board as JSON messages."""
+    try:
+        await service.project(project_id)
+    except NotFoundError:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+
+    await websocket.accept()
+    subscriber = hub.subscribe(project_id)
+    tasks = [
+        asyncio.create_task(_send_events(websocket, subscriber)),
+        asyncio.create_task(_drain_client(websocket)),
+    ]
+    try:
+        done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+        for task in done:
+            error = None if task.cancelled() else task.exception()
+            if error is not None and not isinstance(error, WebSocketDisconnect):
+                raise error
+    finally:
+        hub.unsubscribe(subscriber)
+        for task in tasks:
+            task.cancel()
@@ -0,0 +1,43 @@
+"""
+Cross-project report API routes.
+
+``src.board.reports`` (and with it NumPy) is imported on the first report
+request rather than at startup.
+"""
+from datetime import date
+from typing import List, Optional
+from uuid import UUID
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+
+from src.board import schemas
+from src.board.service import BoardService, get_board_service
+
+router = APIRouter(prefix="/api/reports", tags=["analytics"])
+
+
+@router.get("/flow", response_model=schemas.FlowReport)
+async def get_flow_report(
+    since: Optional[date] = Query(
+        None, description="First completion day (default a year ago)"
+    ),
+    until: Optional[date] = Query(
+        None, description="Last completion day (default today)"
+    ),
+    project_id: Optional[List[UUID]] = Query(None, description="Only these projects"),
+    interval: int = Query(7, ge=1, le=366, description="Days per throughput point"),
+    window: int = Query(
+        28, ge=1, le=366, description="Rolling throughput window in days"
+    ),
+    service: BoardService = Depends(get_board_service),
+):
+    """Cycle time histograms, percentiles and rolling throughput across projects."""
+    from src.board import reports
+
+    try:
+        since, until = reports.report_period(since, until)
+    except ValueError as error:
+        raise HTTPException(status_code=400, detail=str(error))
+    return await reports.flow(
+        service.sessions, project_id, since, until, interval, window
+    )
@@ -0,0 +1,28 @@
+"""
+Search API routes.
+"""
+from typing import List, Optional
+from uuid import UUID
+
+from fastapi import APIRouter, Depends, Query
+
+from src.board import schemas
+from src.board.search import get_search_backend
+
+router = APIRouter(prefix="/api/search", tags=["search"])
+
+
+@router.get("/tasks", response_model=List[schemas.SearchHit])
+async def search_tasks(
+    q: str = Query(
+        ...,
+        min_length=1,
+        max_length=200,
+        description="Words to match; the last may be partial",
+    ),
+    project_id: Optional[UUID] = Query(None, description="Only search this board"),
+    limit: int = Query(20, ge=1, le=100),
+    backend=Depends(get_search_backend),
+):
+    """Full-text search over task titles and descriptions, best matches first."""
+    return [hit._asdict() for hit in await backend.search(q, project_id, limit)]
@@ -0,0 +1,510 @@
+"""
+Incrementally maintained board analytics: velocity, burndown and cycle time.
+
+A task's analytic state is its column's role, its sprint (``metadata["sprint"]``)
+and its story points (``metadata["points"]``, 0 if absent). A column is
+"done" if its name is one of ``settings.analytics_done_columns``, "todo" if
+it is the board's first column, and "doing" otherwise; columns are only ever
+appended, so a column's role never changes.
+
+Every task write that changes that state appends the new state to
+``task_events`` and adds the change to per project, sprint and day totals in
+the same transaction: tasks and points added to scope (negative when they
+leave it) and tasks and points completed (negative when reopened). Each
+completion also counts its cycle time, from the task's first move out of
+"todo" (or its creation) to "done", in a log-scale bucket histogram per
+project, sprint and day. The buckets grow by 5%, so any percentile read
+from them is within about 2.5% of the exact value, and histograms for a
+date range merge by adding counts.
+
+Reports read these aggregates in O(days), never the task history. The
+history is kept so ``python -m src.board.analytics rebuild`` can recompute
+the aggregates, e.g. after changing the done columns.
+"""
+import argparse
+import asyncio
+import logging
+import math
+from collections import Counter, defaultdict
+from datetime import date, datetime, timedelta
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    List,
+    NamedTuple,
+    Optional,
+    Sequence,
+    Set,
+    Tuple,
+)
+from uuid import UUID
+
+from sqlalchemy import Table, case, delete, func, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.core.config import settings
+from src.core.database import create_tables, dispose_engine, session_scope
+
+from . import schemas, store, tables
+from .engine import BoardEngine, Task
+
+logger = logging.getLogger(__name__)
+
+TODO = "todo"
+DOING = "doing"
+DONE = "done"
+DELETED = "deleted"
+
+# Cycle time bucket bounds grow by this factor: bucket b holds durations in
+# (GROWTH ** (b - 1), GROWTH ** b] seconds, and bucket 0 anything up to 1s.
+BUCKET_GROWTH = 1.05
+_LOG_GROWTH = math.log(BUCKET_GROWTH)
+
+PERCENTILES = (50, 75, 85, 95)
+
+_INSERTS: Dict[str, Callable[[Table], Any]] = {
+    "postgresql": postgresql.insert,
+    "sqlite": sqlite.insert,
+}
+
+
+class TaskState(NamedTuple):
+    column_id: UUID
+    state: str
+    sprint: str  # "" when the task is in no sprint
+    points: float
+
+
+class Change(NamedTuple):
+    task_id: UUID
+    project_id: UUID
+    old: Optional[TaskState]  # None for a new task
+    new: Optional[TaskState]  # None for a deleted task
+
+
+def done_columns() -> Set[str]:
+    return {name.strip().lower() for name in settings.analytics_done_columns.split(",")}
+
+
+def column_state(name: str, first: bool) -> str:
+    if name.strip().lower() in done_columns():
+        return DONE
+    return TODO if first else DOING
+
+
+def task_state(column_id: UUID, state: str, metadata: Dict[str, Any]) -> TaskState:
+    sprint = metadata.get("sprint")
+    points = metadata.get("points")
+    if isinstance(points, bool) or not isinstance(points, (int, float)):
+        points = 0
+    return TaskState(
+        column_id, state, "" if sprint is None else str(sprint)[:100], float(points)
+    )
+
+
+def engine_state(engine: BoardEngine, task: Task) -> TaskState:
+    """The analytic state of a task as the engine holds it now."""
+    column = engine.columns[task.column_id]
+    first = engine.projects[task.project_id].columns.first()
+    state = column_state(column.name, first is not None and first[1] == column.id)
+    return task_state(task.column_id, state, task.metadata)
+
+
+def bucket_of(seconds: float) -> int:
+    if seconds <= 1:
+        return 0
+    return math.ceil(math.log(seconds) / _LOG_GROWTH)
+
+
+def bucket_seconds(bucket: int) -> float:
+    """A bucket's representative duration: the geometric middle of its bounds."""
+    return 0.0 if bucket == 0 else BUCKET_GROWTH ** (bucket - 0.5)
+
+
+def _completes(old: Optional[TaskState], new: Optional[TaskState]) -> bool:
+    return (
+        new is not None and new.state == DONE and old is not None and old.state != DONE
+    )
+
+
+class Aggregates:
+    """Additions to ``analytics_days`` and ``cycle_time_buckets``, keyed by row."""
+
+    def __init__(self) -> None:
+        # (project, sprint, day) -> [tasks added, points added, tasks done, points done]
+        self.days: Dict[Tuple[UUID, str, date], List[float]] = defaultdict(
+            lambda: [0, 0.0, 0, 0.0]
+        )
+        self.cycles: Counter = Counter()
+
+    def add(
+        self,
+        project_id: UUID,
+        old: Optional[TaskState],
+        new: Optional[TaskState],
+        day: date,
+        cycle_seconds: Optional[float] = None,
+    ) -> None:
+        for state, sign in ((old, -1), (new, 1)):
+            if state is None:
+                continue
+            totals = self.days[(project_id, state.sprint, day)]
+            totals[0] += sign
+            totals[1] += sign * state.points
+            if state.state == DONE:
+                totals[2] += sign
+                totals[3] += sign * state.points
+        if cycle_seconds is not None and new is not None:
+            self.cycles[(project_id, new.sprint, day, bucket_of(cycle_seconds))] += 1
+
+    async def write(self, session: AsyncSession) -> None:
+        days = [
+            {
+                "project_id": project_id,
+                "sprint": sprint,
+                "day": day,
+                "tasks_added": tasks_added,
+                "points_added": points_added,
+                "tasks_done": tasks_done,
+                "points_done": points_done,
+            }
+            for (project_id, sprint, day), totals in sorted(self.days.items())
+            if any(totals)
+            for tasks_added, points_added, tasks_done, points_done in [totals]
+        ]
+        await _add_to(session, tables.analytics_days, days)
+        cycles = [
+            {
+                "project_id": project_id,
+                "sprint": sprint,
+                "day": day,
+                "bucket": bucket,
+                "count": n,
+            }
+            for (project_id, sprint, day, bucket), n in sorted(self.cycles.items())
+        ]
+        await _add_to(session, tables.cycle_time_buckets, cycles)
+
+
+async def _add_to(
+    session: AsyncSession, table: Table, rows: List[Dict[str, Any]]
+) -> None:
+    """Insert ``rows``, adding their values to existing rows with the same key."""
+    if not rows:
+        return
+    statement = _INSERTS[session.bind.dialect.name](table)
+    statement = statement.on_conflict_do_update(
+        index_elements=list(table.primary_key.columns),
+        set_={
+            column.name: column + statement.excluded[column.name]
+            for column in table.columns
+            if not column.primary_key
+        },
+    )
+    # Rows arrive sorted by key, so concurrent writers lock them in one order.
+    await session.execute(statement, rows)
+
+
+def _event(
+    task_id: UUID, project_id: UUID, state: Optional[TaskState], at: datetime
+) -> dict:
+    return {
+        "task_id": task_id,
+        "project_id": project_id,
+        "column_id": state.column_id if state else None,
+        "state": state.state if state else DELETED,
+        "sprint": state.sprint if state else "",
+        "points": state.points if state else 0.0,
+        "at": at,
+    }
+
+
+async def _start_times(
+    session: AsyncSession, task_ids: Sequence[UUID]
+) -> Dict[UUID, datetime]:
+    """When each task first left "todo", or else was created."""
+    events = tables.task_events
+    started = func.min(case((events.c.state.in_([DOING, DONE]), events.c.at)))
+    result = await session.execute(
+        select(events.c.task_id, func.coalesce(started, func.min(events.c.at)))
+        .where(events.c.task_id.in_(task_ids))
+        .group_by(events.c.task_id)
+    )
+    return dict(result.tuples().all())
+
+
+async def record(
+    session: AsyncSession, changes: Iterable[Change], at: Optional[datetime] = None
+) -> None:
+    """Append events for changes to tasks' analytic state and update the aggregates."""
+    changes = [change for change in changes if change.old != change.new]
+    if not changes:
+        return
+    at = at or datetime.utcnow()
+    completed = [
+        change.task_id for change in changes if _completes(change.old, change.new)
+    ]
+    started = await _start_times(session, completed) if completed else {}
+    await store.insert_rows(
+        session,
+        tables.task_events,
+        [
+            _event(change.task_id, change.project_id, change.new, at)
+            for change in changes
+        ],
+    )
+    aggregates = Aggregates()
+    for change in changes:
+        cycle = None
+        if change.task_id in started:
+            cycle = max(0.0, (at - started[change.task_id]).total_seconds())
+        aggregates.add(change.project_id, change.old, change.new, at.date(), cycle)
+    await aggregates.write(session)
+
+
+# Rebuilding
+
+
+async def _seed(
+    session: AsyncSession, project_id: Optional[UUID], batch_size: int
+) -> int:
+    """Record a creation event for every task that has none, in its current state."""
+    t, c, events = tables.tasks, tables.columns, tables.task_events
+    others = c.alias("others")
+    first_rank = (
+        select(func.min(others.c.rank))
+        .where(others.c.project_id == t.c.project_id)
+        .scalar_subquery()
+    )
+    query = (
+        select(
+            t.c.id,
+            t.c.project_id,
+            t.c.column_id,
+            t.c.metadata,
+            t.c.created_at,
+            c.c.name,
+        )
+        .add_columns((c.c.rank == first_rank).label("first"))
+        .join(c, t.c.column_id == c.c.id)
+        .where(~select(events.c.id).where(events.c.task_id == t.c.id).exists())
+        .execution_options(yield_per=batch_size)
+    )
+    if project_id is not None:
+        query = query.where(t.c.project_id == project_id)
+    rows = []
+    result = await session.stream(query)
+    async for partition in result.partitions():
+        for row in partition:
+            state = task_state(
+                row.column_id, column_state(row.name, row.first), row.metadata
+            )
+            rows.append(_event(row.id, row.project_id, state, row.created_at))
+    for start in range(0, len(rows), batch_size):
+        await store.insert_rows(
+            session, tables.task_events, rows[start : start + batch_size]
+        )
+    return len(rows)
+
+
+async def rebuild(
+    sessions=session_scope, project_id: Optional[UUID] = None, batch_size: int = 10000
+) -> int:
+    """
+    Recompute the aggregates of one project, or all, by replaying
+    ``task_events``. Tasks without history (created before analytics
+    existed) first get a creation event in their current state. Returns the
+    number of events replayed.
+    """
+    events = tables.task_events
+    async with sessions() as session:
+        seeded = await _seed(session, project_id, batch_size)
+        for table in (tables.analytics_days, tables.cycle_time_buckets):
+            statement = delete(table)
+            if project_id is not None:
+                statement = statement.where(table.c.project_id == project_id)
+            await session.execute(statement)
+
+        query = (
+            select(events)
+            .order_by(events.c.task_id, events.c.id)
+            .execution_options(yield_per=batch_size)
+        )
+        if project_id is not None:
+            query = query.where(events.c.project_id == project_id)
+        aggregates = Aggregates()
+        replayed = 0
+        task_id = None
+        old: Optional[TaskState] = None
+        created = started = None
+        result = await session.stream(query)
+        async for partition in result.partitions():
+            for event in partition:
+                replayed += 1
+                if event.task_id != task_id:
+                    task_id, old, created, started = event.task_id, None, event.at, None
+                new = None
+                if event.state != DELETED:
+                    new = TaskState(
+                        event.column_id, event.state, event.sprint, event.points
+                    )
+                cycle = None
+                if _completes(old, new):
+                    cycle = max(0.0, (event.at - (started or created)).total_seconds())
+                if new is not None and new.state != TODO and started is None:
+                    started = event.at
+                aggregates.add(event.project_id, old, new, event.at.date(), cycle)
+                old = new
+        await aggregates.write(session)
+    logger.info("Seeded %d task events and replayed %d", seeded, replayed)
+    return replayed
+
+
+# Reports
+
+
+async def velocity(
+    session: AsyncSession, project_id: UUID
+) -> List[schemas.SprintVelocity]:
+    """Tasks and points completed per sprint, in order of first activity."""
+    days = tables.analytics_days
+    result = await session.execute(
+        select(days.c.sprint, func.sum(days.c.tasks_done), func.sum(days.c.points_done))
+        .where(days.c.project_id == project_id)
+        .group_by(days.c.sprint)
+        .order_by(func.min(days.c.day), days.c.sprint)
+    )
+    return [
+        schemas.SprintVelocity(
+            sprint=sprint or None, tasks_done=tasks, points_done=round(points, 3)
+        )
+        for sprint, tasks, points in result
+    ]
+
+
+async def burndown(
+    session: AsyncSession,
+    project_id: UUID,
+    sprint: Optional[str] = None,
+    until: Optional[date] = None,
+) -> List[schemas.BurndownDay]:
+    """
+    Remaining and completed work per day, from the first day with activity
+    through ``until`` (default today), for one sprint or the whole board.
+    """
+    days = tables.analytics_days
+    query = (
+        select(
+            days.c.day,
+            func.sum(days.c.tasks_added),
+            func.sum(days.c.points_added),
+            func.sum(days.c.tasks_done),
+            func.sum(days.c.points_done),
+        )
+        .where(days.c.project_id == project_id)
+        .group_by(days.c.day)
+        .order_by(days.c.day)
+    )
+    if sprint is not None:
+        query = query.where(days.c.sprint == sprint)
+    if until is not None:
+        query = query.where(days.c.day <= until)
+    totals = {row[0]: row[1:] for row in await session.execute(query)}
+    if not totals:
+        return []
+    end = until or max(datetime.utcnow().date(), max(totals))
+    report = []
+    scope_tasks = scope_points = done_tasks = done_points = 0.0
+    day = min(totals)
+    while day <= end:
+        added, points_added, done, points_done = totals.get(day, (0, 0.0, 0, 0.0))
+        scope_tasks += added
+        scope_points += points_added
+        done_tasks += done
+        done_points += points_done
+        report.append(
+            schemas.BurndownDay(
+                day=day,
+                remaining_tasks=int(scope_tasks - done_tasks),
+                remaining_points=round(scope_points - done_points, 3),
+                done_tasks=done,
+                done_points=round(points_done, 3),
+            )
+        )
+        day += timedelta(days=1)
+    return report
+
+
+def summarize(
+    histogram: Sequence[Tuple[int, int]]
+) -> Tuple[int, Optional[float], Dict[str, float]]:
+    """Count, mean and ``PERCENTILES`` (in hours) of a sorted bucket histogram."""
+    total = sum(count for _, count in histogram)
+    if not total:
+        return 0, None, {}
+    mean = sum(bucket_seconds(bucket) * count for bucket, count in histogram) / total
+    percentiles = {}
+    targets = iter(PERCENTILES)
+    target: Optional[int] = next(targets)
+    seen = 0
+    for bucket, count in histogram:
+        seen += count
+        while target is not None and seen >= math.ceil(total * target / 100):
+            percentiles[f"p{target}"] = round(bucket_seconds(bucket) / 3600, 3)
+            target = next(targets, None)
+    return total, round(mean / 3600, 3), percentiles
+
+
+async def cycle_time(
+    session: AsyncSession,
+    project_id: UUID,
+    sprint: Optional[str] = None,
+    since: Optional[date] = None,
+    until: Optional[date] = None,
+) -> Tuple[int, Optional[float], Dict[str, float]]:
+    """Cycle time count, mean and percentiles (hours) for tasks done in a date range."""
+    buckets = tables.cycle_time_buckets
+    query = (
+        select(buckets.c.bucket, func.sum(buckets.c.count))
+        .where(buckets.c.project_id == project_id)
+        .group_by(buckets.c.bucket)
+        .order_by(buckets.c.bucket)
+    )
+    if sprint is not None:
+        query = query.where(buckets.c.sprint == sprint)
+    if since is not None:
+        query = query.where(buckets.c.day >= since)
+    if until is not None:
+        query = query.where(buckets.c.day <= until)
+    return summarize((await session.execute(query)).tuples().all())
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Board analytics maintenance.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    rebuild_command = commands.add_parser(
+        "rebuild", help="Recompute the aggregates from the task event history"
+    )
+    rebuild_command.add_argument(
+        "--project-id", type=UUID, help="Only rebuild this project"
+    )
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO)
+
+    async def run() -> None:
+        try:
+            if settings.db_create_tables:
+                await create_tables(tables.metadata)
+            replayed = await rebuild(project_id=args.project_id)
+        finally:
+            await dispose_engine()
+        print(f"Rebuilt analytics from {replayed} task events")
+
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    main()
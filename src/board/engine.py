@@ -0,0 +1,540 @@
+"""
+In-memory board engine for projects, columns and tasks.
+
+Columns keep their cards in a ``RankedIndex`` keyed by lexicographic rank
+(see ``src.board.ranking``). Moving a card only assigns a new rank to that
+card, so a drag-and-drop touches one row and costs O(log n) regardless of
+column size. Ranks that grow too long are queued and rewritten in bulk by a
+background rebalancer instead of on the request path.
+
+Every mutation bumps the project version and appends to a bounded per-project
+change log, which ``changes_since`` uses to answer incremental sync requests.
+
+The database is the system of record (see ``src.board.service``); the engine
+holds the boards this process has loaded. Versions start from a microsecond
+clock reading whenever a board is created or loaded, so they keep increasing
+across reloads and a client's stale version never lands inside a new log.
+"""
+import time
+import uuid
+from bisect import bisect_left, bisect_right, insort
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Set, Tuple
+
+from .ranking import rank_between, rank_sequence
+
+# Ranks longer than this are rewritten by the rebalancer.
+MAX_RANK_LENGTH = 24
+
+# Change log entries kept per project for incremental sync.
+CHANGE_LOG_SIZE = 1000
+
+Entry = Tuple[str, uuid.UUID]
+
+# Change log entry kinds
+TASK = "task"
+COLUMN = "column"
+COLUMN_TASKS = "column_tasks"  # every task in the column changed (rebalance)
+
+
+class BoardError(Exception):
+    """Base error raised by the board engine."""
+
+
+class NotFoundError(BoardError):
+    """Raised when a project, column or task does not exist."""
+
+
+class InvalidMoveError(BoardError):
+    """Raised when a move or placement request is inconsistent."""
+
+
+class RankedIndex:
+    """
+    Sorted ``(rank, id)`` entries stored in bounded chunks.
+
+    Inserts and removals bisect a short list of chunk maxima and then one
+    chunk, so their cost stays flat as the column grows instead of shifting
+    the whole sequence like a single Python list would.
+    """
+
+    def __init__(self, load: int = 256):
+        self._load = load
+        self._chunks: List[List[Entry]] = []
+        self._maxes: List[Entry] = []
+        self._len = 0
+
+    def __len__(self) -> int:
+        return self._len
+
+    def __iter__(self) -> Iterator[Entry]:
+        for chunk in self._chunks:
+            yield from chunk
+
+    def add(self, entry: Entry) -> None:
+        """Insert an entry, keeping ranks sorted."""
+        self._len += 1
+        if not self._chunks:
+            self._chunks.append([entry])
+            self._maxes.append(entry)
+            return
+        pos = bisect_left(self._maxes, entry)
+        if pos == len(self._maxes):
+            pos -= 1
+            self._chunks[pos].append(entry)
+            self._maxes[pos] = entry
+        else:
+            insort(self._chunks[pos], entry)
+        if len(self._chunks[pos]) > 2 * self._load:
+            chunk = self._chunks[pos]
+            self._chunks[pos : pos + 1] = [chunk[: self._load], chunk[self._load :]]
+            self._maxes[pos : pos + 1] = [chunk[self._load - 1], chunk[-1]]
+
+    def remove(self, entry: Entry) -> None:
+        """Remove an entry, raising ``KeyError`` if it is not present."""
+        pos = bisect_left(self._maxes, entry)
+        if pos == len(self._maxes):
+            raise KeyError(entry)
+        chunk = self._chunks[pos]
+        idx = bisect_left(chunk, entry)
+        if idx == len(chunk) or chunk[idx] != entry:
+            raise KeyError(entry)
+        del chunk[idx]
+        self._len -= 1
+        if not chunk:
+            del self._chunks[pos]
+            del self._maxes[pos]
+        elif idx == len(chunk):
+            self._maxes[pos] = chunk[-1]
+
+    def first(self) -> Optional[Entry]:
+        return self._chunks[0][0] if self._chunks else None
+
+    def last(self) -> Optional[Entry]:
+        return self._maxes[-1] if self._maxes else None
+
+    def successor(self, entry: Entry) -> Optional[Entry]:
+        """Return the entry sorting immediately after ``entry``."""
+        pos = bisect_right(self._maxes, entry)
+        if pos == len(self._maxes):
+            return None
+        chunk = self._chunks[pos]
+        return chunk[bisect_right(chunk, entry)]
+
+    def predecessor(self, entry: Entry) -> Optional[Entry]:
+        """Return the entry sorting immediately before ``entry``."""
+        pos = bisect_left(self._maxes, entry)
+        if pos == len(self._maxes):
+            return self.last()
+        chunk = self._chunks[pos]
+        idx = bisect_left(chunk, entry)
+        if idx:
+            return chunk[idx - 1]
+        return self._maxes[pos - 1] if pos else None
+
+    def clear(self) -> None:
+        self._chunks.clear()
+        self._maxes.clear()
+        self._len = 0
+
+
+@dataclass
+class Task:
+    id: uuid.UUID
+    project_id: uuid.UUID
+    column_id: uuid.UUID
+    title: str
+    rank: str
+    description: Optional[str] = None
+    metadata: Dict[str, Any] = field(default_factory=dict)
+    user_story_id: Optional[uuid.UUID] = None
+    created_at: datetime = field(default_factory=datetime.utcnow)
+    updated_at: datetime = field(default_factory=datetime.utcnow)
+
+
+@dataclass
+class Column:
+    id: uuid.UUID
+    project_id: uuid.UUID
+    name: str
+    rank: str
+    color: str = "#gray"
+    tasks: RankedIndex = field(default_factory=RankedIndex, repr=False)
+
+
+@dataclass
+class Project:
+    id: uuid.UUID
+    name: str
+    description: Optional[str] = None
+    version: int = 0
+    columns: RankedIndex = field(default_factory=RankedIndex, repr=False)
+    # (version, kind, entity id); versions older than ``log_floor`` were trimmed
+    changes: List[Tuple[int, str, uuid.UUID]] = field(default_factory=list, repr=False)
+    log_floor: int = 0
+    created_at: datetime = field(default_factory=datetime.utcnow)
+    updated_at: datetime = field(default_factory=datetime.utcnow)
+    # Stored revision this copy matches; ``version`` only counts changes in memory
+    revision: int = 0
+
+
+@dataclass
+class Changes:
+    """Entities changed after a given version, as returned by ``changes_since``."""
+
+    version: int
+    columns: List[Column]
+    tasks: List[Task]
+    deleted_task_ids: List[uuid.UUID]
+
+
+class BoardEngine:
+    """Holds every board in memory and applies mutations to it."""
+
+    def __init__(
+        self,
+        max_rank_length: int = MAX_RANK_LENGTH,
+        change_log_size: int = CHANGE_LOG_SIZE,
+    ):
+        self.max_rank_length = max_rank_length
+        self.change_log_size = change_log_size
+        self.projects: Dict[uuid.UUID, Project] = {}
+        self.columns: Dict[uuid.UUID, Column] = {}
+        self.tasks: Dict[uuid.UUID, Task] = {}
+        self._pending_rebalance: Set[uuid.UUID] = set()
+        # project id -> version when its open batch started
+        self._batches: Dict[uuid.UUID, int] = {}
+
+    # Lookups
+
+    def get_project(self, project_id: uuid.UUID) -> Project:
+        try:
+            return self.projects[project_id]
+        except KeyError:
+            raise NotFoundError(f"Project {project_id} not found") from None
+
+    def get_column(self, column_id: uuid.UUID) -> Column:
+        try:
+            return self.columns[column_id]
+        except KeyError:
+            raise NotFoundError(f"Column {column_id} not found") from None
+
+    def get_task(self, task_id: uuid.UUID) -> Task:
+        try:
+            return self.tasks[task_id]
+        except KeyError:
+            raise NotFoundError(f"Task {task_id} not found") from None
+
+    def iter_columns(self, project_id: uuid.UUID) -> Iterator[Column]:
+        for _, column_id in self.get_project(project_id).columns:
+            yield self.columns[column_id]
+
+    def iter_tasks(self, column_id: uuid.UUID) -> Iterator[Task]:
+        for _, task_id in self.get_column(column_id).tasks:
+            yield self.tasks[task_id]
+
+    # Loading
+
+    def load_project(
+        self, project: Project, columns: List[Column], tasks: List[Task]
+    ) -> Project:
+        """Add a board read from storage, replacing any copy already held."""
+        self.unload_project(project.id)
+        project.version = project.log_floor = _version_epoch()
+        project.changes = []
+        project.columns = RankedIndex()
+        for column in columns:
+            column.tasks = RankedIndex()
+            self.columns[column.id] = column
+            project.columns.add((column.rank, column.id))
+        for task in tasks:
+            self.tasks[task.id] = task
+            self.columns[task.column_id].tasks.add((task.rank, task.id))
+        self.projects[project.id] = project
+        return project
+
+    def add_loaded(
+        self,
+        project_id: uuid.UUID,
+        columns: Sequence[Column] = (),
+        tasks: Sequence[Task] = (),
+    ) -> None:
+        """Add columns and tasks written to storage directly, as one change."""
+        project = self.get_project(project_id)
+        with self.batch(project_id):
+            for column in columns:
+                column.tasks = RankedIndex()
+                self.columns[column.id] = column
+                project.columns.add((column.rank, column.id))
+                self._touch(project, COLUMN, column.id)
+            for task in tasks:
+                column = self._column_in(project, task.column_id)
+                self.tasks[task.id] = task
+                column.tasks.add((task.rank, task.id))
+                self._check_rank(column, task.rank)
+                self._touch(project, TASK, task.id)
+
+    def unload_project(self, project_id: uuid.UUID) -> None:
+        """Forget a board so the next access reloads it from storage."""
+        project = self.projects.pop(project_id, None)
+        if project is None:
+            return
+        for _, column_id in project.columns:
+            column = self.columns.pop(column_id)
+            for _, task_id in column.tasks:
+                del self.tasks[task_id]
+            self._pending_rebalance.discard(column_id)
+
+    # Mutations
+
+    @contextmanager
+    def batch(self, project_id: uuid.UUID) -> Iterator[Project]:
+        """Group mutations to one board so they share a single version bump."""
+        project = self.get_project(project_id)
+        self._batches[project_id] = project.version
+        try:
+            yield project
+        finally:
+            del self._batches[project_id]
+
+    def create_project(self, name: str, description: Optional[str] = None) -> Project:
+        epoch = _version_epoch()
+        project = Project(
+            id=uuid.uuid4(),
+            name=name,
+            description=description,
+            version=epoch,
+            log_floor=epoch,
+        )
+        self.projects[project.id] = project
+        return project
+
+    def create_column(
+        self, project_id: uuid.UUID, name: str, color: str = "#gray"
+    ) -> Column:
+        project = self.get_project(project_id)
+        last = project.columns.last()
+        column = Column(
+            id=uuid.uuid4(),
+            project_id=project_id,
+            name=name,
+            color=color,
+            rank=rank_between(last[0] if last else None, None),
+        )
+        self.columns[column.id] = column
+        project.columns.add((column.rank, column.id))
+        self._touch(project, COLUMN, column.id)
+        return column
+
+    def create_task(
+        self,
+        project_id: uuid.UUID,
+        column_id: uuid.UUID,
+        title: str,
+        description: Optional[str] = None,
+        metadata: Optional[Dict[str, Any]] = None,
+        user_story_id: Optional[uuid.UUID] = None,
+    ) -> Task:
+        """Create a task at the bottom of ``column_id``."""
+        project = self.get_project(project_id)
+        column = self._column_in(project, column_id)
+        last = column.tasks.last()
+        task = Task(
+            id=uuid.uuid4(),
+            project_id=project_id,
+            column_id=column_id,
+            title=title,
+            description=description,
+            metadata=dict(metadata or {}),
+            user_story_id=user_story_id,
+            rank=rank_between(last[0] if last else None, None),
+        )
+        self.tasks[task.id] = task
+        column.tasks.add((task.rank, task.id))
+        self._check_rank(column, task.rank)
+        self._touch(project, TASK, task.id)
+        return task
+
+    def update_task(self, task_id: uuid.UUID, **changes: Any) -> Task:
+        """Update editable task fields (title, description, metadata, user_story_id)."""
+        task = self.get_task(task_id)
+        for name, value in changes.items():
+            if name not in {"title", "description", "metadata", "user_story_id"}:
+                raise InvalidMoveError(f"Field {name!r} cannot be updated")
+            setattr(task, name, value)
+        task.updated_at = datetime.utcnow()
+        self._touch(self.projects[task.project_id], TASK, task.id)
+        return task
+
+    def delete_task(self, task_id: uuid.UUID) -> Task:
+        task = self.get_task(task_id)
+        self.columns[task.column_id].tasks.remove((task.rank, task.id))
+        del self.tasks[task_id]
+        self._touch(self.projects[task.project_id], TASK, task.id)
+        return task
+
+    def move_task(
+        self,
+        task_id: uuid.UUID,
+        column_id: uuid.UUID,
+        after_id: Optional[uuid.UUID] = None,
+        before_id: Optional[uuid.UUID] = None,
+    ) -> Task:
+        """
+        Move a task into ``column_id`` directly after ``after_id`` and/or
+        before ``before_id``; with neither it goes to the bottom.
+
+        Only the moved task's rank and column change.
+        """
+        task = self.get_task(task_id)
+        project = self.projects[task.project_id]
+        target = self._column_in(project, column_id)
+        if task_id in (after_id, before_id):
+            raise InvalidMoveError("A task cannot be placed relative to itself")
+
+        after = self._task_in(target, after_id) if after_id else None
+        before = self._task_in(target, before_id) if before_id else None
+
+        source = self.columns[task.column_id]
+        source.tasks.remove((task.rank, task.id))
+        try:
+            lower, upper = self._neighbours(target, after, before)
+        except InvalidMoveError:
+            source.tasks.add((task.rank, task.id))
+            raise
+        rank = rank_between(lower, upper)
+
+        task.column_id = target.id
+        task.rank = rank
+        task.updated_at = datetime.utcnow()
+        target.tasks.add((rank, task.id))
+        self._check_rank(target, rank)
+        self._touch(project, TASK, task.id)
+        return task
+
+    # Rebalancing
+
+    @property
+    def pending_rebalance(self) -> Set[uuid.UUID]:
+        return set(self._pending_rebalance)
+
+    def rebalance_column(self, column_id: uuid.UUID) -> int:
+        """Rewrite every rank in a column as evenly spaced short keys."""
+        column = self.get_column(column_id)
+        entries = list(column.tasks)
+        column.tasks.clear()
+        for (_, task_id), rank in zip(entries, rank_sequence(len(entries))):
+            self.tasks[task_id].rank = rank
+            column.tasks.add((rank, task_id))
+        self._pending_rebalance.discard(column_id)
+        self._touch(self.projects[column.project_id], COLUMN_TASKS, column_id)
+        return len(entries)
+
+    def rebalance_pending(self) -> int:
+        """Rebalance every queued column, returning the number of rows rewritten."""
+        rewritten = 0
+        for column_id in list(self._pending_rebalance):
+            if column_id in self.columns:
+                rewritten += self.rebalance_column(column_id)
+            self._pending_rebalance.discard(column_id)
+        return rewritten
+
+    # Incremental sync
+
+    def changes_since(self, project_id: uuid.UUID, version: int) -> Optional[Changes]:
+        """
+        Return the columns and tasks changed after ``version``.
+
+        Returns None when ``version`` is older than the retained change log
+        (or ahead of the project), in which case the caller needs a full board.
+        """
+        project = self.get_project(project_id)
+        if version < project.log_floor or version > project.version:
+            return None
+        start = bisect_right(project.changes, version, key=lambda change: change[0])
+        column_ids: Set[uuid.UUID] = set()
+        task_ids: Set[uuid.UUID] = set()
+        for _, kind, entity_id in project.changes[start:]:
+            if kind == TASK:
+                task_ids.add(entity_id)
+            elif kind == COLUMN:
+                column_ids.add(entity_id)
+            elif kind == COLUMN_TASKS and entity_id in self.columns:
+                task_ids.update(task_id for _, task_id in self.columns[entity_id].tasks)
+
+        tasks = [self.tasks[task_id] for task_id in task_ids if task_id in self.tasks]
+        tasks.sort(key=lambda task: (task.column_id, task.rank))
+        return Changes(
+            version=project.version,
+            columns=[
+                self.columns[column_id]
+                for column_id in column_ids
+                if column_id in self.columns
+            ],
+            tasks=tasks,
+            deleted_task_ids=[
+                task_id for task_id in task_ids if task_id not in self.tasks
+            ],
+        )
+
+    # Helpers
+
+    def _column_in(self, project: Project, column_id: uuid.UUID) -> Column:
+        column = self.get_column(column_id)
+        if column.project_id != project.id:
+            raise NotFoundError(f"Column {column_id} not found in project {project.id}")
+        return column
+
+    def _task_in(self, column: Column, task_id: uuid.UUID) -> Task:
+        task = self.get_task(task_id)
+        if task.column_id != column.id:
+            raise InvalidMoveError(f"Task {task_id} is not in column {column.id}")
+        return task
+
+    def _neighbours(
+        self, column: Column, after: Optional[Task], before: Optional[Task]
+    ) -> Tuple[Optional[str], Optional[str]]:
+        if after and before:
+            if column.tasks.successor((after.rank, after.id)) != (
+                before.rank,
+                before.id,
+            ):
+                raise InvalidMoveError("after_id and before_id must be adjacent")
+            return after.rank, before.rank
+        if after:
+            nxt = column.tasks.successor((after.rank, after.id))
+            return after.rank, nxt[0] if nxt else None
+        if before:
+            prev = column.tasks.predecessor((before.rank, before.id))
+            return prev[0] if prev else None, before.rank
+        last = column.tasks.last()
+        return last[0] if last else None, None
+
+    def _check_rank(self, column: Column, rank: str) -> None:
+        if len(rank) > self.max_rank_length:
+            self._pending_rebalance.add(column.id)
+
+    def _touch(self, project: Project, kind: str, entity_id: uuid.UUID) -> None:
+        if self._batches.get(project.id, project.version) == project.version:
+            project.version += 1
+        project.updated_at = datetime.utcnow()
+        project.changes.append((project.version, kind, entity_id))
+        if len(project.changes) > 2 * self.change_log_size:
+            # Trim in batches so appends stay amortized O(1).
+            del project.changes[: -self.change_log_size]
+            project.log_floor = project.changes[0][0] - 1
+
+
+def _version_epoch() -> int:
+    return time.time_ns() // 1000
+
+
+# Global engine instance
+board_engine = BoardEngine()
+
+
+def get_board_engine() -> BoardEngine:
+    """Get the application board engine."""
+    return board_engine
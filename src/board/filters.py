@@ -0,0 +1,692 @@
+"""
+Compiled JSON filters for task listings (``GET /api/tasks?filter=``).
+
+A filter is a JSON object mapping fields to conditions::
+
+    {"project_id": "...", "metadata.points": {"gte": 3},
+     "or": [{"metadata.labels": {"has": "bug"}}, {"title": {"contains": "crash"}}]}
+
+A bare value means ``eq``, several keys in one object are ANDed, and
+``and``/``or``/``not`` nest. Fields are the task columns plus
+``metadata.<key>[.<key>...]`` paths into the JSON metadata.
+
+``parse_filter`` validates the JSON once into an immutable AST and caches
+the result by the raw text, since dashboards re-send the same saved filters.
+What gets compiled is the filter's *shape*, its structure without the
+literal values: ``FilterCompiler`` keeps one statement with named bind
+parameters per shape, so a saved filter re-sent with new values reuses it,
+and so does SQLAlchemy's own compiled-SQL cache.
+
+Only predicates that an index declared in ``src.board.tables`` can answer on
+the current dialect are pushed down to SQL. The rest are checked in Python
+on the streamed candidate rows, so a dashboard filter cannot make the
+database scan and parse every task's JSON. A filter needs at least one
+pushed-down predicate (``project_id`` always is one): otherwise every task
+row would stream into Python, so it is rejected instead. ``recommend_indexes`` turns the
+most-used shapes' Python-side predicates into PostgreSQL ``CREATE INDEX``
+statements; declaring one in ``src.board.tables`` makes them push down.
+"""
+import collections
+import heapq
+import json
+import operator
+import re
+from datetime import datetime, timezone
+from functools import lru_cache
+from itertools import count
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterator,
+    List,
+    Mapping,
+    NamedTuple,
+    Optional,
+    Sequence,
+    Set,
+    Tuple,
+    Union,
+)
+from uuid import UUID
+
+from prometheus_client import Counter
+from pydantic import TypeAdapter, ValidationError
+from sqlalchemy import (
+    Index,
+    MetaData,
+    Numeric,
+    Select,
+    Table,
+    Text,
+    and_,
+    bindparam,
+    func,
+    or_,
+    select,
+)
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.engine import Dialect, make_url
+from sqlalchemy.schema import CreateIndex
+
+from src.core.config import settings
+
+from . import tables
+from .engine import BoardError
+
+# Longest accepted filter text, and limits on what it may contain.
+MAX_FILTER_LENGTH = 4096
+MAX_FILTER_DEPTH = 8
+MAX_CONDITIONS = 64
+MAX_IN_VALUES = 100
+MAX_PATH_DEPTH = 4
+
+FILTER_COMPILES = Counter(
+    "task_filter_compiles_total",
+    "Task filter shapes looked up, by compile cache result.",
+    ["cache"],
+)
+
+COLUMN_TYPES = {
+    "id": UUID,
+    "project_id": UUID,
+    "column_id": UUID,
+    "user_story_id": UUID,
+    "title": str,
+    "description": str,
+    "created_at": datetime,
+    "updated_at": datetime,
+}
+NULLABLE = {"user_story_id", "description"}
+TEXT_FIELDS = {"title", "description"}
+_ADAPTERS: Dict[str, TypeAdapter[Any]] = {
+    name: TypeAdapter(type_) for name, type_ in COLUMN_TYPES.items()
+}
+
+COMPARATORS = {
+    "lt": operator.lt,
+    "lte": operator.le,
+    "gt": operator.gt,
+    "gte": operator.ge,
+}
+OPERATORS = {"eq", "ne", "in", "contains", "has", "exists", *COMPARATORS}
+
+METADATA_KEY = re.compile(r"[\w-]{1,64}")
+
+# A metadata path that is not in the task's metadata.
+MISSING = object()
+
+Check = Callable[[Mapping[str, Any], Sequence[Any]], bool]
+Binder = Callable[[Sequence[Any]], Dict[str, Any]]
+
+
+class InvalidFilterError(BoardError):
+    """Raised for a filter that is not valid JSON or not a valid filter."""
+
+
+class Compare(NamedTuple):
+    field: str  # a task column, or "metadata"
+    path: Tuple[str, ...]  # keys into metadata; empty for columns
+    op: str
+    value: Any
+
+
+class And(NamedTuple):
+    items: Tuple[Any, ...]
+
+
+class Or(NamedTuple):
+    items: Tuple[Any, ...]
+
+
+class Not(NamedTuple):
+    item: Any
+
+
+Node = Union[Compare, And, Or, Not]
+
+
+class TaskFilter(NamedTuple):
+    node: Optional[Node]  # None matches every task
+    shape: Any
+    values: Tuple[Any, ...]  # the comparison values, in ``shape`` order
+
+
+# Parsing
+
+
+@lru_cache(maxsize=1024)
+def parse_filter(text: str) -> TaskFilter:
+    """Validate a JSON filter into a ``TaskFilter``."""
+    try:
+        document = json.loads(text)
+    except ValueError as exc:
+        raise InvalidFilterError(f"Filter is not valid JSON: {exc}") from None
+    if document == {}:
+        return TaskFilter(None, None, ())
+    node = _parse(document, 0, count(1))
+    return TaskFilter(node, _shape(node), tuple(_values(node)))
+
+
+def _parse(document: Any, depth: int, conditions: Iterator[int]) -> Node:
+    if depth > MAX_FILTER_DEPTH:
+        raise InvalidFilterError(f"Filters nest at most {MAX_FILTER_DEPTH} levels deep")
+    if not isinstance(document, dict) or not document:
+        raise InvalidFilterError("A filter must be a non-empty JSON object")
+    items: List[Node] = []
+    for key, value in document.items():
+        if key in ("and", "or"):
+            if not isinstance(value, list) or not value:
+                raise InvalidFilterError(f"'{key}' takes a non-empty list of filters")
+            children = tuple(_parse(child, depth + 1, conditions) for child in value)
+            if len(children) == 1:
+                items.append(children[0])
+            else:
+                items.append(And(children) if key == "and" else Or(children))
+        elif key == "not":
+            items.append(Not(_parse(value, depth + 1, conditions)))
+        else:
+            field, path = _field(key)
+            ops = value.items() if isinstance(value, dict) else [("eq", value)]
+            for op, operand in ops:
+                if next(conditions) > MAX_CONDITIONS:
+                    raise InvalidFilterError(
+                        f"Filters have at most {MAX_CONDITIONS} conditions"
+                    )
+                items.append(_compare(key, field, path, op, operand))
+    return items[0] if len(items) == 1 else And(tuple(items))
+
+
+def _field(key: str) -> Tuple[str, Tuple[str, ...]]:
+    if key in COLUMN_TYPES:
+        return key, ()
+    name, _, rest = key.partition(".")
+    path = tuple(rest.split("."))
+    if name != "metadata" or not rest:
+        raise InvalidFilterError(f"Unknown filter field '{key}'")
+    if len(path) > MAX_PATH_DEPTH or not all(
+        METADATA_KEY.fullmatch(part) for part in path
+    ):
+        raise InvalidFilterError(f"Invalid metadata path '{key}'")
+    return name, path
+
+
+def _compare(
+    key: str, field: str, path: Tuple[str, ...], op: str, value: Any
+) -> Compare:
+    metadata = field == "metadata"
+    if op not in OPERATORS:
+        raise InvalidFilterError(f"Unknown operator '{op}' for '{key}'")
+    if op == "in":
+        if not isinstance(value, list) or not 0 < len(value) <= MAX_IN_VALUES:
+            raise InvalidFilterError(
+                f"'in' for '{key}' takes a list of 1 to {MAX_IN_VALUES} values"
+            )
+        if None in value:
+            raise InvalidFilterError(f"'in' for '{key}' cannot match null; use 'eq'")
+        value = tuple(_value(key, field, item) for item in value)
+    elif op == "contains":
+        if field not in TEXT_FIELDS or not isinstance(value, str) or not value:
+            raise InvalidFilterError(
+                f"'contains' takes a string and applies to {sorted(TEXT_FIELDS)}"
+            )
+        value = value.lower()
+    elif op == "exists":
+        if not metadata or not isinstance(value, bool):
+            raise InvalidFilterError(
+                "'exists' takes true or false and applies to metadata paths"
+            )
+    elif op == "has":
+        if not metadata or value is None:
+            raise InvalidFilterError(
+                "'has' takes a value and applies to metadata paths"
+            )
+        value = _value(key, field, value)
+    else:
+        value = _value(key, field, value)
+        if op in COMPARATORS and (value is None or isinstance(value, bool)):
+            raise InvalidFilterError(
+                f"'{op}' for '{key}' takes a number, string or date"
+            )
+        if value is None and not metadata and field not in NULLABLE:
+            raise InvalidFilterError(f"'{key}' is never null")
+    return Compare(field, path, op, value)
+
+
+def _value(key: str, field: str, value: Any) -> Any:
+    if field == "metadata":
+        if value is not None and not isinstance(value, (bool, int, float, str)):
+            raise InvalidFilterError(
+                "Metadata filters compare strings, numbers, booleans or null"
+            )
+        return value
+    if value is None:
+        return None
+    try:
+        value = _ADAPTERS[field].validate_python(value)
+    except ValidationError as exc:
+        raise InvalidFilterError(
+            f"Invalid value for '{key}': {exc.errors()[0]['msg']}"
+        ) from None
+    if isinstance(value, datetime) and value.tzinfo is not None:
+        # Task timestamps are stored as naive UTC.
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def _kind(value: Any) -> str:
+    if value is None:
+        return "null"
+    if isinstance(value, bool):
+        return "bool"
+    return "number" if isinstance(value, (int, float)) else "string"
+
+
+def _shape(node: Node) -> Any:
+    if isinstance(node, Compare):
+        if node.op == "in":
+            # Metadata ``in`` compiles to one containment test per value.
+            kind: Any = len(node.value) if node.field == "metadata" else None
+        elif node.op == "exists":
+            kind = node.value
+        elif node.field == "metadata":
+            kind = _kind(node.value)
+        else:
+            kind = "null" if node.value is None else None
+        return ("cmp", node.field, node.path, node.op, kind)
+    if isinstance(node, Not):
+        return ("not", _shape(node.item))
+    return (
+        "and" if isinstance(node, And) else "or",
+        tuple(_shape(item) for item in node.items),
+    )
+
+
+def _values(node: Node) -> Iterator[Any]:
+    if isinstance(node, Compare):
+        yield node.value
+    elif isinstance(node, Not):
+        yield from _values(node.item)
+    else:
+        for item in node.items:
+            yield from _values(item)
+
+
+def _conjuncts(shape: Any) -> Iterator[Any]:
+    if shape[0] == "and":
+        for item in shape[1]:
+            yield from _conjuncts(item)
+    else:
+        yield shape
+
+
+def _comparisons(shape: Any) -> Iterator[Tuple[str, Tuple[str, ...], str, Any]]:
+    if shape[0] == "cmp":
+        yield shape[1:]
+    elif shape[0] == "not":
+        yield from _comparisons(shape[1])
+    else:
+        for item in shape[1]:
+            yield from _comparisons(item)
+
+
+# Compiling
+
+
+class Compiled(NamedTuple):
+    statement: Select  # pushed-down predicates, with bind parameters
+    binders: Tuple[Binder, ...]  # build those parameters from the values
+    residual: Optional[Check]  # predicates left to check in Python
+
+
+class TaskQuery(NamedTuple):
+    statement: Select
+    params: Dict[str, Any]
+    residual: Optional[Callable[[Mapping[str, Any]], bool]]
+
+
+def index_catalog(table: Table, dialect: Dialect) -> Set[Tuple[str, str]]:
+    """``(leading expression SQL, method)`` per index of ``table`` on ``dialect``."""
+    catalog = {
+        (_render(column, dialect), "btree") for column in table.primary_key.columns[:1]
+    }
+    for index in table.indexes:
+        condition = getattr(index, "_ddl_if", None)
+        if condition is not None and condition.dialect not in (None, dialect.name):
+            continue
+        expression = index.expressions[0]
+        expression = getattr(expression, "element", expression)  # unwrap a label
+        method = "btree"
+        if dialect.name == "postgresql":
+            method = index.dialect_options["postgresql"]["using"] or "btree"
+        catalog.add((_render(expression, dialect), method))
+    return catalog
+
+
+def _render(expression: Any, dialect: Dialect) -> str:
+    return str(
+        expression.compile(dialect=dialect, compile_kwargs={"literal_binds": True})
+    )
+
+
+def _requirement(
+    table: Table, field: str, path: Tuple[str, ...], op: str, kind: Any
+) -> Optional[Tuple[Any, str]]:
+    """The ``(expression, method)`` an index needs to answer a comparison."""
+    if field != "metadata":
+        if op == "contains":
+            return func.lower(table.c[field]), "gin"
+        if op == "eq" or op == "in" or op in COMPARATORS:
+            return table.c[field], "btree"
+        return None
+    if op == "has" or op == "in" or (op == "eq" and kind != "null"):
+        return table.c.metadata, "gin"
+    if op == "exists" and kind and len(path) == 1:
+        return table.c.metadata, "gin"
+    if op in COMPARATORS:
+        if kind == "number":
+            return tables.metadata_number(table.c.metadata, path), "btree"
+        return tables.metadata_text(table.c.metadata, path), "btree"
+    return None
+
+
+class FilterCompiler:
+    """
+    Compiles filter shapes into statements over ``table`` for one dialect,
+    keeping the ``cache_size`` most recently used, and counts how often each
+    shape is queried for ``recommend_indexes``.
+    """
+
+    def __init__(
+        self, dialect: Dialect, table: Table = tables.tasks, cache_size: int = 512
+    ):
+        self.dialect = dialect
+        self.table = table
+        self.cache_size = cache_size
+        self.indexes = index_catalog(table, dialect)
+        self.usage: collections.Counter = collections.Counter()
+        self._cache: "collections.OrderedDict[Any, Compiled]" = (
+            collections.OrderedDict()
+        )
+
+    def compile(self, shape: Any) -> Compiled:
+        compiled = self._cache.get(shape)
+        if compiled is not None:
+            FILTER_COMPILES.labels("hit").inc()
+            self._cache.move_to_end(shape)
+            return compiled
+        FILTER_COMPILES.labels("miss").inc()
+        compiled = self._cache[shape] = self._compile(shape)
+        if len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+        return compiled
+
+    def query(self, task_filter: TaskFilter, after: Optional[UUID] = None) -> TaskQuery:
+        """The statement, parameters and Python-side check for a filter."""
+        self.usage[task_filter.shape] += 1
+        if len(self.usage) > 4 * self.cache_size:
+            self.usage = collections.Counter(
+                dict(self.usage.most_common(self.cache_size))
+            )
+        compiled = self.compile(task_filter.shape)
+        values = task_filter.values
+        params: Dict[str, Any] = {}
+        for bind in compiled.binders:
+            params.update(bind(values))
+        statement = compiled.statement
+        if after is not None:
+            statement = statement.where(
+                self.table.c.id > bindparam("after", type_=self.table.c.id.type)
+            )
+            params["after"] = after
+        residual = None
+        if compiled.residual is not None:
+            check = compiled.residual
+            residual = lambda row: check(row, values)  # noqa: E731
+        return TaskQuery(statement, params, residual)
+
+    def pushable(self, shape: Any) -> bool:
+        """Whether an index can answer every comparison in ``shape``."""
+        kind = shape[0]
+        if kind == "not":
+            return False
+        if kind in ("and", "or"):
+            return all(self.pushable(item) for item in shape[1])
+        requirement = _requirement(self.table, *shape[1:])
+        if requirement is None:
+            return False
+        expression, method = requirement
+        return (_render(expression, self.dialect), method) in self.indexes
+
+    def _compile(self, shape: Any) -> Compiled:
+        statement = select(self.table).order_by(self.table.c.id)
+        if shape is None:
+            return Compiled(statement, (), None)
+        # Leaves are numbered in the same depth-first order as the values.
+        leaves = count()
+        binders: List[Binder] = []
+        checks: List[Check] = []
+        pushed = False
+        for part in _conjuncts(shape):
+            if self.pushable(part):
+                statement = statement.where(self._sql(part, leaves, binders))
+                pushed = True
+            else:
+                checks.append(_check(part, leaves))
+        if not pushed:
+            raise InvalidFilterError(
+                "No index can answer this filter; add a project_id condition"
+            )
+        residual = None
+        if len(checks) == 1:
+            residual = checks[0]
+        elif checks:
+            residual = lambda row, values: all(
+                check(row, values) for check in checks
+            )  # noqa: E731
+        return Compiled(statement, tuple(binders), residual)
+
+    def _sql(self, shape: Any, leaves: Iterator[int], binders: List[Binder]):
+        if shape[0] in ("and", "or"):
+            parts = [self._sql(item, leaves, binders) for item in shape[1]]
+            return (and_ if shape[0] == "and" else or_)(*parts)
+        _, field, path, op, kind = shape
+        leaf = next(leaves)
+        name = f"f{leaf}"
+        if field != "metadata":
+            column = self.table.c[field]
+            if op == "eq" and kind == "null":
+                return column.is_(None)
+            if op == "contains":
+                binders.append(lambda values: {name: f"%{_escape_like(values[leaf])}%"})
+                return func.lower(column).like(bindparam(name, type_=Text), escape="/")
+            binders.append(lambda values: {name: values[leaf]})
+            if op == "in":
+                return column.in_(bindparam(name, expanding=True, type_=column.type))
+            compare = operator.eq if op == "eq" else COMPARATORS[op]
+            return compare(column, bindparam(name, type_=column.type))
+
+        metadata = self.table.c.metadata
+        if op == "exists":
+            return tables.metadata_has_key(metadata, path[0])
+        if op in COMPARATORS:
+            number = kind == "number"
+            expression = (tables.metadata_number if number else tables.metadata_text)(
+                metadata, path
+            )
+            binders.append(lambda values: {name: values[leaf]})
+            type_: Any = Numeric() if number else Text()
+            return COMPARATORS[op](expression, bindparam(name, type_=type_))
+        contains = metadata.op("@>", is_comparison=True)
+        if op == "in":
+            names = [f"{name}_{i}" for i in range(kind)]
+            binders.append(
+                lambda values: {
+                    n: _nest(path, value) for n, value in zip(names, values[leaf])
+                }
+            )
+            return or_(*(contains(bindparam(n, type_=JSONB)) for n in names))
+        if op == "has":
+            binders.append(lambda values: {name: _nest(path, [values[leaf]])})
+        else:
+            binders.append(lambda values: {name: _nest(path, values[leaf])})
+        return contains(bindparam(name, type_=JSONB))
+
+
+def _escape_like(text: str) -> str:
+    return text.replace("/", "//").replace("%", "/%").replace("_", "/_")
+
+
+def _nest(path: Tuple[str, ...], value: Any) -> Any:
+    for key in reversed(path):
+        value = {key: value}
+    return value
+
+
+# Python-side checks; these define the filter semantics that SQL must match.
+
+
+def _lookup(metadata: Any, path: Tuple[str, ...]) -> Any:
+    for key in path:
+        if not isinstance(metadata, dict) or key not in metadata:
+            return MISSING
+        metadata = metadata[key]
+    return metadata
+
+
+def _equal(actual: Any, expected: Any) -> bool:
+    if expected is None:
+        return actual is None or actual is MISSING
+    # JSON true is not 1, unlike Python's True.
+    return actual == expected and isinstance(actual, bool) == isinstance(expected, bool)
+
+
+def _ordered(actual: Any, expected: Any, compare: Callable[[Any, Any], bool]) -> bool:
+    if actual is None or actual is MISSING or isinstance(actual, bool):
+        return False
+    if isinstance(expected, (int, float)):
+        return isinstance(actual, (int, float)) and compare(actual, expected)
+    return type(actual) is type(expected) and compare(actual, expected)
+
+
+def _check(shape: Any, leaves: Iterator[int]) -> Check:
+    kind = shape[0]
+    if kind in ("and", "or"):
+        checks = [_check(item, leaves) for item in shape[1]]
+        combine = all if kind == "and" else any
+        return lambda row, values: combine(check(row, values) for check in checks)
+    if kind == "not":
+        check = _check(shape[1], leaves)
+        return lambda row, values: not check(row, values)
+
+    _, field, path, op, _ = shape
+    leaf = next(leaves)
+    if field == "metadata":
+        get: Callable[[Mapping[str, Any]], Any] = lambda row: _lookup(
+            row["metadata"], path
+        )  # noqa: E731
+    else:
+        get = operator.itemgetter(field)
+    if op == "eq":
+        return lambda row, values: _equal(get(row), values[leaf])
+    if op == "ne":
+        return lambda row, values: not _equal(get(row), values[leaf])
+    if op == "in":
+        return lambda row, values: any(
+            _equal(get(row), value) for value in values[leaf]
+        )
+    if op == "contains":
+        return lambda row, values: values[leaf] in (get(row) or "").lower()
+    if op == "has":
+        return lambda row, values: isinstance(get(row), list) and any(
+            _equal(item, values[leaf]) for item in get(row)
+        )
+    if op == "exists":
+        return lambda row, values: (get(row) is not MISSING) == values[leaf]
+    compare = COMPARATORS[op]
+    return lambda row, values: _ordered(get(row), values[leaf], compare)
+
+
+# Index recommendations
+
+
+class IndexRecommendation(NamedTuple):
+    name: str
+    ddl: str
+    uses: int  # queries of the shapes that need this index
+
+
+def _recommended_index(
+    table: Table, field: str, path: Tuple[str, ...], op: str, kind: Any
+) -> Optional[Index]:
+    requirement = _requirement(table, field, path, op, kind)
+    if requirement is None:
+        return None
+    expression, method = requirement
+    options: Dict[str, Any] = {"postgresql_concurrently": True}
+    if field != "metadata":
+        if method == "gin":
+            label = f"{field}_lower"
+            return Index(
+                f"tasks_{field}_trgm_idx",
+                expression.label(label),
+                postgresql_using="gin",
+                postgresql_ops={label: "gin_trgm_ops"},
+                **options,
+            )
+        return Index(f"tasks_{field}_idx", expression, **options)
+    if method == "gin":
+        return Index(
+            "tasks_metadata_idx", expression, postgresql_using="gin", **options
+        )
+    suffix = "_num" if kind == "number" else ""
+    return Index(f"tasks_metadata_{'_'.join(path)}{suffix}_idx", expression, **options)
+
+
+def recommend_indexes(
+    usage: Mapping[Any, int], top: int = 12
+) -> List[IndexRecommendation]:
+    """
+    PostgreSQL indexes that would let the ``top`` most-used filter shapes in
+    ``usage`` push down the comparisons they currently check in Python.
+    """
+    compiler = FilterCompiler(postgresql.dialect())
+    # Indexes attach to the table of their columns, so build them on a copy.
+    scratch = tables.tasks.to_metadata(MetaData())
+    found: Dict[str, List[Any]] = {}
+    hot = heapq.nlargest(top, usage.items(), key=operator.itemgetter(1))
+    for shape, uses in hot:
+        if shape is None:
+            continue
+        needed: Set[str] = set()
+        for comparison in _comparisons(shape):
+            if compiler.pushable(("cmp", *comparison)):
+                continue
+            index = _recommended_index(scratch, *comparison)
+            if index is None or str(index.name) in needed:
+                continue
+            needed.add(str(index.name))
+            entry = found.setdefault(str(index.name), [index, 0])
+            entry[1] += uses
+    return sorted(
+        (
+            IndexRecommendation(
+                name, str(CreateIndex(index).compile(dialect=compiler.dialect)), uses
+            )
+            for name, (index, uses) in found.items()
+        ),
+        key=lambda recommendation: (-recommendation.uses, recommendation.name),
+    )
+
+
+_compiler: Optional[FilterCompiler] = None
+
+
+def get_filter_compiler() -> FilterCompiler:
+    """Get the application filter compiler for the configured database."""
+    global _compiler
+    if _compiler is None:
+        dialect = make_url(settings.database_url).get_dialect()()
+        _compiler = FilterCompiler(dialect, cache_size=settings.filter_cache_size)
+    return _compiler
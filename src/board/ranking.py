@@ -0,0 +1,153 @@
+"""
+Lexicographic rank keys for ordering cards and columns.
+
+A rank is an integer part followed by an optional base-62 fraction. The
+first character of the integer part encodes its length (``a`` = one digit,
+``b`` = two digits, ...; ``Z``, ``Y``, ... for negative integers), so keys
+compare correctly as plain strings. Appending to a column increments the
+integer part and grows keys logarithmically; inserting between two cards
+picks a midpoint fraction and only needs a new key for that one card.
+"""
+from typing import List, Optional, Tuple
+
+ALPHABET = "0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz"
+BASE = len(ALPHABET)
+_DIGITS = {char: value for value, char in enumerate(ALPHABET)}
+_SMALLEST_INTEGER = "A" + ALPHABET[0] * 26
+_FIRST_RANK = "a" + ALPHABET[0]
+
+
+def _integer_length(head: str) -> int:
+    if "a" <= head <= "z":
+        return ord(head) - ord("a") + 2
+    if "A" <= head <= "Z":
+        return ord("Z") - ord(head) + 2
+    raise ValueError(f"Invalid rank head: {head!r}")
+
+
+def _split(rank: str) -> Tuple[str, str]:
+    length = _integer_length(rank[0])
+    if length > len(rank):
+        raise ValueError(f"Invalid rank key: {rank!r}")
+    return rank[:length], rank[length:]
+
+
+def validate_rank(rank: str) -> str:
+    """Return ``rank`` unchanged, raising ``ValueError`` if it is malformed."""
+    try:
+        integer, fraction = _split(rank)
+    except (IndexError, ValueError):
+        raise ValueError(f"Invalid rank key: {rank!r}") from None
+    if (
+        integer == _SMALLEST_INTEGER
+        or fraction.endswith(ALPHABET[0])
+        or any(c not in _DIGITS for c in rank[1:])
+    ):
+        raise ValueError(f"Invalid rank key: {rank!r}")
+    return rank
+
+
+def _midpoint(lower: str, upper: Optional[str]) -> str:
+    """Return a fraction strictly between two fractions (``None`` = open end)."""
+    digits: List[str] = []
+    index = 0
+    while True:
+        low = _DIGITS[lower[index]] if index < len(lower) else 0
+        high = BASE
+        if upper is not None:
+            high = _DIGITS[upper[index]] if index < len(upper) else 0
+        if high - low > 1:
+            digits.append(ALPHABET[(low + high) // 2])
+            return "".join(digits)
+        digits.append(ALPHABET[low])
+        if high - low == 1:
+            # Everything after this digit already sorts below ``upper``.
+            upper = None
+        index += 1
+
+
+def _increment_integer(integer: str) -> Optional[str]:
+    head, digits = integer[0], list(integer[1:])
+    for index in reversed(range(len(digits))):
+        value = _DIGITS[digits[index]] + 1
+        if value < BASE:
+            digits[index] = ALPHABET[value]
+            return head + "".join(digits)
+        digits[index] = ALPHABET[0]
+    if head == "Z":
+        return _FIRST_RANK
+    if head == "z":
+        return None
+    head = chr(ord(head) + 1)
+    if head > "a":
+        digits.append(ALPHABET[0])
+    else:
+        digits.pop()
+    return head + "".join(digits)
+
+
+def _decrement_integer(integer: str) -> Optional[str]:
+    head, digits = integer[0], list(integer[1:])
+    for index in reversed(range(len(digits))):
+        value = _DIGITS[digits[index]] - 1
+        if value >= 0:
+            digits[index] = ALPHABET[value]
+            return head + "".join(digits)
+        digits[index] = ALPHABET[-1]
+    if head == "a":
+        return "Z" + ALPHABET[-1]
+    if head == "A":
+        return None
+    head = chr(ord(head) - 1)
+    if head < "Z":
+        digits.append(ALPHABET[-1])
+    else:
+        digits.pop()
+    return head + "".join(digits)
+
+
+def rank_between(lower: Optional[str] = None, upper: Optional[str] = None) -> str:
+    """
+    Return a rank strictly between ``lower`` and ``upper``.
+
+    ``None`` stands for the open start/end of the sequence.
+    """
+    if lower is not None and upper is not None and lower >= upper:
+        raise ValueError(f"Lower rank {lower!r} must sort before {upper!r}")
+    if lower is None:
+        if upper is None:
+            return _FIRST_RANK
+        integer, fraction = _split(upper)
+        if integer == _SMALLEST_INTEGER:
+            return integer + _midpoint("", fraction)
+        if integer < upper:
+            return integer
+        decremented = _decrement_integer(integer)
+        if decremented is None:
+            raise ValueError("Cannot rank before the smallest key")
+        return decremented
+    integer, fraction = _split(lower)
+    if upper is None:
+        incremented = _increment_integer(integer)
+        return (
+            incremented
+            if incremented is not None
+            else integer + _midpoint(fraction, None)
+        )
+    upper_integer, upper_fraction = _split(upper)
+    if integer == upper_integer:
+        return integer + _midpoint(fraction, upper_fraction)
+    incremented = _increment_integer(integer)
+    if incremented is not None and incremented < upper:
+        return incremented
+    return integer + _midpoint(fraction, None)
+
+
+def rank_sequence(count: int) -> List[str]:
+    """Return ``count`` consecutive short ranks in ascending order."""
+    ranks: List[str] = []
+    rank: Optional[str] = None
+    for _ in range(count):
+        rank = rank_between(rank, None)
+        ranks.append(rank)
+    return ranks
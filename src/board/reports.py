@@ -0,0 +1,387 @@
+"""
+Cross-project flow reports computed from the task event history.
+
+The per-board analytics in ``src.board.analytics`` read pre-aggregated rows;
+these reports instead answer arbitrary date ranges over many projects and
+years of history, so they read ``task_events`` directly. Events are streamed
+in batches and decoded into NumPy columns (task, project, state, timestamp),
+and every step after that - finding completions and their cycle times,
+histograms, rolling throughput and per-project percentiles - is whole-array
+arithmetic rather than a Python loop per event.
+
+Completions and cycle times follow the same rules as the incremental
+analytics: a task completes when it enters a done column from any other
+state, and its cycle time runs from its first move out of "todo" (or its
+creation) to that completion. Percentiles here are exact.
+"""
+import argparse
+import asyncio
+import logging
+import operator
+import sys
+import time
+from datetime import date, datetime, timedelta
+from typing import List, NamedTuple, Optional, Sequence, Tuple
+from uuid import UUID
+
+import numpy as np
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.core.config import settings
+from src.core.database import create_tables, dispose_engine, session_scope
+
+from . import schemas, tables
+from .analytics import DELETED, DOING, DONE, PERCENTILES, TODO
+
+logger = logging.getLogger(__name__)
+
+STATE_CODES = {TODO: 0, DOING: 1, DONE: 2, DELETED: 3}
+
+# Upper bounds (hours) of the cycle time histogram bins; a last bin holds the rest.
+HISTOGRAM_HOURS = (1, 4, 8, 24, 72, 168, 336, 720, 2160)
+
+# Longest reporting period accepted, in days.
+MAX_REPORT_DAYS = 3660
+
+
+class Transitions(NamedTuple):
+    """Task events as columns, ordered by task and then by event."""
+
+    task: np.ndarray  # int64; a task's events share a code and are contiguous
+    project: np.ndarray  # int32 index into ``projects``
+    state: np.ndarray  # int8 ``STATE_CODES``
+    at: np.ndarray  # datetime64[us], UTC
+    projects: List[UUID]
+
+
+class Completions(NamedTuple):
+    project: np.ndarray  # int32 index into ``Transitions.projects``
+    at: np.ndarray  # datetime64[us]
+    hours: np.ndarray  # float64 cycle time
+
+
+def empty_transitions() -> Transitions:
+    return Transitions(
+        np.empty(0, np.int64),
+        np.empty(0, np.int32),
+        np.empty(0, np.int8),
+        np.empty(0, "datetime64[us]"),
+        [],
+    )
+
+
+def report_period(since: Optional[date], until: Optional[date]) -> Tuple[date, date]:
+    """Default to the year up to today; reject empty or overlong periods."""
+    until = until or datetime.utcnow().date()
+    since = since or until - timedelta(days=364)
+    if since > until:
+        raise ValueError("since must not be after until")
+    if (until - since).days >= MAX_REPORT_DAYS:
+        raise ValueError(f"Reports cover at most {MAX_REPORT_DAYS} days")
+    return since, until
+
+
+async def load_transitions(
+    session: AsyncSession,
+    project_ids: Optional[Sequence[UUID]] = None,
+    until: Optional[date] = None,
+    batch_size: int = 50000,
+) -> Transitions:
+    """
+    Stream task events up to the end of ``until`` into columns, one batch
+    at a time. Events before the reporting period are still needed for the
+    start of cycles that end inside it.
+    """
+    events = tables.task_events
+    query = (
+        select(events.c.task_id, events.c.project_id, events.c.state, events.c.at)
+        .order_by(events.c.task_id, events.c.id)
+        .execution_options(yield_per=batch_size)
+    )
+    if project_ids:
+        query = query.where(events.c.project_id.in_(project_ids))
+    if until is not None:
+        end = datetime.combine(until + timedelta(days=1), datetime.min.time())
+        query = query.where(events.c.at < end)
+
+    codes: dict = {}
+    batches = []
+    last_task = None
+    tasks_seen = 0
+    result = await session.stream(query)
+    async for partition in result.partitions():
+        task_ids, project_ids_, states, ats = zip(*partition)
+        n = len(task_ids)
+        new_task = np.fromiter(
+            map(operator.ne, task_ids, (last_task,) + task_ids[:-1]),
+            dtype=bool,
+            count=n,
+        )
+        batches.append(
+            (
+                np.cumsum(new_task, dtype=np.int64) + (tasks_seen - 1),
+                np.fromiter(
+                    (codes.setdefault(pid, len(codes)) for pid in project_ids_),
+                    np.int32,
+                    n,
+                ),
+                np.fromiter(map(STATE_CODES.__getitem__, states), np.int8, n),
+                np.array(ats, dtype="datetime64[us]"),
+            )
+        )
+        tasks_seen += int(new_task.sum())
+        last_task = task_ids[-1]
+    if not batches:
+        return empty_transitions()
+    task, project, state, at = (np.concatenate(column) for column in zip(*batches))
+    return Transitions(task, project, state, at, list(codes))
+
+
+def completions(transitions: Transitions) -> Completions:
+    """Every completion in the history with its cycle time."""
+    task, project, state, at = transitions[:4]
+    n = len(task)
+    if not n:
+        return Completions(project, at, np.empty(0))
+    first = np.ones(n, dtype=bool)
+    first[1:] = task[1:] != task[:-1]
+    previous = np.empty_like(state)
+    previous[1:] = state[:-1]
+    done = np.flatnonzero(
+        (state == STATE_CODES[DONE])
+        & ~first
+        & (previous != STATE_CODES[DONE])
+        & (previous != STATE_CODES[DELETED])
+    )
+
+    # A cycle starts at the task's first "doing" or "done" event before the
+    # completion, or else at its creation.
+    created = np.flatnonzero(first)
+    active = (state == STATE_CODES[DOING]) | (state == STATE_CODES[DONE])
+    first_active = np.minimum.reduceat(np.where(active, np.arange(n), n), created)
+    started = first_active[task[done]]
+    started = np.where(started < done, started, created[task[done]])
+    seconds = (at[done] - at[started]) / np.timedelta64(1, "s")
+    return Completions(project[done], at[done], np.maximum(seconds, 0) / 3600)
+
+
+def _percentiles(
+    sorted_hours: np.ndarray, offsets: np.ndarray, counts: np.ndarray
+) -> np.ndarray:
+    """Nearest-rank ``PERCENTILES`` of consecutively laid out groups, one row each."""
+    ranks = (
+        np.ceil(counts[:, None] * (np.array(PERCENTILES) / 100)).astype(np.int64) - 1
+    )
+    index = offsets[:, None] + np.maximum(ranks, 0)
+    if not len(sorted_hours):
+        return np.zeros(ranks.shape)
+    return sorted_hours[np.minimum(index, len(sorted_hours) - 1)]
+
+
+def _flow(
+    project_id: Optional[UUID],
+    count: int,
+    total_hours: float,
+    percentiles: np.ndarray,
+    histogram: np.ndarray,
+    completed: np.ndarray,
+    rolling: np.ndarray,
+    days: List[date],
+) -> schemas.ProjectFlow:
+    return schemas.ProjectFlow(
+        project_id=project_id,
+        completed=count,
+        mean_hours=round(total_hours / count, 3) if count else None,
+        percentiles=(
+            {f"p{p}": round(float(v), 3) for p, v in zip(PERCENTILES, percentiles)}
+            if count
+            else {}
+        ),
+        histogram=[
+            schemas.HistogramBin(le_hours=bound, count=int(n))
+            for bound, n in zip(HISTOGRAM_HOURS + (None,), histogram)
+        ],
+        throughput=[
+            schemas.ThroughputPoint(day=day, completed=c, rolling_per_day=r)
+            for day, c, r in zip(
+                days, completed.tolist(), np.round(rolling, 3).tolist()
+            )
+        ],
+    )
+
+
+def flow_report(
+    transitions: Transitions,
+    since: date,
+    until: date,
+    interval_days: int = 7,
+    window_days: int = 28,
+) -> schemas.FlowReport:
+    """
+    Cycle time and throughput for completions from ``since`` through
+    ``until``, per project and in total.
+
+    Throughput has one point per ``interval_days`` counted from ``since``
+    (the last may be shorter), each with the completions in that interval
+    and the mean completions per day over the trailing ``window_days``.
+    """
+    done = completions(transitions)
+    first_day = np.datetime64(since, "D")
+    span = (until - since).days + 1
+    day = (done.at.astype("datetime64[D]") - first_day).astype(np.int64)
+    keep = (day >= 0) & (day < span)
+    project, day, hours = done.project[keep], day[keep], done.hours[keep]
+    projects = len(transitions.projects)
+
+    counts = np.bincount(project, minlength=projects)
+    total_hours = np.bincount(project, weights=hours, minlength=projects)
+    # Sort by cycle time, then stably by project: faster than a two-key lexsort.
+    by_hours = np.argsort(hours)
+    order = by_hours[np.argsort(project[by_hours], kind="stable")]
+    percentiles = _percentiles(hours[order], np.cumsum(counts) - counts, counts)
+    bins = len(HISTOGRAM_HOURS) + 1
+    histogram = np.bincount(
+        project * bins + np.searchsorted(HISTOGRAM_HOURS, hours),
+        minlength=projects * bins,
+    ).reshape(projects, bins)
+
+    # Completions per project and day, as running totals with a leading zero.
+    daily = np.bincount(project * span + day, minlength=projects * span).reshape(
+        projects, span
+    )
+    running = np.zeros((projects + 1, span + 1), dtype=np.int64)
+    np.cumsum(daily, axis=1, out=running[:-1, 1:])
+    running[-1] = running[:-1].sum(axis=0)
+    ends = np.minimum(
+        np.arange(interval_days, span + interval_days, interval_days), span
+    )
+    starts = np.insert(ends[:-1], 0, 0)
+    completed = running[:, ends] - running[:, starts]
+    rolling = (
+        running[:, ends] - running[:, np.maximum(ends - window_days, 0)]
+    ) / np.minimum(window_days, ends)
+    days = [since + timedelta(days=int(end) - 1) for end in ends]
+
+    total = _flow(
+        None,
+        int(counts.sum()),
+        float(hours.sum()),
+        _percentiles(hours[by_hours], np.zeros(1, np.int64), np.array([len(hours)]))[0],
+        histogram.sum(axis=0),
+        completed[-1],
+        rolling[-1],
+        days,
+    )
+    ranked = sorted(
+        range(projects), key=lambda i: (-counts[i], str(transitions.projects[i]))
+    )
+    return schemas.FlowReport(
+        since=since,
+        until=until,
+        interval_days=interval_days,
+        window_days=window_days,
+        transitions=len(transitions.task),
+        total=total,
+        projects=[
+            _flow(
+                transitions.projects[i],
+                int(counts[i]),
+                float(total_hours[i]),
+                percentiles[i],
+                histogram[i],
+                completed[i],
+                rolling[i],
+                days,
+            )
+            for i in ranked
+        ],
+    )
+
+
+async def flow(
+    sessions=session_scope,
+    project_ids: Optional[Sequence[UUID]] = None,
+    since: Optional[date] = None,
+    until: Optional[date] = None,
+    interval_days: int = 7,
+    window_days: int = 28,
+) -> schemas.FlowReport:
+    """Load the history and build a flow report off the event loop."""
+    since, until = report_period(since, until)
+    started = time.perf_counter()
+    async with sessions() as session:
+        transitions = await load_transitions(
+            session, project_ids, until, settings.report_batch_size
+        )
+    loaded = time.perf_counter()
+    report = await asyncio.to_thread(
+        flow_report, transitions, since, until, interval_days, window_days
+    )
+    logger.info(
+        "Flow report over %d task events: loaded in %.2fs, computed in %.2fs",
+        report.transitions,
+        loaded - started,
+        time.perf_counter() - loaded,
+    )
+    return report
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Cross-project flow reports.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    flow_command = commands.add_parser(
+        "flow", help="Cycle time and throughput as JSON, per project and in total"
+    )
+    flow_command.add_argument(
+        "--since", type=date.fromisoformat, help="First day (YYYY-MM-DD)"
+    )
+    flow_command.add_argument(
+        "--until", type=date.fromisoformat, help="Last day (YYYY-MM-DD)"
+    )
+    flow_command.add_argument(
+        "--project-id",
+        type=UUID,
+        action="append",
+        help="Only this project (repeatable)",
+    )
+    flow_command.add_argument(
+        "--interval", type=int, default=7, help="Days per throughput point"
+    )
+    flow_command.add_argument(
+        "--window", type=int, default=28, help="Rolling window in days"
+    )
+    flow_command.add_argument("--output", help="Write to this file instead of stdout")
+    args = parser.parse_args(argv)
+    if args.interval < 1 or args.window < 1:
+        parser.error("--interval and --window must be positive")
+    try:
+        report_period(args.since, args.until)
+    except ValueError as error:
+        parser.error(str(error))
+    logging.basicConfig(level=logging.INFO)
+
+    async def run() -> schemas.FlowReport:
+        try:
+            if settings.db_create_tables:
+                await create_tables(tables.metadata)
+            return await flow(
+                project_ids=args.project_id,
+                since=args.since,
+                until=args.until,
+                interval_days=args.interval,
+                window_days=args.window,
+            )
+        finally:
+            await dispose_engine()
+
+    text = asyncio.run(run()).model_dump_json(indent=2)
+    if args.output:
+        with open(args.output, "w") as output:
+            output.write(text + "\n")
+    else:
+        sys.stdout.write(text + "\n")
+
+
+if __name__ == "__main__":
+    main()
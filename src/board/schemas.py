@@ -0,0 +1,346 @@
+"""
+Pydantic models for the kanban board API.
+"""
+from datetime import date, datetime
+from typing import Annotated, Any, Dict, List, Literal, Optional, Union, cast
+from uuid import UUID
+
+from pydantic import BaseModel, ConfigDict, Field, TypeAdapter, field_validator
+
+from src.core.responses import encode
+
+from .engine import BoardEngine, Changes
+
+
+class ProjectCreate(BaseModel):
+    name: str = Field(..., max_length=255, description="Project name")
+    description: Optional[str] = Field(None, description="Project description")
+
+
+class Project(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    id: UUID
+    name: str
+    description: Optional[str]
+    version: int
+    created_at: datetime
+    updated_at: datetime
+
+
+class ColumnCreate(BaseModel):
+    name: str = Field(..., max_length=100, description="Column name")
+    color: str = Field("#gray", max_length=7, description="Column color")
+
+
+class Column(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    id: UUID
+    project_id: UUID
+    name: str
+    rank: str
+    color: str
+
+
+class TaskCreate(BaseModel):
+    title: str = Field(..., max_length=255, description="Task title")
+    description: Optional[str] = Field(None, description="Task description")
+    column_id: UUID = Field(..., description="Column ID where task belongs")
+    user_story_id: Optional[UUID] = Field(None, description="Linked user story")
+    metadata: Dict[str, Any] = Field(default_factory=dict)
+
+
+class TaskUpdate(BaseModel):
+    """Fields to change; omitted fields are kept."""
+
+    title: Optional[str] = Field(None, max_length=255)
+    description: Optional[str] = None
+    user_story_id: Optional[UUID] = None
+    metadata: Optional[Dict[str, Any]] = None
+
+    @field_validator("title", "metadata")
+    @classmethod
+    def not_null(cls, value: Any) -> Any:
+        # Defaults are not validated, so only an explicit null gets here
+        if value is None:
+            raise ValueError("may be omitted but not null")
+        return value
+
+
+class TaskMove(BaseModel):
+    column_id: UUID = Field(..., description="Destination column")
+    after_id: Optional[UUID] = Field(None, description="Place directly after this task")
+    before_id: Optional[UUID] = Field(
+        None, description="Place directly before this task"
+    )
+
+
+class Task(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    id: UUID
+    project_id: UUID
+    column_id: UUID
+    title: str
+    description: Optional[str]
+    rank: str
+    metadata: Dict[str, Any]
+    user_story_id: Optional[UUID]
+    created_at: datetime
+    updated_at: datetime
+
+
+class Attachment(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    id: UUID
+    task_id: UUID
+    filename: str
+    content_type: str
+    size: int
+    sha256: str
+    created_at: datetime
+
+
+class BoardColumn(Column):
+    tasks: List[Task]
+
+
+class Board(BaseModel):
+    project: Project
+    columns: List[BoardColumn]
+
+
+class BoardDelta(BaseModel):
+    """Columns and tasks changed since a client's last known board version."""
+
+    project: Project
+    since: int
+    version: int
+    columns: List[Column]
+    tasks: List[Task]
+    deleted_task_ids: List[UUID]
+
+
+class ProjectRecord(BaseModel):
+    """Project line of a board export; informational on import."""
+
+    type: Literal["project"]
+
+
+class ColumnRecord(ColumnCreate):
+    """Column line of a board export."""
+
+    type: Literal["column"]
+    id: UUID = Field(..., description="Column ID referenced by the task lines")
+
+
+class TaskRecord(TaskCreate):
+    """Task line of a board export."""
+
+    type: Literal["task"]
+    created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+
+
+AnyRecord = Union[ProjectRecord, ColumnRecord, TaskRecord]
+BoardRecord = cast(
+    TypeAdapter[AnyRecord],
+    TypeAdapter(Annotated[AnyRecord, Field(discriminator="type")]),
+)
+
+
+class ImportResult(BaseModel):
+    columns: int
+    tasks: int
+    seconds: float
+    rows_per_second: float
+
+
+# Largest accepted POST /api/batch request
+MAX_BATCH_OPERATIONS = 1000
+
+
+class BatchCreate(TaskCreate):
+    op: Literal["create"]
+
+
+class BatchUpdate(TaskUpdate):
+    op: Literal["update"]
+    task_id: UUID
+
+
+class BatchMove(TaskMove):
+    op: Literal["move"]
+    task_id: UUID
+
+
+class BatchDelete(BaseModel):
+    op: Literal["delete"]
+    task_id: UUID
+
+
+BatchOperation = Annotated[
+    Union[BatchCreate, BatchUpdate, BatchMove, BatchDelete], Field(discriminator="op")
+]
+
+
+class BatchRequest(BaseModel):
+    project_id: UUID = Field(..., description="Board every operation applies to")
+    operations: List[BatchOperation] = Field(
+        ...,
+        min_length=1,
+        max_length=MAX_BATCH_OPERATIONS,
+        description="Applied in order",
+    )
+
+
+class BatchResult(BaseModel):
+    index: int
+    op: str
+    task_id: UUID
+    task: Optional[Task] = Field(
+        None, description="Resulting task; omitted for deletes"
+    )
+
+
+class BatchResponse(BaseModel):
+    project_id: UUID
+    version: int
+    results: List[BatchResult]
+
+
+class SearchHit(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    id: UUID
+    project_id: UUID
+    title: str
+    score: float
+
+
+class SprintVelocity(BaseModel):
+    sprint: Optional[str]
+    tasks_done: int
+    points_done: float
+
+
+class Velocity(BaseModel):
+    project_id: UUID
+    sprints: List[SprintVelocity]
+
+
+class BurndownDay(BaseModel):
+    day: date
+    remaining_tasks: int
+    remaining_points: float
+    done_tasks: int
+    done_points: float
+
+
+class Burndown(BaseModel):
+    project_id: UUID
+    sprint: Optional[str]
+    days: List[BurndownDay]
+
+
+class CycleTime(BaseModel):
+    project_id: UUID
+    sprint: Optional[str]
+    since: Optional[date]
+    until: Optional[date]
+    count: int
+    mean_hours: Optional[float]
+    percentiles: Dict[str, float]  # p50, p75, p85, p95 in hours
+
+
+class HistogramBin(BaseModel):
+    le_hours: Optional[
+        float
+    ]  # upper bound of the bin; None for the open-ended last bin
+    count: int
+
+
+class ThroughputPoint(BaseModel):
+    day: date  # last day of the interval
+    completed: int
+    rolling_per_day: float  # mean daily completions over the trailing window
+
+
+class ProjectFlow(BaseModel):
+    project_id: Optional[UUID]  # None for the total over all projects
+    completed: int
+    mean_hours: Optional[float]
+    percentiles: Dict[str, float]  # p50, p75, p85, p95 in hours
+    histogram: List[HistogramBin]
+    throughput: List[ThroughputPoint]
+
+
+class FlowReport(BaseModel):
+    since: date
+    until: date
+    interval_days: int
+    window_days: int
+    transitions: int
+    total: ProjectFlow
+    projects: List[ProjectFlow]
+
+
+class IndexRecommendation(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    name: str
+    ddl: str
+    uses: int
+
+
+def _project_data(project) -> Dict[str, Any]:
+    return {
+        "id": project.id,
+        "name": project.name,
+        "description": project.description,
+        "version": project.version,
+        "created_at": project.created_at,
+        "updated_at": project.updated_at,
+    }
+
+
+def _column_data(column) -> Dict[str, Any]:
+    return {
+        "id": column.id,
+        "project_id": column.project_id,
+        "name": column.name,
+        "rank": column.rank,
+        "color": column.color,
+    }
+
+
+def encode_board(engine: BoardEngine, project_id: UUID) -> bytes:
+    """
+    Serialize the full board (shaped like ``Board``) straight from the
+    engine. Engine tasks are dataclasses with exactly the ``Task`` fields,
+    so they are written without building a model per task.
+    """
+    project = engine.get_project(project_id)
+    columns = [
+        {**_column_data(column), "tasks": list(engine.iter_tasks(column.id))}
+        for column in engine.iter_columns(project_id)
+    ]
+    return encode({"project": _project_data(project), "columns": columns})
+
+
+def encode_delta(
+    engine: BoardEngine, project_id: UUID, since: int, changes: Changes
+) -> bytes:
+    """Serialize the incremental sync response, shaped like ``BoardDelta``."""
+    return encode(
+        {
+            "project": _project_data(engine.get_project(project_id)),
+            "since": since,
+            "version": changes.version,
+            "columns": [_column_data(column) for column in changes.columns],
+            "tasks": changes.tasks,
+            "deleted_task_ids": changes.deleted_task_ids,
+        }
+    )
@@ -0,0 +1,342 @@
+"""
+Full-text task search with two interchangeable backends.
+
+``PostgresSearch`` queries the GIN-indexed ``tsvector`` expression defined in
+``src.board.tables``; the database keeps that index current on every write.
+``LocalSearch`` is an in-process inverted index for SQLite and development:
+it is filled from the database on first use and then updated incrementally
+by the board service on every task write.
+
+Both treat the query's words as required terms, with the last word matched
+as a prefix so results update while a user is still typing, and rank title
+matches above description matches.
+"""
+import asyncio
+import heapq
+import logging
+import math
+import re
+from array import array
+from bisect import bisect_left, insort
+from collections import Counter
+from typing import Dict, List, NamedTuple, Optional, Tuple
+from uuid import UUID
+
+from sqlalchemy import func, select
+from sqlalchemy.engine import make_url
+
+from src.core.config import settings
+from src.core.database import session_scope
+
+from . import tables
+
+logger = logging.getLogger(__name__)
+
+TOKEN = re.compile(r"\w+")
+
+# Title words count this many times a description word.
+TITLE_WEIGHT = 3
+
+# Vocabulary completions considered for the prefix (last) query word.
+MAX_PREFIX_EXPANSIONS = 50
+
+
+def tokenize(text: Optional[str]) -> List[str]:
+    return TOKEN.findall(text.lower()) if text else []
+
+
+class SearchHit(NamedTuple):
+    id: UUID
+    project_id: UUID
+    title: str
+    score: float
+
+
+class PostgresSearch:
+    """Ranked search on PostgreSQL ``tsvector`` with a GIN index."""
+
+    def __init__(self, sessions=session_scope):
+        self.sessions = sessions
+
+    def add(
+        self, task_id: UUID, project_id: UUID, title: str, description: Optional[str]
+    ) -> None:
+        """No-op: the database index follows task writes itself."""
+
+    def remove(self, task_id: UUID) -> None:
+        """No-op: the database index follows task writes itself."""
+
+    @staticmethod
+    def tsquery(query: str) -> Optional[str]:
+        """Build a ``to_tsquery`` string; tokens are word characters only."""
+        terms = tokenize(query)
+        if not terms:
+            return None
+        return " & ".join(terms[:-1] + [f"{terms[-1]}:*"])
+
+    def statement(
+        self, tsquery: str, project_id: Optional[UUID] = None, limit: int = 20
+    ):
+        query = func.to_tsquery(tables.SEARCH_CONFIG, tsquery)
+        score = func.ts_rank(tables.task_search_vector, query)
+        statement = (
+            select(
+                tables.tasks.c.id,
+                tables.tasks.c.project_id,
+                tables.tasks.c.title,
+                score,
+            )
+            .where(tables.task_search_vector.op("@@")(query))
+            .order_by(score.desc())
+            .limit(limit)
+        )
+        if project_id is not None:
+            statement = statement.where(tables.tasks.c.project_id == project_id)
+        return statement
+
+    async def search(
+        self, query: str, project_id: Optional[UUID] = None, limit: int = 20
+    ) -> List[SearchHit]:
+        tsquery = self.tsquery(query)
+        if tsquery is None:
+            return []
+        async with self.sessions() as session:
+            result = await session.execute(self.statement(tsquery, project_id, limit))
+            return [SearchHit(*row) for row in result]
+
+
+class InvertedIndex:
+    """
+    In-memory inverted index over task titles and descriptions.
+
+    Each task gets an increasing document number, so postings stay sorted by
+    plain appends and are stored as compact arrays of document numbers and
+    term weights. Queries score every posting at once with NumPy views of
+    those arrays instead of looping in Python; NumPy is imported on first
+    use, so processes searching PostgreSQL never load it. Updating or
+    removing a task tombstones its old document; tombstones are purged by
+    ``compact`` once they outnumber live documents. A sorted vocabulary
+    answers prefix lookups with a binary search.
+    """
+
+    def __init__(self) -> None:
+        self.clear()
+
+    def clear(self) -> None:
+        self._postings: Dict[str, Tuple[array, array]] = {}
+        self._vocabulary: List[str] = []
+        self._docs: List[Optional[Tuple[UUID, UUID, str]]] = []
+        self._doc_of: Dict[UUID, int] = {}
+        # Per document: 1 while live, and a small integer code for its project
+        self._live = bytearray()
+        self._project_codes = array("I")
+        self._codes: Dict[UUID, int] = {}
+        self._dead = 0
+
+    def __len__(self) -> int:
+        return len(self._doc_of)
+
+    def add(
+        self, task_id: UUID, project_id: UUID, title: str, description: Optional[str]
+    ) -> None:
+        """Index a task, replacing any earlier version of it."""
+        self.remove(task_id)
+        doc = len(self._docs)
+        self._docs.append((task_id, project_id, title))
+        self._doc_of[task_id] = doc
+        self._live.append(1)
+        self._project_codes.append(self._codes.setdefault(project_id, len(self._codes)))
+        weights = Counter(tokenize(description))
+        for token in tokenize(title):
+            weights[token] += TITLE_WEIGHT
+        for token, weight in weights.items():
+            postings = self._postings.get(token)
+            if postings is None:
+                postings = self._postings[token] = (array("I"), array("B"))
+                insort(self._vocabulary, token)
+            postings[0].append(doc)
+            postings[1].append(min(weight, 255))
+
+    def remove(self, task_id: UUID) -> None:
+        doc = self._doc_of.pop(task_id, None)
+        if doc is None:
+            return
+        self._docs[doc] = None
+        self._live[doc] = 0
+        self._dead += 1
+        if self._dead > max(1024, len(self._doc_of)):
+            self.compact()
+
+    def compact(self) -> None:
+        """Drop tombstoned documents and renumber the live ones."""
+        import numpy as np
+
+        live = np.frombuffer(self._live, dtype=np.uint8).astype(bool)
+        renumber = np.cumsum(live, dtype=np.int64) - 1
+        for token in list(self._postings):
+            docs, weights = (
+                np.frombuffer(a, dtype=a.typecode) for a in self._postings[token]
+            )
+            keep = live[docs]
+            if keep.any():
+                self._postings[token] = (
+                    array("I", renumber[docs[keep]].astype(np.uint32).tobytes()),
+                    array("B", weights[keep].tobytes()),
+                )
+            else:
+                del self._postings[token]
+        self._vocabulary = sorted(self._postings)
+        entries = [entry for entry in self._docs if entry is not None]
+        self._docs = list(entries)
+        self._doc_of = {entry[0]: doc for doc, entry in enumerate(entries)}
+        self._live = bytearray(b"\x01" * len(entries))
+        codes = np.frombuffer(self._project_codes, dtype=np.uint32)[live]
+        self._project_codes = array("I", codes.tobytes())
+        self._dead = 0
+
+    def search(
+        self, query: str, project_id: Optional[UUID] = None, limit: int = 20
+    ) -> List[SearchHit]:
+        """Return the best matches containing every word, the last as a prefix."""
+        import numpy as np
+
+        terms = tokenize(query)
+        if not terms or not self._doc_of:
+            return []
+        if project_id is not None and project_id not in self._codes:
+            return []
+        total = len(self._doc_of)
+        groups: List[List[Tuple[Tuple[array, array], float]]] = []
+        for term in dict.fromkeys(terms[:-1]):
+            postings = self._postings.get(term)
+            if postings is None:
+                return []
+            groups.append([(postings, self._idf(postings, total))])
+        prefix = terms[-1]
+        expansions = [
+            (
+                self._postings[token],
+                self._idf(self._postings[token], total) * len(prefix) / len(token),
+            )
+            for token in self._expand(prefix)
+        ]
+        if not expansions:
+            return []
+        groups.append(expansions)
+
+        # Every word must match: a document's score is the sum of its best
+        # weight per word, and zero if any word is missing.
+        scores = np.frombuffer(self._live, dtype=np.uint8).astype(np.float32)
+        if project_id is not None:
+            codes = np.frombuffer(self._project_codes, dtype=np.uint32)
+            scores[codes != self._codes[project_id]] = 0
+        for group in groups:
+            matched = np.zeros(len(scores), dtype=np.float32)
+            for postings, idf in group:
+                docs = np.frombuffer(postings[0], dtype=np.uint32)
+                weights = np.frombuffer(postings[1], dtype=np.uint8) * np.float32(idf)
+                matched[docs] = np.maximum(matched[docs], weights)
+            scores = np.where((scores > 0) & (matched > 0), scores + matched, 0)
+        # Each live document started at 1; drop that offset from the scores.
+        hits = np.flatnonzero(scores)
+        if len(hits) > limit:
+            hits = hits[np.argpartition(scores[hits], -limit)[-limit:]]
+        hits = hits[np.argsort(-scores[hits], kind="stable")]
+        return [
+            SearchHit(*entry, score=round(float(scores[doc]) - 1, 4))
+            for doc in hits
+            if (entry := self._docs[doc]) is not None
+        ]
+
+    def _expand(self, prefix: str) -> List[str]:
+        start = bisect_left(self._vocabulary, prefix)
+        tokens = []
+        for token in self._vocabulary[start:]:
+            if not token.startswith(prefix):
+                break
+            tokens.append(token)
+        if len(tokens) > MAX_PREFIX_EXPANSIONS:
+            tokens = heapq.nlargest(
+                MAX_PREFIX_EXPANSIONS,
+                tokens,
+                key=lambda token: len(self._postings[token][0]),
+            )
+        return tokens
+
+    @staticmethod
+    def _idf(postings: Tuple[array, array], total: int) -> float:
+        return math.log(1 + total / len(postings[0]))
+
+
+class LocalSearch:
+    """``InvertedIndex`` loaded from the database on first search."""
+
+    def __init__(self, sessions=session_scope, batch_size: int = 5000):
+        self.sessions = sessions
+        self.batch_size = batch_size
+        self.index = InvertedIndex()
+        self._loaded: Optional[asyncio.Future] = None
+
+    def add(
+        self, task_id: UUID, project_id: UUID, title: str, description: Optional[str]
+    ) -> None:
+        self.index.add(task_id, project_id, title, description)
+
+    def remove(self, task_id: UUID) -> None:
+        self.index.remove(task_id)
+
+    async def load(self) -> int:
+        """Index every task in the database, returning the number indexed."""
+        columns = (
+            tables.tasks.c.id,
+            tables.tasks.c.project_id,
+            tables.tasks.c.title,
+            tables.tasks.c.description,
+        )
+        async with self.sessions() as session:
+            result = await session.stream(
+                select(*columns).execution_options(yield_per=self.batch_size)
+            )
+            async for partition in result.partitions():
+                for row in partition:
+                    self.index.add(*row)
+        logger.info("Indexed %d tasks for search", len(self.index))
+        return len(self.index)
+
+    async def search(
+        self, query: str, project_id: Optional[UUID] = None, limit: int = 20
+    ) -> List[SearchHit]:
+        if self._loaded is None:
+            self._loaded = asyncio.ensure_future(self.load())
+        try:
+            await asyncio.shield(self._loaded)
+        except Exception:
+            self._loaded = None
+            raise
+        return self.index.search(query, project_id, limit)
+
+
+_backend = None
+
+
+def create_search_backend(backend: str, database_url: str):
+    """Pick a backend; ``auto`` uses PostgreSQL when the database is PostgreSQL."""
+    if backend == "auto":
+        backend = (
+            "postgres"
+            if make_url(database_url).get_backend_name() == "postgresql"
+            else "local"
+        )
+    if backend == "postgres":
+        return PostgresSearch()
+    if backend == "local":
+        return LocalSearch()
+    raise ValueError(f"Unknown search backend {backend!r}")
+
+
+def get_search_backend():
+    """Get the application search backend."""
+    global _backend
+    if _backend is None:
+        _backend = create_search_backend(settings.search_backend, settings.database_url)
+    return _backend
@@ -0,0 +1,504 @@
+"""
+Board service: the engine as a write-through copy of the database.
+
+Boards are loaded into the in-memory engine on first access. Each mutation
+is applied to the engine first (it validates the request and assigns ranks)
+and then written to the database in its own transaction. If that write
+fails the board is dropped from the engine, so the next request reloads the
+committed state instead of serving a change that never persisted. Boards
+written by another worker are marked stale (``mark_stale``, fed by the
+live-update hub) and reloaded on their next access; when the hub may have
+lost notices, all of them are (``mark_all_stale``).
+
+That notice can arrive late or not at all, so writes do not rely on it:
+each board has a revision in the database that every write advances, and a
+write only commits if the board is still at the revision this engine
+loaded (``write_session``). Otherwise the engine's copy is stale, the board
+is unloaded and ``ConflictError`` is raised before anything is written;
+mutations retry once on the reloaded board, so a stale worker never
+overwrites what another worker committed.
+
+Task writes also record their effect on the board analytics (see
+``src.board.analytics``) and, when notifications are configured, queue
+them in the outbox (``src.core.outbox``) in the same transaction.
+"""
+import asyncio
+import functools
+import logging
+from contextlib import AbstractAsyncContextManager, asynccontextmanager
+from typing import (
+    Any,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Dict,
+    List,
+    Optional,
+    Set,
+    Tuple,
+)
+from uuid import UUID
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.core import outbox
+from src.core.database import session_scope
+from src.core.tracing import span
+
+from . import analytics, schemas, store, tables
+from .search import get_search_backend
+from .engine import (
+    BoardEngine,
+    BoardError,
+    Column,
+    NotFoundError,
+    Project,
+    Task,
+    board_engine,
+)
+
+logger = logging.getLogger(__name__)
+
+# Outbox event type for each batch operation
+BATCH_EVENTS = {
+    "create": "task.created",
+    "update": "task.updated",
+    "move": "task.moved",
+    "delete": "task.deleted",
+}
+
+SessionScope = Callable[[], AbstractAsyncContextManager]
+
+
+class BatchError(BoardError):
+    """Raised when one operation of a batch fails; nothing in the batch is applied."""
+
+    def __init__(self, index: int, error: BoardError):
+        super().__init__(f"Operation {index} failed: {error}")
+        self.index = index
+        self.error = error
+
+
+class ConflictError(BoardError):
+    """Raised when a board was written elsewhere since this process loaded it."""
+
+
+def _retry_on_conflict(
+    method: Callable[..., Awaitable[Any]]
+) -> Callable[..., Awaitable[Any]]:
+    # The conflict unloaded the board, so the second attempt runs on a fresh copy.
+    @functools.wraps(method)
+    async def retry(self: "BoardService", *args: Any, **kwargs: Any) -> Any:
+        try:
+            return await method(self, *args, **kwargs)
+        except ConflictError:
+            return await method(self, *args, **kwargs)
+
+    return retry
+
+
+class BoardService:
+    """Loads boards on demand and persists every engine mutation."""
+
+    def __init__(self, engine: BoardEngine, sessions: SessionScope = session_scope):
+        self.engine = engine
+        self.sessions = sessions
+        self._loading: Dict[UUID, asyncio.Future] = {}
+        self._stale: Set[UUID] = set()
+        # Serializes each board's writes so revisions advance in order
+        self._write_locks: Dict[UUID, asyncio.Lock] = {}
+
+    # Loading
+
+    def mark_stale(self, project_id: UUID) -> None:
+        """Reload a board on its next access because another process wrote to it."""
+        if project_id in self.engine.projects or project_id in self._loading:
+            self._stale.add(project_id)
+
+    def mark_all_stale(self) -> None:
+        """Reload every board on its next access, after notices may have been lost."""
+        self._stale.update(self.engine.projects)
+        self._stale.update(self._loading)
+
+    async def project(self, project_id: UUID) -> Project:
+        """Return a board's project, loading the board if this process lacks it."""
+        while True:
+            project = self.engine.projects.get(project_id)
+            if project is not None and project_id in self._stale:
+                self._stale.discard(project_id)
+                self.engine.unload_project(project_id)
+                project = None
+            if project is not None:
+                return project
+            pending = self._loading.get(project_id)
+            if pending is None:
+                break
+            # Another request is already loading this board; an import may
+            # unload it again before we resume, so check once more.
+            await pending
+        self._loading[project_id] = asyncio.get_running_loop().create_future()
+        try:
+            with span("board.load", {"board.project_id": str(project_id)}):
+                async with self.sessions() as session:
+                    if await store.load_project(session, self.engine, project_id):
+                        # Taken before the session closes, while it is surely loaded.
+                        project = self.engine.projects[project_id]
+        finally:
+            self._loading.pop(project_id).set_result(None)
+        return project if project is not None else self.engine.get_project(project_id)
+
+    async def is_current(self, project_id: UUID, revision: int) -> bool:
+        """
+        Whether the stored board is still at ``revision``. If not, and this
+        engine did not write the newer revision, mark the board stale.
+        """
+        async with self.sessions() as session:
+            stored = await store.get_revision(session, project_id)
+        if stored == revision:
+            return True
+        project = self.engine.projects.get(project_id)
+        lock = self._write_locks.get(project_id)
+        # A write in progress finds out for itself whether its copy is stale.
+        writing = lock is not None and lock.locked()
+        if project is not None and project.revision != stored and not writing:
+            self.mark_stale(project_id)
+        return False
+
+    async def task(self, task_id: UUID) -> Task:
+        task = self.engine.tasks.get(task_id)
+        if task is not None:
+            if task.project_id not in self._stale:
+                return task
+            await self.project(task.project_id)
+            return self.engine.get_task(task_id)
+        async with self.sessions() as session:
+            project_id = await store.find_task_project(session, task_id)
+        if project_id is not None:
+            await self.project(project_id)
+        return self.engine.get_task(task_id)
+
+    # Mutations
+
+    async def create_project(
+        self, name: str, description: Optional[str] = None
+    ) -> Project:
+        project = self.engine.create_project(name, description)
+        try:
+            async with self.sessions() as session:
+                await store.insert_project(session, project)
+        except Exception:
+            self.engine.unload_project(project.id)
+            raise
+        return project
+
+    @_retry_on_conflict
+    async def create_column(
+        self, project_id: UUID, name: str, color: str = "#gray"
+    ) -> Column:
+        project = await self.project(project_id)
+        column = self.engine.create_column(project_id, name, color)
+        await self._persist(project, store.insert_column, column)
+        return column
+
+    @_retry_on_conflict
+    async def create_task(
+        self, project_id: UUID, column_id: UUID, title: str, **fields: Any
+    ) -> Task:
+        project = await self.project(project_id)
+        task = self.engine.create_task(project_id, column_id, title, **fields)
+        change = self._change(task, None)
+        events = self._events("task.created", task)
+        await self._persist(
+            project, store.insert_task, task, changes=[change], events=events
+        )
+        _index(task)
+        return task
+
+    @_retry_on_conflict
+    async def update_task(self, task_id: UUID, **changes: Any) -> Task:
+        old = analytics.engine_state(self.engine, await self.task(task_id))
+        task = self.engine.update_task(task_id, **changes)
+        change = self._change(task, old)
+        events = self._events("task.updated", task)
+        await self._persist(
+            self.engine.projects[task.project_id],
+            store.update_task,
+            task,
+            changes=[change],
+            events=events,
+        )
+        _index(task)
+        return task
+
+    @_retry_on_conflict
+    async def delete_task(self, task_id: UUID) -> Task:
+        task = await self.task(task_id)
+        project = self.engine.projects[task.project_id]
+        change = analytics.Change(
+            task.id, task.project_id, analytics.engine_state(self.engine, task), None
+        )
+        events = self._events("task.deleted", task)
+        self.engine.delete_task(task_id)
+        await self._persist(
+            project, store.delete_task, task, changes=[change], events=events
+        )
+        get_search_backend().remove(task.id)
+        return task
+
+    @_retry_on_conflict
+    async def move_task(
+        self,
+        task_id: UUID,
+        column_id: UUID,
+        after_id: Optional[UUID] = None,
+        before_id: Optional[UUID] = None,
+    ) -> Task:
+        old = analytics.engine_state(self.engine, await self.task(task_id))
+        task = self.engine.move_task(
+            task_id, column_id, after_id=after_id, before_id=before_id
+        )
+        change = self._change(task, old)
+        events = self._events("task.moved", task)
+        await self._persist(
+            self.engine.projects[task.project_id],
+            store.update_task,
+            task,
+            changes=[change],
+            events=events,
+        )
+        return task
+
+    @_retry_on_conflict
+    async def apply_batch(
+        self, project_id: UUID, operations: List[schemas.BatchOperation]
+    ) -> Tuple[Project, List[Task]]:
+        """
+        Apply task operations to one board in order, all or nothing.
+
+        The whole batch shares one version bump and one transaction, which
+        writes only each task's final state. Returns the project and the
+        task each operation produced (the removed task for deletes).
+        """
+        project = await self.project(project_id)
+        results: List[Task] = []
+        created: Set[UUID] = set()
+        deleted: Set[UUID] = set()
+        # Analytic state of each touched task before the batch
+        before: Dict[UUID, Optional[analytics.TaskState]] = {}
+        with self.engine.batch(project_id):
+            for index, operation in enumerate(operations):
+                task_id = getattr(operation, "task_id", None)
+                if task_id is not None and task_id not in before:
+                    task = self.engine.tasks.get(task_id)
+                    if task is not None and task.project_id == project_id:
+                        before[task_id] = analytics.engine_state(self.engine, task)
+                try:
+                    task = self._apply(project_id, operation)
+                except BoardError as exc:
+                    # Earlier operations already changed the engine; reload instead.
+                    self.engine.unload_project(project_id)
+                    raise BatchError(index, exc) from exc
+                if operation.op == "create":
+                    before[task.id] = None
+                    created.add(task.id)
+                elif operation.op == "delete":
+                    if task.id in created:
+                        created.discard(task.id)
+                    else:
+                        deleted.add(task.id)
+                results.append(task)
+
+        changed = {task.id for task in results} - deleted
+        tasks = self.engine.tasks
+        inserts = [tasks[task_id] for task_id in created]
+        updates = [tasks[task_id] for task_id in changed - created if task_id in tasks]
+        changes = [
+            analytics.Change(
+                task_id,
+                project_id,
+                old,
+                analytics.engine_state(self.engine, tasks[task_id])
+                if task_id in tasks
+                else None,
+            )
+            for task_id, old in before.items()
+        ]
+        events = [
+            event
+            for operation, task in zip(operations, results)
+            for event in self._events(BATCH_EVENTS[operation.op], task)
+        ]
+        await self._persist(
+            project,
+            self._write_batch,
+            inserts,
+            updates,
+            deleted,
+            changes=changes,
+            events=events,
+        )
+        for task in inserts + updates:
+            _index(task)
+        for task_id in deleted:
+            get_search_backend().remove(task_id)
+        return project, results
+
+    # Rebalancing
+
+    async def rebalance_pending(self) -> int:
+        """Rebalance queued columns and persist their new ranks."""
+        rewritten = 0
+        for column_id in self.engine.pending_rebalance:
+            column = self.engine.columns.get(column_id)
+            if column is None:
+                continue
+            project = self.engine.projects[column.project_id]
+            count = self.engine.rebalance_column(column_id)
+            try:
+                await self._persist(
+                    project,
+                    store.update_task_ranks,
+                    list(self.engine.iter_tasks(column_id)),
+                )
+            except ConflictError:
+                # The ranks came from a stale copy of the column, which is now unloaded.
+                logger.info("Skipped rebalancing column %s of a stale board", column_id)
+                continue
+            rewritten += count
+        return rewritten
+
+    async def run_rebalancer(self, interval: float = 30.0) -> None:
+        """Periodically rebalance queued columns until cancelled."""
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                rewritten = await self.rebalance_pending()
+            except Exception:
+                logger.exception("Rank rebalance failed")
+                continue
+            if rewritten:
+                logger.info("Rebalanced %d task ranks", rewritten)
+
+    # Helpers
+
+    def _change(
+        self, task: Task, old: Optional[analytics.TaskState]
+    ) -> analytics.Change:
+        return analytics.Change(
+            task.id, task.project_id, old, analytics.engine_state(self.engine, task)
+        )
+
+    def _events(self, event_type: str, task: Task) -> List[outbox.Event]:
+        """The outbox event for a task change, or none if notifications are off."""
+        if not outbox.enabled():
+            return []
+        project = self.engine.projects.get(task.project_id)
+        column = self.engine.columns.get(task.column_id)
+        return [
+            outbox.task_event(
+                event_type,
+                task,
+                project.name if project else "",
+                column.name if column else "",
+            )
+        ]
+
+    def _apply(self, project_id: UUID, operation: schemas.BatchOperation) -> Task:
+        if operation.op == "create":
+            return self.engine.create_task(
+                project_id,
+                operation.column_id,
+                operation.title,
+                description=operation.description,
+                metadata=operation.metadata,
+                user_story_id=operation.user_story_id,
+            )
+        task = self.engine.get_task(operation.task_id)
+        if task.project_id != project_id:
+            raise NotFoundError(f"Task {task.id} not found in project {project_id}")
+        if operation.op == "update":
+            changes = operation.model_dump(
+                exclude_unset=True, exclude={"op", "task_id"}
+            )
+            return self.engine.update_task(task.id, **changes)
+        if operation.op == "move":
+            return self.engine.move_task(
+                task.id,
+                operation.column_id,
+                after_id=operation.after_id,
+                before_id=operation.before_id,
+            )
+        return self.engine.delete_task(task.id)
+
+    @staticmethod
+    async def _write_batch(
+        session: AsyncSession,
+        inserts: List[Task],
+        updates: List[Task],
+        deletes: Set[UUID],
+    ) -> None:
+        await store.insert_rows(
+            session, tables.tasks, [store.task_row(task) for task in inserts]
+        )
+        await store.update_tasks(session, updates)
+        await store.delete_tasks(session, deletes)
+
+    @asynccontextmanager
+    async def write_session(self, project: Project) -> AsyncIterator[AsyncSession]:
+        """
+        A transaction writing to ``project``'s board, if its copy is current.
+
+        The transaction first advances the board's stored revision from the
+        one ``project`` was loaded at, which also locks the row until it
+        commits. If the board is no longer at that revision, or this engine
+        dropped ``project`` in the meantime, ``ConflictError`` is raised
+        before anything is written. On any other failure the board is
+        unloaded.
+        """
+        lock = self._write_locks.setdefault(project.id, asyncio.Lock())
+        async with lock:
+            if self.engine.projects.get(project.id) is not project:
+                # The change went with the dropped copy; the current one is
+                # someone else's and stays loaded.
+                raise ConflictError(f"Board {project.id} was reloaded during the write")
+            try:
+                async with self.sessions() as session:
+                    if not await store.advance_revision(
+                        session, project.id, project.revision
+                    ):
+                        raise ConflictError(
+                            f"Board {project.id} was changed by another process"
+                        )
+                    yield session
+            except BaseException:
+                self.engine.unload_project(project.id)
+                raise
+            project.revision += 1
+
+    async def _persist(
+        self,
+        project: Project,
+        write: Callable[..., Awaitable[None]],
+        *args: Any,
+        changes: Optional[List[analytics.Change]] = None,
+        events: Optional[List[outbox.Event]] = None,
+    ) -> None:
+        async with self.write_session(project) as session:
+            await write(session, *args)
+            if changes:
+                await analytics.record(session, changes)
+            if events:
+                await outbox.enqueue(session, events)
+
+
+def _index(task: Task) -> None:
+    get_search_backend().add(task.id, task.project_id, task.title, task.description)
+
+
+# Global service instance
+board_service = BoardService(board_engine)
+
+
+def get_board_service() -> BoardService:
+    """Get the application board service."""
+    return board_service
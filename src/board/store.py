@@ -0,0 +1,273 @@
+"""
+Database reads and writes for boards.
+
+Every function takes an ``AsyncSession`` that the caller owns, so several
+writes can share one transaction. Writes mirror a single engine mutation and
+touch only the rows it changed; a card move is one ``UPDATE`` of one row.
+"""
+from typing import (
+    Any,
+    AsyncIterator,
+    Callable,
+    Collection,
+    Dict,
+    Iterable,
+    List,
+    Mapping,
+    Optional,
+    Sequence,
+    cast,
+)
+from uuid import UUID
+
+from sqlalchemy import Row, Select, Table, bindparam, delete, insert, select, update
+from sqlalchemy.engine import CursorResult
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from . import tables
+from .engine import BoardEngine, Column, Project, Task
+
+# PostgreSQL accepts at most 32767 bind parameters per statement.
+MAX_BIND_PARAMS = 32767
+
+
+def project_row(project: Project) -> Dict[str, Any]:
+    return {
+        "id": project.id,
+        "name": project.name,
+        "description": project.description,
+        "revision": project.revision,
+        "created_at": project.created_at,
+        "updated_at": project.updated_at,
+    }
+
+
+def column_row(column: Column) -> Dict[str, Any]:
+    return {
+        "id": column.id,
+        "project_id": column.project_id,
+        "name": column.name,
+        "rank": column.rank,
+        "color": column.color,
+    }
+
+
+def task_row(task: Task) -> Dict[str, Any]:
+    return {
+        "id": task.id,
+        "project_id": task.project_id,
+        "column_id": task.column_id,
+        "title": task.title,
+        "description": task.description,
+        "rank": task.rank,
+        "metadata": task.metadata,
+        "user_story_id": task.user_story_id,
+        "created_at": task.created_at,
+        "updated_at": task.updated_at,
+    }
+
+
+# Reads
+
+
+async def get_project_row(session: AsyncSession, project_id: UUID) -> Optional[Row]:
+    result = await session.execute(
+        select(tables.projects).where(tables.projects.c.id == project_id)
+    )
+    return result.first()
+
+
+async def get_revision(session: AsyncSession, project_id: UUID) -> Optional[int]:
+    result = await session.execute(
+        select(tables.projects.c.revision).where(tables.projects.c.id == project_id)
+    )
+    return result.scalar()
+
+
+async def get_column_rows(session: AsyncSession, project_id: UUID) -> Sequence[Row]:
+    result = await session.execute(
+        select(tables.columns)
+        .where(tables.columns.c.project_id == project_id)
+        .order_by(tables.columns.c.rank)
+    )
+    return result.all()
+
+
+async def find_task_project(session: AsyncSession, task_id: UUID) -> Optional[UUID]:
+    """Return the project a task belongs to, or None if it does not exist."""
+    result = await session.execute(
+        select(tables.tasks.c.project_id).where(tables.tasks.c.id == task_id)
+    )
+    return result.scalar()
+
+
+async def load_project(
+    session: AsyncSession, engine: BoardEngine, project_id: UUID
+) -> bool:
+    """Read a whole board into ``engine``; False if the project does not exist."""
+    project = await get_project_row(session, project_id)
+    if project is None:
+        return False
+    columns = [
+        Column(**row._mapping) for row in await get_column_rows(session, project_id)
+    ]
+    result = await session.execute(
+        select(tables.tasks).where(tables.tasks.c.project_id == project_id)
+    )
+    tasks = [Task(**row._mapping) for row in result]
+    engine.load_project(Project(**project._mapping), columns, tasks)
+    return True
+
+
+async def stream_tasks(
+    session: AsyncSession, project_id: UUID, batch_size: int = 1000
+) -> AsyncIterator[Sequence[Row]]:
+    """
+    Yield a board's tasks in column and rank order, ``batch_size`` rows at a
+    time, from a server-side cursor.
+    """
+    query = (
+        select(tables.tasks)
+        .join(tables.columns, tables.tasks.c.column_id == tables.columns.c.id)
+        .where(tables.tasks.c.project_id == project_id)
+        .order_by(tables.columns.c.rank, tables.tasks.c.rank)
+        .execution_options(yield_per=batch_size)
+    )
+    result = await session.stream(query)
+    async for partition in result.partitions():
+        yield partition
+
+
+async def find_tasks(
+    session: AsyncSession,
+    statement: Select,
+    params: Dict[str, Any],
+    residual: Optional[Callable[[Mapping[Any, Any]], bool]] = None,
+    limit: int = 100,
+    batch_size: int = 500,
+) -> List[Row]:
+    """
+    Return up to ``limit`` task rows selected by ``statement`` that also pass
+    ``residual``. Without a residual check the database applies the limit;
+    with one, rows stream from a cursor until enough of them pass.
+    """
+    if residual is None:
+        result = await session.execute(statement.limit(limit), params)
+        return list(result.all())
+    found: List[Row] = []
+    stream = await session.stream(
+        statement.execution_options(yield_per=batch_size), params
+    )
+    try:
+        async for partition in stream.partitions():
+            found.extend(row for row in partition if residual(row._mapping))
+            if len(found) >= limit:
+                break
+    finally:
+        await stream.close()
+    return found[:limit]
+
+
+# Writes
+
+
+async def insert_project(session: AsyncSession, project: Project) -> None:
+    await session.execute(insert(tables.projects).values(project_row(project)))
+
+
+async def advance_revision(
+    session: AsyncSession, project_id: UUID, revision: int
+) -> bool:
+    """Move a board on from ``revision``; False if it is no longer at ``revision``."""
+    result = await session.execute(
+        update(tables.projects)
+        .where(
+            tables.projects.c.id == project_id, tables.projects.c.revision == revision
+        )
+        .values(revision=revision + 1)
+    )
+    return cast(CursorResult, result).rowcount == 1
+
+
+async def insert_column(session: AsyncSession, column: Column) -> None:
+    await session.execute(insert(tables.columns).values(column_row(column)))
+
+
+async def insert_task(session: AsyncSession, task: Task) -> None:
+    await session.execute(insert(tables.tasks).values(task_row(task)))
+
+
+async def insert_rows(
+    session: AsyncSession, table: Table, rows: List[Dict[str, Any]]
+) -> None:
+    """
+    Insert ``rows`` as multi-row ``INSERT ... VALUES`` statements.
+
+    An executemany INSERT with RETURNING goes through SQLAlchemy's
+    "insertmanyvalues" path: the statement is compiled once and sent as
+    multi-row VALUES pages of ``len(rows)`` rows (capped by the database's
+    bind-parameter limit) rather than as one statement per row.
+    """
+    if rows:
+        page_size = min(len(rows), MAX_BIND_PARAMS // len(table.columns))
+        await session.execute(
+            insert(table)
+            .returning(table.primary_key.columns[0])
+            .execution_options(insertmanyvalues_page_size=page_size),
+            rows,
+        )
+
+
+async def update_task(session: AsyncSession, task: Task) -> None:
+    row = task_row(task)
+    del row["id"], row["project_id"], row["created_at"]
+    await session.execute(
+        update(tables.tasks).where(tables.tasks.c.id == task.id).values(**row)
+    )
+
+
+async def update_tasks(session: AsyncSession, tasks: Iterable[Task]) -> None:
+    """Write the editable fields of many tasks in one executemany round trip."""
+    fields = (
+        "column_id",
+        "title",
+        "description",
+        "rank",
+        "metadata",
+        "user_story_id",
+        "updated_at",
+    )
+    params = [
+        {"task_id": task.id, **{f"new_{name}": getattr(task, name) for name in fields}}
+        for task in tasks
+    ]
+    if params:
+        await session.execute(
+            update(tables.tasks)
+            .where(tables.tasks.c.id == bindparam("task_id"))
+            .values({name: bindparam(f"new_{name}") for name in fields}),
+            params,
+        )
+
+
+async def update_task_ranks(session: AsyncSession, tasks: Iterable[Task]) -> None:
+    """Write new ranks for many tasks in one executemany round trip."""
+    params = [{"task_id": task.id, "new_rank": task.rank} for task in tasks]
+    if params:
+        await session.execute(
+            update(tables.tasks)
+            .where(tables.tasks.c.id == bindparam("task_id"))
+            .values(rank=bindparam("new_rank")),
+            params,
+        )
+
+
+async def delete_task(session: AsyncSession, task: Task) -> None:
+    await session.execute(delete(tables.tasks).where(tables.tasks.c.id == task.id))
+
+
+async def delete_tasks(session: AsyncSession, task_ids: Collection[UUID]) -> None:
+    if task_ids:
+        await session.execute(
+            delete(tables.tasks).where(tables.tasks.c.id.in_(task_ids))
+        )
@@ -0,0 +1,255 @@
+"""
+Database tables for boards: projects, columns and tasks, plus the task event
+history and the analytics aggregates derived from it (see
+``src.board.analytics``), the API keys of ``src.core.api_keys``, the
+notification outbox of ``src.core.outbox`` and the task attachments of
+``src.core.attachments``.
+
+Ranks use the "C" collation on PostgreSQL so the database orders them
+bytewise, exactly like ``src.board.ranking`` compares them. On PostgreSQL
+tasks also get a GIN index over ``task_search_vector`` for full-text search
+and one over ``metadata`` for containment filters. Queries must use the
+indexed expression verbatim for an expression index to apply, so builders
+for those expressions live here.
+"""
+from typing import Sequence
+
+from sqlalchemy import (
+    JSON,
+    BigInteger,
+    Column,
+    Date,
+    DateTime,
+    Float,
+    ForeignKey,
+    Index,
+    Integer,
+    MetaData,
+    SmallInteger,
+    Numeric,
+    String,
+    Table,
+    Text,
+    Uuid,
+    cast,
+    bindparam,
+    func,
+)
+from sqlalchemy.dialects.postgresql import JSONB
+
+metadata = MetaData()
+
+Rank = String(64).with_variant(String(64, collation="C"), "postgresql")
+Metadata = JSON().with_variant(JSONB(), "postgresql")
+
+projects = Table(
+    "projects",
+    metadata,
+    Column("id", Uuid, primary_key=True),
+    Column("name", String(255), nullable=False),
+    Column("description", Text),
+    # Advanced by every write to the board; see ``BoardService.write_session``.
+    Column("revision", BigInteger, nullable=False, default=0),
+    Column("created_at", DateTime, nullable=False),
+    Column("updated_at", DateTime, nullable=False),
+)
+
+columns = Table(
+    "columns",
+    metadata,
+    Column("id", Uuid, primary_key=True),
+    Column(
+        "project_id",
+        Uuid,
+        ForeignKey("projects.id", ondelete="CASCADE"),
+        nullable=False,
+    ),
+    Column("name", String(100), nullable=False),
+    Column("rank", Rank, nullable=False),
+    Column("color", String(7), nullable=False, default="#gray"),
+    Index("columns_project_rank_idx", "project_id", "rank"),
+)
+
+tasks = Table(
+    "tasks",
+    metadata,
+    Column("id", Uuid, primary_key=True),
+    Column(
+        "project_id",
+        Uuid,
+        ForeignKey("projects.id", ondelete="CASCADE"),
+        nullable=False,
+    ),
+    Column(
+        "column_id", Uuid, ForeignKey("columns.id", ondelete="CASCADE"), nullable=False
+    ),
+    Column("title", String(255), nullable=False),
+    Column("description", Text),
+    Column("rank", Rank, nullable=False),
+    Column("metadata", Metadata, nullable=False, default=dict),
+    Column("user_story_id", Uuid),
+    Column("created_at", DateTime, nullable=False),
+    Column("updated_at", DateTime, nullable=False),
+    Index("tasks_column_rank_idx", "column_id", "rank"),
+    Index("tasks_project_idx", "project_id"),
+)
+
+# Analytic state of a task after each write that changed it. Rows outlive
+# their task, so there is no foreign key on task_id.
+task_events = Table(
+    "task_events",
+    metadata,
+    Column("id", BigInteger().with_variant(Integer, "sqlite"), primary_key=True),
+    Column("task_id", Uuid, nullable=False),
+    Column(
+        "project_id",
+        Uuid,
+        ForeignKey("projects.id", ondelete="CASCADE"),
+        nullable=False,
+    ),
+    Column("column_id", Uuid),
+    Column("state", String(8), nullable=False),  # todo, doing, done or deleted
+    Column("sprint", String(100), nullable=False),
+    Column("points", Float, nullable=False),
+    Column("at", DateTime, nullable=False),
+    Index("task_events_task_idx", "task_id", "id"),
+    Index("task_events_project_idx", "project_id", "id"),
+)
+
+# Net task and point changes per project, sprint and day.
+analytics_days = Table(
+    "analytics_days",
+    metadata,
+    Column(
+        "project_id",
+        Uuid,
+        ForeignKey("projects.id", ondelete="CASCADE"),
+        primary_key=True,
+    ),
+    Column("sprint", String(100), primary_key=True),
+    Column("day", Date, primary_key=True),
+    Column("tasks_added", Integer, nullable=False),
+    Column("points_added", Float, nullable=False),
+    Column("tasks_done", Integer, nullable=False),
+    Column("points_done", Float, nullable=False),
+)
+
+# Cycle time histogram per project, sprint and day, in log-scale buckets.
+cycle_time_buckets = Table(
+    "cycle_time_buckets",
+    metadata,
+    Column(
+        "project_id",
+        Uuid,
+        ForeignKey("projects.id", ondelete="CASCADE"),
+        primary_key=True,
+    ),
+    Column("sprint", String(100), primary_key=True),
+    Column("day", Date, primary_key=True),
+    Column("bucket", SmallInteger, primary_key=True),
+    Column("count", Integer, nullable=False),
+)
+
+# API keys are stored as their public lookup prefix and an HMAC of the whole
+# key; the key itself is shown once at creation and never stored.
+api_keys = Table(
+    "api_keys",
+    metadata,
+    Column("id", Uuid, primary_key=True),
+    Column("prefix", String(16), nullable=False),
+    Column("key_hash", String(64), nullable=False),
+    Column("name", String(100), nullable=False),
+    Column("created_at", DateTime, nullable=False),
+    Column("last_used_at", DateTime),
+    Column("usage_count", BigInteger, nullable=False, default=0),
+    Column("revoked_at", DateTime),
+    Index("api_keys_prefix_idx", "prefix", unique=True),
+)
+
+# Notifications written with the board change that caused them, one row per
+# destination, and deleted once delivered. available_at is the next attempt
+# (or the end of a dispatcher's lease); failed_at marks a dead letter.
+outbox = Table(
+    "outbox",
+    metadata,
+    Column("id", BigInteger().with_variant(Integer, "sqlite"), primary_key=True),
+    Column(
+        "destination", String(500), nullable=False
+    ),  # webhook URL or mailto: address
+    Column("event_type", String(64), nullable=False),
+    Column("payload", JSON, nullable=False),
+    Column("created_at", DateTime, nullable=False),
+    Column("available_at", DateTime, nullable=False),
+    Column("attempts", Integer, nullable=False, default=0),
+    Column("last_error", Text),
+    Column("failed_at", DateTime),
+)
+Index(
+    "outbox_pending_idx",
+    outbox.c.available_at,
+    postgresql_where=outbox.c.failed_at.is_(None),
+)
+
+# Files attached to tasks. The content lives in the blob store under its
+# SHA-256, so rows with the same content share one file.
+attachments = Table(
+    "attachments",
+    metadata,
+    Column("id", Uuid, primary_key=True),
+    Column("task_id", Uuid, ForeignKey("tasks.id", ondelete="CASCADE"), nullable=False),
+    Column("filename", String(255), nullable=False),
+    Column("content_type", String(255), nullable=False),
+    Column("size", BigInteger, nullable=False),
+    Column("sha256", String(64), nullable=False),
+    Column("created_at", DateTime, nullable=False),
+    Index("attachments_task_idx", "task_id", "created_at"),
+    Index("attachments_sha256_idx", "sha256"),
+)
+
+
+def _inline(value: str):
+    # Constants are rendered into the SQL text, not bound, so queries repeat
+    # the indexed expression exactly and the planner can use the index.
+    return bindparam(None, value, literal_execute=True)
+
+
+# Unstemmed, so prefix queries behave like the local index (src.board.search).
+SEARCH_CONFIG = _inline("simple")
+
+
+def _weighted(column: Column, weight: str):
+    return func.setweight(
+        func.to_tsvector(SEARCH_CONFIG, func.coalesce(column, _inline(""))),
+        _inline(weight),
+    )
+
+
+task_search_vector = _weighted(tasks.c.title, "A").op("||")(
+    _weighted(tasks.c.description, "B")
+)
+
+Index("tasks_search_idx", task_search_vector, postgresql_using="gin").ddl_if(
+    dialect="postgresql"
+)
+
+# Answers ``metadata @> '{...}'`` and ``metadata ? 'key'`` (see src.board.filters).
+Index("tasks_metadata_idx", tasks.c.metadata, postgresql_using="gin").ddl_if(
+    dialect="postgresql"
+)
+
+
+def metadata_text(column: Column, path: Sequence[str]):
+    """The metadata value at ``path`` as text: ``->>`` or ``#>>`` with inlined keys."""
+    if len(path) == 1:
+        return column.op("->>", return_type=Text)(_inline(path[0]))
+    return column.op("#>>", return_type=Text)(_inline("{" + ",".join(path) + "}"))
+
+
+def metadata_has_key(column: Column, key: str):
+    """``metadata ? key``, answered by the GIN index on metadata."""
+    return column.op("?", is_comparison=True)(_inline(key))
+
+
+def metadata_number(column: Column, path: Sequence[str]):
+    """The metadata value at ``path`` cast to ``NUMERIC``."""
+    return cast(metadata_text(column, path), Numeric)
@@ -0,0 +1,273 @@
+"""
+Streaming board export and import as NDJSON.
+
+An export is one JSON object per line, tagged with ``type``: the project,
+its columns in rank order, then its tasks in column and rank order. Tasks
+come from a server-side cursor ``batch_size`` rows at a time, so memory use
+does not grow with the board.
+
+An import reads the same format from a streamed body into an existing
+project. Every line is validated as it arrives. Columns and tasks get fresh
+ids (task ``column_id`` values are remapped to the imported columns) and are
+appended below the existing content in file order. Tasks are written with
+multi-row INSERTs of ``batch_size`` rows, all in one transaction, so an
+invalid line rolls the whole import back. That transaction is a board write
+(``BoardService.write_session``): an import based on a stale copy of the
+board conflicts before any of the body is read, and starts over once on the
+reloaded board like other writes. Written rows are added to the engine's
+copy of the board as they go rather than reloading it afterwards.
+"""
+import json
+import logging
+import time
+import uuid
+from datetime import datetime
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+from prometheus_client import Counter
+from pydantic import ValidationError
+from sqlalchemy import Row
+
+from . import analytics, store, tables
+from .engine import BoardError, Column, Task
+from .ranking import rank_between
+from .schemas import BoardRecord, ImportResult
+from .search import get_search_backend
+from .service import BoardService, ConflictError, SessionScope
+
+logger = logging.getLogger(__name__)
+
+# Longest accepted import line; guards against a body with no newlines.
+MAX_LINE_BYTES = 1 << 20
+
+TRANSFER_ROWS = Counter(
+    "board_transfer_rows_total",
+    "Rows streamed by board export and import.",
+    ["direction"],
+)
+
+
+class InvalidImportError(BoardError):
+    """Raised for an import line that cannot be applied."""
+
+    def __init__(self, line: int, errors: Any):
+        super().__init__(f"Invalid record on line {line}")
+        self.line = line
+        self.errors = errors
+
+
+def _default(value: Any) -> str:
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return str(value)
+
+
+def _line(kind: str, row: Row) -> str:
+    return json.dumps({"type": kind, **row._mapping}, default=_default) + "\n"
+
+
+async def export_board(
+    sessions: SessionScope, project_id: uuid.UUID, batch_size: int = 1000
+) -> AsyncIterator[bytes]:
+    """Yield a board as NDJSON chunks, one chunk per cursor batch."""
+    start = time.perf_counter()
+    rows = 0
+    async with sessions() as session:
+        project = await store.get_project_row(session, project_id)
+        if project is None:
+            return
+        columns = await store.get_column_rows(session, project_id)
+        yield "".join(
+            [_line("project", project)] + [_line("column", c) for c in columns]
+        ).encode()
+        async for partition in store.stream_tasks(session, project_id, batch_size):
+            rows += len(partition)
+            TRANSFER_ROWS.labels("export").inc(len(partition))
+            yield "".join(_line("task", row) for row in partition).encode()
+    elapsed = time.perf_counter() - start
+    logger.info(
+        "Exported %d tasks from board %s in %.2fs (%.0f rows/s)",
+        rows,
+        project_id,
+        elapsed,
+        rows / elapsed if elapsed else 0.0,
+    )
+
+
+async def iter_lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[Tuple[int, bytes]]:
+    """Split a byte stream into numbered lines."""
+    buffer = b""
+    number = 0
+    async for chunk in chunks:
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            number += 1
+            yield number, line
+        if len(buffer) > MAX_LINE_BYTES:
+            raise InvalidImportError(number + 1, f"Line exceeds {MAX_LINE_BYTES} bytes")
+    if buffer:
+        yield number + 1, buffer
+
+
+async def import_board(
+    service: BoardService,
+    project_id: uuid.UUID,
+    chunks: AsyncIterator[bytes],
+    batch_size: int = 1000,
+) -> ImportResult:
+    """Append the columns and tasks of an NDJSON export to a project."""
+    try:
+        return await _import_board(service, project_id, chunks, batch_size)
+    except ConflictError:
+        # Nothing of ``chunks`` was read yet
+        return await _import_board(service, project_id, chunks, batch_size)
+
+
+async def _import_board(
+    service: BoardService,
+    project_id: uuid.UUID,
+    chunks: AsyncIterator[bytes],
+    batch_size: int,
+) -> ImportResult:
+    start = time.perf_counter()
+    engine = service.engine
+    project = await service.project(project_id)
+    column_rank: Optional[str] = None
+    # Last task rank per target column, and exported column id -> new column id
+    task_ranks: Dict[uuid.UUID, Optional[str]] = {}
+    # Analytic state of a task in each target column
+    column_states: Dict[uuid.UUID, str] = {}
+    column_ids: Dict[uuid.UUID, uuid.UUID] = {}
+
+    now = datetime.utcnow()
+    columns = 0
+    batch: List[Dict[str, Any]] = []
+    task_count = 0
+    search = get_search_backend()
+    indexed: List[uuid.UUID] = []
+
+    async def flush(session) -> None:
+        nonlocal batch, task_count
+        await store.insert_rows(session, tables.tasks, batch)
+        await analytics.record(
+            session,
+            [
+                analytics.Change(
+                    row["id"],
+                    project_id,
+                    None,
+                    analytics.task_state(
+                        row["column_id"],
+                        column_states[row["column_id"]],
+                        row["metadata"],
+                    ),
+                )
+                for row in batch
+            ],
+        )
+        for row in batch:
+            search.add(row["id"], project_id, row["title"], row["description"])
+            indexed.append(row["id"])
+        add_loaded(tasks=[Task(**row) for row in batch])
+        task_count += len(batch)
+        batch = []
+
+    def add_loaded(**rows: Any) -> None:
+        # Written rows join the engine's copy as they go, so concurrent writes
+        # rank after them; if the import fails the board is unloaded.
+        if engine.projects.get(project_id) is project:
+            engine.add_loaded(project_id, **rows)
+
+    try:
+        async with service.write_session(project) as session:
+            last = project.columns.last()
+            column_rank = last[0] if last else None
+            for column in engine.iter_columns(project_id):
+                last = column.tasks.last()
+                task_ranks[column.id] = last[0] if last else None
+                column_states[column.id] = analytics.column_state(
+                    column.name, not column_states
+                )
+            async for number, line in iter_lines(chunks):
+                if not line.strip():
+                    continue
+                try:
+                    record = BoardRecord.validate_json(line)
+                except ValidationError as exc:
+                    raise InvalidImportError(
+                        number,
+                        exc.errors(
+                            include_url=False,
+                            include_context=False,
+                            include_input=False,
+                        ),
+                    ) from None
+
+                if record.type == "column":
+                    column_rank = rank_between(column_rank, None)
+                    column_id = uuid.uuid4()
+                    column_ids[record.id] = column_id
+                    task_ranks[column_id] = None
+                    column_states[column_id] = analytics.column_state(
+                        record.name, not column_states
+                    )
+                    row: Dict[str, Any] = {
+                        "id": column_id,
+                        "project_id": project_id,
+                        "name": record.name,
+                        "rank": column_rank,
+                        "color": record.color,
+                    }
+                    await store.insert_rows(session, tables.columns, [row])
+                    add_loaded(columns=[Column(**row)])
+                    columns += 1
+                elif record.type == "task":
+                    column_id = column_ids.get(record.column_id, record.column_id)
+                    if column_id not in task_ranks:
+                        raise InvalidImportError(
+                            number,
+                            f"Column {record.column_id} is not in the import "
+                            "or the project",
+                        )
+                    rank = task_ranks[column_id] = rank_between(
+                        task_ranks[column_id], None
+                    )
+                    batch.append(
+                        {
+                            "id": uuid.uuid4(),
+                            "project_id": project_id,
+                            "column_id": column_id,
+                            "title": record.title,
+                            "description": record.description,
+                            "rank": rank,
+                            "metadata": record.metadata,
+                            "user_story_id": record.user_story_id,
+                            "created_at": record.created_at or now,
+                            "updated_at": record.updated_at or now,
+                        }
+                    )
+                    if len(batch) >= batch_size:
+                        await flush(session)
+            await flush(session)
+    except BaseException:
+        for task_id in indexed:
+            search.remove(task_id)
+        raise
+    TRANSFER_ROWS.labels("import").inc(columns + task_count)
+    elapsed = time.perf_counter() - start
+    result = ImportResult(
+        columns=columns,
+        tasks=task_count,
+        seconds=round(elapsed, 3),
+        rows_per_second=round((columns + task_count) / elapsed, 1) if elapsed else 0.0,
+    )
+    logger.info(
+        "Imported %d columns and %d tasks into board %s in %.2fs (%.0f rows/s)",
+        columns,
+        task_count,
+        project_id,
+        elapsed,
+        result.rows_per_second,
+    )
+    return result
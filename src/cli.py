@@ -0,0 +1,141 @@
+"""
+Command-line entry point: ``simple-kanban <command>`` (``python -m src.cli``).
+
+``serve`` runs the API server; options given on the command line override
+the corresponding settings. ``api-keys`` creates, lists and revokes the
+keys accepted in ``X-API-Key``. ``attachments prune`` deletes stored files
+no attachment refers to any more.
+"""
+import argparse
+import asyncio
+import sys
+from typing import List, Optional
+from uuid import UUID
+
+from src.core.config import settings
+
+
+async def _api_keys(args: argparse.Namespace) -> int:
+    from src.board.tables import metadata
+    from src.core.api_keys import get_api_key_auth
+    from src.core.database import create_tables, dispose_engine
+    from src.core.redis_client import close_redis
+
+    try:
+        if settings.db_create_tables:
+            await create_tables(metadata)
+        auth = get_api_key_auth()
+        if args.action == "create":
+            key, api_key = await auth.create(args.name)
+            print(
+                f"Created API key {api_key.id} ({api_key.name}); it is not shown again:"
+            )
+            print(key)
+        elif args.action == "list":
+            for record in await auth.list_keys():
+                state = (
+                    f"revoked {record.revoked_at:%Y-%m-%d}"
+                    if record.revoked_at
+                    else "active"
+                )
+                last_used = (
+                    f"{record.last_used_at:%Y-%m-%d %H:%M}"
+                    if record.last_used_at
+                    else "-"
+                )
+                print(
+                    f"{record.id}  sk_{record.prefix}...  {record.name:<24} {state:<18}"
+                    f" uses={record.usage_count} last_used={last_used}"
+                )
+        elif not await auth.revoke(args.key_id):
+            print(f"No active API key {args.key_id}", file=sys.stderr)
+            return 1
+        return 0
+    finally:
+        await dispose_engine()
+        await close_redis()
+
+
+async def _prune_attachments(args: argparse.Namespace) -> int:
+    from src.core.attachments import get_attachment_store
+    from src.core.database import dispose_engine
+
+    try:
+        removed = await get_attachment_store().prune(args.grace)
+        print(f"Removed {removed} unreferenced files")
+        return 0
+    finally:
+        await dispose_engine()
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(
+        prog="simple-kanban", description="simple-kanban server."
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+    serve_command = commands.add_parser("serve", help="Run the API server")
+    serve_command.add_argument("--host", help="Bind address (HOST)")
+    serve_command.add_argument("--port", type=int, help="Port (PORT)")
+    serve_command.add_argument(
+        "--workers",
+        type=int,
+        help="Worker processes (WORKERS); 0 sizes from the CPU quota",
+    )
+    serve_command.add_argument(
+        "--reload",
+        action="store_true",
+        default=None,
+        help="Single process, reload on changes",
+    )
+    keys_command = commands.add_parser(
+        "api-keys", help="Create, list and revoke API keys"
+    )
+    key_actions = keys_command.add_subparsers(dest="action", required=True)
+    key_actions.add_parser("create", help="Mint a key and print it once").add_argument(
+        "name"
+    )
+    key_actions.add_parser("list", help="Keys with their usage, newest last")
+    key_actions.add_parser("revoke", help="Revoke a key on every worker").add_argument(
+        "key_id", type=UUID
+    )
+    attachments_command = commands.add_parser(
+        "attachments", help="Maintain stored attachments"
+    )
+    attachment_actions = attachments_command.add_subparsers(
+        dest="action", required=True
+    )
+    attachment_actions.add_parser(
+        "prune", help="Delete stored files no attachment references"
+    ).add_argument(
+        "--grace",
+        type=float,
+        default=3600.0,
+        help="Leave files modified within this many seconds (default 3600)",
+    )
+    args = parser.parse_args(argv)
+
+    if args.command == "api-keys":
+        sys.exit(asyncio.run(_api_keys(args)))
+    if args.command == "attachments":
+        sys.exit(asyncio.run(_prune_attachments(args)))
+    if args.workers is not None and args.workers < 0:
+        parser.error("--workers must not be negative")
+
+    from src.core.server import serve, worker_count
+
+    overrides = {
+        key: value
+        for key, value in vars(args).items()
+        if key in ("host", "port", "workers", "reload") and value is not None
+    }
+    config = settings.model_copy(update=overrides)
+    try:
+        if not config.reload:
+            worker_count(config)
+    except ValueError as exc:
+        parser.error(str(exc))
+    serve(config)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,311 @@
+"""
+API-key authentication.
+
+Keys look like ``sk_<43 url-safe characters>`` (``generate_api_key``). The
+first ``PREFIX_LENGTH`` characters after ``sk_`` are a public lookup prefix
+with a unique index; the table keeps only that prefix and an HMAC-SHA256 of
+the whole key under ``api_key_hash_secret``. Keys are random, so a fast
+keyed hash is as safe as bcrypt here, and validating a key is one indexed
+lookup and one constant-time comparison.
+
+Validated keys are cached in-process for ``api_key_cache_ttl_seconds``.
+Revoking a key marks it revoked in the table and publishes its ID on the bus,
+so every worker drops it from its cache at once; the TTL bounds how long a
+worker that missed the message keeps accepting it. Uses are counted in
+memory and added to ``usage_count`` and ``last_used_at`` in one batched
+update every ``api_key_usage_flush_seconds``.
+"""
+import asyncio
+import hashlib
+import hmac
+import logging
+import time
+import uuid
+from collections import OrderedDict
+from contextlib import AbstractAsyncContextManager
+from datetime import datetime
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Tuple
+from uuid import UUID
+
+from fastapi import HTTPException, WebSocketException, status
+from prometheus_client import Counter
+from sqlalchemy import bindparam, insert, select, update
+from starlette.requests import HTTPConnection
+
+from src.board.tables import api_keys
+
+from .config import Settings, settings
+from .database import session_scope
+from .pubsub import InMemoryBus, RedisBus
+from .redis_client import get_redis
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = "sk_"
+PREFIX_LENGTH = 12
+# Shorter keys cannot have come from generate_api_key.
+MIN_KEY_LENGTH = len(KEY_PREFIX) + 32
+REVOKED_CHANNEL = "api-keys:revoked"
+
+API_KEY_REQUESTS = Counter(
+    "auth_api_key_requests_total",
+    "API-key validations by result.",
+    ["result"],  # cached, verified or rejected
+)
+
+
+class ApiKey(NamedTuple):
+    id: UUID
+    name: str
+    prefix: str
+
+
+class ApiKeyRecord(NamedTuple):
+    id: UUID
+    name: str
+    prefix: str
+    created_at: datetime
+    last_used_at: Optional[datetime]
+    usage_count: int
+    revoked_at: Optional[datetime]
+
+
+def hash_api_key(key: str, secret: Optional[str] = None) -> str:
+    """Hex HMAC-SHA256 of a key under the configured secret."""
+    secret = settings.api_key_hash_secret if secret is None else secret
+    return hmac.new(secret.encode(), key.encode(), hashlib.sha256).hexdigest()
+
+
+def key_prefix(key: str) -> Optional[str]:
+    """The lookup prefix of a well-formed key, None otherwise."""
+    if not key.startswith(KEY_PREFIX) or len(key) < MIN_KEY_LENGTH:
+        return None
+    return key[len(KEY_PREFIX) : len(KEY_PREFIX) + PREFIX_LENGTH]
+
+
+class ApiKeyCache:
+    """LRU cache of validated keys by key hash, with a fixed TTL."""
+
+    def __init__(self, maxsize: int = 10000, ttl: float = 60.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, Tuple[float, ApiKey]]" = OrderedDict()
+        self._hashes: Dict[UUID, str] = {}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key_hash: str) -> Optional[ApiKey]:
+        entry = self._entries.get(key_hash)
+        if entry is None:
+            return None
+        if entry[0] <= time.monotonic():
+            self.drop(entry[1].id)
+            return None
+        self._entries.move_to_end(key_hash)
+        return entry[1]
+
+    def put(self, key_hash: str, api_key: ApiKey) -> None:
+        if self.maxsize <= 0:
+            return
+        self._entries[key_hash] = (time.monotonic() + self.ttl, api_key)
+        self._entries.move_to_end(key_hash)
+        self._hashes[api_key.id] = key_hash
+        while len(self._entries) > self.maxsize:
+            _, (_, evicted) = self._entries.popitem(last=False)
+            self._hashes.pop(evicted.id, None)
+
+    def drop(self, key_id: UUID) -> None:
+        key_hash = self._hashes.pop(key_id, None)
+        if key_hash is not None:
+            self._entries.pop(key_hash, None)
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._hashes.clear()
+
+
+class ApiKeyAuth:
+    """Validates, creates and revokes API keys and records their use."""
+
+    def __init__(
+        self,
+        bus: Any,
+        cache: ApiKeyCache,
+        sessions: Callable[[], AbstractAsyncContextManager] = session_scope,
+        secret: Optional[str] = None,
+    ):
+        self.bus = bus
+        self.cache = cache
+        self.sessions = sessions
+        self.secret = secret
+        self._uses: Dict[UUID, int] = {}
+        bus.add_handler(self.dispatch)
+        # Revocations published while the bus was unsubscribed never arrive.
+        bus.add_subscribe_listener(cache.clear)
+
+    async def authenticate(self, key: str) -> Optional[ApiKey]:
+        """The key's identity, or None if it is unknown, malformed or revoked."""
+        prefix = key_prefix(key)
+        if prefix is None:
+            API_KEY_REQUESTS.labels("rejected").inc()
+            return None
+        key_hash = hash_api_key(key, self.secret)
+        api_key = self.cache.get(key_hash)
+        if api_key is not None:
+            API_KEY_REQUESTS.labels("cached").inc()
+        else:
+            async with self.sessions() as session:
+                row = (
+                    await session.execute(
+                        select(
+                            api_keys.c.id, api_keys.c.name, api_keys.c.key_hash
+                        ).where(
+                            api_keys.c.prefix == prefix, api_keys.c.revoked_at.is_(None)
+                        )
+                    )
+                ).first()
+            if row is None or not hmac.compare_digest(row.key_hash, key_hash):
+                API_KEY_REQUESTS.labels("rejected").inc()
+                return None
+            api_key = ApiKey(row.id, row.name, prefix)
+            self.cache.put(key_hash, api_key)
+            API_KEY_REQUESTS.labels("verified").inc()
+        self._uses[api_key.id] = self._uses.get(api_key.id, 0) + 1
+        return api_key
+
+    def is_verified(self, key: str) -> bool:
+        """Whether ``key`` is in the cache of validated keys (no database query)."""
+        return (
+            key_prefix(key) is not None
+            and self.cache.get(hash_api_key(key, self.secret)) is not None
+        )
+
+    async def create(self, name: str) -> Tuple[str, ApiKey]:
+        """Mint and store a new key; the raw key is returned only here."""
+        from .security import generate_api_key
+
+        key = generate_api_key()
+        api_key = ApiKey(uuid.uuid4(), name, key_prefix(key) or "")
+        async with self.sessions() as session:
+            await session.execute(
+                insert(api_keys).values(
+                    id=api_key.id,
+                    prefix=api_key.prefix,
+                    key_hash=hash_api_key(key, self.secret),
+                    name=name,
+                    created_at=datetime.utcnow(),
+                    usage_count=0,
+                )
+            )
+        return key, api_key
+
+    async def revoke(self, key_id: UUID) -> bool:
+        """Revoke a key everywhere; False if there is no such active key."""
+        async with self.sessions() as session:
+            result = await session.execute(
+                update(api_keys)
+                .where(api_keys.c.id == key_id, api_keys.c.revoked_at.is_(None))
+                .values(revoked_at=datetime.utcnow())
+            )
+        if not result.rowcount:
+            return False
+        self.cache.drop(key_id)
+        await self.bus.publish(REVOKED_CHANNEL, str(key_id).encode())
+        return True
+
+    async def list_keys(self) -> List[ApiKeyRecord]:
+        columns = [getattr(api_keys.c, field) for field in ApiKeyRecord._fields]
+        async with self.sessions() as session:
+            rows = await session.execute(
+                select(*columns).order_by(api_keys.c.created_at)
+            )
+            return [ApiKeyRecord(*row) for row in rows]
+
+    def dispatch(self, channel: str, message: bytes) -> None:
+        """Drop a key revoked by another process from the cache."""
+        if channel != REVOKED_CHANNEL:
+            return
+        try:
+            self.cache.drop(
+                UUID(message.decode() if isinstance(message, bytes) else message)
+            )
+        except ValueError:
+            logger.warning("Ignoring malformed revocation %r", message)
+
+    async def flush_usage(self) -> int:
+        """Add uses counted since the last flush to the table; returns keys updated."""
+        uses, self._uses = self._uses, {}
+        if not uses:
+            return 0
+        try:
+            async with self.sessions() as session:
+                await session.execute(
+                    update(api_keys)
+                    .where(api_keys.c.id == bindparam("key_id"))
+                    .values(
+                        usage_count=api_keys.c.usage_count + bindparam("uses"),
+                        last_used_at=datetime.utcnow(),
+                    ),
+                    [
+                        {"key_id": key_id, "uses": count}
+                        for key_id, count in uses.items()
+                    ],
+                )
+        except Exception:
+            # Keep the counts for the next flush.
+            for key_id, count in uses.items():
+                self._uses[key_id] = self._uses.get(key_id, 0) + count
+            raise
+        return len(uses)
+
+    async def run(self, interval: float) -> None:
+        """Listen for revocations and flush usage every ``interval`` seconds."""
+        listener = asyncio.create_task(self.bus.run(REVOKED_CHANNEL))
+        try:
+            while True:
+                await asyncio.sleep(interval)
+                try:
+                    await self.flush_usage()
+                except Exception:
+                    logger.exception("API key usage flush failed")
+        finally:
+            listener.cancel()
+
+
+async def require_api_key(connection: HTTPConnection) -> ApiKey:
+    """Dependency rejecting requests and WebSockets without a valid ``X-API-Key``."""
+    key = connection.headers.get("x-api-key")
+    api_key = await get_api_key_auth().authenticate(key) if key else None
+    if api_key is None:
+        if connection.scope["type"] == "websocket":
+            raise WebSocketException(code=status.WS_1008_POLICY_VIOLATION)
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid or missing API key",
+            headers={"WWW-Authenticate": "ApiKey"},
+        )
+    return api_key
+
+
+_auth: Optional[ApiKeyAuth] = None
+
+
+def is_verified(key: str) -> bool:
+    """Whether this process validated ``key`` recently (``ApiKeyAuth.is_verified``)."""
+    return _auth is not None and _auth.is_verified(key)
+
+
+def get_api_key_auth(config: Settings = settings) -> ApiKeyAuth:
+    """Get the application API-key authenticator, rebuilt if ``config`` changed it."""
+    global _auth
+    wanted = (
+        config.api_key_hash_secret,
+        config.api_key_cache_size,
+        config.api_key_cache_ttl_seconds,
+    )
+    if _auth is None or (_auth.secret, _auth.cache.maxsize, _auth.cache.ttl) != wanted:
+        bus = RedisBus(get_redis()) if config.redis_enabled else InMemoryBus()
+        cache = ApiKeyCache(config.api_key_cache_size, config.api_key_cache_ttl_seconds)
+        _auth = ApiKeyAuth(bus, cache, secret=config.api_key_hash_secret)
+    return _auth
@@ -0,0 +1,395 @@
+"""
+Task attachments in a content-addressed blob store.
+
+Uploads are streamed: ``AttachmentStore.save`` writes the request body to a
+temporary file under ``upload_path`` chunk by chunk with aiofiles, hashing
+it with SHA-256 on the way, so a worker holds one chunk of an upload in
+memory whatever its size. A body over ``max_upload_size`` is refused from
+its ``Content-Length`` before anything is read, or as soon as the streamed
+bytes pass the limit. The finished file is renamed to
+``blobs/<sha[:2]>/<sha>``; content that is already stored is kept once and
+the upload only adds an ``attachments`` row naming it.
+
+``BlobResponse`` serves a blob, or one byte range of it (``Range``, with
+``If-Range``) as 206. When the server offers the ASGI zero-copy extension
+the open file is handed to it to ``sendfile``; otherwise the file is read
+in chunks off the event loop. The file is opened before the response
+starts, so a blob missing from the volume is a clean 410 rather than a
+truncated 200.
+
+A blob is not deleted with its last row, since an upload of the same
+content may be about to reference it again; ``prune`` removes blobs no row
+references once they are older than a grace period, along with abandoned
+temporary files.
+"""
+import asyncio
+import hashlib
+import logging
+import os
+import time
+import uuid
+from contextlib import AbstractAsyncContextManager
+from datetime import datetime
+from pathlib import Path
+from typing import AsyncIterator, Callable, List, NamedTuple, Optional, Tuple
+from urllib.parse import quote
+from uuid import UUID
+
+import aiofiles
+from prometheus_client import Counter
+from sqlalchemy import delete, insert, select
+from starlette.responses import JSONResponse, Response
+from starlette.types import Receive, Scope, Send
+
+from src.board.tables import attachments
+
+from .config import settings
+from .database import session_scope
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 256 * 1024
+# Unreferenced blobs and temporary files younger than this are left alone.
+PRUNE_GRACE_SECONDS = 3600.0
+ZEROCOPY = "http.response.zerocopysend"
+
+ATTACHMENT_BYTES = Counter(
+    "attachment_bytes_total",
+    "Attachment bytes by stage.",
+    ["stage"],  # uploaded, stored (new blobs only) or served
+)
+
+
+class UploadTooLargeError(Exception):
+    """Raised when an upload passes the size limit."""
+
+    def __init__(self, limit: int):
+        super().__init__(f"Upload exceeds {limit} bytes")
+        self.limit = limit
+
+
+class RangeNotSatisfiableError(Exception):
+    """Raised for a byte range that lies outside the file."""
+
+
+class Attachment(NamedTuple):
+    id: UUID
+    task_id: UUID
+    filename: str
+    content_type: str
+    size: int
+    sha256: str
+    created_at: datetime
+
+
+def clean_filename(filename: str) -> str:
+    """The last path component of a client-supplied file name."""
+    name = filename.replace("\\", "/").rsplit("/", 1)[-1].strip()
+    return "".join(char for char in name if char.isprintable())[:255] or "attachment"
+
+
+def byte_range(header: Optional[str], size: int) -> Optional[Tuple[int, int]]:
+    """
+    The inclusive ``(start, end)`` of a single-range ``Range`` header.
+
+    None means the whole file should be sent: no header, one that is not
+    understood, or several ranges. A range starting past the end raises
+    ``RangeNotSatisfiableError``.
+    """
+    if not header or not header.startswith("bytes=") or "," in header:
+        return None
+    start_text, _, end_text = header[len("bytes=") :].strip().partition("-")
+    try:
+        if not start_text:  # suffix: the last N bytes
+            length = int(end_text)
+            if length <= 0 or size == 0:
+                raise RangeNotSatisfiableError(header)
+            return max(size - length, 0), size - 1
+        start = int(start_text)
+        end = int(end_text) if end_text else size - 1
+    except ValueError:
+        return None
+    if start >= size:
+        raise RangeNotSatisfiableError(header)
+    if end < start:
+        return None
+    return start, min(end, size - 1)
+
+
+def content_disposition(filename: str) -> str:
+    fallback = "".join(
+        char if char.isascii() and char not in '"\\' else "_" for char in filename
+    )
+    return f"attachment; filename=\"{fallback}\"; filename*=UTF-8''{quote(filename)}"
+
+
+class BlobResponse(Response):
+    """A stored file, or ``count`` bytes of it from ``offset``, unbuffered."""
+
+    def __init__(
+        self,
+        path: Path,
+        offset: int,
+        count: int,
+        status_code: int = 200,
+        headers: Optional[dict] = None,
+        media_type: Optional[str] = None,
+    ):
+        self.path = path
+        self.offset = offset
+        self.count = count
+        self.status_code = status_code
+        self.media_type = media_type
+        self.background = None
+        self.init_headers({**(headers or {}), "Content-Length": str(count)})
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        try:
+            file = await asyncio.to_thread(open, self.path, "rb")
+        except FileNotFoundError:
+            logger.error("Attachment blob %s is missing", self.path.name)
+            missing = JSONResponse(
+                {"detail": "Attachment content is missing"}, status_code=410
+            )
+            await missing(scope, receive, send)
+            return
+        with file:
+            await send(
+                {
+                    "type": "http.response.start",
+                    "status": self.status_code,
+                    "headers": self.raw_headers,
+                }
+            )
+            if scope["method"] == "HEAD" or self.count == 0:
+                await send({"type": "http.response.body", "body": b""})
+                return
+            ATTACHMENT_BYTES.labels("served").inc(self.count)
+            if ZEROCOPY in scope.get("extensions", {}):
+                await send(
+                    {
+                        "type": ZEROCOPY,
+                        "file": file,
+                        "offset": self.offset,
+                        "count": self.count,
+                    }
+                )
+                return
+            file.seek(self.offset)
+            remaining = self.count
+            while remaining:
+                chunk = await asyncio.to_thread(file.read, min(CHUNK_SIZE, remaining))
+                remaining = remaining - len(chunk) if chunk else 0
+                await send(
+                    {
+                        "type": "http.response.body",
+                        "body": chunk,
+                        "more_body": bool(remaining),
+                    }
+                )
+
+
+def download(
+    attachment: Attachment,
+    path: Path,
+    range_header: Optional[str] = None,
+    if_range: Optional[str] = None,
+    if_none_match: Optional[str] = None,
+) -> Response:
+    """The response to a download request: the blob, a range of it, 304 or 416."""
+    etag = f'"{attachment.sha256}"'
+    headers = {
+        "ETag": etag,
+        "Accept-Ranges": "bytes",
+        # Content never changes under an attachment ID; no-transform keeps the
+        # compression middleware from breaking byte ranges.
+        "Cache-Control": "private, max-age=31536000, immutable, no-transform",
+        "Content-Disposition": content_disposition(attachment.filename),
+        "X-Content-Type-Options": "nosniff",
+    }
+    if if_none_match and etag in [
+        value.strip().removeprefix("W/") for value in if_none_match.split(",")
+    ]:
+        return Response(status_code=304, headers=headers)
+    if if_range is not None and if_range.strip() != etag:
+        range_header = None
+    size = attachment.size
+    try:
+        selected = byte_range(range_header, size)
+    except RangeNotSatisfiableError:
+        return Response(
+            status_code=416, headers={**headers, "Content-Range": f"bytes */{size}"}
+        )
+    if selected is None:
+        return BlobResponse(
+            path, 0, size, headers=headers, media_type=attachment.content_type
+        )
+    start, end = selected
+    headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+    return BlobResponse(
+        path,
+        start,
+        end - start + 1,
+        206,
+        headers=headers,
+        media_type=attachment.content_type,
+    )
+
+
+class AttachmentStore:
+    """Task attachments as rows pointing into a content-addressed blob directory."""
+
+    def __init__(
+        self,
+        root: str,
+        max_size: int,
+        sessions: Callable[[], AbstractAsyncContextManager] = session_scope,
+    ):
+        self.root = Path(root)
+        self.max_size = max_size
+        self.sessions = sessions
+
+    def blob_path(self, sha256: str) -> Path:
+        return self.root / "blobs" / sha256[:2] / sha256
+
+    def _commit_blob(self, temporary: Path, sha256: str) -> bool:
+        path = self.blob_path(sha256)
+        if path.exists():
+            # Refresh the mtime so a concurrent prune leaves it alone.
+            os.utime(path)
+            temporary.unlink()
+            return False
+        path.parent.mkdir(parents=True, exist_ok=True)
+        os.replace(temporary, path)
+        return True
+
+    async def write_blob(self, chunks: AsyncIterator[bytes]) -> Tuple[str, int]:
+        """Stream ``chunks`` into the blob store; returns their SHA-256 and size."""
+        temporary = self.root / "tmp" / uuid.uuid4().hex
+        await asyncio.to_thread(temporary.parent.mkdir, parents=True, exist_ok=True)
+        digest = hashlib.sha256()
+        size = 0
+        try:
+            async with aiofiles.open(temporary, "xb") as file:
+                async for chunk in chunks:
+                    size += len(chunk)
+                    if size > self.max_size:
+                        raise UploadTooLargeError(self.max_size)
+                    digest.update(chunk)
+                    await file.write(chunk)
+            sha256 = digest.hexdigest()
+            stored = await asyncio.to_thread(self._commit_blob, temporary, sha256)
+        except BaseException:
+            await asyncio.to_thread(temporary.unlink, missing_ok=True)
+            raise
+        ATTACHMENT_BYTES.labels("uploaded").inc(size)
+        if stored:
+            ATTACHMENT_BYTES.labels("stored").inc(size)
+        return sha256, size
+
+    async def save(
+        self,
+        task_id: UUID,
+        filename: str,
+        content_type: str,
+        chunks: AsyncIterator[bytes],
+    ) -> Attachment:
+        """Store an upload and attach it to a task."""
+        sha256, size = await self.write_blob(chunks)
+        attachment = Attachment(
+            uuid.uuid4(),
+            task_id,
+            clean_filename(filename),
+            content_type,
+            size,
+            sha256,
+            datetime.utcnow(),
+        )
+        async with self.sessions() as session:
+            await session.execute(insert(attachments).values(**attachment._asdict()))
+        return attachment
+
+    async def get(self, attachment_id: UUID) -> Optional[Attachment]:
+        async with self.sessions() as session:
+            row = (
+                await session.execute(
+                    select(attachments).where(attachments.c.id == attachment_id)
+                )
+            ).first()
+        return None if row is None else Attachment(*row)
+
+    async def list_for_task(self, task_id: UUID) -> List[Attachment]:
+        async with self.sessions() as session:
+            rows = await session.execute(
+                select(attachments)
+                .where(attachments.c.task_id == task_id)
+                .order_by(attachments.c.created_at)
+            )
+            return [Attachment(*row) for row in rows]
+
+    async def delete(self, attachment_id: UUID) -> bool:
+        """Remove an attachment; its blob stays until ``prune``."""
+        async with self.sessions() as session:
+            result = await session.execute(
+                delete(attachments).where(attachments.c.id == attachment_id)
+            )
+        return bool(result.rowcount)
+
+    def _stale_files(self, grace: float) -> Tuple[List[Path], List[Path]]:
+        cutoff = time.time() - grace
+
+        def old(directory: Path) -> List[Path]:
+            if not directory.is_dir():
+                return []
+            return [
+                path for path in directory.iterdir() if path.stat().st_mtime < cutoff
+            ]
+
+        blobs = [
+            path for shard in (self.root / "blobs").glob("*") for path in old(shard)
+        ]
+        return blobs, old(self.root / "tmp")
+
+    async def prune(self, grace: float = PRUNE_GRACE_SECONDS) -> int:
+        """Delete unreferenced blobs and stale temporary files; returns how many."""
+        blobs, temporaries = await asyncio.to_thread(self._stale_files, grace)
+        referenced = set()
+        async with self.sessions() as session:
+            for start in range(0, len(blobs), 1000):
+                names = [path.name for path in blobs[start : start + 1000]]
+                rows = await session.execute(
+                    select(attachments.c.sha256)
+                    .where(attachments.c.sha256.in_(names))
+                    .distinct()
+                )
+                referenced.update(rows.scalars())
+        candidates = [
+            path for path in blobs if path.name not in referenced
+        ] + temporaries
+        return await asyncio.to_thread(self._remove_stale, candidates, grace)
+
+    @staticmethod
+    def _remove_stale(paths: List[Path], grace: float) -> int:
+        cutoff = time.time() - grace
+        removed = 0
+        for path in paths:
+            try:
+                # An upload of the same content refreshes the mtime before
+                # adding its row.
+                if path.stat().st_mtime < cutoff:
+                    path.unlink()
+                    removed += 1
+            except FileNotFoundError:
+                pass
+        return removed
+
+
+_store: Optional[AttachmentStore] = None
+
+
+def get_attachment_store() -> AttachmentStore:
+    """Get the application attachment store."""
+    global _store
+    if _store is None:
+        _store = AttachmentStore(settings.upload_path, settings.max_upload_size)
+    return _store
@@ -0,0 +1,259 @@
+"""
+Read-through cache for serialized board snapshots.
+
+Each project has a version counter (``board:{id}:version``) and one snapshot
+key (``board:{id}:snapshot``) whose value is prefixed with the version it
+was built at and a strong ETag (a digest of the payload, computed once). A
+read fetches both with a single ``MGET`` and only serves the snapshot if the
+versions agree; writes invalidate by incrementing the counter, so stale
+snapshots are never served and need no delete. Misses for
+the same project and version are coalesced in-process, so a cold board is
+built once no matter how many requests arrive together.
+
+A worker can read a new version before it has heard of the write behind
+it, and build the snapshot from its outdated copy of the board. Builders
+that can tell pass ``confirm``: a snapshot is only stored once it says the
+copy it was built from was current, so a stale one is served to that
+request at most and never cached under the new version.
+
+Compressed variants of a snapshot (``board:{id}:snapshot:{coding}``) are
+stored next to it, tagged with the snapshot's ETag, and built the same way:
+a hot board is compressed once per version and coding, not once per request.
+"""
+import asyncio
+import hashlib
+import logging
+from typing import (
+    Any,
+    Awaitable,
+    Callable,
+    Dict,
+    Hashable,
+    NamedTuple,
+    Optional,
+    Tuple,
+    Union,
+)
+from uuid import UUID
+
+from prometheus_client import Counter
+
+from .compression import compress_async
+from .config import settings
+from .redis_client import get_redis
+from .tracing import span
+
+logger = logging.getLogger(__name__)
+
+BOARD_CACHE_REQUESTS = Counter(
+    "board_cache_requests_total",
+    "Board snapshot cache lookups by result.",
+    ["result"],
+)
+BOARD_CACHE_VARIANTS = Counter(
+    "board_cache_variant_requests_total",
+    "Compressed board snapshot lookups by coding and result.",
+    ["encoding", "result"],
+)
+
+Builder = Callable[[], Union[bytes, Awaitable[bytes]]]
+Confirm = Callable[[], Awaitable[bool]]
+
+
+class Snapshot(NamedTuple):
+    version: int
+    etag: str
+    payload: bytes
+
+
+def make_etag(payload: bytes) -> str:
+    """Return a strong ETag for a serialized payload."""
+    return '"' + hashlib.blake2b(payload, digest_size=16).hexdigest() + '"'
+
+
+def version_key(project_id: UUID) -> str:
+    return f"board:{project_id}:version"
+
+
+def snapshot_key(project_id: UUID) -> str:
+    return f"board:{project_id}:snapshot"
+
+
+def variant_key(project_id: UUID, encoding: str) -> str:
+    return f"board:{project_id}:snapshot:{encoding}"
+
+
+class BoardCache:
+    """Versioned board snapshot cache with single-flight rebuilds."""
+
+    def __init__(self, redis: Any, ttl: int = 300):
+        self.redis = redis
+        self.ttl = ttl
+        self._inflight: Dict[Hashable, "asyncio.Future[Any]"] = {}
+
+    async def version(self, project_id: UUID) -> int:
+        return int(await self.redis.get(version_key(project_id)) or 0)
+
+    async def get(self, project_id: UUID) -> Tuple[int, Optional[Snapshot]]:
+        """Return the current version and the snapshot if it is current."""
+        raw_version, raw_snapshot = await self.redis.mget(
+            version_key(project_id), snapshot_key(project_id)
+        )
+        version = int(raw_version or 0)
+        if raw_snapshot is not None:
+            stored_version, etag, payload = raw_snapshot.split(b"\n", 2)
+            if int(stored_version) == version:
+                return version, Snapshot(version, etag.decode(), payload)
+        return version, None
+
+    async def set(self, project_id: UUID, snapshot: Snapshot) -> None:
+        value = b"\n".join(
+            (str(snapshot.version).encode(), snapshot.etag.encode(), snapshot.payload)
+        )
+        await self.redis.set(snapshot_key(project_id), value, ex=self.ttl)
+
+    async def invalidate(self, project_id: UUID) -> int:
+        """Bump the project version so every cached snapshot becomes stale."""
+        return await self.redis.incr(version_key(project_id))
+
+    async def get_or_build(
+        self, project_id: UUID, build: Builder, confirm: Optional[Confirm] = None
+    ) -> Snapshot:
+        """Serve the current snapshot, building (and storing) it on a miss."""
+        with span(
+            "cache.board_snapshot", {"board.project_id": str(project_id)}
+        ) as current:
+            return await self._get_or_build(project_id, build, confirm, current)
+
+    async def _get_or_build(
+        self, project_id: UUID, build: Builder, confirm: Optional[Confirm], current: Any
+    ) -> Snapshot:
+        try:
+            version, snapshot = await self.get(project_id)
+        except Exception:
+            logger.warning("Board cache unavailable, building directly", exc_info=True)
+            BOARD_CACHE_REQUESTS.labels("error").inc()
+            current.set_attribute("cache.result", "error")
+            payload = await _call(build)
+            return Snapshot(-1, make_etag(payload), payload)
+        if snapshot is not None:
+            BOARD_CACHE_REQUESTS.labels("hit").inc()
+            current.set_attribute("cache.result", "hit")
+            return snapshot
+
+        async def build_snapshot() -> Snapshot:
+            payload = await _call(build)
+            return Snapshot(version, make_etag(payload), payload)
+
+        async def store(snapshot: Snapshot) -> None:
+            if confirm is not None and not await confirm():
+                logger.info(
+                    "Not caching board %s version %d: built from a stale copy",
+                    project_id,
+                    version,
+                )
+                return
+            await self.set(project_id, snapshot)
+
+        def record(result: str) -> None:
+            BOARD_CACHE_REQUESTS.labels(result).inc()
+            current.set_attribute("cache.result", result)
+
+        return await self._single_flight(
+            (project_id, version), build_snapshot, store, record
+        )
+
+    async def get_or_compress(
+        self, project_id: UUID, snapshot: Snapshot, encoding: str
+    ) -> bytes:
+        """Serve ``snapshot``'s payload in ``encoding``, compressing it only once."""
+        attributes = {
+            "board.project_id": str(project_id),
+            "http.content_encoding": encoding,
+        }
+        with span("cache.board_variant", attributes) as current:
+            return await self._get_or_compress(project_id, snapshot, encoding, current)
+
+    async def _get_or_compress(
+        self, project_id: UUID, snapshot: Snapshot, encoding: str, current: Any
+    ) -> bytes:
+        key = variant_key(project_id, encoding)
+        tag = snapshot.etag.encode()
+        try:
+            raw = await self.redis.get(key)
+        except Exception:
+            logger.warning(
+                "Board cache unavailable, compressing directly", exc_info=True
+            )
+            BOARD_CACHE_VARIANTS.labels(encoding, "error").inc()
+            current.set_attribute("cache.result", "error")
+            return await compress_async(encoding, snapshot.payload)
+        if raw is not None:
+            stored_tag, payload = raw.split(b"\n", 1)
+            if stored_tag == tag:
+                BOARD_CACHE_VARIANTS.labels(encoding, "hit").inc()
+                current.set_attribute("cache.result", "hit")
+                return payload
+
+        async def compress_snapshot() -> bytes:
+            return await compress_async(encoding, snapshot.payload, cached=True)
+
+        async def store(payload: bytes) -> None:
+            await self.redis.set(key, tag + b"\n" + payload, ex=self.ttl)
+
+        def record(result: str) -> None:
+            BOARD_CACHE_VARIANTS.labels(encoding, result).inc()
+            current.set_attribute("cache.result", result)
+
+        return await self._single_flight(
+            (project_id, snapshot.etag, encoding), compress_snapshot, store, record
+        )
+
+    async def _single_flight(
+        self,
+        key: Hashable,
+        produce: Callable[[], Awaitable[Any]],
+        store: Callable[[Any], Awaitable[None]],
+        record: Callable[[str], None],
+    ) -> Any:
+        """Produce and store a value once per ``key`` across concurrent callers."""
+        pending = self._inflight.get(key)
+        if pending is not None:
+            record("coalesced")
+            return await asyncio.shield(pending)
+
+        record("miss")
+        future: "asyncio.Future[Any]" = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            value = await produce()
+            future.set_result(value)
+            # Stay registered until stored so late arrivals still coalesce.
+            await store(value)
+        except Exception as exc:
+            if not future.done():
+                future.set_exception(exc)
+                future.exception()  # waiters re-raise it; don't log it as unretrieved
+                raise
+            logger.warning("Failed to store board cache entry", exc_info=True)
+        finally:
+            del self._inflight[key]
+        return value
+
+
+async def _call(build: Builder) -> bytes:
+    result = build()
+    if isinstance(result, bytes):
+        return result
+    return await result
+
+
+_board_cache: Optional[BoardCache] = None
+
+
+def get_board_cache() -> BoardCache:
+    """Get the application board cache."""
+    global _board_cache
+    if _board_cache is None or _board_cache.redis is not get_redis():
+        _board_cache = BoardCache(get_redis(), ttl=settings.board_cache_ttl_seconds)
+    return _board_cache
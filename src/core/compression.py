@@ -0,0 +1,276 @@
+"""
+HTTP response compression.
+
+``CompressionMiddleware`` negotiates a content coding from
+``Accept-Encoding`` (brotli, zstd or gzip, in ``compression_encodings``
+order when the client accepts several equally) and compresses compressible
+responses on the way out. A response whose body arrives in one piece is
+compressed whole and only if it is at least ``compression_minimum_size``
+bytes; a streamed response (an NDJSON export) is compressed chunk by
+chunk and flushed after each, so the client keeps receiving rows as they
+are produced. Responses that already carry a ``Content-Encoding`` pass
+through untouched, which is how the board route serves its precompressed
+snapshot variants.
+
+brotli and zstd are optional: a coding whose module is not installed is
+never negotiated, and gzip (stdlib) always is.
+"""
+import asyncio
+import gzip
+import importlib.util
+import zlib
+from functools import lru_cache
+from typing import Any, List, Optional, Sequence
+
+from prometheus_client import Counter
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from .config import settings
+
+# Levels per coding: fast ones for per-request work, slower and smaller ones
+# for payloads compressed once and then served from the cache.
+LEVELS = {"br": 4, "zstd": 3, "gzip": 6}
+CACHED_LEVELS = {"br": 6, "zstd": 9, "gzip": 9}
+MODULES = {"br": "brotli", "zstd": "zstandard", "gzip": None}
+
+# Bodies at least this large are compressed on a worker thread.
+THREAD_THRESHOLD = 256 * 1024
+
+COMPRESSIBLE_TYPES = frozenset(
+    {
+        "application/json",
+        "application/x-ndjson",
+        "application/javascript",
+        "application/xml",
+        "image/svg+xml",
+    }
+)
+
+COMPRESSION_BYTES = Counter(
+    "response_compression_bytes_total",
+    "Response body bytes before and after compression.",
+    ["encoding", "stage"],
+)
+
+
+@lru_cache(maxsize=None)
+def _installed(encoding: str) -> bool:
+    module = MODULES.get(encoding, "")
+    return module is None or (
+        bool(module) and importlib.util.find_spec(module) is not None
+    )
+
+
+def encodings(preferred: Optional[str] = None) -> List[str]:
+    """Installed codings from a comma-separated preference list or the setting."""
+    if preferred is None:
+        preferred = (
+            settings.compression_encodings if settings.compression_enabled else ""
+        )
+    names = [name.strip().lower() for name in preferred.split(",")]
+    return [name for name in names if name and _installed(name)]
+
+
+def negotiate(
+    accept_encoding: Optional[str], available: Sequence[str]
+) -> Optional[str]:
+    """
+    Pick the coding for an ``Accept-Encoding`` header, or None for identity.
+
+    The highest q-value wins and ties go to the earliest entry of
+    ``available``; ``q=0`` refuses a coding and ``*`` matches any other.
+    """
+    if not accept_encoding:
+        return None
+    weights = {}
+    for item in accept_encoding.split(","):
+        name, _, params = item.partition(";")
+        weight = 1.0
+        for param in params.split(";"):
+            key, _, value = param.partition("=")
+            if key.strip().lower() == "q":
+                try:
+                    weight = float(value)
+                except ValueError:
+                    weight = 0.0
+        weights[name.strip().lower()] = weight
+    best, best_weight = None, 0.0
+    for encoding in available:
+        weight = weights.get(encoding, weights.get("*", 0.0))
+        if weight > best_weight:
+            best, best_weight = encoding, weight
+    return best
+
+
+def variant_etag(etag: str, encoding: Optional[str]) -> str:
+    """The ETag of ``etag``'s representation in ``encoding`` (same for identity)."""
+    if encoding is None:
+        return etag
+    return f'{etag[:-1]}-{encoding}"'
+
+
+def compress(encoding: str, data: bytes, cached: bool = False) -> bytes:
+    """Compress ``data`` in one piece; ``cached`` trades time for size."""
+    level = (CACHED_LEVELS if cached else LEVELS)[encoding]
+    if encoding == "gzip":
+        return gzip.compress(data, compresslevel=level, mtime=0)
+    if encoding == "br":
+        import brotli
+
+        return brotli.compress(data, quality=level)
+    if encoding == "zstd":
+        import zstandard
+
+        return zstandard.ZstdCompressor(level=level).compress(data)
+    raise ValueError(f"Unsupported content coding: {encoding}")
+
+
+async def compress_async(encoding: str, data: bytes, cached: bool = False) -> bytes:
+    """``compress``, moved off the event loop for large bodies."""
+    if len(data) >= THREAD_THRESHOLD:
+        return await asyncio.to_thread(compress, encoding, data, cached)
+    return compress(encoding, data, cached)
+
+
+class StreamCompressor:
+    """Incremental compressor that flushes after every chunk."""
+
+    def __init__(self, encoding: str):
+        self.encoding = encoding
+        level = LEVELS[encoding]
+        if encoding == "gzip":
+            self._codec: Any = zlib.compressobj(
+                level, zlib.DEFLATED, 16 + zlib.MAX_WBITS
+            )
+        elif encoding == "br":
+            import brotli
+
+            self._codec = brotli.Compressor(quality=level)
+        elif encoding == "zstd":
+            import zstandard
+
+            self._codec = zstandard.ZstdCompressor(level=level).compressobj()
+        else:
+            raise ValueError(f"Unsupported content coding: {encoding}")
+
+    def compress(self, data: bytes) -> bytes:
+        if self.encoding == "gzip":
+            return self._codec.compress(data) + self._codec.flush(zlib.Z_SYNC_FLUSH)
+        if self.encoding == "br":
+            return self._codec.process(data) + self._codec.flush()
+        import zstandard
+
+        return self._codec.compress(data) + self._codec.flush(
+            zstandard.COMPRESSOBJ_FLUSH_BLOCK
+        )
+
+    def finish(self) -> bytes:
+        if self.encoding == "br":
+            return self._codec.finish()
+        return self._codec.flush()
+
+
+def compressible(status: int, headers: Headers) -> bool:
+    """Whether a response may be compressed by the middleware."""
+    if status < 200 or status in (204, 304) or "content-encoding" in headers:
+        return False
+    if "no-transform" in headers.get("cache-control", "").lower():
+        return False
+    media_type = headers.get("content-type", "").split(";")[0].strip().lower()
+    return (
+        media_type.startswith("text/")
+        or media_type.endswith("+json")
+        or media_type in COMPRESSIBLE_TYPES
+    )
+
+
+class CompressionMiddleware:
+    """ASGI middleware compressing responses with the negotiated coding."""
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        minimum_size: Optional[int] = None,
+        preferred: Optional[str] = None,
+    ):
+        self.app = app
+        self.minimum_size = (
+            settings.compression_minimum_size if minimum_size is None else minimum_size
+        )
+        self.encodings = encodings(preferred)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        encoding = negotiate(
+            Headers(scope=scope).get("accept-encoding"), self.encodings
+        )
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start: Optional[Message] = None  # held back until the first body chunk
+        stream: Optional[StreamCompressor] = None
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal start, stream
+            if message["type"] == "http.response.start":
+                if compressible(message["status"], Headers(raw=message["headers"])):
+                    start = message
+                else:
+                    await send(message)
+                return
+            if message["type"] != "http.response.body" or (
+                start is None and stream is None
+            ):
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+            if start is not None:
+                response_start, start = start, None
+                headers = MutableHeaders(scope=response_start)
+                declared = headers.get("content-length")
+                if not more_body:
+                    small = len(body) < self.minimum_size
+                else:  # streamed: small only if the length was declared up front
+                    small = declared is not None and int(declared) < self.minimum_size
+                if small:
+                    await send(response_start)
+                    await send(message)
+                    return
+                headers["Content-Encoding"] = encoding
+                headers.add_vary_header("Accept-Encoding")
+                if not more_body:
+                    compressed = await compress_async(encoding, body)
+                    headers["Content-Length"] = str(len(compressed))
+                    _count(encoding, len(body), len(compressed))
+                    await send(response_start)
+                    await send({"type": "http.response.body", "body": compressed})
+                    return
+                if "content-length" in headers:
+                    del headers["Content-Length"]
+                stream = StreamCompressor(encoding)
+                await send(response_start)
+
+            assert stream is not None
+            if len(body) >= THREAD_THRESHOLD:
+                chunk = await asyncio.to_thread(stream.compress, body)
+            else:
+                chunk = stream.compress(body) if body else b""
+            if not more_body:
+                chunk += stream.finish()
+            _count(encoding, len(body), len(chunk))
+            await send(
+                {"type": "http.response.body", "body": chunk, "more_body": more_body}
+            )
+
+        await self.app(scope, receive, send_wrapper)
+
+
+def _count(encoding: str, original: int, compressed: int) -> None:
+    COMPRESSION_BYTES.labels(encoding, "original").inc(original)
+    COMPRESSION_BYTES.labels(encoding, "compressed").inc(compressed)
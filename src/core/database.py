@@ -0,0 +1,182 @@
+"""
+Async SQLAlchemy engine, session factory and connection-pool metrics.
+
+One engine is shared per process and created lazily from ``Settings`` the
+first time it is needed. Pool sizing, overflow, pre-ping, recycle time and
+the asyncpg prepared-statement cache are all configurable so the pool can be
+sized against the number of pod replicas. ``get_session`` is the per-request
+FastAPI dependency and ``session_scope`` the transactional block for
+service code; both time the pool checkout so wait time under load is
+visible next to pool saturation in ``/metrics``. File-backed SQLite
+databases run in WAL mode, so reads do not queue behind writes.
+"""
+import time
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, Iterator, Optional
+
+from prometheus_client import REGISTRY, Histogram
+from prometheus_client.core import GaugeMetricFamily
+from prometheus_client.registry import Collector
+from sqlalchemy import MetaData, event
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext import asyncio as sqlalchemy_asyncio
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker
+from sqlalchemy.pool import QueuePool
+
+from .config import Settings, settings
+
+POOL_CHECKOUT_WAIT = Histogram(
+    "db_pool_checkout_wait_seconds",
+    "Time spent waiting for a pooled database connection.",
+    buckets=(0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0, 30.0),
+)
+
+_engine: Optional[AsyncEngine] = None
+_sessionmaker: Optional[async_sessionmaker] = None
+
+
+def engine_options(config: Settings) -> Dict[str, Any]:
+    """Build ``create_async_engine`` keyword arguments for a database URL."""
+    url = make_url(config.database_url)
+    options: Dict[str, Any] = {
+        "echo": config.db_echo,
+        "pool_pre_ping": config.db_pool_pre_ping,
+    }
+    if url.get_backend_name() == "sqlite" and url.database in (None, "", ":memory:"):
+        # In-memory SQLite uses a single static connection; sizing does not apply.
+        return options
+    options.update(
+        pool_size=config.db_pool_size,
+        max_overflow=config.db_max_overflow,
+        pool_timeout=config.db_pool_timeout,
+        pool_recycle=config.db_pool_recycle,
+    )
+    if url.get_driver_name() == "asyncpg":
+        options["connect_args"] = {
+            "prepared_statement_cache_size": config.db_statement_cache_size
+        }
+    return options
+
+
+def create_engine_from_settings(config: Settings) -> AsyncEngine:
+    """Create a new async engine configured from ``config``."""
+    # Looked up on the module at call time so tracing's instrumentation applies.
+    engine = sqlalchemy_asyncio.create_async_engine(
+        config.database_url, **engine_options(config)
+    )
+    url = make_url(config.database_url)
+    in_memory = url.database in (None, "", ":memory:")
+    if url.get_backend_name() == "sqlite" and not in_memory:
+        event.listen(engine.sync_engine, "connect", _sqlite_wal)
+    return engine
+
+
+def _sqlite_wal(connection: Any, _record: Any) -> None:
+    # Readers no longer block the writer, and a commit appends to the log
+    # without syncing it: a power loss can lose the last commits, but does
+    # not corrupt the database.
+    cursor = connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.close()
+
+
+def get_engine() -> AsyncEngine:
+    """Get the shared engine, creating it on first use."""
+    global _engine, _sessionmaker
+    if _engine is None:
+        _engine = create_engine_from_settings(settings)
+        _sessionmaker = async_sessionmaker(_engine, expire_on_commit=False)
+    return _engine
+
+
+def get_sessionmaker() -> async_sessionmaker:
+    """Get the session factory bound to the shared engine."""
+    get_engine()
+    assert _sessionmaker is not None
+    return _sessionmaker
+
+
+async def _checkout(session: AsyncSession) -> None:
+    start = time.perf_counter()
+    await session.connection()
+    POOL_CHECKOUT_WAIT.observe(time.perf_counter() - start)
+
+
+async def get_session() -> AsyncIterator[AsyncSession]:
+    """FastAPI dependency yielding a session that is closed after the request."""
+    async with get_sessionmaker()() as session:
+        await _checkout(session)
+        yield session
+
+
+@asynccontextmanager
+async def session_scope() -> AsyncIterator[AsyncSession]:
+    """Session in a transaction that commits on exit and rolls back on error."""
+    async with get_sessionmaker()() as session:
+        async with session.begin():
+            await _checkout(session)
+            yield session
+
+
+async def create_tables(metadata: MetaData) -> None:
+    """Create any tables in ``metadata`` missing from the database."""
+    async with get_engine().begin() as conn:
+        await conn.run_sync(metadata.create_all)
+
+
+async def dispose_engine() -> None:
+    """Close every pooled connection and forget the shared engine."""
+    global _engine, _sessionmaker
+    if _engine is not None:
+        await _engine.dispose()
+    _engine = None
+    _sessionmaker = None
+
+
+def pool_status(engine: Optional[AsyncEngine] = None) -> Dict[str, float]:
+    """Return checked-out, idle, overflow and saturation figures for a pool."""
+    engine = engine or _engine
+    pool = engine.sync_engine.pool if engine is not None else None
+    if not isinstance(pool, QueuePool):
+        return {}
+    capacity = pool.size() + max(pool._max_overflow, 0)
+    checked_out = pool.checkedout()
+    return {
+        "size": pool.size(),
+        "checked_out": checked_out,
+        "idle": pool.checkedin(),
+        "overflow": max(pool.overflow(), 0),
+        "saturation": checked_out / capacity if capacity else 0.0,
+    }
+
+
+class PoolCollector(Collector):
+    """Reports the shared engine's pool state at scrape time."""
+
+    def collect(self) -> Iterator[GaugeMetricFamily]:
+        status = pool_status()
+        if not status:
+            return
+        yield GaugeMetricFamily(
+            "db_connections_active",
+            "Pooled connections checked out.",
+            status["checked_out"],
+        )
+        yield GaugeMetricFamily(
+            "db_connections_idle",
+            "Pooled connections idle in the pool.",
+            status["idle"],
+        )
+        yield GaugeMetricFamily(
+            "db_pool_overflow", "Connections open beyond pool_size.", status["overflow"]
+        )
+        yield GaugeMetricFamily("db_pool_size", "Configured pool size.", status["size"])
+        yield GaugeMetricFamily(
+            "db_pool_saturation",
+            "Checked-out connections as a fraction of pool_size + max_overflow.",
+            status["saturation"],
+        )
+
+
+REGISTRY.register(PoolCollector())
@@ -0,0 +1,75 @@
+"""
+Bounded executor for CPU-heavy password hashing.
+
+bcrypt releases the GIL, so running it on a small dedicated thread pool
+keeps the event loop free while several hashes proceed in parallel. Jobs
+beyond ``max_workers`` wait in the pool's queue; once ``max_pending`` jobs
+are queued or running, new ones are rejected with 503 so a login burst
+degrades into back-pressure instead of unbounded memory and latency.
+"""
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Optional, TypeVar
+
+from fastapi import HTTPException, status
+from prometheus_client import Gauge
+
+T = TypeVar("T")
+
+PASSWORD_HASH_PENDING = Gauge(
+    "password_hash_pending",
+    "Password hash jobs queued or running.",
+    multiprocess_mode="livesum",
+)
+
+
+class HashingOverloadedError(HTTPException):
+    """Raised when the hashing queue is full."""
+
+    def __init__(self) -> None:
+        super().__init__(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Authentication service is busy, retry shortly",
+            headers={"Retry-After": "1"},
+        )
+
+
+class HashingExecutor:
+    """Runs blocking hash functions on a size-limited thread pool."""
+
+    def __init__(self, max_workers: int = 4, max_pending: int = 256):
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self._pending = 0
+        self._lock = threading.Lock()
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    @property
+    def pending(self) -> int:
+        return self._pending
+
+    async def run(self, func: Callable[..., T], *args) -> T:
+        """Run ``func(*args)`` on the pool without blocking the event loop."""
+        with self._lock:
+            if self._pending >= self.max_pending:
+                raise HashingOverloadedError()
+            self._pending += 1
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_workers, thread_name_prefix="password-hash"
+                )
+        PASSWORD_HASH_PENDING.inc()
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._executor, func, *args)
+        finally:
+            with self._lock:
+                self._pending -= 1
+            PASSWORD_HASH_PENDING.dec()
+
+    def shutdown(self) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,221 @@
+"""
+Live-update hub fanning board events out to WebSocket subscribers.
+
+Events are serialized once and published on ``board-events:{project_id}``.
+Every worker listens on the bus and hands each message to its local
+subscribers for that board. A subscriber owns a bounded send queue; when a
+slow client lets it fill up, the backlog is collapsed into a single
+``resync`` message telling the client to refetch the board, so one stalled
+socket never holds memory or delays the others.
+
+On the bus each event is prefixed with the publishing process's origin ID
+(stripped before it reaches a socket); listeners added with
+``on_remote_change`` hear about boards written by other workers, which is
+how each worker learns that its in-memory copy of a board is out of date.
+Those events can be lost while the bus is disconnected, so after every
+(re)subscription and every failed publish the ``on_missed_events``
+listeners are told to distrust everything, and after a resubscription
+every subscriber is sent ``resync``.
+"""
+import asyncio
+import json
+import logging
+import os
+import uuid
+from collections import deque
+from typing import Any, Callable, Deque, Dict, List, Optional, Set, Tuple
+from uuid import UUID
+
+from prometheus_client import Counter, Gauge
+
+from .config import settings
+from .pubsub import InMemoryBus, RedisBus
+from .redis_client import get_redis
+
+logger = logging.getLogger(__name__)
+
+CHANNEL_PREFIX = "board-events:"
+
+WS_SUBSCRIBERS = Gauge(
+    "ws_subscribers", "Open board WebSocket subscriptions.", multiprocess_mode="livesum"
+)
+WS_EVENTS_COALESCED = Counter(
+    "ws_events_coalesced_total", "Queued events replaced by a resync for slow clients."
+)
+
+RESYNC = "resync"
+
+
+def channel_for(project_id: UUID) -> str:
+    return f"{CHANNEL_PREFIX}{project_id}"
+
+
+_origin: Tuple[int, str] = (0, "")
+
+
+def process_origin() -> str:
+    """An ID for this process, fresh in every forked worker."""
+    global _origin
+    pid = os.getpid()
+    if _origin[0] != pid:
+        _origin = (pid, uuid.uuid4().hex)
+    return _origin[1]
+
+
+class Subscriber:
+    """Bounded outgoing queue for one WebSocket connection."""
+
+    def __init__(self, project_id: UUID, maxsize: int = 100):
+        self.project_id = project_id
+        self.maxsize = maxsize
+        self.coalesced = 0
+        self._queue: Deque[str] = deque()
+        self._ready = asyncio.Event()
+        self._loop = asyncio.get_running_loop()
+
+    def __len__(self) -> int:
+        return len(self._queue)
+
+    def offer(self, message: str) -> None:
+        """Queue a message; safe to call from any thread or event loop."""
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is self._loop:
+            self._offer(message)
+        else:
+            self._loop.call_soon_threadsafe(self._offer, message)
+
+    def _offer(self, message: str) -> None:
+        if len(self._queue) >= self.maxsize:
+            dropped = len(self._queue)
+            self._queue.clear()
+            self._queue.append(
+                json.dumps({"type": RESYNC, "project_id": str(self.project_id)})
+            )
+            self.coalesced += dropped
+            WS_EVENTS_COALESCED.inc(dropped)
+        self._queue.append(message)
+        self._ready.set()
+
+    async def get(self) -> str:
+        """Wait for and return the next queued message."""
+        while not self._queue:
+            self._ready.clear()
+            await self._ready.wait()
+        return self._queue.popleft()
+
+
+class BoardHub:
+    """Tracks local subscribers per board and relays bus messages to them."""
+
+    def __init__(self, bus: Any, queue_size: int = 100):
+        self.bus = bus
+        self.queue_size = queue_size
+        self._subscribers: Dict[UUID, Set[Subscriber]] = {}
+        self._remote_listeners: List[Callable[[UUID], None]] = []
+        self._missed_listeners: List[Callable[[], None]] = []
+        bus.add_handler(self.dispatch)
+        bus.add_subscribe_listener(self.resync)
+
+    def on_remote_change(self, listener: Callable[[UUID], None]) -> None:
+        """Call ``listener(project_id)`` for events published by other processes."""
+        if listener not in self._remote_listeners:
+            self._remote_listeners.append(listener)
+
+    def on_missed_events(self, listener: Callable[[], None]) -> None:
+        """Call ``listener()`` when events from other processes may have been lost."""
+        if listener not in self._missed_listeners:
+            self._missed_listeners.append(listener)
+
+    def _missed_events(self) -> None:
+        for listener in self._missed_listeners:
+            listener()
+
+    def resync(self) -> None:
+        """Recover from lost events: notify listeners, tell subscribers to refetch."""
+        self._missed_events()
+        for project_id, subscribers in self._subscribers.items():
+            message = json.dumps({"type": RESYNC, "project_id": str(project_id)})
+            for subscriber in list(subscribers):
+                subscriber.offer(message)
+
+    def subscribe(self, project_id: UUID) -> Subscriber:
+        subscriber = Subscriber(project_id, self.queue_size)
+        self._subscribers.setdefault(project_id, set()).add(subscriber)
+        WS_SUBSCRIBERS.inc()
+        return subscriber
+
+    def unsubscribe(self, subscriber: Subscriber) -> None:
+        subscribers = self._subscribers.get(subscriber.project_id)
+        if subscribers and subscriber in subscribers:
+            subscribers.discard(subscriber)
+            WS_SUBSCRIBERS.dec()
+            if not subscribers:
+                del self._subscribers[subscriber.project_id]
+
+    def subscriber_count(self, project_id: UUID) -> int:
+        return len(self._subscribers.get(project_id, ()))
+
+    async def publish(
+        self,
+        project_id: UUID,
+        event_type: str,
+        version: int,
+        data: Optional[Any] = None,
+    ) -> None:
+        """Serialize an event once and publish it to every worker."""
+        message = json.dumps(
+            {
+                "type": event_type,
+                "project_id": str(project_id),
+                "version": version,
+                "data": data,
+            }
+        )
+        envelope = f"{process_origin()} {message}"
+        try:
+            await self.bus.publish(channel_for(project_id), envelope.encode())
+        except Exception:
+            # The bus is unreachable, so events from other workers are likely lost too.
+            self._missed_events()
+            raise
+
+    def dispatch(self, channel: str, message: bytes) -> None:
+        """Hand a bus message to the local subscribers of its board."""
+        if not channel.startswith(CHANNEL_PREFIX):
+            return
+        try:
+            project_id = UUID(channel[len(CHANNEL_PREFIX) :])
+        except ValueError:
+            return
+        text = message.decode() if isinstance(message, bytes) else message
+        # Events from workers still on a release without origins start with "{".
+        origin, _, text = (
+            ("", "", text) if text.startswith("{") else text.partition(" ")
+        )
+        if origin != process_origin():
+            for listener in self._remote_listeners:
+                listener(project_id)
+        subscribers = self._subscribers.get(project_id)
+        if not subscribers:
+            return
+        for subscriber in list(subscribers):
+            subscriber.offer(text)
+
+    async def run(self) -> None:
+        """Relay messages from other workers until cancelled."""
+        await self.bus.run(CHANNEL_PREFIX + "*")
+
+
+_hub: Optional[BoardHub] = None
+
+
+def get_board_hub() -> BoardHub:
+    """Get the application live-update hub."""
+    global _hub
+    if _hub is None:
+        bus = RedisBus(get_redis()) if settings.redis_enabled else InMemoryBus()
+        _hub = BoardHub(bus, queue_size=settings.ws_send_queue_size)
+    return _hub
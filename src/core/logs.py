@@ -0,0 +1,275 @@
+"""
+Logging pipeline: records are queued on the calling thread and rendered
+and written by a background listener.
+
+``configure_logging`` puts a single ``QueueingHandler`` on the root logger.
+On the calling thread - usually the event loop - a record is only
+filtered and appended to a bounded queue; it is neither formatted nor
+written there. A ``QueueListener`` thread renders each record with
+structlog, as JSON (``log_format="json"``) or as console lines, and writes
+it to stdout, so a slow or blocked stdout never stalls a request. When the
+queue is full new records are dropped and counted rather than waited on.
+
+Messages are formatted lazily: pass ``%`` arguments (``logger.info("Moved
+%s", task_id)``) rather than an f-string, and the string is only built by
+the listener, for records that pass the level and sampling filters. The
+arguments are read then, so pass values that will not be mutated in the
+meantime. Fields given in ``extra`` become JSON keys, as do the request
+and trace IDs from ``CorrelationFilter``.
+
+``log_sample_rates`` keeps only a share of the INFO and DEBUG records
+logged while serving matching paths (``"/echo=0.01,/api/tasks=0.1"``,
+longest prefix wins). Whether a request's records are kept is decided by
+its request ID, so a request is logged completely or not at all; warnings
+and errors are always kept.
+
+structlog is imported by the listener when it renders its first record,
+not at startup. ``get_logger`` returns a structlog logger for key-value
+events that go through the same queue.
+"""
+import atexit
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+import threading
+import zlib
+from datetime import datetime, timezone
+from typing import Any, Dict, List, MutableMapping, Optional, TextIO, Tuple
+
+import orjson
+
+from . import tracing
+from .config import Settings
+
+# Attributes every record has; anything else on a record came from ``extra``
+# or a filter and is rendered as a field.
+RECORD_ATTRIBUTES = frozenset(
+    logging.LogRecord("", 0, "", 0, "", (), None).__dict__.keys()
+    | {"message", "asctime"}
+)
+
+_handler: Optional["QueueingHandler"] = None
+_listener: Optional["QueueListener"] = None
+_discarded: Any = None
+_discarded_lock = threading.Lock()
+
+
+def records_discarded() -> Any:
+    """The ``log_records_discarded_total`` counter, labelled sampled or queue_full."""
+    # Created on first use: this module is imported before ``serve`` sets
+    # PROMETHEUS_MULTIPROC_DIR, which prometheus_client only reads when it
+    # is first imported, so importing it here would keep every worker's
+    # metrics out of the shared directory.
+    global _discarded
+    if _discarded is None:
+        with _discarded_lock:
+            if _discarded is None:
+                from prometheus_client import Counter
+
+                _discarded = Counter(
+                    "log_records_discarded_total",
+                    "Log records not written.",
+                    ["reason"],
+                )
+    return _discarded
+
+
+class QueueingHandler(logging.handlers.QueueHandler):
+    """Enqueues records as they are, dropping them when the queue is full."""
+
+    queue: "queue.Queue[logging.LogRecord]"
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # The listener runs in this process, so the record needs no
+        # formatting or pickling before it is handed over.
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            records_discarded().labels("queue_full").inc()
+
+
+class QueueListener(logging.handlers.QueueListener):
+    """A listener that can always be stopped, even with a full queue."""
+
+    queue: "queue.Queue[Optional[logging.LogRecord]]"
+    _sentinel: None  # set by the base class, missing from its stubs
+
+    def enqueue_sentinel(self) -> None:
+        # Wait for room rather than fail; the thread is still draining the queue.
+        self.queue.put(self._sentinel)
+
+
+def parse_sample_rates(value: str) -> List[Tuple[str, float]]:
+    """``"/prefix=rate,..."`` as (prefix, rate) pairs, longest prefix first."""
+    rates = []
+    for item in value.split(","):
+        if not item.strip():
+            continue
+        prefix, separator, rate = item.strip().rpartition("=")
+        if not separator or not prefix.startswith("/") or not 0.0 <= float(rate) <= 1.0:
+            raise ValueError(f"Invalid log sample rate {item.strip()!r}")
+        rates.append((prefix, float(rate)))
+    return sorted(rates, key=lambda pair: len(pair[0]), reverse=True)
+
+
+class SamplingFilter(logging.Filter):
+    """Keeps a request-consistent share of INFO and DEBUG records per path prefix."""
+
+    def __init__(self, rates: List[Tuple[str, float]]):
+        super().__init__()
+        self.rates = rates
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if not self.rates or record.levelno > logging.INFO:
+            return True
+        path = tracing.request_path.get()
+        if path is None:
+            return True
+        for prefix, rate in self.rates:
+            if path.startswith(prefix):
+                break
+        else:
+            return True
+        key = (tracing.request_id.get() or "").encode()
+        if zlib.crc32(key) < rate * 2**32:
+            return True
+        records_discarded().labels("sampled").inc()
+        return False
+
+
+def _add_record_fields(
+    logger: Any, method_name: str, event_dict: MutableMapping[str, Any]
+) -> Any:
+    record = event_dict.get("_record")
+    if record is None:
+        return event_dict
+    # Timestamps come from the record, not from when the listener got to it.
+    created = datetime.fromtimestamp(record.created, timezone.utc)
+    event_dict["timestamp"] = created.isoformat(timespec="milliseconds").replace(
+        "+00:00", "Z"
+    )
+    for key, value in record.__dict__.items():
+        if key not in RECORD_ATTRIBUTES and not key.startswith("_"):
+            event_dict.setdefault(key, value)
+    return event_dict
+
+
+def _render_json(event_dict: Dict[str, Any], **kwargs: Any) -> str:
+    return orjson.dumps(event_dict, default=str).decode()
+
+
+class StructuredFormatter(logging.Formatter):
+    """Renders records with structlog; builds the renderer on first use."""
+
+    def __init__(self, json_format: bool = True):
+        super().__init__()
+        self.json_format = json_format
+        self._formatter: Optional[logging.Formatter] = None
+
+    def _build(self) -> logging.Formatter:
+        import structlog
+
+        if self.json_format:
+            renderers: List[Any] = [
+                structlog.processors.format_exc_info,
+                structlog.processors.JSONRenderer(serializer=_render_json),
+            ]
+        else:
+            renderers = [structlog.dev.ConsoleRenderer(colors=False)]
+        return structlog.stdlib.ProcessorFormatter(
+            processors=[
+                structlog.stdlib.add_log_level,
+                structlog.stdlib.add_logger_name,
+                _add_record_fields,
+                structlog.stdlib.ProcessorFormatter.remove_processors_meta,
+                *renderers,
+            ],
+        )
+
+    def format(self, record: logging.LogRecord) -> str:
+        if self._formatter is None:
+            self._formatter = self._build()
+        return self._formatter.format(record)
+
+
+def configure_logging(config: Settings, stream: Optional[TextIO] = None) -> None:
+    """Route the root logger through the queue to a listener writing to ``stream``."""
+    global _handler, _listener
+    shutdown_logging()
+    output = logging.StreamHandler(stream if stream is not None else sys.stdout)
+    output.setFormatter(StructuredFormatter(config.log_format == "json"))
+    _handler = QueueingHandler(queue.Queue(config.log_queue_size))
+    _handler.addFilter(SamplingFilter(parse_sample_rates(config.log_sample_rates)))
+    _handler.addFilter(tracing.CorrelationFilter())
+    root = logging.getLogger()
+    root.addHandler(_handler)
+    root.setLevel(config.log_level.upper())
+    _listener = QueueListener(_handler.queue, output, respect_handler_level=True)
+    _listener.start()
+
+
+def shutdown_logging() -> None:
+    """Write out the queued records and remove the handler."""
+    global _handler, _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+    if _handler is not None:
+        logging.getLogger().removeHandler(_handler)
+        _handler = None
+
+
+def _pause_listener() -> None:
+    # A listener forked mid-record would leave the child with whatever it
+    # held locked - a handler's lock, or the module lock of the structlog
+    # import on its first record - and no thread to ever release it.
+    if _listener is not None:
+        _listener.stop()
+
+
+def _resume_listener() -> None:
+    if _listener is not None:
+        _listener.start()
+
+
+def _restart_listener() -> None:
+    # Threads do not survive fork: a worker forked from a master that had
+    # configured logging needs its own queue and listener.
+    global _listener
+    if _handler is None or _listener is None:
+        return
+    _handler.queue = queue.Queue(_handler.queue.maxsize)
+    _listener = QueueListener(
+        _handler.queue, *_listener.handlers, respect_handler_level=True
+    )
+    _listener.start()
+
+
+os.register_at_fork(
+    before=_pause_listener,
+    after_in_parent=_resume_listener,
+    after_in_child=_restart_listener,
+)
+atexit.register(shutdown_logging)
+
+
+def get_logger(name: Optional[str] = None) -> Any:
+    """A structlog logger for key-value events (``log.info("moved", task_id=...)``)."""
+    import structlog
+
+    if not structlog.is_configured():
+        structlog.configure(
+            processors=[
+                structlog.stdlib.filter_by_level,
+                structlog.stdlib.ProcessorFormatter.wrap_for_formatter,
+            ],
+            logger_factory=structlog.stdlib.LoggerFactory(),
+            wrapper_class=structlog.stdlib.BoundLogger,
+            cache_logger_on_first_use=True,
+        )
+    return structlog.get_logger(name)
@@ -0,0 +1,156 @@
+"""
+Prometheus instrumentation for the HTTP API.
+
+``PrometheusMiddleware`` records request counts, in-flight requests and
+latency histograms labelled by route template (``/api/tasks/{task_id}``
+rather than the raw path) so series cardinality stays bounded. The default
+registry also carries the process collector (RSS, CPU, open fds) and an
+uptime gauge. The exposition format is served from ``/metrics`` and, when
+enabled, from a standalone server on ``Settings.metrics_port`` running in
+its own thread.
+
+Under the multi-worker server (``PROMETHEUS_MULTIPROC_DIR`` set) every
+worker writes its samples to that directory and both endpoints report the
+sum over workers; collectors that only exist in-process (the process
+collector, the database pool gauges) are not included there.
+"""
+import logging
+import os
+import time
+from typing import Optional, Tuple
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+    start_http_server,
+)
+from starlette.routing import Match
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+logger = logging.getLogger(__name__)
+
+UNMATCHED_ROUTE = "<unmatched>"
+
+# Latency buckets tuned around the 100ms API response target.
+LATENCY_BUCKETS = (
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.075,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+)
+
+REQUESTS_TOTAL = Counter(
+    "http_requests_total",
+    "Total HTTP requests by method, route template and status code.",
+    ["method", "route", "status"],
+)
+REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency by method and route template.",
+    ["method", "route"],
+    buckets=LATENCY_BUCKETS,
+)
+REQUESTS_IN_PROGRESS = Gauge(
+    "http_requests_in_progress",
+    "HTTP requests currently being handled.",
+    ["method", "route"],
+    multiprocess_mode="livesum",
+)
+TASKS_CREATED = Counter("kanban_tasks_created_total", "Tasks created.")
+
+_started_at = time.monotonic()
+UPTIME = Gauge("process_uptime_seconds", "Seconds since the application started.")
+UPTIME.set_function(lambda: time.monotonic() - _started_at)
+
+_metrics_server_port: Optional[int] = None
+
+
+def route_template(scope: Scope) -> str:
+    """Return the path template of the route matching ``scope``."""
+    partial = UNMATCHED_ROUTE
+    for route in getattr(scope.get("app"), "routes", ()):
+        match, _ = route.matches(scope)
+        if match == Match.FULL:
+            return getattr(route, "path", UNMATCHED_ROUTE)
+        if match == Match.PARTIAL and partial == UNMATCHED_ROUTE:
+            # Path matched but the method did not (405).
+            partial = getattr(route, "path", UNMATCHED_ROUTE)
+    return partial
+
+
+class PrometheusMiddleware:
+    """ASGI middleware recording per-route request metrics."""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        route = route_template(scope)
+        status_code = 500
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        in_progress = REQUESTS_IN_PROGRESS.labels(method, route)
+        in_progress.inc()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            REQUEST_DURATION.labels(method, route).observe(time.perf_counter() - start)
+            REQUESTS_TOTAL.labels(method, route, str(status_code)).inc()
+            in_progress.dec()
+
+
+def exposition_registry() -> CollectorRegistry:
+    """The registry to expose: the default one, or all workers' samples combined."""
+    if "PROMETHEUS_MULTIPROC_DIR" not in os.environ:
+        return REGISTRY
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    return registry
+
+
+def render_metrics() -> Tuple[bytes, str]:
+    """Render the exposition registry in the Prometheus text format."""
+    return generate_latest(exposition_registry()), CONTENT_TYPE_LATEST
+
+
+def start_metrics_server(port: int, addr: str = "0.0.0.0") -> bool:
+    """
+    Serve the exposition format on ``port`` from a daemon thread.
+
+    Scrapes then never queue behind API requests on the event loop. Returns
+    False if the server was already started in this process, which includes
+    workers forked from a server master that started it.
+    """
+    global _metrics_server_port
+    if _metrics_server_port is not None:
+        return False
+    start_http_server(port, addr=addr, registry=exposition_registry())
+    _metrics_server_port = port
+    logger.info("Metrics server listening on %s:%d", addr, port)
+    return True
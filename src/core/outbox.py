@@ -0,0 +1,378 @@
+"""
+Transactional outbox for webhook and email notifications.
+
+Board writes call ``enqueue`` inside their own transaction, adding one
+``outbox`` row per event and configured destination, so a notification
+exists exactly when its change committed and request handlers never wait
+on an external service. ``OutboxDispatcher`` delivers in the background:
+
+- every ``outbox_poll_seconds`` it leases up to ``outbox_batch_size`` due
+  rows (``FOR UPDATE SKIP LOCKED`` on PostgreSQL, so workers and replicas
+  never take the same rows), moving their ``available_at`` past the lease;
+- rows are grouped by destination and each group goes out as one message,
+  so a burst of card moves becomes one Slack post or one email;
+- webhooks share one pooled ``httpx.AsyncClient`` and emails one SMTP
+  connection that stays open between batches;
+- delivered rows are deleted; failed ones are retried with exponential
+  backoff and jitter and marked failed after ``outbox_max_attempts``.
+
+Delivery is at least once: a dispatcher that dies mid-send leaves its rows
+to be retried when the lease runs out.
+"""
+import asyncio
+import logging
+import random
+import smtplib
+from collections import defaultdict
+from contextlib import AbstractAsyncContextManager
+from datetime import datetime, timedelta
+from email.message import EmailMessage
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Sequence, Tuple
+from urllib.parse import urlsplit
+
+from prometheus_client import Counter
+from sqlalchemy import bindparam, delete, insert, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.board.tables import outbox
+
+from .config import Settings, settings
+from .database import session_scope
+
+logger = logging.getLogger(__name__)
+
+MAILTO = "mailto:"
+# Discord rejects longer message content.
+DISCORD_MAX_CONTENT = 2000
+
+OUTBOX_DELIVERIES = Counter(
+    "outbox_deliveries_total",
+    "Outbox sends by channel and result (failed counts rows given up on).",
+    ["channel", "result"],  # webhook or email; sent, retry or failed
+)
+OUTBOX_EVENTS = Counter(
+    "outbox_events_total", "Events delivered from the outbox.", ["channel"]
+)
+
+
+class Event(NamedTuple):
+    type: str
+    data: Dict[str, Any]
+
+
+def destinations(config: Settings = settings) -> List[str]:
+    """Configured webhook URLs and ``mailto:`` addresses."""
+    urls = [
+        url.strip() for url in config.notification_webhooks.split(",") if url.strip()
+    ]
+    emails = [
+        addr.strip() for addr in config.notification_emails.split(",") if addr.strip()
+    ]
+    return urls + [MAILTO + addr for addr in emails]
+
+
+def channel_of(destination: str) -> str:
+    return "email" if destination.startswith(MAILTO) else "webhook"
+
+
+def enabled(config: Settings = settings) -> bool:
+    return bool(destinations(config))
+
+
+async def enqueue(session: AsyncSession, events: Sequence[Event]) -> int:
+    """Add ``events`` for every destination in the caller's transaction."""
+    targets = destinations()
+    if not events or not targets:
+        return 0
+    now = datetime.utcnow()
+    rows = [
+        {
+            "destination": target,
+            "event_type": event.type,
+            "payload": event.data,
+            "created_at": now,
+            "available_at": now,
+            "attempts": 0,
+        }
+        for event in events
+        for target in targets
+    ]
+    await session.execute(insert(outbox), rows)
+    return len(rows)
+
+
+def describe(event_type: str, data: Dict[str, Any]) -> str:
+    """A one-line human summary of an event."""
+    title, project = data.get("title", ""), data.get("project", "")
+    if event_type == "task.created":
+        return f'"{title}" added to {data.get("column", "")} in {project}'
+    if event_type == "task.moved":
+        return f'"{title}" moved to {data.get("column", "")} in {project}'
+    if event_type == "task.updated":
+        return f'"{title}" updated in {project}'
+    if event_type == "task.deleted":
+        return f'"{title}" deleted from {project}'
+    return f"{event_type} in {project}"
+
+
+def webhook_body(url: str, rows: Sequence[Any]) -> Dict[str, Any]:
+    """The JSON body for a webhook: Slack and Discord get text, others the events."""
+    host = urlsplit(url).hostname or ""
+    text = "\n".join(describe(row.event_type, row.payload) for row in rows)
+    if host == "hooks.slack.com":
+        return {"text": text}
+    if host in ("discord.com", "discordapp.com"):
+        if len(text) > DISCORD_MAX_CONTENT:
+            text = text[: DISCORD_MAX_CONTENT - 1] + "…"
+        return {"content": text}
+    return {
+        "events": [
+            {
+                "id": row.id,
+                "type": row.event_type,
+                "created_at": row.created_at.isoformat() + "Z",
+                "data": row.payload,
+            }
+            for row in rows
+        ]
+    }
+
+
+def retry_delay(attempts: int, config: Settings = settings) -> float:
+    """Seconds before the next attempt: exponential, capped, with equal jitter."""
+    ceiling = min(
+        config.outbox_retry_max_seconds,
+        config.outbox_retry_base_seconds * 2 ** (attempts - 1),
+    )
+    return random.uniform(ceiling / 2, ceiling)
+
+
+class OutboxDispatcher:
+    """Delivers due outbox rows in coalesced, retried batches."""
+
+    def __init__(
+        self,
+        config: Settings = settings,
+        sessions: Callable[[], AbstractAsyncContextManager] = session_scope,
+    ):
+        self.config = config
+        self.sessions = sessions
+        self._http: Optional[Any] = None
+        self._smtp: Optional[smtplib.SMTP] = None
+        self._smtp_lock = asyncio.Lock()
+
+    # Claiming and settling rows
+
+    async def _claim(self, now: datetime) -> List[Any]:
+        lease = now + timedelta(seconds=self.config.outbox_lease_seconds)
+        async with self.sessions() as session:
+            rows = (
+                await session.execute(
+                    select(outbox)
+                    .where(outbox.c.failed_at.is_(None), outbox.c.available_at <= now)
+                    .order_by(outbox.c.id)
+                    .limit(self.config.outbox_batch_size)
+                    .with_for_update(skip_locked=True)
+                )
+            ).all()
+            if rows:
+                await session.execute(
+                    update(outbox)
+                    .where(outbox.c.id.in_([row.id for row in rows]))
+                    .values(available_at=lease, attempts=outbox.c.attempts + 1)
+                )
+        return rows
+
+    async def _settle(
+        self, delivered: List[int], failed: List[Tuple[Any, str]], now: datetime
+    ) -> None:
+        async with self.sessions() as session:
+            if delivered:
+                await session.execute(delete(outbox).where(outbox.c.id.in_(delivered)))
+            if failed:
+                params = []
+                for row, error in failed:
+                    attempts = row.attempts + 1
+                    dead = attempts >= self.config.outbox_max_attempts
+                    if dead:
+                        OUTBOX_DELIVERIES.labels(
+                            channel_of(row.destination), "failed"
+                        ).inc()
+                    params.append(
+                        {
+                            "row_id": row.id,
+                            "next_at": now
+                            + timedelta(seconds=retry_delay(attempts, self.config)),
+                            "error": error[:1000],
+                            "dead_at": now if dead else None,
+                        }
+                    )
+                await session.execute(
+                    update(outbox)
+                    .where(outbox.c.id == bindparam("row_id"))
+                    .values(
+                        available_at=bindparam("next_at"),
+                        last_error=bindparam("error"),
+                        failed_at=bindparam("dead_at"),
+                    ),
+                    params,
+                )
+
+    # Sending
+
+    async def _post(self, url: str, rows: List[Any]) -> None:
+        if self._http is None:
+            import httpx
+
+            self._http = httpx.AsyncClient(
+                timeout=self.config.webhook_timeout_seconds,
+                limits=httpx.Limits(max_connections=20, max_keepalive_connections=10),
+            )
+        response = await self._http.post(url, json=webhook_body(url, rows))
+        response.raise_for_status()
+
+    def _smtp_connect(self) -> smtplib.SMTP:
+        smtp = smtplib.SMTP(
+            self.config.smtp_host,
+            self.config.smtp_port,
+            timeout=self.config.webhook_timeout_seconds,
+        )
+        try:
+            if self.config.smtp_tls:
+                smtp.starttls()
+            if self.config.smtp_user:
+                smtp.login(self.config.smtp_user, self.config.smtp_password or "")
+        except BaseException:
+            smtp.close()
+            raise
+        return smtp
+
+    def _smtp_send(self, message: EmailMessage) -> None:
+        # One connection is kept across batches and reopened once if the
+        # server dropped it while idle. After any other failure, short of the
+        # recipient being refused, its state is unknown (a timeout mid-DATA,
+        # a reply out of step), so it is closed and the next batch reconnects.
+        for attempt in (1, 2):
+            if self._smtp is None:
+                self._smtp = self._smtp_connect()
+            try:
+                self._smtp.send_message(message)
+                return
+            except smtplib.SMTPRecipientsRefused:
+                raise
+            except BaseException as exc:
+                smtp, self._smtp = self._smtp, None
+                smtp.close()
+                disconnected = isinstance(
+                    exc, (smtplib.SMTPServerDisconnected, ConnectionError)
+                )
+                if attempt == 2 or not disconnected:
+                    raise
+
+    async def _email(self, address: str, rows: List[Any]) -> None:
+        message = EmailMessage()
+        message["From"] = self.config.email_from
+        message["To"] = address
+        count = len(rows)
+        message["Subject"] = (
+            describe(rows[0].event_type, rows[0].payload)
+            if count == 1
+            else f"{count} board updates"
+        )
+        message.set_content(
+            "\n".join(describe(row.event_type, row.payload) for row in rows)
+        )
+        async with self._smtp_lock:
+            await asyncio.to_thread(self._smtp_send, message)
+
+    async def _deliver(self, destination: str, rows: List[Any]) -> Optional[str]:
+        channel = channel_of(destination)
+        try:
+            if channel == "email":
+                await self._email(destination[len(MAILTO) :], rows)
+            else:
+                await self._post(destination, rows)
+        except Exception as exc:
+            logger.warning(
+                "Delivering %d events to %s failed: %s", len(rows), destination, exc
+            )
+            OUTBOX_DELIVERIES.labels(channel, "retry").inc()
+            return f"{type(exc).__name__}: {exc}"
+        OUTBOX_DELIVERIES.labels(channel, "sent").inc()
+        OUTBOX_EVENTS.labels(channel).inc(len(rows))
+        return None
+
+    async def dispatch_once(self, now: Optional[datetime] = None) -> int:
+        """Deliver one batch of due rows; returns how many were delivered."""
+        now = now or datetime.utcnow()
+        rows = await self._claim(now)
+        if not rows:
+            return 0
+        groups: Dict[str, List[Any]] = defaultdict(list)
+        for row in rows:
+            groups[row.destination].append(row)
+        results = await asyncio.gather(
+            *(
+                self._deliver(destination, group)
+                for destination, group in groups.items()
+            )
+        )
+        delivered: List[int] = []
+        failed: List[Tuple[Any, str]] = []
+        for group, error in zip(groups.values(), results):
+            if error is None:
+                delivered.extend(row.id for row in group)
+            else:
+                failed.extend((row, error) for row in group)
+        await self._settle(delivered, failed, now)
+        return len(delivered)
+
+    async def run(self) -> None:
+        """Dispatch until cancelled, draining full batches without waiting."""
+        while True:
+            try:
+                backlog = await self.dispatch_once() >= self.config.outbox_batch_size
+            except Exception:
+                logger.exception("Outbox dispatch failed")
+                backlog = False
+            if not backlog:
+                await asyncio.sleep(self.config.outbox_poll_seconds)
+
+    async def close(self) -> None:
+        if self._http is not None:
+            await self._http.aclose()
+            self._http = None
+        if self._smtp is not None:
+            smtp, self._smtp = self._smtp, None
+            try:
+                await asyncio.to_thread(smtp.quit)
+            except smtplib.SMTPException:
+                smtp.close()
+
+
+def task_event(
+    event_type: str, task: Any, project_name: str, column_name: str
+) -> Event:
+    """An outbox event describing a task change."""
+    return Event(
+        event_type,
+        {
+            "project_id": str(task.project_id),
+            "project": project_name,
+            "task_id": str(task.id),
+            "title": task.title,
+            "column_id": str(task.column_id),
+            "column": column_name,
+        },
+    )
+
+
+_dispatcher: Optional[OutboxDispatcher] = None
+
+
+def get_dispatcher(config: Settings = settings) -> OutboxDispatcher:
+    """Get the application outbox dispatcher."""
+    global _dispatcher
+    if _dispatcher is None or _dispatcher.config is not config:
+        _dispatcher = OutboxDispatcher(config)
+    return _dispatcher
@@ -0,0 +1,95 @@
+"""
+Message bus used to fan board events out across worker processes.
+
+``RedisBus`` publishes on Redis channels and runs one pattern subscription
+per process; ``InMemoryBus`` delivers straight to local handlers and is
+used when Redis is disabled (tests, single-process development).
+
+Redis pub/sub delivers at most once: messages published while a
+subscription is down are lost. ``add_subscribe_listener`` callbacks run
+each time ``RedisBus.run`` has (re)subscribed, so consumers can discard
+whatever those messages would have invalidated. A handler that raises is
+logged and skipped; it does not end the subscription.
+"""
+import asyncio
+import logging
+from typing import Any, Callable, List
+
+logger = logging.getLogger(__name__)
+
+Handler = Callable[[str, bytes], None]
+
+
+def _deliver(handlers: List[Handler], channel: str, message: bytes) -> None:
+    for handler in handlers:
+        try:
+            handler(channel, message)
+        except Exception:
+            logger.exception("Event bus handler failed on %s", channel)
+
+
+class InMemoryBus:
+    """Delivers published messages to handlers in this process."""
+
+    def __init__(self) -> None:
+        self.handlers: List[Handler] = []
+
+    def add_handler(self, handler: Handler) -> None:
+        self.handlers.append(handler)
+
+    def add_subscribe_listener(self, listener: Callable[[], None]) -> None:
+        """Never called: in-process delivery cannot miss messages."""
+
+    async def publish(self, channel: str, message: bytes) -> None:
+        _deliver(self.handlers, channel, message)
+
+    async def run(self, pattern: str) -> None:
+        """Nothing to listen to; delivery happens in ``publish``."""
+
+
+class RedisBus:
+    """Publishes through Redis and dispatches pattern-subscribed messages."""
+
+    def __init__(self, redis: Any, reconnect_delay: float = 1.0) -> None:
+        self.redis = redis
+        self.reconnect_delay = reconnect_delay
+        self.handlers: List[Handler] = []
+        self.subscribe_listeners: List[Callable[[], None]] = []
+
+    def add_handler(self, handler: Handler) -> None:
+        self.handlers.append(handler)
+
+    def add_subscribe_listener(self, listener: Callable[[], None]) -> None:
+        """Call ``listener()`` after each (re)subscription, as messages may be lost."""
+        self.subscribe_listeners.append(listener)
+
+    async def publish(self, channel: str, message: bytes) -> None:
+        await self.redis.publish(channel, message)
+
+    async def run(self, pattern: str) -> None:
+        """Listen on ``pattern`` until cancelled, resubscribing after errors."""
+        while True:
+            pubsub = self.redis.pubsub(ignore_subscribe_messages=True)
+            try:
+                await pubsub.psubscribe(pattern)
+                for listener in self.subscribe_listeners:
+                    try:
+                        listener()
+                    except Exception:
+                        logger.exception("Event bus subscribe listener failed")
+                async for message in pubsub.listen():
+                    if message["type"] != "pmessage":
+                        continue
+                    channel = message["channel"]
+                    if isinstance(channel, bytes):
+                        channel = channel.decode()
+                    _deliver(self.handlers, channel, message["data"])
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.warning(
+                    "Event bus subscription lost, reconnecting", exc_info=True
+                )
+                await asyncio.sleep(self.reconnect_delay)
+            finally:
+                await pubsub.aclose()
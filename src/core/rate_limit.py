@@ -0,0 +1,266 @@
+"""
+Token-bucket rate limiting for the HTTP API.
+
+Each client gets a bucket holding up to ``rate_limit_burst`` tokens that
+refills at ``rate_limit_per_minute``; a request takes one token and is
+rejected with 429 and ``Retry-After`` when none is left. Requests carrying
+an ``X-API-Key`` this process has already authenticated are limited per key
+(by digest; raw keys are never kept), all others per client IP, so made-up
+keys neither get a fresh bucket each nor push real clients out of the local
+buckets. Behind a proxy the server must be run with proxy headers enabled
+so the client address is the real one.
+
+With Redis enabled the buckets live in Redis and are updated by one atomic
+Lua script, so every replica shares them. Each process also keeps a local
+bucket per client as a fast path: it only sees this replica's share of the
+traffic, so when it is empty the shared bucket is too and the request is
+rejected without a Redis round trip. A client hammering the API is thereby
+turned away locally, and if Redis is unreachable the local buckets decide.
+"""
+import hashlib
+import logging
+import math
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, NamedTuple, Optional, Tuple
+
+from prometheus_client import Counter, Histogram
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from .config import Settings, settings
+from .redis_client import get_redis
+
+logger = logging.getLogger(__name__)
+
+# Paths never rate limited, so probes and scrapes keep working under load.
+EXEMPT_PATHS = frozenset({"/health", "/metrics"})
+
+RATE_LIMIT_DECISIONS = Counter(
+    "rate_limit_decisions_total",
+    "Rate limiter decisions by result and the store that made them.",
+    ["result", "store"],
+)
+RATE_LIMIT_DECISION_SECONDS = Histogram(
+    "rate_limit_decision_seconds",
+    "Time taken to reach a rate limiting decision, by deciding store.",
+    ["store"],
+    buckets=(0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05),
+)
+
+# KEYS[1] = bucket; ARGV = tokens per second, burst, cost. The server clock
+# is used so replicas with skewed clocks still agree.
+TOKEN_BUCKET_SCRIPT = """
+local rate = tonumber(ARGV[1])
+local burst = tonumber(ARGV[2])
+local cost = tonumber(ARGV[3])
+local time = redis.call('TIME')
+local now = tonumber(time[1]) + tonumber(time[2]) / 1000000
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'at')
+local tokens = tonumber(state[1]) or burst
+local at = tonumber(state[2]) or now
+tokens = math.min(burst, tokens + math.max(0, now - at) * rate)
+local allowed = 0
+local retry_after = 0
+if tokens >= cost then
+    tokens = tokens - cost
+    allowed = 1
+else
+    retry_after = (cost - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'at', tostring(now))
+redis.call('PEXPIRE', KEYS[1], math.ceil((burst - tokens) / rate * 1000) + 1000)
+return {allowed, tostring(tokens), tostring(retry_after)}
+"""
+
+
+class Decision(NamedTuple):
+    allowed: bool
+    remaining: int  # whole tokens left
+    retry_after: float  # seconds until a token is available, 0 if allowed
+
+
+class LocalBuckets:
+    """In-process token buckets, the least recently used dropped beyond ``maxsize``."""
+
+    def __init__(self, maxsize: int = 100000, clock=time.monotonic):
+        self.maxsize = maxsize
+        self.clock = clock
+        self._buckets: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+    def take(self, key: str, rate: float, burst: int, cost: int = 1) -> Decision:
+        now = self.clock()
+        with self._lock:
+            tokens = self._refill(key, rate, burst, now)
+            allowed = tokens >= cost
+            if allowed:
+                tokens -= cost
+            self._buckets[key] = (tokens, now)
+            self._buckets.move_to_end(key)
+            if len(self._buckets) > self.maxsize:
+                # A forgotten bucket comes back full: the client is merely
+                # treated as new.
+                self._buckets.popitem(last=False)
+        retry_after = 0.0 if allowed else (cost - tokens) / rate
+        return Decision(allowed, int(tokens), retry_after)
+
+    def sync(self, key: str, tokens: float) -> None:
+        """Lower a bucket to the shared count, including other replicas' traffic."""
+        with self._lock:
+            current = self._buckets.get(key)
+            if current is not None and tokens < current[0]:
+                self._buckets[key] = (tokens, current[1])
+
+    def _refill(self, key: str, rate: float, burst: int, now: float) -> float:
+        state = self._buckets.get(key)
+        if state is None:
+            return float(burst)
+        tokens, at = state
+        return min(float(burst), tokens + max(0.0, now - at) * rate)
+
+
+class RedisBuckets:
+    """Token buckets shared by all replicas, updated atomically by a Lua script."""
+
+    def __init__(self, redis: Any, prefix: str = "ratelimit:"):
+        self.redis = redis
+        self.prefix = prefix
+        self._script = redis.register_script(TOKEN_BUCKET_SCRIPT)
+
+    async def take(self, key: str, rate: float, burst: int, cost: int = 1) -> Decision:
+        allowed, tokens, retry_after = await self._script(
+            keys=[self.prefix + key], args=[rate, burst, cost]
+        )
+        return Decision(bool(int(allowed)), int(float(tokens)), float(retry_after))
+
+
+class RateLimiter:
+    """Decide whether a client may make a request, locally first and then in Redis."""
+
+    def __init__(
+        self,
+        per_minute: int,
+        burst: int,
+        shared: Optional[RedisBuckets] = None,
+        local: Optional[LocalBuckets] = None,
+    ):
+        if per_minute <= 0 or burst <= 0:
+            raise ValueError("Rate limits must be positive")
+        self.rate = per_minute / 60.0
+        self.burst = burst
+        self.shared = shared
+        self.local = local or LocalBuckets()
+        self._degraded = False
+
+    async def check(self, key: str, cost: int = 1) -> Decision:
+        start = time.perf_counter()
+        store = "local"
+        decision = self.local.take(key, self.rate, self.burst, cost)
+        if decision.allowed and self.shared is not None:
+            try:
+                decision = await self.shared.take(key, self.rate, self.burst, cost)
+            except Exception:
+                if not self._degraded:
+                    logger.warning(
+                        "Shared rate limits unavailable, limiting locally",
+                        exc_info=True,
+                    )
+                    self._degraded = True
+            else:
+                store = "redis"
+                self._degraded = False
+                self.local.sync(key, decision.remaining)
+        RATE_LIMIT_DECISION_SECONDS.labels(store).observe(time.perf_counter() - start)
+        RATE_LIMIT_DECISIONS.labels(
+            "allowed" if decision.allowed else "limited", store
+        ).inc()
+        return decision
+
+
+def client_key(
+    scope: Scope, key_verified: Optional[Callable[[str], bool]] = None
+) -> str:
+    """The bucket a request counts against: a ``key_verified`` API key, else its IP."""
+    api_key = Headers(scope=scope).get("x-api-key")
+    if api_key and key_verified is not None and key_verified(api_key):
+        return "key:" + hashlib.sha256(api_key.encode()).hexdigest()[:32]
+    client = scope.get("client")
+    return "ip:" + (client[0] if client else "unknown")
+
+
+class RateLimitMiddleware:
+    """ASGI middleware applying ``RateLimiter`` to every HTTP request.
+
+    Without a ``limiter`` it uses the application limiter for ``config``.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        limiter: Optional[RateLimiter] = None,
+        key_verified: Optional[Callable[[str], bool]] = None,
+        config: Settings = settings,
+    ):
+        self.app = app
+        self.limiter = limiter
+        self.key_verified = key_verified
+        self.config = config
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["path"] in EXEMPT_PATHS:
+            await self.app(scope, receive, send)
+            return
+        limiter = self.limiter or get_rate_limiter(self.config)
+        if limiter is None:
+            await self.app(scope, receive, send)
+            return
+
+        decision = await limiter.check(client_key(scope, self.key_verified))
+        headers = {
+            "X-RateLimit-Limit": str(limiter.burst),
+            "X-RateLimit-Remaining": str(decision.remaining),
+        }
+        if not decision.allowed:
+            headers["Retry-After"] = str(max(1, math.ceil(decision.retry_after)))
+            response = JSONResponse(
+                {"detail": "Rate limit exceeded"}, status_code=429, headers=headers
+            )
+            await response(scope, receive, send)
+            return
+
+        async def send_wrapper(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                MutableHeaders(scope=message).update(headers)
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
+
+
+_limiter: Optional[RateLimiter] = None
+
+
+def get_rate_limiter(config: Settings = settings) -> Optional[RateLimiter]:
+    """Get the application rate limiter, or None when rate limiting is disabled."""
+    global _limiter
+    if not config.rate_limit_enabled:
+        return None
+    redis = get_redis() if config.redis_enabled else None
+    shared = _limiter.shared.redis if _limiter and _limiter.shared else None
+    if (
+        _limiter is None
+        or shared is not redis
+        or _limiter.rate != config.rate_limit_per_minute / 60.0
+        or _limiter.burst != config.rate_limit_burst
+    ):
+        _limiter = RateLimiter(
+            config.rate_limit_per_minute,
+            config.rate_limit_burst,
+            shared=RedisBuckets(redis) if redis is not None else None,
+        )
+    return _limiter
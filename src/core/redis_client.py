@@ -0,0 +1,113 @@
+"""
+Shared Redis client with an in-process stand-in.
+
+``get_redis`` returns one ``redis.asyncio.Redis`` per process built from
+``Settings.redis_url``. With ``redis_enabled=False`` it returns
+``InMemoryRedis`` instead, which implements the subset of commands the app
+uses, so tests and single-process development need no Redis server.
+"""
+import fnmatch
+import time
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+from .config import settings
+
+Value = Union[bytes, str, int, float]
+
+_client: Optional[Any] = None
+
+
+def _encode(value: Value) -> bytes:
+    if isinstance(value, bytes):
+        return value
+    return str(value).encode()
+
+
+class InMemoryRedis:
+    """Dict-backed async stand-in for the Redis commands used by the app."""
+
+    def __init__(self) -> None:
+        self._data: Dict[str, Tuple[bytes, Optional[float]]] = {}
+
+    def _live(self, key: str) -> Optional[bytes]:
+        item = self._data.get(key)
+        if item is None:
+            return None
+        value, expires_at = item
+        if expires_at is not None and expires_at <= time.monotonic():
+            del self._data[key]
+            return None
+        return value
+
+    async def get(self, key: str) -> Optional[bytes]:
+        return self._live(key)
+
+    async def mget(self, *keys: str) -> List[Optional[bytes]]:
+        if len(keys) == 1 and isinstance(keys[0], (list, tuple)):
+            keys = tuple(keys[0])
+        return [self._live(key) for key in keys]
+
+    async def set(
+        self, key: str, value: Value, ex: Optional[float] = None, nx: bool = False
+    ) -> Optional[bool]:
+        if nx and self._live(key) is not None:
+            return None
+        expires_at = time.monotonic() + ex if ex else None
+        self._data[key] = (_encode(value), expires_at)
+        return True
+
+    async def incr(self, key: str, amount: int = 1) -> int:
+        current = self._live(key)
+        value = int(current or 0) + amount
+        expires_at = self._data[key][1] if current is not None else None
+        self._data[key] = (_encode(value), expires_at)
+        return value
+
+    async def expire(self, key: str, seconds: float) -> bool:
+        value = self._live(key)
+        if value is None:
+            return False
+        self._data[key] = (value, time.monotonic() + seconds)
+        return True
+
+    async def delete(self, *keys: str) -> int:
+        removed = 0
+        for key in keys:
+            if self._live(key) is not None:
+                del self._data[key]
+                removed += 1
+        return removed
+
+    async def keys(self, pattern: str = "*") -> List[bytes]:
+        return [
+            key.encode()
+            for key in list(self._data)
+            if self._live(key) is not None and fnmatch.fnmatchcase(key, pattern)
+        ]
+
+    async def ping(self) -> bool:
+        return True
+
+    async def aclose(self) -> None:
+        self._data.clear()
+
+
+def get_redis() -> Any:
+    """Get the process-wide Redis client, creating it on first use."""
+    global _client
+    if _client is None:
+        if settings.redis_enabled:
+            import redis.asyncio as redis
+
+            _client = redis.Redis.from_url(settings.redis_url)
+        else:
+            _client = InMemoryRedis()
+    return _client
+
+
+async def close_redis() -> None:
+    """Close the shared client's connections."""
+    global _client
+    if _client is not None:
+        await _client.aclose()
+    _client = None
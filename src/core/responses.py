@@ -0,0 +1,41 @@
+"""
+JSON responses serialized straight to bytes.
+
+FastAPI's default path validates a route's return value against its
+``response_model``, converts it to plain Python objects and then runs
+``json.dumps``. For large payloads built from data the service already
+holds in validated form - the engine's task dataclasses, database rows -
+``encode`` instead writes them with orjson in one pass: orjson handles
+dataclasses, UUIDs and datetimes natively, and row mappings and pydantic
+models go through ``_default``. Routes return the bytes in a
+``JSONBytesResponse``, which FastAPI sends as is, so the ``response_model``
+only documents the shape. Other routes keep the validated path but
+render with FastAPI's ``ORJSONResponse``, the application's default
+response class.
+"""
+from collections.abc import Mapping
+from typing import Any
+
+import orjson
+from pydantic import BaseModel
+from starlette.responses import Response
+
+
+def _default(value: Any) -> Any:
+    if isinstance(value, Mapping):
+        # Row mapping keys may be str subclasses, which orjson rejects as keys.
+        return {str(key): item for key, item in value.items()}
+    if isinstance(value, BaseModel):
+        return value.model_dump(mode="json")
+    raise TypeError(f"Type is not JSON serializable: {type(value).__name__}")
+
+
+def encode(content: Any) -> bytes:
+    """Serialize ``content`` to JSON bytes with orjson."""
+    return orjson.dumps(content, default=_default)
+
+
+class JSONBytesResponse(Response):
+    """A response whose body is already-encoded JSON."""
+
+    media_type = "application/json"
@@ -3,15 +3,31 @@ Security utilities for authentication and authorization.
 """
 import secrets
 from datetime import datetime, timedelta
-from typing import Optional, Union
+from typing import Optional, Tuple, Union
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 from fastapi import HTTPException, status
 from .config import settings
+from .hashing import HashingExecutor
+from .token_cache import TokenCache
+from .tracing import span
 
 
 # Password hashing
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+pwd_context = CryptContext(
+    schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=settings.bcrypt_rounds
+)
+
+# Dedicated pool so bcrypt never runs on the event loop thread
+hashing_executor = HashingExecutor(
+    max_workers=settings.password_hash_workers,
+    max_pending=settings.password_hash_max_pending,
+)
+
+# Verified-token cache shared by every request in this process
+token_cache = TokenCache(
+    maxsize=settings.token_cache_size, max_ttl=settings.token_cache_ttl_seconds
+)
 
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
@@ -20,8 +36,10 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
     if expires_delta:
         expire = datetime.utcnow() + expires_delta
     else:
-        expire = datetime.utcnow() + timedelta(minutes=settings.jwt_access_token_expire_minutes)
-    
+        expire = datetime.utcnow() + timedelta(
+            minutes=settings.jwt_access_token_expire_minutes
+        )
+
     to_encode.update({"exp": expire})
     encoded_jwt = jwt.encode(to_encode, settings.jwt_secret_key, algorithm="HS256")
     return encoded_jwt
@@ -36,17 +54,41 @@ def create_refresh_token(data: dict) -> str:
     return encoded_jwt
 
 
+def _credentials_exception() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Could not validate credentials",
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+
+
 def verify_token(token: str) -> dict:
-    """Verify and decode JWT token."""
-    try:
-        payload = jwt.decode(token, settings.jwt_secret_key, algorithms=["HS256"])
+    """Verify and decode JWT token, reusing cached results for repeat tokens."""
+    with span("auth.verify_token") as current:
+        payload = token_cache.get(token)
+        current.set_attribute("auth.token_cached", payload is not None)
+        if payload is not None:
+            return payload
+        if token_cache.is_revoked(token):
+            raise _credentials_exception()
+        try:
+            payload = jwt.decode(token, settings.jwt_secret_key, algorithms=["HS256"])
+        except JWTError:
+            raise _credentials_exception()
+        token_cache.put(token, payload)
         return payload
+
+
+def revoke_token(token: str) -> None:
+    """Reject a token for the rest of its lifetime in this process."""
+    expires_at = None
+    try:
+        claims = jwt.get_unverified_claims(token)
+        if isinstance(claims.get("exp"), (int, float)):
+            expires_at = float(claims["exp"])
     except JWTError:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Could not validate credentials",
-            headers={"WWW-Authenticate": "Bearer"},
-        )
+        pass
+    token_cache.revoke(token, expires_at)
 
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
@@ -59,6 +101,36 @@ def get_password_hash(password: str) -> str:
     return pwd_context.hash(password)
 
 
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """Verify a password on the hashing pool."""
+    with span("auth.verify_password", {"auth.hash_pending": hashing_executor.pending}):
+        return await hashing_executor.run(
+            verify_password, plain_password, hashed_password
+        )
+
+
+async def get_password_hash_async(password: str) -> str:
+    """Hash a password on the hashing pool."""
+    with span("auth.hash_password", {"auth.hash_pending": hashing_executor.pending}):
+        return await hashing_executor.run(get_password_hash, password)
+
+
+async def verify_and_update_password(
+    plain_password: str, hashed_password: str
+) -> Tuple[bool, Optional[str]]:
+    """
+    Verify a password at login and rehash it if its parameters are outdated.
+
+    Returns ``(valid, new_hash)``; ``new_hash`` is set when the stored hash
+    uses a deprecated scheme or different bcrypt rounds and should be saved.
+    """
+    if not await verify_password_async(plain_password, hashed_password):
+        return False, None
+    if pwd_context.needs_update(hashed_password):
+        return True, await get_password_hash_async(plain_password)
+    return True, None
+
+
 def generate_api_key() -> str:
     """Generate a secure API key."""
     return f"sk_{secrets.token_urlsafe(32)}"
@@ -0,0 +1,188 @@
+"""
+Production server runner behind ``simple-kanban serve``.
+
+Gunicorn supervises a pool of uvicorn workers. The app is built once in the
+master before forking (``preload_app``), so the imported modules and the
+routing tables are shared copy-on-write; ``gc.freeze()`` keeps the
+workers' garbage collector from writing to those pages and unsharing them.
+The worker count follows the CPU the container may actually use (its
+cgroup quota and CPU affinity, not the host's core count) and workers run
+on uvloop and httptools when installed. Each worker is replaced after
+``worker_max_requests`` requests (jittered so they do not all restart at
+once), and on SIGTERM workers stop accepting connections and get
+``graceful_timeout`` seconds to finish the requests in flight before the
+lifespan shutdown runs.
+
+Metrics are collected in Prometheus multiprocess mode: workers write their
+samples under ``PROMETHEUS_MULTIPROC_DIR`` and the standalone metrics
+server runs in the master, reporting the sum over workers.
+
+Boards live in each worker's memory, so workers only see each other's
+writes through the Redis event bus; without Redis the runner starts a
+single worker and refuses an explicit ``WORKERS`` above one.
+"""
+import gc
+import logging
+import math
+import os
+import tempfile
+from importlib.util import find_spec
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from gunicorn.app.base import BaseApplication
+from uvicorn.workers import UvicornWorker
+
+from .config import Settings
+
+logger = logging.getLogger(__name__)
+
+CGROUP_ROOT = Path("/sys/fs/cgroup")
+
+# Time left after the request drain for the lifespan shutdown (closing
+# pools, flushing spans) before gunicorn kills the worker.
+SHUTDOWN_GRACE = 5.0
+
+
+def _read(path: Path) -> Optional[str]:
+    try:
+        return path.read_text().strip()
+    except OSError:
+        return None
+
+
+def cpu_quota(root: Path = CGROUP_ROOT) -> Optional[float]:
+    """CPUs allowed by the cgroup CPU quota (v2 or v1), None when unlimited."""
+    limit = _read(root / "cpu.max")  # cgroup v2: "<quota> <period>" or "max <period>"
+    if limit is not None:
+        quota, _, period = limit.partition(" ")
+        if quota == "max" or not period:
+            return None
+        return int(quota) / int(period)
+    for directory in ("cpu", "cpu,cpuacct"):  # cgroup v1
+        cfs_quota = _read(root / directory / "cpu.cfs_quota_us")
+        cfs_period = _read(root / directory / "cpu.cfs_period_us")
+        if cfs_quota is not None and cfs_period is not None:
+            return None if int(cfs_quota) < 0 else int(cfs_quota) / int(cfs_period)
+    return None
+
+
+def available_cpus(root: Path = CGROUP_ROOT) -> float:
+    """CPUs this process can use: its affinity mask capped by the cgroup quota."""
+    try:
+        cpus = float(len(os.sched_getaffinity(0)))
+    except AttributeError:  # not on Linux
+        cpus = float(os.cpu_count() or 1)
+    quota = cpu_quota(root)
+    return min(cpus, quota) if quota is not None else cpus
+
+
+def worker_count(config: Settings, root: Path = CGROUP_ROOT) -> int:
+    """
+    ``config.workers`` if set, otherwise one worker per available CPU (rounded up).
+
+    Raises ``ValueError`` for several workers without Redis, since they
+    would not hear about each other's board writes.
+    """
+    if config.workers > 0:
+        if config.workers > 1 and not config.redis_enabled:
+            raise ValueError(
+                f"WORKERS={config.workers} needs Redis (REDIS_ENABLED=true) so workers "
+                "see each other's board writes; use WORKERS=1 without it"
+            )
+        return config.workers
+    if not config.redis_enabled:
+        return 1
+    return max(1, math.ceil(available_cpus(root)))
+
+
+def event_loop() -> str:
+    return "uvloop" if find_spec("uvloop") else "asyncio"
+
+
+def http_parser() -> str:
+    return "httptools" if find_spec("httptools") else "h11"
+
+
+class KanbanWorker(UvicornWorker):
+    """Uvicorn worker on uvloop/httptools that drains requests on SIGTERM."""
+
+    CONFIG_KWARGS = {"loop": event_loop(), "http": http_parser(), "lifespan": "on"}
+
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        super().__init__(*args, **kwargs)
+        self.config.timeout_graceful_shutdown = max(
+            self.cfg.graceful_timeout - SHUTDOWN_GRACE, 1
+        )
+
+
+def gunicorn_options(config: Settings, root: Path = CGROUP_ROOT) -> Dict[str, Any]:
+    """Gunicorn settings for ``config``."""
+    return {
+        "bind": f"{config.host}:{config.port}",
+        "workers": worker_count(config, root),
+        "worker_class": f"{KanbanWorker.__module__}.{KanbanWorker.__qualname__}",
+        "preload_app": True,
+        "max_requests": config.worker_max_requests,
+        "max_requests_jitter": config.worker_max_requests_jitter,
+        "graceful_timeout": math.ceil(config.graceful_timeout + SHUTDOWN_GRACE),
+        "keepalive": 5,
+        "loglevel": config.log_level.lower(),
+        "accesslog": None,
+        "child_exit": _child_exit,
+    }
+
+
+def _child_exit(server: Any, worker: Any) -> None:
+    from prometheus_client import multiprocess
+
+    # Drop the exited worker's live gauges; its counters stay in the totals.
+    multiprocess.mark_process_dead(worker.pid)
+
+
+class Server(BaseApplication):
+    """Gunicorn application serving the app built by ``create_app``."""
+
+    def __init__(self, config: Settings, options: Optional[Dict[str, Any]] = None):
+        self.settings = config
+        self.options = options if options is not None else gunicorn_options(config)
+        super().__init__()
+
+    def load_config(self) -> None:
+        for key, value in self.options.items():
+            self.cfg.set(key, value)
+
+    def load(self) -> Any:
+        from src.core.metrics import start_metrics_server
+        from src.main import create_app
+
+        app = create_app(self.settings)
+        if self.settings.enable_metrics:
+            # Started before forking, so workers skip it in their lifespan.
+            start_metrics_server(self.settings.metrics_port)
+        logger.info(
+            "Serving on %s with %d workers (%s, %s)",
+            self.options["bind"],
+            self.options["workers"],
+            event_loop(),
+            http_parser(),
+        )
+        # Move everything allocated so far out of the collector's reach, so
+        # collections in the workers do not touch the shared pages.
+        gc.freeze()
+        return app
+
+
+def serve(config: Settings) -> None:
+    """Run the production server, or uvicorn with auto-reload if ``config.reload``."""
+    if config.reload:
+        import uvicorn
+
+        uvicorn.run("src.main:app", host=config.host, port=config.port, reload=True)
+        return
+    # Must be set before prometheus_client is first imported (by the app).
+    if "PROMETHEUS_MULTIPROC_DIR" not in os.environ:
+        os.environ["PROMETHEUS_MULTIPROC_DIR"] = tempfile.mkdtemp(
+            prefix="kanban-metrics-"
+        )
+    Server(config).run()
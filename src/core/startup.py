@@ -0,0 +1,105 @@
+"""
+Startup-time profiling for the application factory.
+
+``profile_startup`` runs a fresh interpreter with ``-X importtime`` that
+imports ``src.main`` and calls ``create_app()``, so nothing already loaded in
+the calling process hides a cost. It returns the wall time of each phase and
+the per-module import times Python reports, from which ``format_profile``
+prints the slowest modules and the total per top-level package.
+"""
+import os
+import subprocess
+import sys
+from collections import defaultdict
+from pathlib import Path
+from typing import Dict, Iterable, List, NamedTuple
+
+ROOT = Path(__file__).resolve().parent.parent.parent
+
+_SCRIPT = """
+import time
+started = time.perf_counter()
+import src.main
+imported = time.perf_counter()
+src.main.create_app()
+print(imported - started, time.perf_counter() - imported)
+"""
+
+
+class ModuleTime(NamedTuple):
+    module: str
+    self_us: int  # time spent in the module body itself
+    cumulative_us: int  # including the modules it imported
+
+
+class StartupProfile(NamedTuple):
+    import_seconds: float
+    factory_seconds: float
+    modules: List[ModuleTime]
+
+    @property
+    def total_seconds(self) -> float:
+        return self.import_seconds + self.factory_seconds
+
+    def loaded(self, module: str) -> bool:
+        """Whether ``module`` (or any submodule of it) was imported."""
+        return any(
+            m.module == module or m.module.startswith(module + ".")
+            for m in self.modules
+        )
+
+
+def parse_importtime(lines: Iterable[str]) -> List[ModuleTime]:
+    """Parse ``import time: self | cumulative | name`` lines; others are skipped."""
+    modules = []
+    for line in lines:
+        if not line.startswith("import time:"):
+            continue
+        fields = line[len("import time:") :].split("|")
+        if len(fields) != 3 or not fields[0].strip().isdigit():
+            continue  # the header line
+        modules.append(ModuleTime(fields[2].strip(), int(fields[0]), int(fields[1])))
+    return modules
+
+
+def profile_startup(python: str = sys.executable) -> StartupProfile:
+    """Import the app and build it in a fresh interpreter, timing every import."""
+    result = subprocess.run(
+        [python, "-X", "importtime", "-c", _SCRIPT],
+        cwd=ROOT,
+        env=dict(os.environ, PYTHONDONTWRITEBYTECODE="1"),
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    import_seconds, factory_seconds = map(float, result.stdout.split()[-2:])
+    return StartupProfile(
+        import_seconds, factory_seconds, parse_importtime(result.stderr.splitlines())
+    )
+
+
+def package_totals(modules: Iterable[ModuleTime]) -> Dict[str, int]:
+    """Self time in microseconds summed per top-level package."""
+    totals: Dict[str, int] = defaultdict(int)
+    for module in modules:
+        totals[module.module.split(".")[0]] += module.self_us
+    return dict(totals)
+
+
+def format_profile(profile: StartupProfile, top: int = 25) -> str:
+    lines = [
+        f"import src.main  {profile.import_seconds * 1000:8.1f} ms",
+        f"create_app()     {profile.factory_seconds * 1000:8.1f} ms",
+        f"modules loaded   {len(profile.modules):8d}",
+        "",
+        f"{'package':<40} {'self ms':>9}",
+    ]
+    totals = sorted(package_totals(profile.modules).items(), key=lambda item: -item[1])
+    lines += [f"{name:<40} {us / 1000:9.1f}" for name, us in totals[:top]]
+    lines += ["", f"{'module':<60} {'self ms':>9} {'cumul. ms':>9}"]
+    slowest = sorted(profile.modules, key=lambda m: -m.self_us)[:top]
+    lines += [
+        f"{m.module:<60} {m.self_us / 1000:9.1f} {m.cumulative_us / 1000:9.1f}"
+        for m in slowest
+    ]
+    return "\n".join(lines)
@@ -0,0 +1,107 @@
+"""
+Tail sampling for traces.
+
+Head sampling has to decide before a request runs; the traces worth reading
+are the slow and failed ones, which it cannot tell apart. This processor
+holds a trace's spans until the trace finishes and then keeps it whole or
+drops it whole. Decisions are made per process, so a trace spanning several
+services is only complete where each keeps it; slow and failed traces
+usually are, and the sampled share is keyed on the trace ID so every
+process keeps the same ones.
+"""
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+from opentelemetry.context import Context
+from opentelemetry.sdk.trace import ReadableSpan, Span, SpanProcessor
+from opentelemetry.trace import StatusCode
+from prometheus_client import Counter
+
+# Spans kept per pending trace, and traces pending or remembered at once.
+MAX_SPANS_PER_TRACE = 1000
+MAX_TRACES = 10000
+
+TRACES_SAMPLED = Counter(
+    "tracing_tail_decisions_total",
+    "Traces finished under tail sampling by decision.",
+    ["decision"],
+)
+
+
+def decide(
+    root: ReadableSpan, spans: List[ReadableSpan], slow_ns: int, ratio: float
+) -> str:
+    """Why a finished trace is kept (``slow``/``error``/``sampled``) or ``dropped``."""
+    # Finished spans always have both times
+    if (root.end_time or 0) - (root.start_time or 0) >= slow_ns:
+        return "slow"
+    if any(s.status.status_code is StatusCode.ERROR for s in spans):
+        return "error"
+    attributes = root.attributes or {}
+    status = attributes.get(
+        "http.status_code", attributes.get("http.response.status_code")
+    )
+    if isinstance(status, int) and status >= 500:
+        return "error"
+    # Keyed on the trace ID so every process keeps the same traces.
+    if (root.context.trace_id & 0xFFFFFFFFFFFFFFFF) < ratio * 2**64:
+        return "sampled"
+    return "dropped"
+
+
+class TailSamplingProcessor(SpanProcessor):
+    """
+    Span processor exporting whole traces chosen after they finish.
+
+    Spans are buffered per trace until the trace's local root (a span with
+    no parent or a remote one) ends; the trace is then forwarded to
+    ``downstream`` if it was slow, failed or is in the sampled ``ratio``.
+    Spans ending after their root follow the decision already made.
+    """
+
+    def __init__(self, downstream: SpanProcessor, slow_seconds: float, ratio: float):
+        self.downstream = downstream
+        self.slow_ns = int(slow_seconds * 1e9)
+        self.ratio = ratio
+        self._pending: Dict[int, List[ReadableSpan]] = {}
+        self._decided: "OrderedDict[int, bool]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def on_start(self, span: Span, parent_context: Optional[Context] = None) -> None:
+        self.downstream.on_start(span, parent_context=parent_context)
+
+    def on_end(self, span: ReadableSpan) -> None:
+        trace_id = span.context.trace_id
+        local_root = span.parent is None or span.parent.is_remote
+        with self._lock:
+            keep = self._decided.get(trace_id)
+            if keep is None and not local_root:
+                spans = self._pending.get(trace_id)
+                if spans is None:
+                    if len(self._pending) >= MAX_TRACES:
+                        # Evict the oldest trace whose root never ended.
+                        del self._pending[next(iter(self._pending))]
+                    spans = self._pending[trace_id] = []
+                if len(spans) < MAX_SPANS_PER_TRACE:
+                    spans.append(span)
+                return
+            if keep is None:
+                spans = self._pending.pop(trace_id, [])
+                spans.append(span)
+                decision = decide(span, spans, self.slow_ns, self.ratio)
+                TRACES_SAMPLED.labels(decision).inc()
+                keep = self._decided[trace_id] = decision != "dropped"
+                if len(self._decided) > MAX_TRACES:
+                    self._decided.popitem(last=False)
+            else:
+                spans = [span]
+        if keep:
+            for finished in spans:
+                self.downstream.on_end(finished)
+
+    def shutdown(self) -> None:
+        self.downstream.shutdown()
+
+    def force_flush(self, timeout_millis: int = 30000) -> bool:
+        return self.downstream.force_flush(timeout_millis)
@@ -0,0 +1,126 @@
+"""
+Bounded cache of verified JWT payloads.
+
+Entries are keyed by a SHA-256 digest of the token (raw tokens are never
+kept) and expire at the token's ``exp`` claim or after ``max_ttl`` seconds,
+whichever comes first. Revoked digests are remembered until the token would
+have expired so a revoked token is rejected even if its signature is valid.
+"""
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from prometheus_client import Counter
+
+TOKEN_CACHE_REQUESTS = Counter(
+    "auth_token_cache_requests_total",
+    "Verified-token cache lookups by result.",
+    ["result"],
+)
+
+
+def token_digest(token: str) -> bytes:
+    """Return the cache key for a raw token."""
+    return hashlib.sha256(token.encode()).digest()
+
+
+class TokenCache:
+    """Thread-safe LRU cache of decoded token payloads with per-entry expiry."""
+
+    def __init__(self, maxsize: int = 10000, max_ttl: float = 300.0):
+        self.maxsize = maxsize
+        self.max_ttl = max_ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries: "OrderedDict[bytes, Tuple[float, Dict[str, Any]]]" = (
+            OrderedDict()
+        )
+        self._revoked: Dict[bytes, float] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, token: str) -> Optional[Dict[str, Any]]:
+        """Return a copy of the cached payload, or None on a miss."""
+        key = token_digest(token)
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > now:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                TOKEN_CACHE_REQUESTS.labels("hit").inc()
+                return dict(entry[1])
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+        TOKEN_CACHE_REQUESTS.labels("miss").inc()
+        return None
+
+    def put(self, token: str, payload: Dict[str, Any]) -> None:
+        """Cache a verified payload until its ``exp`` (capped at ``max_ttl``)."""
+        now = time.time()
+        expires_at = now + self.max_ttl
+        exp = payload.get("exp")
+        if isinstance(exp, (int, float)):
+            expires_at = min(expires_at, float(exp))
+        if expires_at <= now or self.maxsize <= 0:
+            return
+        key = token_digest(token)
+        with self._lock:
+            if key in self._revoked:
+                return
+            self._entries[key] = (expires_at, dict(payload))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def revoke(self, token: str, expires_at: Optional[float] = None) -> None:
+        """
+        Drop a token from the cache and reject it until ``expires_at``.
+
+        Without ``expires_at`` the cached ``exp`` (or ``max_ttl``) is used.
+        """
+        key = token_digest(token)
+        now = time.time()
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if expires_at is None:
+                expires_at = entry[0] if entry else now + self.max_ttl
+            self._revoked[key] = expires_at
+            self._prune_revoked(now)
+
+    def is_revoked(self, token: str) -> bool:
+        key = token_digest(token)
+        with self._lock:
+            expires_at = self._revoked.get(key)
+            if expires_at is None:
+                return False
+            if expires_at <= time.time():
+                del self._revoked[key]
+                return False
+            return True
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._revoked.clear()
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "size": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "revoked": len(self._revoked),
+        }
+
+    def _prune_revoked(self, now: float) -> None:
+        expired = [key for key, until in self._revoked.items() if until <= now]
+        for key in expired:
+            del self._revoked[key]
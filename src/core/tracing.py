@@ -0,0 +1,244 @@
+"""
+OpenTelemetry tracing and request correlation.
+
+With ``tracing_enabled`` the app records a trace per request: the FastAPI
+server span, SQLAlchemy queries, Redis commands and outgoing httpx calls
+from the standard instrumentations, plus spans of our own around the hot
+paths (token verification, password hashing, board loading and encoding,
+snapshot cache lookups) via ``span()``. OpenTelemetry is only imported when
+tracing is enabled; otherwise ``span()`` is a shared no-op context.
+
+Sampling happens twice. Head sampling (``tracing_sample_ratio``) decides
+when a trace starts whether it is recorded at all, following the caller's
+decision for propagated traces. Tail sampling (``tracing_tail_ratio`` < 1)
+holds each recorded trace's spans until its local root span ends and then
+exports the whole trace only if it was slow (``tracing_slow_threshold_ms``),
+failed, or falls in the sampled share of the rest, so the traces worth
+reading survive aggressive sampling.
+
+Every request gets a correlation ID (``X-Request-ID``, taken from the
+client when well-formed, generated otherwise, echoed on the response),
+and its path is kept in ``request_path`` for log sampling.
+``CorrelationFilter`` adds the ID and the current trace and span IDs to
+log records.
+"""
+import logging
+import os
+import re
+import uuid
+from contextlib import nullcontext
+from contextvars import ContextVar
+from typing import Any, ContextManager, Dict, List, Optional
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from .config import Settings
+
+logger = logging.getLogger(__name__)
+
+REQUEST_ID_HEADER = "X-Request-ID"
+_REQUEST_ID = re.compile(r"^[A-Za-z0-9._:-]{1,128}$")
+
+request_id: ContextVar[Optional[str]] = ContextVar("request_id", default=None)
+request_path: ContextVar[Optional[str]] = ContextVar("request_path", default=None)
+
+_tracer: Optional[Any] = None
+_provider: Optional[Any] = None
+_exporter: Optional[Any] = None
+_instrumentors: List[Any] = []
+
+
+class _NoSpan:
+    """Stands in for a span when tracing is off."""
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        pass
+
+    def set_attributes(self, attributes: Dict[str, Any]) -> None:
+        pass
+
+
+_NO_SPAN = nullcontext(_NoSpan())
+
+
+def span(name: str, attributes: Optional[Dict[str, Any]] = None) -> ContextManager[Any]:
+    """A span around a block while tracing is enabled, otherwise a no-op."""
+    if _tracer is None:
+        return _NO_SPAN
+    return _tracer.start_as_current_span(name, attributes=attributes)
+
+
+def enabled() -> bool:
+    return _tracer is not None
+
+
+def span_exporter() -> Optional[Any]:
+    """The exporter spans are sent to (an ``InMemorySpanExporter`` in tests)."""
+    return _exporter
+
+
+def correlation_ids() -> Dict[str, str]:
+    """The current request ID and trace/span IDs, ``-`` where there are none."""
+    ids = {"request_id": request_id.get() or "-", "trace_id": "-", "span_id": "-"}
+    if _tracer is not None:
+        from opentelemetry import trace
+
+        context = trace.get_current_span().get_span_context()
+        if context.is_valid:
+            ids["trace_id"] = format(context.trace_id, "032x")
+            ids["span_id"] = format(context.span_id, "016x")
+    return ids
+
+
+class CorrelationFilter(logging.Filter):
+    """Adds ``request_id``, ``trace_id`` and ``span_id`` to every record."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        for key, value in correlation_ids().items():
+            setattr(record, key, value)
+        return True
+
+
+class CorrelationMiddleware:
+    """ASGI middleware assigning each request a correlation ID."""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] not in ("http", "websocket"):
+            await self.app(scope, receive, send)
+            return
+        value = Headers(scope=scope).get(REQUEST_ID_HEADER)
+        if value is None or not _REQUEST_ID.match(value):
+            value = uuid.uuid4().hex
+        token = request_id.set(value)
+        path_token = request_path.set(scope["path"])
+        if _tracer is not None:
+            from opentelemetry import trace
+
+            trace.get_current_span().set_attribute("http.request_id", value)
+
+        async def send_wrapper(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                MutableHeaders(scope=message)[REQUEST_ID_HEADER] = value
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            request_id.reset(token)
+            request_path.reset(path_token)
+
+
+def _make_exporter(name: str) -> Any:
+    if name == "otlp":
+        # Endpoint, headers and protocol come from the OTEL_EXPORTER_OTLP_* variables.
+        from opentelemetry.exporter.otlp.proto.http.trace_exporter import (
+            OTLPSpanExporter,
+        )
+
+        return OTLPSpanExporter()
+    if name == "console":
+        from opentelemetry.sdk.trace.export import ConsoleSpanExporter
+
+        return ConsoleSpanExporter()
+    if name == "memory":
+        from opentelemetry.sdk.trace.export.in_memory_span_exporter import (
+            InMemorySpanExporter,
+        )
+
+        return InMemorySpanExporter()
+    raise ValueError(f"Unknown tracing exporter: {name}")
+
+
+def _instrument_libraries(provider: Any) -> None:
+    """Trace SQLAlchemy, Redis and httpx calls, skipping missing instrumentations."""
+    instrumentations = (
+        ("opentelemetry.instrumentation.sqlalchemy", "SQLAlchemyInstrumentor"),
+        ("opentelemetry.instrumentation.redis", "RedisInstrumentor"),
+        ("opentelemetry.instrumentation.httpx", "HTTPXClientInstrumentor"),
+    )
+    for module_name, class_name in instrumentations:
+        try:
+            module = __import__(module_name, fromlist=[class_name])
+        except ImportError:
+            logger.warning("%s is not installed; its calls are not traced", module_name)
+            continue
+        instrumentor = getattr(module, class_name)()
+        if not instrumentor.is_instrumented_by_opentelemetry:
+            instrumentor.instrument(tracer_provider=provider)
+            _instrumentors.append(instrumentor)
+
+
+def configure_tracing(config: Settings) -> bool:
+    """Set up the tracer provider, exporter and instrumentations; False if disabled."""
+    global _tracer, _provider, _exporter
+    if not config.tracing_enabled:
+        return False
+    if _provider is not None:
+        shutdown_tracing()
+
+    from opentelemetry.sdk.resources import Resource
+    from opentelemetry.sdk.trace import TracerProvider
+    from opentelemetry.sdk.trace.export import BatchSpanProcessor, SimpleSpanProcessor
+    from opentelemetry.sdk.trace.sampling import ParentBased, TraceIdRatioBased
+
+    resource = Resource.create(
+        {
+            "service.name": os.environ.get("OTEL_SERVICE_NAME", "simple-kanban"),
+            "service.version": config.app_version,
+            "deployment.environment": config.environment,
+        }
+    )
+    _provider = TracerProvider(
+        resource=resource,
+        sampler=ParentBased(TraceIdRatioBased(config.tracing_sample_ratio)),
+    )
+    _exporter = _make_exporter(config.tracing_exporter)
+    # In-memory spans must be readable as soon as the request returns.
+    if config.tracing_exporter == "memory":
+        processor: Any = SimpleSpanProcessor(_exporter)
+    else:
+        processor = BatchSpanProcessor(_exporter)
+    if config.tracing_tail_ratio < 1.0:
+        from .tail_sampling import TailSamplingProcessor
+
+        processor = TailSamplingProcessor(
+            processor,
+            config.tracing_slow_threshold_ms / 1000,
+            config.tracing_tail_ratio,
+        )
+    _provider.add_span_processor(processor)
+    _instrument_libraries(_provider)
+    _tracer = _provider.get_tracer("simple-kanban", config.app_version)
+    return True
+
+
+def instrument_app(app: Any) -> None:
+    """Add the FastAPI server span to ``app`` (probes and scrapes excluded)."""
+    if _provider is None:
+        return
+    try:
+        from opentelemetry.instrumentation.fastapi import FastAPIInstrumentor
+    except ImportError:
+        logger.warning(
+            "opentelemetry-instrumentation-fastapi is not installed; no request spans"
+        )
+        return
+    FastAPIInstrumentor.instrument_app(
+        app, tracer_provider=_provider, excluded_urls="health,metrics"
+    )
+
+
+def shutdown_tracing() -> None:
+    """Flush pending spans and undo the library instrumentations."""
+    global _tracer, _provider, _exporter
+    if _provider is None:
+        return
+    for instrumentor in _instrumentors:
+        instrumentor.uninstrument()
+    _instrumentors.clear()
+    _provider.shutdown()
+    _tracer = _provider = _exporter = None
@@ -1,89 +1,240 @@
 """
 FastAPI application entry point for simple-kanban.
 
-This module provides the main FastAPI application with health checks,
-basic routing, and error handling.
+``create_app(settings)`` builds the application with health checks, the API
+routers, middleware and error handling. Importing this module does not build
+anything: ``app`` is created by the factory on first access, and optional
+subsystems (NumPy for local search and reports, JWT and password hashing,
+the Redis client, OpenTelemetry unless tracing is enabled) are imported when
+first used rather than at startup, so new pods become ready sooner.
+``python -m src.main --profile-startup`` prints where cold start time goes.
 """
 
-from fastapi import FastAPI, HTTPException
+from fastapi import APIRouter, Depends, FastAPI, HTTPException, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
 from pydantic import BaseModel
-from typing import Dict, Any
+from typing import Callable, Dict, Any, Optional
+from contextlib import asynccontextmanager
+import asyncio
 import logging
+import sys
 
-# Configure logging
-logging.basicConfig(level=logging.INFO)
+from src.core import config, logs, tracing
+from src.core.config import Settings
+
+# Structured logs written off the event loop; records carry the request's
+# correlation and trace IDs
+logs.configure_logging(config.settings)
 logger = logging.getLogger(__name__)
 
-# Initialize FastAPI app
-app = FastAPI(
-    title="simple-kanban",
-    description="A containerized Python application",
-    version="1.0.0",
-    docs_url="/docs",
-    redoc_url="/redoc"
-)
-
-# Add CORS middleware
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],  # Configure appropriately for production
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
+
+def _lifespan(settings: Settings):
+    @asynccontextmanager
+    async def lifespan(app: FastAPI):
+        """Run background maintenance tasks for the lifetime of the app."""
+        from src.board.service import board_service
+        from src.board.tables import metadata
+        from src.core import outbox
+        from src.core.database import create_tables, dispose_engine
+        from src.core.hub import get_board_hub
+        from src.core.metrics import start_metrics_server
+        from src.core.redis_client import close_redis
+
+        if settings.enable_metrics:
+            start_metrics_server(settings.metrics_port)
+        if settings.db_create_tables:
+            await create_tables(metadata)
+        hub = get_board_hub()
+        # Boards other workers write to are reloaded from the database
+        hub.on_remote_change(board_service.mark_stale)
+        hub.on_missed_events(board_service.mark_all_stale)
+        tasks = [
+            asyncio.create_task(board_service.run_rebalancer()),
+            asyncio.create_task(hub.run()),
+        ]
+        dispatcher = None
+        if outbox.enabled(settings):
+            dispatcher = outbox.get_dispatcher(settings)
+            tasks.append(asyncio.create_task(dispatcher.run()))
+        api_key_auth = None
+        if settings.api_key_required:
+            from src.core.api_keys import get_api_key_auth
+
+            api_key_auth = get_api_key_auth(settings)
+            tasks.append(
+                asyncio.create_task(
+                    api_key_auth.run(settings.api_key_usage_flush_seconds)
+                )
+            )
+        yield
+        for task in tasks:
+            task.cancel()
+        # Let the tasks unwind before the clients they use are closed
+        await asyncio.gather(*tasks, return_exceptions=True)
+        if dispatcher is not None:
+            await dispatcher.close()
+        if api_key_auth is not None:
+            try:
+                await api_key_auth.flush_usage()
+            except Exception:
+                logger.exception("Final API key usage flush failed")
+        security = sys.modules.get("src.core.security")
+        if security is not None:  # only loaded once something authenticated
+            security.hashing_executor.shutdown()
+        await dispose_engine()
+        await close_redis()
+        tracing.shutdown_tracing()
+
+    return lifespan
+
 
 # Pydantic models
 class HealthResponse(BaseModel):
     status: str
     version: str
 
+
 class MessageRequest(BaseModel):
     message: str
 
+
 class MessageResponse(BaseModel):
     echo: str
     length: int
 
-@app.get("/", response_model=Dict[str, str])
+
+router = APIRouter()
+
+
+@router.get("/", response_model=Dict[str, str])
 async def root():
     """Root endpoint returning basic application info."""
-    return {
-        "message": "simple-kanban API",
-        "status": "running",
-        "docs": "/docs"
-    }
+    return {"message": "simple-kanban API", "status": "running", "docs": "/docs"}
+
 
-@app.get("/health", response_model=HealthResponse)
+@router.get("/health", response_model=HealthResponse)
 async def health_check():
     """Health check endpoint for container orchestration."""
-    return HealthResponse(
-        status="healthy",
-        version="1.0.0"
-    )
+    return HealthResponse(status="healthy", version="1.0.0")
 
-@app.post("/echo", response_model=MessageResponse)
+
+@router.post("/echo", response_model=MessageResponse)
 async def echo_message(request: MessageRequest):
     """Echo endpoint for testing API functionality."""
-    logger.info(f"Received message: {request.message}")
-    
+    logger.info("Received message: %s", request.message)
+
     if not request.message.strip():
         raise HTTPException(status_code=400, detail="Message cannot be empty")
-    
-    return MessageResponse(
-        echo=request.message,
-        length=len(request.message)
-    )
 
-@app.get("/metrics")
+    return MessageResponse(echo=request.message, length=len(request.message))
+
+
+@router.get("/metrics")
 async def metrics():
-    """Basic metrics endpoint."""
-    return {
-        "requests_total": 0,  # Implement proper metrics collection
-        "uptime_seconds": 0,
-        "memory_usage_mb": 0
-    }
+    """Prometheus metrics in the text exposition format."""
+    from src.core.metrics import render_metrics
+
+    body, content_type = render_metrics()
+    return Response(content=body, media_type=content_type)
+
+
+def create_app(settings: Optional[Settings] = None) -> FastAPI:
+    """Build the FastAPI application from ``settings`` (default: global settings).
+
+    Explicit ``settings`` also reconfigure logging, and the app's middleware,
+    rate limiter, outbox dispatcher and API-key authenticator follow them. The
+    database engine, Redis client, board cache, live-update hub and the
+    outbox destinations board writes are queued for are shared by the process
+    and always use ``config.settings``.
+    """
+    from src.api import analytics, attachments, board, realtime, reports, search
+    from src.core.compression import CompressionMiddleware
+    from src.core.metrics import PrometheusMiddleware
+    from src.core.rate_limit import RateLimitMiddleware
+
+    if settings is None:
+        settings = config.settings
+    else:
+        logs.configure_logging(settings)
+    tracing.configure_tracing(settings)
+    app = FastAPI(
+        title="simple-kanban",
+        description="A containerized Python application",
+        version="1.0.0",
+        docs_url="/docs",
+        redoc_url="/redoc",
+        default_response_class=ORJSONResponse,
+        lifespan=_lifespan(settings),
+    )
+
+    # Per-client token-bucket rate limits (inside CORS so 429s carry CORS headers)
+    # Only API keys that already authenticated get a bucket of their own
+    if settings.rate_limit_enabled:
+        key_verified: Optional[Callable[[str], bool]] = None
+        if settings.api_key_required:
+            from src.core.api_keys import is_verified as key_verified
+        app.add_middleware(
+            RateLimitMiddleware, key_verified=key_verified, config=settings
+        )
+
+    # Add CORS middleware
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=["*"],  # Configure appropriately for production
+        allow_credentials=True,
+        allow_methods=["*"],
+        allow_headers=["*"],
+    )
+
+    # Compress large responses with the client's preferred coding
+    if settings.compression_enabled:
+        app.add_middleware(
+            CompressionMiddleware,
+            minimum_size=settings.compression_minimum_size,
+            preferred=settings.compression_encodings,
+        )
+
+    # Record per-route request metrics
+    app.add_middleware(PrometheusMiddleware)
+
+    # Tag every request, its logs and its trace with an X-Request-ID
+    app.add_middleware(tracing.CorrelationMiddleware)
+
+    # Board routes and sockets need an X-API-Key when keys are required
+    api_dependencies = []
+    if settings.api_key_required:
+        from src.core.api_keys import require_api_key
+
+        api_dependencies.append(Depends(require_api_key))
+
+    app.include_router(router)
+    for api in (board, attachments, analytics, reports, realtime, search):
+        app.include_router(api.router, dependencies=api_dependencies)
+    tracing.instrument_app(app)
+    return app
+
+
+# Declared, not bound, so that module attribute access reaches ``__getattr__``
+app: FastAPI
+
+
+def __getattr__(name: str) -> Any:
+    # ``uvicorn src.main:app`` and ``from src.main import app`` build the app
+    # on first access; importing the module alone stays cheap.
+    if name == "app":
+        global app
+        app = create_app()
+        return app
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
 
 if __name__ == "__main__":
-    import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000)
+    if "--profile-startup" in sys.argv[1:]:
+        from src.core.startup import format_profile, profile_startup
+
+        print(format_profile(profile_startup()))
+    else:
+        from src.core.server import serve
+
+        serve(config.settings)
@@ -0,0 +1,24 @@
+"""
+Shared test configuration.
+
+Tests run without external services: boards persist to a throwaway SQLite
+database, Redis-backed features use the in-process stand-in, and the
+standalone metrics server and rate limits stay off, and attachments go to
+a temporary directory.
+"""
+
+import os
+import tempfile
+
+from sqlalchemy import create_engine
+
+_db_path = os.path.join(tempfile.mkdtemp(prefix="kanban-tests-"), "kanban.db")
+os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{_db_path}"
+os.environ.setdefault("REDIS_ENABLED", "false")
+os.environ.setdefault("ENABLE_METRICS", "false")
+os.environ.setdefault("RATE_LIMIT_ENABLED", "false")
+os.environ.setdefault("UPLOAD_PATH", tempfile.mkdtemp(prefix="kanban-uploads-"))
+
+from src.board.tables import metadata  # noqa: E402
+
+metadata.create_all(create_engine(f"sqlite:///{_db_path}"))
@@ -0,0 +1,214 @@
+"""
+Unit tests for incrementally maintained board analytics.
+"""
+
+import random
+from datetime import date, datetime, timedelta
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import delete, select
+
+from src.board import analytics, tables
+from src.board.analytics import Aggregates, TaskState, bucket_of, summarize
+from src.board.engine import BoardEngine
+from src.board.service import BoardService
+from src.core.database import session_scope
+from src.main import app
+
+client = TestClient(app)
+
+
+async def make_board(name):
+    service = BoardService(BoardEngine())
+    project = await service.create_project(name)
+    columns = [
+        await service.create_column(project.id, column)
+        for column in ("To Do", "Doing", "Done")
+    ]
+    return service, project, columns
+
+
+async def aggregate_rows(project_id):
+    async with session_scope() as session:
+        days = await session.execute(
+            select(tables.analytics_days)
+            .where(tables.analytics_days.c.project_id == project_id)
+            .order_by(tables.analytics_days.c.sprint)
+        )
+        buckets = await session.execute(
+            select(tables.cycle_time_buckets)
+            .where(tables.cycle_time_buckets.c.project_id == project_id)
+            .order_by(tables.cycle_time_buckets.c.bucket)
+        )
+        return [tuple(row) for row in days], [tuple(row) for row in buckets]
+
+
+@pytest.mark.asyncio
+async def test_task_writes_update_aggregates():
+    service, project, (todo, doing, done) = await make_board("Sprints")
+    a = await service.create_task(
+        project.id, todo.id, "a", metadata={"sprint": "S1", "points": 3}
+    )
+    b = await service.create_task(
+        project.id, todo.id, "b", metadata={"sprint": "S1", "points": 5}
+    )
+    c = await service.create_task(project.id, todo.id, "c", metadata={"sprint": "S2"})
+    await service.move_task(a.id, doing.id)
+    await service.move_task(a.id, done.id)
+    await service.move_task(b.id, done.id)
+    await service.update_task(b.id, metadata={"sprint": "S1", "points": 8})
+    await service.move_task(c.id, done.id)
+    await service.move_task(c.id, doing.id)  # reopened
+    await service.update_task(a.id, title="renamed")  # no analytic change
+    await service.delete_task(c.id)
+
+    async with session_scope() as session:
+        velocity = await analytics.velocity(session, project.id)
+        burndown = await analytics.burndown(session, project.id, "S1")
+        count, _, percentiles = await analytics.cycle_time(session, project.id)
+        events = (
+            await session.execute(
+                select(tables.task_events.c.state)
+                .where(tables.task_events.c.task_id == a.id)
+                .order_by(tables.task_events.c.id)
+            )
+        ).scalars()
+        assert list(events) == ["todo", "doing", "done"]
+
+    assert [(v.sprint, v.tasks_done, v.points_done) for v in velocity] == [
+        ("S1", 2, 11.0),
+        ("S2", 0, 0.0),
+    ]
+    today = burndown[-1]
+    assert len(burndown) == 1 and today.day == datetime.utcnow().date()
+    assert (today.remaining_tasks, today.remaining_points) == (0, 0.0)
+    assert (today.done_tasks, today.done_points) == (2, 11.0)
+    # a, b and c each completed once; c's completion is not undone by reopening it.
+    assert count == 3 and percentiles["p50"] < 1
+
+
+@pytest.mark.asyncio
+async def test_batch_records_net_change_per_task():
+    service, project, (todo, doing, done) = await make_board("Batch analytics")
+    task = await service.create_task(project.id, todo.id, "t", metadata={"points": 2})
+    operations = [
+        {"op": "move", "task_id": str(task.id), "column_id": str(doing.id)},
+        {"op": "move", "task_id": str(task.id), "column_id": str(done.id)},
+        {
+            "op": "create",
+            "column_id": str(done.id),
+            "title": "new",
+            "metadata": {"points": 1},
+        },
+        {"op": "create", "column_id": str(todo.id), "title": "gone"},
+    ]
+    response = client.post(
+        "/api/batch", json={"project_id": str(project.id), "operations": operations}
+    )
+    assert response.status_code == 200, response.text
+    gone = response.json()["results"][3]["task_id"]
+    client.post(
+        "/api/batch",
+        json={
+            "project_id": str(project.id),
+            "operations": [{"op": "delete", "task_id": gone}],
+        },
+    )
+
+    async with session_scope() as session:
+        velocity = await analytics.velocity(session, project.id)
+        states = (
+            await session.execute(
+                select(tables.task_events.c.state)
+                .where(tables.task_events.c.project_id == project.id)
+                .order_by(tables.task_events.c.id)
+            )
+        ).scalars()
+        assert list(states) == ["todo", "done", "done", "todo", "deleted"]
+    assert [(v.sprint, v.tasks_done, v.points_done) for v in velocity] == [
+        (None, 2, 3.0)
+    ]
+
+
+@pytest.mark.asyncio
+async def test_rebuild_matches_incremental_aggregates():
+    service, project, (todo, doing, done) = await make_board("Rebuild")
+    tasks = [
+        await service.create_task(
+            project.id, todo.id, f"t{i}", metadata={"sprint": f"S{i % 2}", "points": i}
+        )
+        for i in range(6)
+    ]
+    for task in tasks[:4]:
+        await service.move_task(task.id, doing.id)
+    for task in tasks[1:5]:
+        await service.move_task(task.id, done.id)
+    await service.update_task(tasks[2].id, metadata={"sprint": "S1", "points": 10})
+    await service.delete_task(tasks[3].id)
+    incremental = await aggregate_rows(project.id)
+    assert incremental[0] and incremental[1]
+
+    # Drop one task's history: rebuild seeds it from the current board.
+    async with session_scope() as session:
+        await session.execute(
+            delete(tables.task_events).where(
+                tables.task_events.c.task_id == tasks[5].id
+            )
+        )
+    assert await analytics.rebuild(project_id=project.id) == 16
+    assert await aggregate_rows(project.id) == incremental
+
+
+@pytest.mark.asyncio
+async def test_import_records_tasks():
+    service, project, (todo, _, done) = await make_board("Imported analytics")
+    lines = [
+        '{"type": "task", "title": "a", "column_id": "%s", "metadata": {"points": 2}}'
+        % done.id,
+        '{"type": "task", "title": "b", "column_id": "%s", "metadata": {"points": 3}}'
+        % todo.id,
+    ]
+    response = client.post(
+        f"/api/projects/{project.id}/import", content="\n".join(lines)
+    )
+    assert response.status_code == 200
+    days = client.get(f"/api/projects/{project.id}/burndown").json()["days"]
+    assert [(d["remaining_points"], d["done_points"]) for d in days] == [(3.0, 2.0)]
+
+
+def test_aggregates_and_percentiles():
+    aggregates = Aggregates()
+    pid = "p"
+    day = date(2024, 1, 1)
+    todo = TaskState("c1", "todo", "S1", 3.0)
+    done = TaskState("c3", "done", "S1", 3.0)
+    aggregates.add(pid, None, todo, day)
+    aggregates.add(pid, todo, done, day + timedelta(days=1), cycle_seconds=7200)
+    aggregates.add(pid, done, None, day + timedelta(days=2))
+    assert dict(aggregates.days) == {
+        (pid, "S1", day): [1, 3.0, 0, 0.0],
+        (pid, "S1", day + timedelta(days=1)): [0, 0.0, 1, 3.0],
+        (pid, "S1", day + timedelta(days=2)): [-1, -3.0, -1, -3.0],
+    }
+    assert list(aggregates.cycles) == [
+        (pid, "S1", day + timedelta(days=1), bucket_of(7200))
+    ]
+
+    rng = random.Random(7)
+    samples = sorted(rng.lognormvariate(11, 1.2) for _ in range(5000))
+    histogram = {}
+    for sample in samples:
+        histogram[bucket_of(sample)] = histogram.get(bucket_of(sample), 0) + 1
+    count, _, percentiles = summarize(sorted(histogram.items()))
+    assert count == 5000
+    for p in analytics.PERCENTILES:
+        exact = samples[int(len(samples) * p / 100) - 1] / 3600
+        assert percentiles[f"p{p}"] == pytest.approx(exact, rel=0.03)
+    assert summarize([]) == (0, None, {})
+
+
+def test_analytics_api_unknown_project():
+    missing = "00000000-0000-0000-0000-000000000000"
+    for report in ("velocity", "burndown", "cycle-time"):
+        assert client.get(f"/api/projects/{missing}/{report}").status_code == 404
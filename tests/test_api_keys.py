@@ -0,0 +1,89 @@
+"""
+Unit tests for API-key authentication.
+"""
+
+import pytest
+from fastapi.testclient import TestClient
+from starlette.websockets import WebSocketDisconnect
+
+from src.core import api_keys
+from src.core.api_keys import ApiKey, ApiKeyAuth, ApiKeyCache, get_api_key_auth
+from src.core.config import Settings
+from src.core.pubsub import InMemoryBus
+from src.main import create_app
+
+
+def test_key_prefix_and_hash():
+    key = "sk_" + "a" * 43
+    assert api_keys.key_prefix(key) == "a" * 12
+    assert api_keys.key_prefix("sk_short") is None
+    assert api_keys.key_prefix("pk_" + "a" * 43) is None
+    assert api_keys.hash_api_key(key, "one") != api_keys.hash_api_key(key, "two")
+    assert len(api_keys.hash_api_key(key)) == 64
+
+
+def test_cache_expires_evicts_and_drops(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(api_keys.time, "monotonic", lambda: now[0])
+    cache = ApiKeyCache(maxsize=2, ttl=60)
+    first, second, third = (ApiKey(i, f"k{i}", f"p{i}") for i in range(3))
+    cache.put("h1", first)
+    cache.put("h2", second)
+    assert cache.get("h1") == first
+    cache.put("h3", third)  # evicts h2, the least recently used
+    assert cache.get("h2") is None and len(cache) == 2
+    cache.drop(third.id)
+    assert cache.get("h3") is None
+    now[0] += 61
+    assert cache.get("h1") is None and len(cache) == 0
+
+
+@pytest.mark.asyncio
+async def test_authenticate_create_revoke_and_usage():
+    bus = InMemoryBus()
+    auth, other_worker = ApiKeyAuth(bus, ApiKeyCache()), ApiKeyAuth(bus, ApiKeyCache())
+    key, created = await auth.create("ci")
+
+    assert not auth.is_verified(key)
+    assert await auth.authenticate(key) == created
+    assert auth.is_verified(key)
+    assert await auth.authenticate(key) == created  # from the cache
+    assert await other_worker.authenticate(key) == created
+    assert await auth.authenticate(key[:-1] + ("A" if key[-1] != "A" else "B")) is None
+    assert await auth.authenticate("sk_" + created.prefix + "x" * 40) is None
+
+    assert await auth.flush_usage() == 1
+    assert await other_worker.flush_usage() == 1
+    assert await auth.flush_usage() == 0
+    (record,) = [r for r in await auth.list_keys() if r.id == created.id]
+    assert record.usage_count == 3 and record.last_used_at is not None
+
+    assert await auth.revoke(created.id)
+    assert not await auth.revoke(created.id)
+    # The revocation reached the other worker's cache through the bus.
+    assert len(other_worker.cache) == 0
+    assert not other_worker.is_verified(key)
+    assert await other_worker.authenticate(key) is None
+    (record,) = [r for r in await auth.list_keys() if r.id == created.id]
+    assert record.revoked_at is not None
+
+
+def test_api_routes_require_a_key_when_enabled():
+    with TestClient(create_app(Settings(api_key_required=True))) as client:
+        key, _ = client.portal.call(get_api_key_auth().create, "integration")
+        response = client.post("/api/projects", json={"name": "Locked"})
+        assert response.status_code == 401
+        assert response.headers["www-authenticate"] == "ApiKey"
+        assert client.get("/health").status_code == 200
+
+        headers = {"X-API-Key": key}
+        project = client.post(
+            "/api/projects", json={"name": "Open"}, headers=headers
+        ).json()
+        board = client.get(f"/api/projects/{project['id']}/board", headers=headers)
+        assert board.status_code == 200
+        with pytest.raises(WebSocketDisconnect):
+            with client.websocket_connect(f"/ws/projects/{project['id']}") as websocket:
+                websocket.receive_json()
+        with client.websocket_connect(f"/ws/projects/{project['id']}", headers=headers):
+            pass
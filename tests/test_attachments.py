@@ -0,0 +1,215 @@
+"""
+Unit tests for task attachments.
+"""
+
+import asyncio
+import hashlib
+
+import pytest
+from fastapi.testclient import TestClient
+
+from src.core.attachments import (
+    BlobResponse,
+    RangeNotSatisfiableError,
+    byte_range,
+    clean_filename,
+    get_attachment_store,
+)
+from src.main import app
+
+client = TestClient(app)
+store = get_attachment_store()
+
+CONTENT = b"0123456789" * 100
+
+
+def make_task():
+    pid = client.post("/api/projects", json={"name": "Files"}).json()["id"]
+    column = client.post(f"/api/projects/{pid}/columns", json={"name": "To Do"}).json()
+    task = client.post(
+        f"/api/projects/{pid}/tasks", json={"title": "Logs", "column_id": column["id"]}
+    )
+    return task.json()["id"]
+
+
+def upload(
+    task_id, content=CONTENT, filename="build.log", content_type="text/plain", **kwargs
+):
+    return client.post(
+        f"/api/tasks/{task_id}/attachments",
+        params={"filename": filename},
+        content=content,
+        headers={"Content-Type": content_type},
+        **kwargs,
+    )
+
+
+def stored_files(directory):
+    path = store.root / directory
+    return sorted(p for p in path.rglob("*") if p.is_file()) if path.exists() else []
+
+
+def test_upload_list_and_download():
+    task_id = make_task()
+    response = upload(task_id, filename="C:\\logs\\build.log")
+    assert response.status_code == 201
+    attachment = response.json()
+    assert attachment["filename"] == "build.log"
+    assert attachment["size"] == len(CONTENT)
+    assert attachment["sha256"] == hashlib.sha256(CONTENT).hexdigest()
+    assert client.get(f"/api/tasks/{task_id}/attachments").json() == [attachment]
+
+    url = f"/api/attachments/{attachment['id']}"
+    download = client.get(url, headers={"Accept-Encoding": "gzip"})
+    assert download.status_code == 200
+    assert download.content == CONTENT
+    assert download.headers["content-type"].startswith("text/plain")
+    assert download.headers["content-length"] == str(len(CONTENT))
+    assert "content-encoding" not in download.headers
+    assert download.headers["accept-ranges"] == "bytes"
+    assert download.headers["content-disposition"].startswith(
+        'attachment; filename="build.log"'
+    )
+    etag = download.headers["etag"]
+    assert client.get(url, headers={"If-None-Match": etag}).status_code == 304
+
+    head = client.head(url)
+    assert head.status_code == 200 and head.content == b""
+    assert head.headers["content-length"] == str(len(CONTENT))
+
+    assert client.delete(url).status_code == 204
+    assert client.get(url).status_code == 404
+    assert client.delete(url).status_code == 404
+
+
+def test_range_requests():
+    task_id = make_task()
+    url = f"/api/attachments/{upload(task_id).json()['id']}"
+
+    def get_range(value, **headers):
+        return client.get(url, headers={"Range": value, **headers})
+
+    partial = get_range("bytes=10-19")
+    assert partial.status_code == 206
+    assert partial.content == CONTENT[10:20]
+    assert partial.headers["content-range"] == f"bytes 10-19/{len(CONTENT)}"
+    assert get_range("bytes=-5").content == CONTENT[-5:]
+    assert get_range("bytes=995-").content == CONTENT[995:]
+    assert get_range("bytes=990-5000").content == CONTENT[990:]
+
+    unsatisfiable = get_range("bytes=1000-")
+    assert unsatisfiable.status_code == 416
+    assert unsatisfiable.headers["content-range"] == f"bytes */{len(CONTENT)}"
+
+    etag = partial.headers["etag"]
+    assert get_range("bytes=0-0", **{"If-Range": etag}).status_code == 206
+    stale = get_range("bytes=0-0", **{"If-Range": '"other"'})
+    assert stale.status_code == 200 and stale.content == CONTENT
+    assert get_range("bytes=0-1,5-6").status_code == 200
+
+
+def test_identical_uploads_share_one_blob():
+    task_id = make_task()
+    content = b"screenshot bytes " * 4096
+    first = upload(task_id, content, "one.png").json()
+    second = upload(make_task(), content, "two.png").json()
+    assert first["id"] != second["id"]
+    assert first["sha256"] == second["sha256"]
+    assert stored_files("blobs").count(store.blob_path(first["sha256"])) == 1
+    assert client.get(f"/api/attachments/{second['id']}").content == content
+
+
+def test_oversized_uploads_rejected(monkeypatch):
+    monkeypatch.setattr(store, "max_size", 100)
+    task_id = make_task()
+    declared = upload(task_id, b"x" * 101)
+    assert declared.status_code == 413
+
+    def chunks():  # no Content-Length: caught while streaming
+        for _ in range(10):
+            yield b"y" * 50
+
+    streamed = upload(task_id, chunks())
+    assert streamed.status_code == 413
+    assert stored_files("tmp") == []
+    assert client.get(f"/api/tasks/{task_id}/attachments").json() == []
+
+    assert upload(task_id, b"z" * 100).status_code == 201
+
+
+def test_upload_errors():
+    missing = "00000000-0000-0000-0000-000000000000"
+    assert upload(missing).status_code == 404
+    assert client.get(f"/api/tasks/{missing}/attachments").status_code == 404
+    form = client.post(
+        f"/api/tasks/{make_task()}/attachments",
+        params={"filename": "a.txt"},
+        files={"file": ("a.txt", b"data")},
+    )
+    assert form.status_code == 415
+    task_id = make_task()
+    for content_type in ("text", "text/plain; " + "x" * 250):
+        assert upload(task_id, content_type=content_type).status_code == 422
+    assert client.get(f"/api/tasks/{task_id}/attachments").json() == []
+    upload(task_id, content_type="text/plain; charset=utf-8").raise_for_status()
+
+
+def test_prune_removes_only_unreferenced_blobs():
+    task_id = make_task()
+    kept = upload(task_id, b"kept").json()
+    dropped = upload(task_id, b"dropped").json()
+    client.delete(f"/api/attachments/{dropped['id']}")
+    # Within the grace period nothing is removed.
+    asyncio.run(store.prune())
+    assert store.blob_path(dropped["sha256"]).exists()
+
+    asyncio.run(store.prune(grace=-1))
+    assert not store.blob_path(dropped["sha256"]).exists()
+    assert store.blob_path(kept["sha256"]).exists()
+    assert client.get(f"/api/attachments/{kept['id']}").content == b"kept"
+
+
+def test_missing_blob_is_gone_not_truncated():
+    attachment = upload(make_task(), b"lost with its volume").json()
+    store.blob_path(attachment["sha256"]).unlink()
+    url = f"/api/attachments/{attachment['id']}"
+    response = client.get(url)
+    assert response.status_code == 410
+    assert response.json() == {"detail": "Attachment content is missing"}
+    assert "etag" not in response.headers
+    assert client.head(url).status_code == 410
+
+
+def test_zero_copy_send_when_server_supports_it(tmp_path):
+    path = tmp_path / "blob"
+    path.write_bytes(CONTENT)
+    messages = []
+
+    async def send(message):
+        messages.append(message)
+
+    scope = {
+        "type": "http",
+        "method": "GET",
+        "extensions": {"http.response.zerocopysend": {}},
+    }
+    asyncio.run(BlobResponse(path, 10, 20, 206)(scope, None, send))
+    start, body = messages
+    assert (b"content-length", b"20") in start["headers"]
+    assert body["type"] == "http.response.zerocopysend"
+    assert (body["offset"], body["count"]) == (10, 20)
+
+
+def test_byte_range_parsing():
+    assert byte_range(None, 10) is None
+    assert byte_range("items=0-1", 10) is None
+    assert byte_range("bytes=abc", 10) is None
+    assert byte_range("bytes=5-2", 10) is None
+    assert byte_range("bytes=2-4", 10) == (2, 4)
+    assert byte_range("bytes=-20", 10) == (0, 9)
+    for header, size in (("bytes=10-", 10), ("bytes=-0", 10), ("bytes=-1", 0)):
+        with pytest.raises(RangeNotSatisfiableError):
+            byte_range(header, size)
+    assert clean_filename("../../etc/passwd") == "passwd"
+    assert clean_filename("bad\nname.txt") == "badname.txt"
+    assert clean_filename("/") == "attachment"
@@ -0,0 +1,77 @@
+"""
+Unit tests for the API load test harness.
+"""
+
+import argparse
+
+import pytest
+
+from benchmarks.bench_api import (
+    BUDGETS_MS,
+    asgi_client,
+    budgets_for,
+    check,
+    drive,
+    parse_mix,
+    percentile,
+    seed,
+)
+
+
+def stats(p95_ms, errors=0):
+    return {
+        "p95_ms": p95_ms,
+        "errors": errors,
+        "error_statuses": {"500": errors} if errors else {},
+    }
+
+
+def test_percentile_nearest_rank():
+    values = [float(v) for v in range(1, 101)]
+    assert [percentile(values, q) for q in (50, 95, 99)] == [50.0, 95.0, 99.0]
+    assert percentile([7.0], 99) == 7.0
+    assert percentile([], 50) == 0.0
+
+
+def test_check_budgets_errors_and_regressions():
+    baseline = {"operations": {"board": stats(20.0), "move": stats(1.0)}}
+    results = {
+        "operations": {
+            "board": stats(26.0),  # +30%: regression
+            "move": stats(2.5),  # +150% but under the absolute noise floor
+            # Over budget, failed requests, no baseline
+            "search": stats(120.0, errors=2),
+        }
+    }
+    failures = check(results, baseline, threshold=0.25)
+    assert len(failures) == 3
+    assert failures[0].startswith("board: p95 26.0 ms regressed from 20.0 ms")
+    assert failures[1] == "search: 2 failed requests (2x 500)"
+    assert failures[2] == "search: p95 120.0 ms over the 100 ms budget"
+    assert check(results, baseline, threshold=0.5, budgets={}) == failures[1:2]
+
+
+def test_move_allowance_only_applies_to_sqlite():
+    assert budgets_for("postgresql+asyncpg://db/kanban") is BUDGETS_MS
+    sqlite = budgets_for("sqlite+aiosqlite:///bench.db")
+    assert sqlite["move"] > BUDGETS_MS["move"]
+    assert {k: v for k, v in sqlite.items() if k != "move"} == {
+        k: v for k, v in BUDGETS_MS.items() if k != "move"
+    }
+
+
+def test_parse_mix():
+    assert parse_mix("board=3,move=1") == {"board": 3, "move": 1}
+    with pytest.raises(argparse.ArgumentTypeError):
+        parse_mix("board=1,delete=1")
+
+
+@pytest.mark.asyncio
+async def test_mix_runs_in_process_without_errors():
+    async with asgi_client() as client:
+        boards = await seed(client, boards=2, cards=30)
+        assert all(len(board.task_ids) == 30 for board in boards)
+        results = await drive(client, boards, requests=60, concurrency=3)
+    assert results["requests"] == 60
+    assert set(results["operations"]) == {"board", "move", "search", "import"}
+    assert all(stats["errors"] == 0 for stats in results["operations"].values())
@@ -0,0 +1,536 @@
+"""
+Unit tests for the board engine, rank keys, persistence and board API.
+"""
+
+import asyncio
+import json
+import random
+from contextlib import asynccontextmanager
+from uuid import UUID, uuid4
+
+import pytest
+from fastapi.testclient import TestClient
+
+from src.board import store, transfer
+from src.board.engine import BoardEngine, InvalidMoveError, NotFoundError, RankedIndex
+from src.board.ranking import rank_between, rank_sequence, validate_rank
+from src.board.service import BoardService, board_service
+from src.main import app
+
+client = TestClient(app)
+
+
+def column_titles(engine, column_id):
+    return [task.title for task in engine.iter_tasks(column_id)]
+
+
+@pytest.fixture
+def board():
+    engine = BoardEngine()
+    project = engine.create_project("Demo")
+    todo = engine.create_column(project.id, "To Do")
+    done = engine.create_column(project.id, "Done")
+    tasks = [engine.create_task(project.id, todo.id, f"t{i}") for i in range(5)]
+    return engine, project, todo, done, tasks
+
+
+def test_rank_between_orders_keys():
+    """Generated ranks sort strictly between their bounds."""
+    assert "" < rank_between()
+    low = rank_between()
+    high = rank_between(low, None)
+    mid = rank_between(low, high)
+    assert low < mid < high
+    assert rank_between(None, low) < low
+
+
+def test_rank_between_repeated_inserts_stay_valid():
+    """Inserting repeatedly at the same spot never runs out of room."""
+    low = rank_between()
+    high = rank_between(low, None)
+    for _ in range(200):
+        high = rank_between(low, high)
+        assert low < validate_rank(high)
+
+
+def test_rank_between_rejects_inverted_bounds():
+    with pytest.raises(ValueError):
+        rank_between("a2", "a1")
+
+
+def test_rank_between_appends_grow_logarithmically():
+    rank = None
+    for _ in range(100000):
+        rank = rank_between(rank, None)
+    assert len(rank) <= 5
+
+
+def test_rank_sequence_is_sorted_and_unique():
+    ranks = rank_sequence(5000)
+    assert ranks == sorted(set(ranks))
+    assert all(validate_rank(rank) for rank in ranks)
+
+
+def test_ranked_index_matches_sorted_list():
+    """The chunked index behaves like a sorted list under random churn."""
+    index = RankedIndex(load=4)
+    expected = []
+    rng = random.Random(7)
+    for value in range(300):
+        entry = (f"{rng.random():.6f}", value)
+        index.add(entry)
+        expected.append(entry)
+        if rng.random() < 0.3:
+            victim = expected.pop(rng.randrange(len(expected)))
+            index.remove(victim)
+    expected.sort()
+    assert list(index) == expected
+    assert len(index) == len(expected)
+    assert index.successor(expected[10]) == expected[11]
+    assert index.predecessor(expected[10]) == expected[9]
+    assert index.predecessor(expected[0]) is None
+    assert index.successor(expected[-1]) is None
+
+
+def test_move_within_column(board):
+    engine, project, todo, _, tasks = board
+    version = project.version
+    engine.move_task(tasks[4].id, todo.id, after_id=tasks[0].id)
+    assert column_titles(engine, todo.id) == ["t0", "t4", "t1", "t2", "t3"]
+    engine.move_task(tasks[3].id, todo.id, before_id=tasks[0].id)
+    assert column_titles(engine, todo.id) == ["t3", "t0", "t4", "t1", "t2"]
+    assert project.version == version + 2
+
+
+def test_move_between_columns_touches_only_moved_task(board):
+    engine, _, todo, done, tasks = board
+    before = {task.id: task.rank for task in tasks}
+    moved = engine.move_task(tasks[2].id, done.id)
+    assert moved.column_id == done.id
+    assert column_titles(engine, done.id) == ["t2"]
+    assert column_titles(engine, todo.id) == ["t0", "t1", "t3", "t4"]
+    changed = [task.id for task in tasks if task.rank != before[task.id]]
+    assert changed == [tasks[2].id]
+
+
+def test_move_rejects_non_adjacent_neighbours(board):
+    engine, _, todo, _, tasks = board
+    with pytest.raises(InvalidMoveError):
+        engine.move_task(
+            tasks[4].id, todo.id, after_id=tasks[0].id, before_id=tasks[2].id
+        )
+    # The failed move leaves the column untouched.
+    assert column_titles(engine, todo.id) == ["t0", "t1", "t2", "t3", "t4"]
+
+
+def test_move_rejects_unknown_neighbour_column(board):
+    engine, _, _, done, tasks = board
+    with pytest.raises(InvalidMoveError):
+        engine.move_task(tasks[0].id, done.id, after_id=tasks[1].id)
+    with pytest.raises(NotFoundError):
+        engine.get_task(done.id)
+
+
+def test_long_ranks_are_queued_and_rebalanced(board):
+    engine, _, todo, _, tasks = board
+    engine.max_rank_length = 4
+    for _ in range(40):
+        engine.move_task(tasks[4].id, todo.id, after_id=tasks[0].id)
+        engine.move_task(tasks[3].id, todo.id, after_id=tasks[0].id)
+    assert todo.id in engine.pending_rebalance
+    order = column_titles(engine, todo.id)
+    assert engine.rebalance_pending() == 5
+    assert column_titles(engine, todo.id) == order
+    assert all(len(task.rank) <= 4 for task in engine.iter_tasks(todo.id))
+    assert not engine.pending_rebalance
+
+
+def test_board_api_roundtrip():
+    """Create a board through the API, move a card and read it back."""
+    project = client.post("/api/projects", json={"name": "API"}).json()
+    pid = project["id"]
+    todo = client.post(f"/api/projects/{pid}/columns", json={"name": "To Do"}).json()
+    done = client.post(f"/api/projects/{pid}/columns", json={"name": "Done"}).json()
+    first = client.post(
+        f"/api/projects/{pid}/tasks", json={"title": "first", "column_id": todo["id"]}
+    ).json()
+    client.post(
+        f"/api/projects/{pid}/tasks", json={"title": "second", "column_id": todo["id"]}
+    )
+
+    response = client.put(
+        f"/api/tasks/{first['id']}/move", json={"column_id": done["id"]}
+    )
+    assert response.status_code == 200
+    assert response.json()["column_id"] == done["id"]
+
+    board_data = client.get(f"/api/projects/{pid}/board").json()
+    assert [c["name"] for c in board_data["columns"]] == ["To Do", "Done"]
+    assert [t["title"] for t in board_data["columns"][0]["tasks"]] == ["second"]
+    assert [t["title"] for t in board_data["columns"][1]["tasks"]] == ["first"]
+
+
+def test_board_api_errors():
+    project = client.post("/api/projects", json={"name": "Errors"}).json()
+    missing = "00000000-0000-0000-0000-000000000000"
+    assert client.get(f"/api/projects/{missing}/board").status_code == 404
+    response = client.post(
+        f"/api/projects/{project['id']}/tasks",
+        json={"title": "x", "column_id": missing},
+    )
+    assert response.status_code == 404
+
+
+def test_board_api_validates_before_writing():
+    pid = client.post("/api/projects", json={"name": "Validation"}).json()["id"]
+    todo = client.post(f"/api/projects/{pid}/columns", json={"name": "To Do"}).json()
+    task = client.post(
+        f"/api/projects/{pid}/tasks", json={"title": "task", "column_id": todo["id"]}
+    ).json()
+
+    for field in ("title", "metadata"):
+        response = client.put(f"/api/tasks/{task['id']}", json={field: None})
+        assert response.status_code == 422
+    response = client.put(f"/api/tasks/{task['id']}", json={"description": None})
+    assert response.status_code == 200
+    response = client.post(
+        "/api/batch",
+        json={
+            "project_id": pid,
+            "operations": [{"op": "update", "task_id": task["id"], "title": None}],
+        },
+    )
+    assert response.status_code == 422
+
+    too_long = [
+        ("/api/projects", {"name": "p" * 256}),
+        (f"/api/projects/{pid}/columns", {"name": "c" * 101}),
+        (f"/api/projects/{pid}/columns", {"name": "Done", "color": "#abcdef0"}),
+        (f"/api/projects/{pid}/tasks", {"title": "t" * 256, "column_id": todo["id"]}),
+    ]
+    for path, body in too_long:
+        assert client.post(path, json=body).status_code == 422
+    response = client.put(f"/api/tasks/{task['id']}", json={"title": "t" * 256})
+    assert response.status_code == 422
+
+    board_data = client.get(f"/api/projects/{pid}/board").json()
+    assert [c["name"] for c in board_data["columns"]] == ["To Do"]
+    assert board_data["columns"][0]["tasks"][0]["title"] == "task"
+    assert UUID(pid) in board_service.engine.projects
+
+
+def test_changes_since_reports_changed_and_deleted_tasks(board):
+    engine, project, todo, done, tasks = board
+    start = project.version
+    engine.move_task(tasks[1].id, done.id)
+    engine.update_task(tasks[2].id, title="renamed")
+    engine.delete_task(tasks[3].id)
+    changes = engine.changes_since(project.id, start)
+    assert changes.version == project.version
+    assert {task.id for task in changes.tasks} == {tasks[1].id, tasks[2].id}
+    assert changes.deleted_task_ids == [tasks[3].id]
+    assert changes.columns == []
+    assert engine.changes_since(project.id, project.version).tasks == []
+
+
+def test_changes_since_includes_rebalanced_columns(board):
+    engine, project, todo, _, tasks = board
+    start = project.version
+    engine.rebalance_column(todo.id)
+    changes = engine.changes_since(project.id, start)
+    assert {task.id for task in changes.tasks} == {task.id for task in tasks}
+
+
+def test_changes_since_requires_retained_history():
+    engine = BoardEngine(change_log_size=3)
+    project = engine.create_project("Trimmed")
+    column = engine.create_column(project.id, "To Do")
+    for index in range(10):
+        engine.create_task(project.id, column.id, f"t{index}")
+    assert engine.changes_since(project.id, 0) is None
+    assert engine.changes_since(project.id, project.version + 1) is None
+    assert len(engine.changes_since(project.id, project.version - 2).tasks) == 2
+
+
+def test_board_api_delta_and_etag():
+    pid = client.post("/api/projects", json={"name": "Sync"}).json()["id"]
+    column = client.post(f"/api/projects/{pid}/columns", json={"name": "To Do"}).json()
+    task = client.post(
+        f"/api/projects/{pid}/tasks", json={"title": "one", "column_id": column["id"]}
+    ).json()
+
+    full = client.get(f"/api/projects/{pid}/board")
+    etag = full.headers["etag"]
+    version = full.json()["project"]["version"]
+    unchanged = client.get(
+        f"/api/projects/{pid}/board", headers={"If-None-Match": etag}
+    )
+    assert unchanged.status_code == 304
+    assert unchanged.content == b""
+
+    client.put(f"/api/tasks/{task['id']}", json={"title": "two"})
+    changed = client.get(f"/api/projects/{pid}/board", headers={"If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.headers["etag"] != etag
+
+    delta = client.get(f"/api/projects/{pid}/board", params={"since": version}).json()
+    assert delta["since"] == version
+    assert [t["title"] for t in delta["tasks"]] == ["two"]
+    assert delta["deleted_task_ids"] == []
+
+    full_fallback = client.get(
+        f"/api/projects/{pid}/board", params={"since": 10**6}
+    ).json()
+    assert "columns" in full_fallback and "since" not in full_fallback
+
+
+def test_board_survives_reload_from_database():
+    pid = client.post("/api/projects", json={"name": "Persisted"}).json()["id"]
+    todo = client.post(f"/api/projects/{pid}/columns", json={"name": "To Do"}).json()
+    done = client.post(f"/api/projects/{pid}/columns", json={"name": "Done"}).json()
+    tasks = [
+        client.post(
+            f"/api/projects/{pid}/tasks",
+            json={"title": f"t{i}", "column_id": todo["id"]},
+        ).json()
+        for i in range(3)
+    ]
+    client.put(
+        f"/api/tasks/{tasks[2]['id']}/move",
+        json={"column_id": todo["id"], "before_id": tasks[0]["id"]},
+    )
+    client.put(f"/api/tasks/{tasks[1]['id']}/move", json={"column_id": done["id"]})
+    client.put(f"/api/tasks/{tasks[0]['id']}", json={"title": "renamed"})
+    before = client.get(f"/api/projects/{pid}/board").json()
+
+    board_service.engine.unload_project(UUID(pid))
+    assert client.get(f"/api/tasks/{tasks[1]['id']}").json()["column_id"] == done["id"]
+    after = client.get(f"/api/projects/{pid}/board").json()
+    assert after["columns"] == before["columns"]
+    assert [t["title"] for t in after["columns"][0]["tasks"]] == ["t2", "renamed"]
+    # Versions keep increasing across reloads, so stale deltas fall back to a
+    # full board.
+    assert (
+        board_service.engine.projects[UUID(pid)].version > before["project"]["version"]
+    )
+
+
+@pytest.mark.asyncio
+async def test_stale_board_reloads_on_next_access():
+    service = BoardService(BoardEngine())
+    project = await service.create_project("Shared")
+    column = await service.create_column(project.id, "To Do")
+    task = await service.create_task(project.id, column.id, "mine")
+    # Another worker renames the task: it reaches the database, not this engine.
+    other = BoardService(BoardEngine())
+    await other.update_task(task.id, title="theirs")
+    assert (await service.task(task.id)).title == "mine"
+
+    service.mark_stale(project.id)
+    service.mark_stale(uuid4())  # boards this worker never loaded are ignored
+    assert (await service.task(task.id)).title == "theirs"
+    assert (await service.project(project.id)) is not project
+    assert (await service.project(project.id)) is service.engine.projects[project.id]
+
+
+@pytest.mark.asyncio
+async def test_stale_write_retries_without_reverting_other_writes():
+    service = BoardService(BoardEngine())
+    project = await service.create_project("Replicas")
+    todo = await service.create_column(project.id, "To Do")
+    done = await service.create_column(project.id, "Done")
+    task = await service.create_task(project.id, todo.id, "draft")
+    # Another worker moves the task and this one is never told.
+    other = BoardService(BoardEngine())
+    await other.move_task(task.id, done.id)
+
+    renamed = await service.update_task(task.id, title="final")
+    assert (renamed.title, renamed.column_id) == ("final", done.id)
+    assert service.engine.projects[project.id] is not project
+    reloaded = BoardService(BoardEngine())
+    stored = await reloaded.task(task.id)
+    assert (stored.title, stored.column_id) == ("final", done.id)
+
+
+@pytest.mark.asyncio
+async def test_stale_rebalance_is_skipped():
+    service = BoardService(BoardEngine(max_rank_length=4))
+    project = await service.create_project("Stale ranks")
+    column = await service.create_column(project.id, "To Do")
+    tasks = [
+        await service.create_task(project.id, column.id, f"t{i}") for i in range(3)
+    ]
+    for _ in range(30):
+        await service.move_task(tasks[2].id, column.id, after_id=tasks[0].id)
+        await service.move_task(tasks[1].id, column.id, after_id=tasks[0].id)
+    other = BoardService(BoardEngine())
+    added = await other.create_task(project.id, column.id, "added elsewhere")
+
+    assert await service.rebalance_pending() == 0
+    assert project.id not in service.engine.projects
+    await service.project(project.id)
+    assert service.engine.tasks[added.id].rank == added.rank
+
+
+@pytest.mark.asyncio
+async def test_imports_and_concurrent_writes_share_the_loaded_board():
+    service = BoardService(BoardEngine())
+    project = await service.create_project("Busy")
+    column = await service.create_column(project.id, "To Do")
+    tasks = [
+        await service.create_task(project.id, column.id, f"t{i}") for i in range(4)
+    ]
+    line = {"type": "task", "title": "imported", "column_id": str(column.id)}
+
+    async def body():
+        yield json.dumps(line).encode() + b"\n"
+
+    await asyncio.gather(
+        transfer.import_board(service, project.id, body()),
+        *(
+            service.update_task(task.id, title=f"renamed {task.title}")
+            for task in tasks
+        ),
+        service.create_task(project.id, column.id, "created"),
+        transfer.import_board(service, project.id, body()),
+    )
+    # Nothing conflicted: the imports added their rows to the loaded copy.
+    assert service.engine.projects[project.id] is project
+    loaded = [(t.rank, t.title) for t in service.engine.iter_tasks(column.id)]
+    reloaded = BoardService(BoardEngine())
+    await reloaded.project(project.id)
+    stored = [(t.rank, t.title) for t in reloaded.engine.iter_tasks(column.id)]
+    assert loaded == stored
+    assert len({rank for rank, _ in stored}) == 7
+    assert sorted(title for _, title in stored) == sorted(
+        [f"renamed t{i}" for i in range(4)] + ["created"] + ["imported"] * 2
+    )
+
+
+def test_repeated_conflict_returns_409(monkeypatch):
+    pid = client.post("/api/projects", json={"name": "Contended"}).json()["id"]
+    cid = client.post(f"/api/projects/{pid}/columns", json={"name": "To Do"}).json()[
+        "id"
+    ]
+    tid = client.post(
+        f"/api/projects/{pid}/tasks", json={"column_id": cid, "title": "t"}
+    ).json()["id"]
+
+    async def always_moved_on(session, project_id, revision):
+        return False
+
+    monkeypatch.setattr(store, "advance_revision", always_moved_on)
+    response = client.put(f"/api/tasks/{tid}", json={"title": "lost"})
+    assert response.status_code == 409
+    monkeypatch.undo()
+    assert client.get(f"/api/tasks/{tid}").json()["title"] == "t"
+
+
+@pytest.mark.asyncio
+async def test_failed_write_drops_board_from_engine():
+    engine = BoardEngine()
+    project = engine.create_project("Broken")
+
+    @asynccontextmanager
+    async def failing_sessions():
+        raise ConnectionError("database down")
+        yield
+
+    service = BoardService(engine, sessions=failing_sessions)
+    with pytest.raises(ConnectionError):
+        await service.create_column(project.id, "To Do")
+    assert project.id not in engine.projects
+    assert not engine.columns
+
+
+@pytest.mark.asyncio
+async def test_rebalance_persists_new_ranks():
+    service = BoardService(BoardEngine(max_rank_length=4))
+    project = await service.create_project("Rebalanced")
+    column = await service.create_column(project.id, "To Do")
+    tasks = [
+        await service.create_task(project.id, column.id, f"t{i}") for i in range(3)
+    ]
+    for _ in range(30):
+        await service.move_task(tasks[2].id, column.id, after_id=tasks[0].id)
+        await service.move_task(tasks[1].id, column.id, after_id=tasks[0].id)
+    order = column_titles(service.engine, column.id)
+    assert await service.rebalance_pending() == 3
+
+    service.engine.unload_project(project.id)
+    await service.project(project.id)
+    assert column_titles(service.engine, column.id) == order
+    assert all(len(task.rank) <= 4 for task in service.engine.iter_tasks(column.id))
+
+
+def test_batch_shares_one_version(board):
+    engine, project, todo, done, tasks = board
+    start = project.version
+    with engine.batch(project.id):
+        engine.move_task(tasks[0].id, done.id)
+        engine.create_task(project.id, done.id, "new")
+        engine.delete_task(tasks[1].id)
+    assert project.version == start + 1
+    changes = engine.changes_since(project.id, start)
+    assert len(changes.tasks) == 2 and changes.deleted_task_ids == [tasks[1].id]
+    engine.update_task(tasks[2].id, title="after")
+    assert project.version == start + 2
+
+
+def test_batch_api_applies_operations_atomically():
+    pid = client.post("/api/projects", json={"name": "Batch"}).json()["id"]
+    todo = client.post(f"/api/projects/{pid}/columns", json={"name": "To Do"}).json()
+    done = client.post(f"/api/projects/{pid}/columns", json={"name": "Done"}).json()
+    keep = client.post(
+        f"/api/projects/{pid}/tasks", json={"title": "keep", "column_id": todo["id"]}
+    ).json()
+    drop = client.post(
+        f"/api/projects/{pid}/tasks", json={"title": "drop", "column_id": todo["id"]}
+    ).json()
+    version = client.get(f"/api/projects/{pid}").json()["version"]
+
+    response = client.post(
+        "/api/batch",
+        json={
+            "project_id": pid,
+            "operations": [
+                {"op": "create", "title": "a", "column_id": todo["id"]},
+                {"op": "create", "title": "b", "column_id": todo["id"]},
+                {"op": "move", "task_id": keep["id"], "column_id": done["id"]},
+                {"op": "update", "task_id": keep["id"], "title": "kept"},
+                {"op": "delete", "task_id": drop["id"]},
+            ],
+        },
+    )
+    assert response.status_code == 200
+    body = response.json()
+    assert body["version"] == version + 1
+    assert [r["op"] for r in body["results"]] == [
+        "create",
+        "create",
+        "move",
+        "update",
+        "delete",
+    ]
+    assert body["results"][3]["task"]["title"] == "kept"
+    assert body["results"][4]["task"] is None
+
+    board_service.engine.unload_project(UUID(pid))
+    columns = client.get(f"/api/projects/{pid}/board").json()["columns"]
+    assert [t["title"] for t in columns[0]["tasks"]] == ["a", "b"]
+    assert [t["title"] for t in columns[1]["tasks"]] == ["kept"]
+
+    failed = client.post(
+        "/api/batch",
+        json={
+            "project_id": pid,
+            "operations": [
+                {"op": "create", "title": "ghost", "column_id": todo["id"]},
+                {"op": "delete", "task_id": drop["id"]},
+            ],
+        },
+    )
+    assert failed.status_code == 404
+    assert failed.json()["detail"]["index"] == 1
+    columns = client.get(f"/api/projects/{pid}/board").json()["columns"]
+    assert [t["title"] for t in columns[0]["tasks"]] == ["a", "b"]
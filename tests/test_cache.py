@@ -0,0 +1,153 @@
+"""
+Unit tests for the board snapshot cache.
+"""
+
+import asyncio
+import uuid
+
+import fakeredis.aioredis
+import pytest
+from fastapi.testclient import TestClient
+
+from src.board.engine import BoardEngine
+from src.board.service import BoardService
+from src.core.cache import BoardCache, make_etag
+from src.core.redis_client import InMemoryRedis
+from src.main import app
+
+client = TestClient(app)
+
+
+@pytest.fixture(params=["fakeredis", "memory"])
+def cache(request):
+    if request.param == "fakeredis":
+        return BoardCache(fakeredis.aioredis.FakeRedis(), ttl=60)
+    return BoardCache(InMemoryRedis(), ttl=60)
+
+
+@pytest.mark.asyncio
+async def test_miss_then_hit(cache):
+    project_id = uuid.uuid4()
+    builds = []
+
+    def build():
+        builds.append(1)
+        return b'{"n": 1}'
+
+    first = await cache.get_or_build(project_id, build)
+    second = await cache.get_or_build(project_id, build)
+    assert first.payload == second.payload == b'{"n": 1}'
+    assert first.etag == second.etag == make_etag(b'{"n": 1}')
+    assert len(builds) == 1
+
+
+@pytest.mark.asyncio
+async def test_invalidate_bumps_version(cache):
+    project_id = uuid.uuid4()
+    await cache.get_or_build(project_id, lambda: b"old")
+    assert await cache.invalidate(project_id) == 1
+    assert await cache.get(project_id) == (1, None)
+    assert (await cache.get_or_build(project_id, lambda: b"new")).payload == b"new"
+    version, snapshot = await cache.get(project_id)
+    assert (version, snapshot.payload) == (1, b"new")
+
+
+@pytest.mark.asyncio
+async def test_concurrent_misses_build_once(cache):
+    project_id = uuid.uuid4()
+    builds = []
+
+    async def build():
+        builds.append(1)
+        await asyncio.sleep(0.01)
+        return b"board"
+
+    results = await asyncio.gather(
+        *(cache.get_or_build(project_id, build) for _ in range(20))
+    )
+    assert [result.payload for result in results] == [b"board"] * 20
+    assert len(builds) == 1
+
+
+@pytest.mark.asyncio
+async def test_failed_build_propagates_to_waiters(cache):
+    project_id = uuid.uuid4()
+
+    async def build():
+        await asyncio.sleep(0.01)
+        raise RuntimeError("boom")
+
+    results = await asyncio.gather(
+        *(cache.get_or_build(project_id, build) for _ in range(3)),
+        return_exceptions=True,
+    )
+    assert all(isinstance(result, RuntimeError) for result in results)
+    assert not cache._inflight
+
+
+@pytest.mark.asyncio
+async def test_unavailable_backend_falls_back_to_build():
+    class BrokenRedis(InMemoryRedis):
+        async def mget(self, *keys):
+            raise ConnectionError("down")
+
+    cache = BoardCache(BrokenRedis())
+    assert (
+        await cache.get_or_build(uuid.uuid4(), lambda: b"direct")
+    ).payload == b"direct"
+
+
+@pytest.mark.asyncio
+async def test_unconfirmed_snapshot_is_served_but_not_stored(cache):
+    project_id = uuid.uuid4()
+
+    async def stale():
+        return False
+
+    async def current():
+        return True
+
+    assert (
+        await cache.get_or_build(project_id, lambda: b"stale", stale)
+    ).payload == b"stale"
+    assert await cache.get(project_id) == (0, None)
+    await cache.get_or_build(project_id, lambda: b"fresh", current)
+    assert (await cache.get(project_id))[1].payload == b"fresh"
+
+
+@pytest.mark.asyncio
+async def test_worker_that_missed_a_write_is_not_current():
+    writer, reader = BoardService(BoardEngine()), BoardService(BoardEngine())
+    project = await writer.create_project("Written elsewhere")
+    loaded = await reader.project(project.id)
+    await writer.create_column(project.id, "To Do")
+
+    assert await writer.is_current(project.id, project.revision)
+    assert not await reader.is_current(project.id, loaded.revision)
+    # The reader reloads the board on its next access.
+    assert len((await reader.project(project.id)).columns) == 1
+
+    # A snapshot outdated by the writer's own write does not make it reload.
+    built_at = project.revision
+    await writer.create_column(project.id, "Done")
+    assert not await writer.is_current(project.id, built_at)
+    assert await writer.project(project.id) is project
+
+
+def test_board_writes_invalidate_cached_snapshot():
+    pid = client.post("/api/projects", json={"name": "Cached"}).json()["id"]
+    column = client.post(f"/api/projects/{pid}/columns", json={"name": "To Do"}).json()
+    assert client.get(f"/api/projects/{pid}/board").json()["columns"][0]["tasks"] == []
+
+    task = client.post(
+        f"/api/projects/{pid}/tasks", json={"title": "fresh", "column_id": column["id"]}
+    ).json()
+    tasks = client.get(f"/api/projects/{pid}/board").json()["columns"][0]["tasks"]
+    assert [t["title"] for t in tasks] == ["fresh"]
+
+    client.put(f"/api/tasks/{task['id']}", json={"title": "renamed"})
+    tasks = client.get(f"/api/projects/{pid}/board").json()["columns"][0]["tasks"]
+    assert [t["title"] for t in tasks] == ["renamed"]
+
+    client.delete(f"/api/tasks/{task['id']}")
+    assert client.get(f"/api/projects/{pid}/board").json()["columns"][0]["tasks"] == []
@@ -0,0 +1,184 @@
+"""
+Unit tests for response compression and precompressed board snapshots.
+"""
+
+import gzip
+import json
+import uuid
+
+import brotli
+import pytest
+import zstandard
+from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse, Response, StreamingResponse
+from fastapi.testclient import TestClient
+
+from src.core.cache import BoardCache, variant_key
+from src.core.compression import (
+    CompressionMiddleware,
+    compress,
+    negotiate,
+    variant_etag,
+)
+from src.core.redis_client import InMemoryRedis
+from src.main import app
+
+client = TestClient(app)
+
+BODY = json.dumps(
+    [{"title": f"card {i}", "column": "To Do"} for i in range(200)]
+).encode()
+
+
+@pytest.fixture
+def compressed_client():
+    inner = FastAPI()
+
+    @inner.get("/large")
+    async def large():
+        return Response(BODY, media_type="application/json")
+
+    @inner.get("/small")
+    async def small():
+        return Response(b'{"ok": true}', media_type="application/json")
+
+    @inner.get("/encoded")
+    async def encoded():
+        return Response(
+            gzip.compress(BODY),
+            media_type="application/json",
+            headers={"Content-Encoding": "gzip"},
+        )
+
+    @inner.get("/binary")
+    async def binary():
+        return Response(BODY, media_type="application/octet-stream")
+
+    @inner.get("/stream")
+    async def stream():
+        async def lines():
+            for i in range(50):
+                yield f'{{"line": {i}}}\n'.encode()
+
+        return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+    @inner.get("/text")
+    async def text():
+        return PlainTextResponse("kanban " * 500)
+
+    inner.add_middleware(
+        CompressionMiddleware, minimum_size=500, preferred="br,zstd,gzip"
+    )
+    return TestClient(inner)
+
+
+def test_negotiate():
+    available = ["br", "zstd", "gzip"]
+    assert negotiate(None, available) is None
+    assert negotiate("identity", available) is None
+    assert negotiate("gzip, deflate, br", available) == "br"
+    assert negotiate("gzip;q=1.0, br;q=0.5", available) == "gzip"
+    assert negotiate("br;q=0, *", available) == "zstd"
+    assert negotiate("*;q=0", available) is None
+    assert negotiate("gzip;q=bogus, zstd", available) == "zstd"
+    assert negotiate("BR", ["gzip"]) is None
+
+
+def test_large_responses_compressed_with_negotiated_coding(compressed_client):
+    for encoding, decompress in (
+        ("br", brotli.decompress),
+        ("gzip", gzip.decompress),
+        ("zstd", zstandard.ZstdDecompressor().decompress),
+    ):
+        with compressed_client.stream(
+            "GET", "/large", headers={"Accept-Encoding": encoding}
+        ) as response:
+            raw = b"".join(response.iter_raw())
+        assert response.headers["content-encoding"] == encoding
+        assert response.headers["vary"] == "Accept-Encoding"
+        assert int(response.headers["content-length"]) < len(BODY)
+        assert decompress(raw) == BODY
+
+
+def test_small_binary_and_encoded_responses_pass_through(compressed_client):
+    small = compressed_client.get("/small", headers={"Accept-Encoding": "gzip"})
+    assert "content-encoding" not in small.headers and small.json() == {"ok": True}
+    binary = compressed_client.get("/binary", headers={"Accept-Encoding": "gzip"})
+    assert "content-encoding" not in binary.headers and binary.content == BODY
+    encoded = compressed_client.get("/encoded", headers={"Accept-Encoding": "gzip"})
+    assert encoded.headers["content-encoding"] == "gzip" and encoded.content == BODY
+    plain = compressed_client.get("/large", headers={"Accept-Encoding": "identity"})
+    assert "content-encoding" not in plain.headers and plain.content == BODY
+
+
+def test_streamed_responses_compressed_per_chunk(compressed_client):
+    response = compressed_client.get("/stream", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["content-encoding"] == "gzip"
+    assert "content-length" not in response.headers
+    assert response.text.splitlines()[-1] == '{"line": 49}'
+    text = compressed_client.get("/text", headers={"Accept-Encoding": "br"})
+    assert text.headers["content-encoding"] == "br" and text.text == "kanban " * 500
+
+
+@pytest.mark.asyncio
+async def test_snapshot_variants_compressed_once(monkeypatch):
+    cache = BoardCache(InMemoryRedis(), ttl=60)
+    project_id = uuid.uuid4()
+    snapshot = await cache.get_or_build(project_id, lambda: BODY)
+    calls = []
+
+    async def compress_once(encoding, data, cached=False):
+        calls.append((encoding, cached))
+        return compress(encoding, data, cached)
+
+    monkeypatch.setattr("src.core.cache.compress_async", compress_once)
+    first = await cache.get_or_compress(project_id, snapshot, "br")
+    second = await cache.get_or_compress(project_id, snapshot, "br")
+    gzipped = await cache.get_or_compress(project_id, snapshot, "gzip")
+    assert first == second and brotli.decompress(first) == BODY
+    assert gzip.decompress(gzipped) == BODY
+    assert calls == [("br", True), ("gzip", True)]
+
+    # A rebuilt snapshot never serves the old variant.
+    await cache.invalidate(project_id)
+    rebuilt = await cache.get_or_build(project_id, lambda: BODY + b" ")
+    assert (
+        brotli.decompress(await cache.get_or_compress(project_id, rebuilt, "br"))
+        == BODY + b" "
+    )
+    assert (await cache.redis.get(variant_key(project_id, "br"))).startswith(
+        rebuilt.etag.encode()
+    )
+
+
+def test_board_api_serves_precompressed_snapshot():
+    pid = client.post("/api/projects", json={"name": "Compressed"}).json()["id"]
+    column = client.post(f"/api/projects/{pid}/columns", json={"name": "To Do"}).json()
+    for i in range(30):
+        client.post(
+            f"/api/projects/{pid}/tasks",
+            json={
+                "title": f"card {i}",
+                "column_id": column["id"],
+                "description": "x" * 40,
+            },
+        )
+
+    plain = client.get(
+        f"/api/projects/{pid}/board", headers={"Accept-Encoding": "identity"}
+    )
+    compressed = client.get(
+        f"/api/projects/{pid}/board", headers={"Accept-Encoding": "br"}
+    )
+    assert "content-encoding" not in plain.headers
+    assert compressed.headers["content-encoding"] == "br"
+    assert compressed.headers["vary"] == "Accept-Encoding"
+    assert compressed.json() == plain.json()
+    assert compressed.headers["etag"] == variant_etag(plain.headers["etag"], "br")
+
+    for etag in (plain.headers["etag"], compressed.headers["etag"]):
+        unchanged = client.get(
+            f"/api/projects/{pid}/board",
+            headers={"Accept-Encoding": "br", "If-None-Match": etag},
+        )
+        assert unchanged.status_code == 304
@@ -0,0 +1,89 @@
+"""
+Unit tests for the async database engine, sessions and pool metrics.
+"""
+
+import asyncio
+
+import pytest
+import pytest_asyncio
+from prometheus_client import REGISTRY
+from sqlalchemy import text
+
+from src.core import database
+from src.core.config import Settings
+
+
+@pytest.fixture
+def sqlite_settings(tmp_path):
+    return Settings(
+        database_url=f"sqlite+aiosqlite:///{tmp_path / 'test.db'}",
+        db_pool_size=2,
+        db_max_overflow=1,
+        db_pool_timeout=5,
+    )
+
+
+@pytest_asyncio.fixture
+async def shared_engine(monkeypatch, sqlite_settings):
+    monkeypatch.setattr(database, "settings", sqlite_settings)
+    await database.dispose_engine()
+    yield database.get_engine()
+    await database.dispose_engine()
+
+
+def test_engine_options_for_postgres():
+    options = database.engine_options(
+        Settings(
+            database_url="postgresql+asyncpg://u:p@db/kanban",
+            db_pool_size=7,
+            db_max_overflow=3,
+            db_statement_cache_size=0,
+        )
+    )
+    assert options["pool_size"] == 7
+    assert options["max_overflow"] == 3
+    assert options["pool_pre_ping"] is True
+    assert options["connect_args"] == {"prepared_statement_cache_size": 0}
+
+
+def test_engine_options_for_memory_sqlite():
+    options = database.engine_options(Settings(database_url="sqlite+aiosqlite://"))
+    assert "pool_size" not in options
+
+
+@pytest.mark.asyncio
+async def test_session_dependency_runs_queries(shared_engine):
+    sessions = database.get_session()
+    session = await sessions.__anext__()
+    assert (await session.execute(text("select 1"))).scalar() == 1
+    with pytest.raises(StopAsyncIteration):
+        await sessions.__anext__()
+    count = REGISTRY.get_sample_value("db_pool_checkout_wait_seconds_count")
+    assert count >= 1
+
+
+@pytest.mark.asyncio
+async def test_file_sqlite_runs_in_wal_mode(shared_engine):
+    async with shared_engine.connect() as conn:
+        mode = (await conn.execute(text("PRAGMA journal_mode"))).scalar()
+    assert mode == "wal"
+
+
+@pytest.mark.asyncio
+async def test_pool_status_reports_saturation(shared_engine):
+    async with shared_engine.connect() as first, shared_engine.connect() as second:
+        await first.execute(text("select 1"))
+        await second.execute(text("select 1"))
+        status = database.pool_status()
+        assert status["checked_out"] == 2
+        assert status["saturation"] == pytest.approx(2 / 3)
+        assert REGISTRY.get_sample_value("db_connections_active") == 2
+    await asyncio.sleep(0)
+    assert database.pool_status()["checked_out"] == 0
+
+
+@pytest.mark.asyncio
+async def test_dispose_resets_shared_engine(shared_engine):
+    await database.dispose_engine()
+    assert database.pool_status() == {}
+    assert database.get_engine() is not shared_engine
@@ -0,0 +1,195 @@
+"""
+Unit tests for compiled task filters.
+"""
+
+import json
+from collections import Counter
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy.dialects import postgresql, sqlite
+
+from src.board.filters import (
+    FilterCompiler,
+    InvalidFilterError,
+    parse_filter,
+    recommend_indexes,
+)
+from src.main import app
+
+client = TestClient(app)
+
+
+def make_tasks(name, tasks):
+    pid = client.post("/api/projects", json={"name": name}).json()["id"]
+    column = client.post(f"/api/projects/{pid}/columns", json={"name": "To Do"}).json()
+    for title, metadata in tasks:
+        client.post(
+            f"/api/projects/{pid}/tasks",
+            json={"title": title, "column_id": column["id"], "metadata": metadata},
+        )
+    return pid
+
+
+def find(pid, conditions, **params):
+    text = json.dumps({"project_id": pid, **conditions})
+    response = client.get("/api/tasks", params={"filter": text, **params})
+    assert response.status_code == 200, response.text
+    return sorted(task["title"] for task in response.json())
+
+
+@pytest.fixture(scope="module")
+def board():
+    return make_tasks(
+        "Filters",
+        [
+            ("Crash on login", {"labels": ["bug", "auth"], "points": 5, "team": "web"}),
+            ("Login copy", {"labels": ["copy"], "points": 1, "team": "web"}),
+            (
+                "Export 100% of rows",
+                {"points": 8, "team": "data", "sprint": {"name": "S10"}},
+            ),
+            ("Tidy up", {"points": True}),
+        ],
+    )
+
+
+def test_filters_over_columns_and_metadata(board):
+    assert find(board, {"metadata.labels": {"has": "bug"}}) == ["Crash on login"]
+    assert find(board, {"metadata.points": {"gte": 5}}) == [
+        "Crash on login",
+        "Export 100% of rows",
+    ]
+    assert find(board, {"metadata.points": 1}) == ["Login copy"]
+    assert find(board, {"title": {"contains": "LOGIN"}}) == [
+        "Crash on login",
+        "Login copy",
+    ]
+    assert find(board, {"title": {"contains": "100%"}}) == ["Export 100% of rows"]
+    assert find(board, {"metadata.sprint.name": "S10"}) == ["Export 100% of rows"]
+    assert find(board, {"metadata.team": {"exists": False}}) == ["Tidy up"]
+    assert find(
+        board,
+        {
+            "or": [
+                {"metadata.team": {"in": ["data"]}},
+                {"metadata.labels": {"has": "copy"}},
+            ]
+        },
+    ) == ["Export 100% of rows", "Login copy"]
+    assert find(board, {"not": {"metadata.team": "web"}, "user_story_id": None}) == [
+        "Export 100% of rows",
+        "Tidy up",
+    ]
+
+
+def test_pagination_by_id(board):
+    first = client.get(
+        "/api/tasks", params={"filter": json.dumps({"project_id": board}), "limit": 3}
+    ).json()
+    rest = client.get(
+        "/api/tasks",
+        params={"filter": json.dumps({"project_id": board}), "after": first[-1]["id"]},
+    ).json()
+    ids = [task["id"] for task in first + rest]
+    assert len(ids) == 4 and ids == sorted(ids)
+
+
+@pytest.mark.parametrize(
+    "text",
+    [
+        "{not json",
+        "[]",
+        '{"owner": "x"}',
+        '{"title": {"like": "x"}}',
+        '{"project_id": "not-a-uuid"}',
+        '{"metadata.points": {"gt": true}}',
+        '{"metadata.team": {"in": []}}',
+        '{"metadata.bad key": 1}',
+        '{"title": null}',
+        '{"or": [{}]}',
+    ],
+)
+def test_invalid_filters(text):
+    with pytest.raises(InvalidFilterError):
+        parse_filter(text)
+    assert client.get("/api/tasks", params={"filter": text}).status_code == 400
+
+
+def test_shape_is_compiled_once():
+    compiler = FilterCompiler(sqlite.dialect())
+    first = parse_filter(
+        '{"metadata.points": {"gte": 3}, "column_id": "%s"}' % ("1" * 32)
+    )
+    second = parse_filter(
+        '{"metadata.points": {"gte": 8}, "column_id": "%s"}' % ("2" * 32)
+    )
+    assert first.shape == second.shape and first.values != second.values
+    assert (
+        parse_filter('{"metadata.points": {"gte": 3}, "column_id": "%s"}' % ("1" * 32))
+        is first
+    )
+
+    one, two = compiler.query(first), compiler.query(second)
+    assert one.statement is two.statement
+    assert one.params != two.params
+    assert compiler.usage[first.shape] == 2
+
+
+def test_pushdown_follows_declared_indexes():
+    task_filter = parse_filter(
+        '{"project_id": "%s", "metadata.labels": {"has": "bug"}, '
+        '"metadata.points": {"gt": 2}}' % ("1" * 32)
+    )
+    pg = FilterCompiler(postgresql.dialect()).query(task_filter)
+    sql = str(pg.statement.compile(dialect=postgresql.dialect()))
+    assert "tasks.project_id = %(f0)s" in sql and "tasks.metadata @> %(f1)s" in sql
+    assert pg.params["f1"] == {"labels": ["bug"]}
+    # No index answers a numeric range on a metadata key, so it stays in Python.
+    assert "points" not in sql and pg.residual is not None
+
+    lite = FilterCompiler(sqlite.dialect()).query(task_filter)
+    sql = str(lite.statement.compile(dialect=sqlite.dialect()))
+    assert "tasks.project_id = ?" in sql and "metadata" not in sql.split("WHERE")[1]
+
+
+def test_unindexed_filters_need_an_indexed_condition(board):
+    text = json.dumps({"metadata.points": {"gte": 5}})
+    response = client.get("/api/tasks", params={"filter": text})
+    assert response.status_code == 400 and "project_id" in response.json()["detail"]
+    # Still counted, so the index it lacks gets recommended.
+    recommended = client.get("/api/tasks/filter-indexes").json()
+    assert "tasks_metadata_points_num_idx" in {r["name"] for r in recommended}
+    assert find(board, {"metadata.points": {"gte": 5}}) == [
+        "Crash on login",
+        "Export 100% of rows",
+    ]
+
+
+def test_recommends_indexes_for_hot_shapes():
+    hot = parse_filter(
+        '{"metadata.points": {"gte": 3}, "created_at": {"gt": "2024-01-01T00:00:00Z"}}'
+    )
+    cold = parse_filter('{"user_story_id": null}')
+    usage = Counter({hot.shape: 10, cold.shape: 1})
+    recommendations = recommend_indexes(usage, top=1)
+    assert [(r.name, r.uses) for r in recommendations] == [
+        ("tasks_created_at_idx", 10),
+        ("tasks_metadata_points_num_idx", 10),
+    ]
+    assert recommendations[1].ddl == (
+        "CREATE INDEX CONCURRENTLY tasks_metadata_points_num_idx "
+        "ON tasks (CAST(metadata ->> 'points' AS NUMERIC))"
+    )
+    # Fully indexed shapes need nothing.
+    assert (
+        recommend_indexes(Counter({parse_filter('{"metadata.team": "web"}').shape: 5}))
+        == []
+    )
+
+
+def test_filter_index_endpoint(board):
+    find(board, {"metadata.points": {"lt": 3}})
+    response = client.get("/api/tasks/filter-indexes")
+    assert response.status_code == 200
+    assert "tasks_metadata_points_num_idx" in {r["name"] for r in response.json()}
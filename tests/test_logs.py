@@ -0,0 +1,221 @@
+"""
+Unit tests for the queued structured logging pipeline.
+"""
+
+import io
+import json
+import logging
+import os
+import queue
+import signal
+import subprocess
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+import pytest
+from fastapi.testclient import TestClient
+
+from src.core import logs, tracing
+from src.core.config import Settings, settings
+from src.main import create_app
+
+
+@contextmanager
+def pipeline_only():
+    # Detach pytest's capture handlers, which format on the calling thread.
+    root = logging.getLogger()
+    saved = root.handlers
+    root.handlers = [
+        handler for handler in saved if isinstance(handler, logs.QueueingHandler)
+    ]
+    try:
+        yield
+    finally:
+        root.handlers = saved
+
+
+@pytest.fixture
+def output():
+    stream = io.StringIO()
+
+    def configure(**overrides):
+        logs.configure_logging(Settings(**overrides), stream)
+
+    def records():
+        logs.shutdown_logging()  # drains the queue
+        return [json.loads(line) for line in stream.getvalue().splitlines()]
+
+    configure.records = records
+    yield configure
+    logs.configure_logging(settings)
+
+
+def test_records_rendered_as_json_by_listener_thread(output):
+    output(log_format="json")
+    rendered_on = []
+
+    class Probe:
+        def __str__(self):
+            rendered_on.append(threading.current_thread().name)
+            return "probe"
+
+    log = logging.getLogger("kanban.test")
+    token = tracing.request_id.set("req-9")
+    try:
+        with pipeline_only():
+            log.info("Moved %s", Probe(), extra={"task_count": 3})
+            log.debug("Not at this level %s", Probe())
+            try:
+                raise RuntimeError("boom")
+            except RuntimeError:
+                log.exception("Failed")
+    finally:
+        tracing.request_id.reset(token)
+    logs.get_logger("kanban.events").warning("task.moved", column="Done")
+
+    moved, failed, event = output.records()
+    assert rendered_on and threading.main_thread().name not in rendered_on
+    assert moved["event"] == "Moved probe"
+    assert moved["level"] == "info" and moved["logger"] == "kanban.test"
+    assert moved["task_count"] == 3 and moved["request_id"] == "req-9"
+    assert moved["timestamp"].endswith("Z")
+    assert failed["level"] == "error" and "RuntimeError: boom" in failed["exception"]
+    assert event["event"] == "task.moved" and event["column"] == "Done"
+    assert not [key for key in event if key.startswith("_")]
+
+
+def test_requests_sampled_per_path(output):
+    output(log_format="json", log_sample_rates="/echo=0,/echo/keep=1")
+    client = TestClient(create_app())
+    client.post("/echo", json={"message": "dropped"})
+    client.post("/echo", json={"message": ""})  # 400: handler logs before rejecting
+    client.get("/health")
+
+    log = logging.getLogger("kanban.test")
+    for path in ("/echo", "/echo/keep", "/other"):
+        token = tracing.request_path.set(path)
+        log.info("info on %s", path)
+        log.warning("warning on %s", path)
+        tracing.request_path.reset(token)
+
+    records = output.records()
+    assert not [r for r in records if r["event"].startswith("Received message")]
+    assert [r["event"] for r in records if r["logger"] == "kanban.test"] == [
+        "warning on /echo",
+        "info on /echo/keep",
+        "warning on /echo/keep",
+        "info on /other",
+        "warning on /other",
+    ]
+
+
+def test_sampling_keeps_whole_requests():
+    sampler = logs.SamplingFilter(logs.parse_sample_rates("/api=0.5"))
+    record = logging.LogRecord("test", logging.INFO, __file__, 1, "message", (), None)
+    path_token = tracing.request_path.set("/api/tasks")
+    kept = []
+    try:
+        for i in range(400):
+            token = tracing.request_id.set(f"request-{i}")
+            decisions = {sampler.filter(record) for _ in range(3)}
+            tracing.request_id.reset(token)
+            assert len(decisions) == 1
+            kept.append(decisions.pop())
+    finally:
+        tracing.request_path.reset(path_token)
+    assert 120 < sum(kept) < 280
+
+    assert logs.parse_sample_rates("/a=0.1, /a/b=1") == [("/a/b", 1.0), ("/a", 0.1)]
+    for invalid in ("echo=0.1", "/echo", "/echo=2"):
+        with pytest.raises(ValueError):
+            logs.parse_sample_rates(invalid)
+
+
+def test_full_queue_drops_instead_of_blocking():
+    handler = logs.QueueingHandler(queue.Queue(1))
+    dropped = logs.records_discarded().labels("queue_full")
+    before = dropped._value.get()
+    for _ in range(3):
+        handler.handle(
+            logging.LogRecord("test", logging.INFO, __file__, 1, "m", (), None)
+        )
+    assert handler.queue.qsize() == 1
+    assert dropped._value.get() == before + 2
+
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="needs fork")
+def test_forked_worker_gets_its_own_listener(tmp_path):
+    path = tmp_path / "log.jsonl"
+    with open(path, "w") as stream:
+        logs.configure_logging(Settings(log_format="json"), stream)
+        try:
+            logging.getLogger("kanban.test").info("from parent")
+            pid = os.fork()
+            if pid == 0:  # the listener thread was not copied; a new one writes
+                logging.getLogger("kanban.test").info("from child")
+                logs.shutdown_logging()
+                os._exit(0)
+            _, status = os.waitpid(pid, 0)
+            assert status == 0
+        finally:
+            logs.configure_logging(settings)
+    events = sorted(json.loads(line)["event"] for line in path.read_text().splitlines())
+    assert events == ["from child", "from parent"]
+
+
+class SlowStream(io.StringIO):
+    """Holds a lock through every write, like a handler rendering a record."""
+
+    def __init__(self):
+        super().__init__()
+        self.lock = threading.Lock()
+
+    def write(self, text):
+        with self.lock:
+            time.sleep(0.2)
+            return super().write(text)
+
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="needs fork")
+def test_fork_waits_for_the_listener_to_finish_a_record():
+    stream = SlowStream()
+    logs.configure_logging(Settings(log_format="json"), stream)
+    try:
+        logging.getLogger("kanban.test").info("being written while forking")
+        time.sleep(0.05)
+        pid = os.fork()
+        if pid == 0:  # deadlocks if the parent's listener held the stream's lock
+            logging.getLogger("kanban.test").info("from child")
+            logs.shutdown_logging()
+            os._exit(0)
+        deadline = time.monotonic() + 10
+        while time.monotonic() < deadline:
+            done, status = os.waitpid(pid, os.WNOHANG)
+            if done:
+                break
+            time.sleep(0.05)
+        else:
+            os.kill(pid, signal.SIGKILL)
+            os.waitpid(pid, 0)
+            pytest.fail("forked process hung on a lock held by the parent's listener")
+        assert status == 0
+        logging.getLogger("kanban.test").info("parent still logging")
+    finally:
+        logs.configure_logging(settings)
+    assert "parent still logging" in stream.getvalue()
+
+
+def test_importing_main_leaves_prometheus_client_unloaded():
+    # serve() sets PROMETHEUS_MULTIPROC_DIR after src.main is imported; the
+    # client must not have been imported (and read it) before then.
+    code = "import sys, src.main; print('prometheus_client' in sys.modules)"
+    result = subprocess.run(
+        [sys.executable, "-c", code],
+        capture_output=True,
+        text=True,
+        timeout=60,
+        check=True,
+    )
+    assert result.stdout.strip() == "False"
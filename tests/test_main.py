@@ -10,6 +10,7 @@ from src.main import app
 
 client = TestClient(app)
 
+
 def test_root_endpoint():
     """Test the root endpoint returns correct response."""
     response = client.get("/")
@@ -19,6 +20,7 @@ def test_root_endpoint():
     assert "status" in data
     assert data["status"] == "running"
 
+
 def test_health_check():
     """Test health check endpoint."""
     response = client.get("/health")
@@ -27,6 +29,7 @@ def test_health_check():
     assert data["status"] == "healthy"
     assert "version" in data
 
+
 def test_echo_endpoint_valid_message():
     """Test echo endpoint with valid message."""
     test_message = "Hello, World!"
@@ -36,31 +39,35 @@ def test_echo_endpoint_valid_message():
     assert data["echo"] == test_message
     assert data["length"] == len(test_message)
 
+
 def test_echo_endpoint_empty_message():
     """Test echo endpoint with empty message."""
     response = client.post("/echo", json={"message": ""})
     assert response.status_code == 400
     assert "Message cannot be empty" in response.json()["detail"]
 
+
 def test_echo_endpoint_whitespace_message():
     """Test echo endpoint with whitespace-only message."""
     response = client.post("/echo", json={"message": "   "})
     assert response.status_code == 400
 
+
 def test_metrics_endpoint():
-    """Test metrics endpoint returns expected structure."""
+    """Test metrics endpoint returns the Prometheus exposition format."""
     response = client.get("/metrics")
     assert response.status_code == 200
-    data = response.json()
-    assert "requests_total" in data
-    assert "uptime_seconds" in data
-    assert "memory_usage_mb" in data
+    assert response.headers["content-type"].startswith("text/plain")
+    assert "http_requests_total" in response.text
+    assert "process_uptime_seconds" in response.text
+
 
 def test_docs_endpoint():
     """Test that OpenAPI docs are accessible."""
     response = client.get("/docs")
     assert response.status_code == 200
 
+
 def test_redoc_endpoint():
     """Test that ReDoc documentation is accessible."""
     response = client.get("/redoc")
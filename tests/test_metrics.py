@@ -0,0 +1,74 @@
+"""
+Unit tests for the Prometheus instrumentation layer.
+"""
+
+from fastapi.testclient import TestClient
+from prometheus_client import REGISTRY
+
+from src.core import metrics
+from src.main import app
+
+client = TestClient(app)
+
+
+def sample(name, **labels):
+    return REGISTRY.get_sample_value(name, labels) or 0.0
+
+
+def test_requests_are_labelled_by_route_template():
+    """Per-id paths collapse into a single route template series."""
+    route = "/api/projects/{project_id}"
+    before = sample("http_requests_total", method="GET", route=route, status="404")
+    for _ in range(3):
+        client.get("/api/projects/00000000-0000-0000-0000-000000000000")
+    after = sample("http_requests_total", method="GET", route=route, status="404")
+    assert after - before == 3
+    count = sample("http_request_duration_seconds_count", method="GET", route=route)
+    assert count >= 3
+
+
+def test_unmatched_paths_share_one_label():
+    before = sample(
+        "http_requests_total", method="GET", route="<unmatched>", status="404"
+    )
+    client.get("/no/such/path")
+    client.get("/another/missing/path")
+    after = sample(
+        "http_requests_total", method="GET", route="<unmatched>", status="404"
+    )
+    assert after - before == 2
+
+
+def test_method_mismatch_uses_route_template():
+    before = sample(
+        "http_requests_total", method="DELETE", route="/health", status="405"
+    )
+    client.delete("/health")
+    after = sample(
+        "http_requests_total", method="DELETE", route="/health", status="405"
+    )
+    assert after - before == 1
+
+
+def test_in_progress_gauge_returns_to_zero():
+    client.get("/health")
+    assert sample("http_requests_in_progress", method="GET", route="/health") == 0
+
+
+def test_exposition_includes_process_metrics():
+    body, content_type = metrics.render_metrics()
+    assert content_type.startswith("text/plain")
+    assert b"process_uptime_seconds" in body
+    assert b"process_resident_memory_bytes" in body
+    assert b"http_request_duration_seconds_bucket" in body
+
+
+def test_metrics_server_starts_once(monkeypatch):
+    started = []
+    monkeypatch.setattr(metrics, "_metrics_server_port", None)
+    monkeypatch.setattr(
+        metrics, "start_http_server", lambda port, addr, registry: started.append(port)
+    )
+    assert metrics.start_metrics_server(9999) is True
+    assert metrics.start_metrics_server(9999) is False
+    assert started == [9999]
@@ -0,0 +1,224 @@
+"""
+Unit tests for the notification outbox and its dispatcher.
+"""
+
+import json
+import smtplib
+import threading
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+
+import pytest
+import pytest_asyncio
+from aiosmtpd.controller import Controller
+from sqlalchemy import delete, select
+
+from benchmarks.bench_api import free_port
+from src.board.engine import BoardEngine
+from src.board.service import BoardService
+from src.board.tables import outbox as outbox_table
+from src.core import outbox
+from src.core.config import settings
+from src.core.database import session_scope
+
+
+class WebhookStub(ThreadingHTTPServer):
+    """Local HTTP endpoint recording JSON posts and answering with ``status``."""
+
+    def __init__(self):
+        self.posts = []
+        self.status = 200
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(handler):
+                length = int(handler.headers["Content-Length"])
+                self.posts.append(
+                    (handler.path, json.loads(handler.rfile.read(length)))
+                )
+                handler.send_response(self.status)
+                handler.send_header("Content-Length", "0")
+                handler.end_headers()
+
+            def log_message(handler, *args):
+                pass
+
+        super().__init__(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server_address[1]}"
+
+
+class Mailbox:
+    def __init__(self):
+        self.messages = []
+
+    async def handle_DATA(self, server, session, envelope):
+        self.messages.append(envelope)
+        return "250 OK"
+
+
+@pytest.fixture
+def webhook(monkeypatch):
+    stub = WebhookStub()
+    thread = threading.Thread(target=stub.serve_forever, daemon=True)
+    thread.start()
+    monkeypatch.setattr(settings, "notification_webhooks", f"{stub.url}/hook")
+    yield stub
+    stub.shutdown()
+    stub.server_close()
+
+
+@pytest.fixture
+def mailbox(monkeypatch):
+    mailbox = Mailbox()
+    controller = Controller(mailbox, hostname="127.0.0.1", port=free_port())
+    controller.start()
+    monkeypatch.setattr(settings, "notification_emails", "team@example.com")
+    monkeypatch.setattr(settings, "smtp_host", "127.0.0.1")
+    monkeypatch.setattr(settings, "smtp_port", controller.port)
+    monkeypatch.setattr(settings, "smtp_tls", False)
+    yield mailbox
+    controller.stop()
+
+
+@pytest_asyncio.fixture
+async def dispatcher():
+    async with session_scope() as session:
+        await session.execute(delete(outbox_table))
+    dispatcher = outbox.OutboxDispatcher(settings)
+    yield dispatcher
+    await dispatcher.close()
+
+
+async def outbox_rows():
+    async with session_scope() as session:
+        return (
+            await session.execute(select(outbox_table).order_by(outbox_table.c.id))
+        ).all()
+
+
+@pytest.mark.asyncio
+async def test_board_writes_are_delivered_coalesced(webhook, mailbox, dispatcher):
+    service = BoardService(BoardEngine())
+    project = await service.create_project("Notified")
+    todo = await service.create_column(project.id, "To Do")
+    done = await service.create_column(project.id, "Done")
+    tasks = [await service.create_task(project.id, todo.id, f"t{i}") for i in range(3)]
+    await service.move_task(tasks[0].id, done.id)
+
+    rows = await outbox_rows()
+    assert len(rows) == 8  # 4 events for each of 2 destinations
+    assert {row.destination for row in rows} == {
+        f"{webhook.url}/hook",
+        "mailto:team@example.com",
+    }
+
+    assert await dispatcher.dispatch_once() == 8
+    ((path, body),) = webhook.posts
+    assert path == "/hook"
+    assert [event["type"] for event in body["events"]] == ["task.created"] * 3 + [
+        "task.moved"
+    ]
+    assert body["events"][3]["data"]["column"] == "Done"
+    (mail,) = mailbox.messages
+    assert mail.rcpt_tos == ["team@example.com"]
+    content = mail.content.decode()
+    assert "Subject: 4 board updates" in content
+    assert '"t0" moved to Done in Notified' in content
+    assert await outbox_rows() == []
+
+    # The SMTP connection stays open between batches and is reopened if dropped.
+    await service.update_task(tasks[1].id, title="renamed")
+    connection = dispatcher._smtp
+    assert await dispatcher.dispatch_once() == 2
+    assert dispatcher._smtp is connection
+    connection.close()
+    await service.delete_task(tasks[2].id)
+    assert await dispatcher.dispatch_once() == 2
+    assert [len(mailbox.messages), len(webhook.posts)] == [3, 3]
+
+
+@pytest.mark.asyncio
+async def test_failed_deliveries_back_off_then_dead_letter(
+    webhook, dispatcher, monkeypatch
+):
+    monkeypatch.setattr(settings, "outbox_max_attempts", 2)
+    webhook.status = 500
+    service = BoardService(BoardEngine())
+    project = await service.create_project("Flaky")
+    column = await service.create_column(project.id, "To Do")
+    await service.create_task(project.id, column.id, "retry me")
+
+    now = datetime.utcnow()
+    assert await dispatcher.dispatch_once(now) == 0
+    (row,) = await outbox_rows()
+    assert row.attempts == 1 and "500" in row.last_error
+    assert row.available_at >= now + timedelta(
+        seconds=settings.outbox_retry_base_seconds / 2
+    )
+    assert row.failed_at is None
+    assert await dispatcher.dispatch_once(now) == 0
+    assert len(webhook.posts) == 1  # not due yet
+
+    later = now + timedelta(hours=1)
+    assert await dispatcher.dispatch_once(later) == 0
+    (row,) = await outbox_rows()
+    assert row.attempts == 2 and row.failed_at == later
+
+    webhook.status = 200
+    assert await dispatcher.dispatch_once(later + timedelta(hours=1)) == 0
+    assert len(webhook.posts) == 2
+
+
+@pytest.mark.asyncio
+async def test_smtp_connection_dropped_after_errors_but_not_refusals(
+    mailbox, dispatcher
+):
+    replies = ["451 Try again later"]
+
+    async def handle_DATA(server, session, envelope):
+        mailbox.messages.append(envelope)
+        return replies.pop() if replies else "250 OK"
+
+    async def handle_RCPT(server, session, envelope, address, options):
+        if address.startswith("nobody@"):
+            return "550 No such user"
+        envelope.rcpt_tos.append(address)
+        return "250 OK"
+
+    mailbox.handle_DATA, mailbox.handle_RCPT = handle_DATA, handle_RCPT
+    rows = [SimpleNamespace(event_type="task.created", payload={"title": "t"})]
+    with pytest.raises(smtplib.SMTPDataError):
+        await dispatcher._email("team@example.com", rows)
+    assert dispatcher._smtp is None  # its state after the error is unknown
+
+    await dispatcher._email("team@example.com", rows)
+    connection = dispatcher._smtp
+    with pytest.raises(smtplib.SMTPRecipientsRefused):
+        await dispatcher._email("nobody@example.com", rows)
+    assert dispatcher._smtp is connection
+    await dispatcher._email("team@example.com", rows)
+    assert len(mailbox.messages) == 3
+
+
+def test_webhook_bodies_and_retry_delays():
+    rows = [
+        SimpleNamespace(
+            id=1,
+            event_type="task.moved",
+            created_at=datetime(2024, 1, 2, 3, 4, 5),
+            payload={"title": "Ship it", "column": "Done", "project": "Launch"},
+        )
+    ]
+    slack = outbox.webhook_body("https://hooks.slack.com/services/T/B/x", rows)
+    assert slack == {"text": '"Ship it" moved to Done in Launch'}
+    discord = outbox.webhook_body("https://discord.com/api/webhooks/1/x", rows * 200)
+    assert len(discord["content"]) == outbox.DISCORD_MAX_CONTENT
+    generic = outbox.webhook_body("https://ci.example.com/kanban", rows)
+    assert generic["events"][0]["created_at"] == "2024-01-02T03:04:05Z"
+
+    delays = [outbox.retry_delay(attempt) for attempt in (1, 2, 3, 30)]
+    base, cap = settings.outbox_retry_base_seconds, settings.outbox_retry_max_seconds
+    assert base / 2 <= delays[0] <= base
+    assert base <= delays[1] <= 2 * base
+    assert 2 * base <= delays[2] <= 4 * base
+    assert cap / 2 <= delays[3] <= cap
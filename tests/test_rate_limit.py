@@ -0,0 +1,182 @@
+"""
+Unit tests for token-bucket rate limiting.
+"""
+
+import fakeredis.aioredis
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from prometheus_client import REGISTRY
+from redis.asyncio import Redis
+
+from src.core import rate_limit
+from src.core.config import Settings
+from src.core.rate_limit import (
+    LocalBuckets,
+    RateLimiter,
+    RateLimitMiddleware,
+    RedisBuckets,
+    client_key,
+)
+from src.main import create_app
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def make_client(limiter, key_verified=None):
+    app = FastAPI()
+    app.add_middleware(RateLimitMiddleware, limiter=limiter, key_verified=key_verified)
+
+    @app.get("/ping")
+    def ping():
+        return {"ok": True}
+
+    @app.get("/health")
+    def health():
+        return {"status": "healthy"}
+
+    return TestClient(app)
+
+
+def test_local_bucket_allows_burst_then_refills():
+    clock = FakeClock()
+    buckets = LocalBuckets(clock=clock)
+    rate = 1.0  # one token per second
+    decisions = [buckets.take("a", rate, 3) for _ in range(4)]
+    assert [d.allowed for d in decisions] == [True, True, True, False]
+    assert [d.remaining for d in decisions] == [2, 1, 0, 0]
+    assert decisions[-1].retry_after == pytest.approx(1.0)
+    assert buckets.take("b", rate, 3).allowed  # other clients are unaffected
+
+    clock.now += 1.5
+    assert buckets.take("a", rate, 3).allowed
+    assert not buckets.take("a", rate, 3).allowed
+    clock.now += 100
+    assert buckets.take("a", rate, 3).remaining == 2  # capped at the burst
+
+
+def test_local_buckets_are_bounded():
+    buckets = LocalBuckets(maxsize=2)
+    for key in "abc":
+        buckets.take(key, 1.0, 5)
+    assert len(buckets) == 2
+
+
+def test_middleware_returns_429_with_retry_after():
+    client = make_client(
+        RateLimiter(per_minute=60, burst=2), {"sk_verified"}.__contains__
+    )
+    first = client.get("/ping")
+    assert first.status_code == 200
+    assert first.headers["X-RateLimit-Limit"] == "2"
+    assert first.headers["X-RateLimit-Remaining"] == "1"
+    client.get("/ping")
+    limited = client.get("/ping")
+    assert limited.status_code == 429
+    assert limited.headers["Retry-After"] == "1"
+    assert limited.json() == {"detail": "Rate limit exceeded"}
+    # Probes are exempt, and verified API keys get their own buckets.
+    assert client.get("/health").status_code == 200
+    assert client.get("/ping", headers={"X-API-Key": "sk_verified"}).status_code == 200
+    # Any other key counts against the client's IP, however often it changes.
+    for attempt in range(3):
+        response = client.get("/ping", headers={"X-API-Key": f"sk_random{attempt}"})
+        assert response.status_code == 429
+
+
+def test_client_key_prefers_verified_api_key_digest():
+    scope = {
+        "type": "http",
+        "headers": [(b"x-api-key", b"secret")],
+        "client": ("10.0.0.1", 1),
+    }
+    key = client_key(scope, lambda api_key: api_key == "secret")
+    assert key.startswith("key:") and "secret" not in key
+    assert client_key(scope, lambda api_key: False) == "ip:10.0.0.1"
+    assert client_key(scope) == "ip:10.0.0.1"
+    assert (
+        client_key({"type": "http", "headers": [], "client": ("10.0.0.1", 1)})
+        == "ip:10.0.0.1"
+    )
+
+
+class SharedBuckets:
+    """Stands in for ``RedisBuckets`` with one bucket set shared by every limiter."""
+
+    def __init__(self, clock):
+        self.buckets = LocalBuckets(clock=clock)
+        self.calls = 0
+
+    async def take(self, key, rate, burst, cost=1):
+        self.calls += 1
+        return self.buckets.take(key, rate, burst, cost)
+
+
+@pytest.mark.asyncio
+async def test_replicas_share_limits_and_deny_locally_when_empty():
+    clock = FakeClock()
+    shared = SharedBuckets(clock)
+    replicas = [
+        RateLimiter(60, 4, shared=shared, local=LocalBuckets(clock=clock))
+        for _ in range(2)
+    ]
+    allowed = [(await replicas[i % 2].check("ip:1")).allowed for i in range(6)]
+    assert allowed == [True] * 4 + [False] * 2
+    assert shared.calls == 5  # the last request was turned away locally
+
+    # Each replica's local bucket now knows the shared one is empty.
+    for replica in replicas:
+        assert not (await replica.check("ip:1")).allowed
+    assert shared.calls == 5
+
+
+@pytest.mark.asyncio
+async def test_falls_back_to_local_buckets_when_redis_fails():
+    redis = Redis.from_url("redis://127.0.0.1:1/0", socket_connect_timeout=0.1)
+    limiter = RateLimiter(60, 2, shared=RedisBuckets(redis))
+    labels = {"result": "limited", "store": "local"}
+    before = REGISTRY.get_sample_value("rate_limit_decisions_total", labels) or 0
+    decisions = [await limiter.check("ip:2") for _ in range(3)]
+    assert [d.allowed for d in decisions] == [True, True, False]
+    assert REGISTRY.get_sample_value("rate_limit_decisions_total", labels) - before == 1
+    await redis.aclose()
+
+
+@pytest.mark.asyncio
+async def test_redis_script_enforces_shared_bucket():
+    pytest.importorskip("lupa")  # fakeredis needs it to run Lua scripts
+    redis = fakeredis.aioredis.FakeRedis()
+    buckets = RedisBuckets(redis)
+    decisions = [await buckets.take("ip:3", 1.0, 2) for _ in range(3)]
+    assert [(d.allowed, d.remaining) for d in decisions] == [
+        (True, 1),
+        (True, 0),
+        (False, 0),
+    ]
+    assert 0 < decisions[-1].retry_after <= 1
+    assert 0 < await redis.pttl("ratelimit:ip:3") <= 3000
+    await redis.aclose()
+
+
+def test_disabled_by_setting(monkeypatch):
+    monkeypatch.setattr(rate_limit.settings, "rate_limit_enabled", False)
+    assert rate_limit.get_rate_limiter() is None
+    monkeypatch.setattr(rate_limit.settings, "rate_limit_enabled", True)
+    monkeypatch.setattr(rate_limit, "_limiter", None)
+    limiter = rate_limit.get_rate_limiter()
+    assert limiter.shared is None  # tests run with the in-process Redis stand-in
+    assert limiter.burst == rate_limit.settings.rate_limit_burst
+
+
+def test_app_limits_follow_its_settings():
+    client = TestClient(
+        create_app(Settings(rate_limit_enabled=True, rate_limit_burst=2))
+    )
+    assert [client.get("/").status_code for _ in range(3)] == [200, 200, 429]
+    assert client.get("/health").status_code == 200
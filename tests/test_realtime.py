@@ -0,0 +1,167 @@
+"""
+Unit tests for the live-update hub and board WebSocket endpoint.
+"""
+
+import asyncio
+import json
+import uuid
+
+import fakeredis.aioredis
+import pytest
+from fastapi.testclient import TestClient
+from starlette.websockets import WebSocketDisconnect
+
+from src.core.hub import BoardHub, Subscriber, channel_for
+from src.core.pubsub import InMemoryBus, RedisBus
+from src.main import app
+
+client = TestClient(app)
+
+
+@pytest.mark.asyncio
+async def test_hub_fans_out_to_board_subscribers_only():
+    hub = BoardHub(InMemoryBus())
+    board_a, board_b = uuid.uuid4(), uuid.uuid4()
+    first, second = hub.subscribe(board_a), hub.subscribe(board_a)
+    other = hub.subscribe(board_b)
+
+    await hub.publish(board_a, "task.moved", 3, {"id": "t1"})
+    for subscriber in (first, second):
+        event = json.loads(await subscriber.get())
+        assert event == {
+            "type": "task.moved",
+            "project_id": str(board_a),
+            "version": 3,
+            "data": {"id": "t1"},
+        }
+    assert len(other) == 0
+
+    hub.unsubscribe(first)
+    hub.unsubscribe(first)
+    assert hub.subscriber_count(board_a) == 1
+
+
+@pytest.mark.asyncio
+async def test_slow_subscriber_is_coalesced_into_resync():
+    subscriber = Subscriber(uuid.uuid4(), maxsize=3)
+    for index in range(5):
+        subscriber.offer(f"event-{index}")
+    messages = [await subscriber.get() for _ in range(len(subscriber))]
+    assert json.loads(messages[0])["type"] == "resync"
+    assert messages[1:] == ["event-3", "event-4"]
+    assert subscriber.coalesced == 3
+
+
+@pytest.mark.asyncio
+async def test_redis_bus_relays_between_hubs():
+    redis = fakeredis.aioredis.FakeRedis()
+    publisher = BoardHub(RedisBus(redis))
+    receiver = BoardHub(RedisBus(redis))
+    project_id = uuid.uuid4()
+    subscriber = receiver.subscribe(project_id)
+    relay = asyncio.create_task(receiver.run())
+    try:
+        for _ in range(50):
+            if await redis.pubsub_numpat():
+                break
+            await asyncio.sleep(0.01)
+        await publisher.publish(project_id, "task.created", 1, {"id": "t1"})
+        # Subscribing first tells the subscriber to refetch what it may have missed.
+        events = [
+            json.loads(await asyncio.wait_for(subscriber.get(), timeout=2))
+            for _ in "ab"
+        ]
+        assert [event["type"] for event in events] == ["resync", "task.created"]
+    finally:
+        relay.cancel()
+
+
+@pytest.mark.asyncio
+async def test_remote_listeners_hear_other_processes_only():
+    hub = BoardHub(InMemoryBus())
+    project_id = uuid.uuid4()
+    subscriber = hub.subscribe(project_id)
+    changed = []
+    hub.on_remote_change(changed.append)
+
+    await hub.publish(project_id, "task.created", 1)
+    assert changed == []
+    event = '{"type": "task.moved"}'
+    hub.dispatch(channel_for(project_id), f"other-worker {event}".encode())
+    hub.dispatch(channel_for(project_id), event.encode())  # published without an origin
+    assert changed == [project_id, project_id]
+    events = [json.loads(await subscriber.get())["type"] for _ in range(3)]
+    assert events == ["task.created", "task.moved", "task.moved"]
+
+
+def test_dispatch_ignores_unrelated_channels():
+    hub = BoardHub(InMemoryBus())
+    hub.dispatch("other:channel", b"{}")
+    hub.dispatch(channel_for(uuid.uuid4()), b"{}")
+
+
+def test_websocket_receives_board_events():
+    pid = client.post("/api/projects", json={"name": "Live"}).json()["id"]
+    column = client.post(f"/api/projects/{pid}/columns", json={"name": "To Do"}).json()
+    with client.websocket_connect(f"/ws/projects/{pid}") as websocket:
+        task = client.post(
+            f"/api/projects/{pid}/tasks",
+            json={"title": "live", "column_id": column["id"]},
+        ).json()
+        event = websocket.receive_json()
+        assert event["type"] == "task.created"
+        assert event["data"]["id"] == task["id"]
+
+        client.put(f"/api/tasks/{task['id']}/move", json={"column_id": column["id"]})
+        event = websocket.receive_json()
+        assert event["type"] == "task.moved"
+        assert event["version"] > 0
+
+
+def test_websocket_rejects_unknown_board():
+    with pytest.raises(WebSocketDisconnect):
+        with client.websocket_connect(f"/ws/projects/{uuid.uuid4()}") as websocket:
+            websocket.receive_json()
+
+
+@pytest.mark.asyncio
+async def test_subscribing_resyncs_and_failing_handlers_are_skipped():
+    redis = fakeredis.aioredis.FakeRedis()
+    bus = RedisBus(redis)
+
+    def broken(channel, message):
+        raise RuntimeError("handler bug")
+
+    bus.add_handler(broken)
+    hub = BoardHub(bus)
+    project_id = uuid.uuid4()
+    subscriber = hub.subscribe(project_id)
+    missed = []
+    hub.on_missed_events(lambda: missed.append(True))
+    relay = asyncio.create_task(hub.run())
+    try:
+        resync = json.loads(await asyncio.wait_for(subscriber.get(), timeout=2))
+        assert resync == {"type": "resync", "project_id": str(project_id)}
+        assert missed == [True]
+        await redis.publish(
+            channel_for(project_id), b'other-worker {"type": "task.moved"}'
+        )
+        event = json.loads(await asyncio.wait_for(subscriber.get(), timeout=2))
+        assert event["type"] == "task.moved"
+        assert not relay.done()
+    finally:
+        relay.cancel()
+
+
+@pytest.mark.asyncio
+async def test_failed_publish_reports_missed_events():
+    class DownBus(InMemoryBus):
+        async def publish(self, channel, message):
+            raise ConnectionError("redis down")
+
+    hub = BoardHub(DownBus())
+    missed = []
+    hub.on_missed_events(lambda: missed.append(True))
+    with pytest.raises(ConnectionError):
+        await hub.publish(uuid.uuid4(), "task.created", 1)
+    assert missed == [True]
@@ -0,0 +1,133 @@
+"""
+Unit tests for vectorized cross-project flow reports.
+"""
+
+import uuid
+from datetime import date, datetime, timedelta
+
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+
+from src.board import reports
+from src.board.reports import STATE_CODES, Transitions, completions, flow_report
+from src.core.database import session_scope
+from src.main import app
+from tests.test_analytics import make_board
+
+client = TestClient(app)
+
+
+def history(*tasks):
+    """Transitions from (project, [(state, hours after 2024-01-01), ...]) per task."""
+    projects = sorted({project for project, _ in tasks})
+    columns = ([], [], [], [])
+    for code, (project, events) in enumerate(tasks):
+        for state, hours in events:
+            columns[0].append(code)
+            columns[1].append(projects.index(project))
+            columns[2].append(STATE_CODES[state])
+            columns[3].append(
+                np.datetime64("2024-01-01T00:00", "us") + np.timedelta64(hours, "h")
+            )
+    return Transitions(
+        np.array(columns[0], np.int64),
+        np.array(columns[1], np.int32),
+        np.array(columns[2], np.int8),
+        np.array(columns[3], "datetime64[us]"),
+        projects,
+    )
+
+
+def test_completions_follow_analytics_rules():
+    a, b = sorted([uuid.uuid4(), uuid.uuid4()])
+    transitions = history(
+        (a, [("todo", 0), ("doing", 10), ("todo", 20), ("done", 30)]),  # started at 10
+        (
+            a,
+            [("todo", 0), ("done", 5), ("doing", 6), ("done", 50)],
+        ),  # reopened: 5h, then 45h from its first start
+        (b, [("done", 0), ("deleted", 1)]),  # created done: no completion
+        (b, [("todo", 0), ("todo", 1), ("deleted", 2)]),
+    )
+    done = completions(transitions)
+    assert done.project.tolist() == [0, 0, 0]
+    assert done.hours.tolist() == [20.0, 5.0, 45.0]
+
+
+def test_flow_report_histogram_percentiles_and_throughput():
+    a, b = sorted([uuid.uuid4(), uuid.uuid4()])
+    day = 24
+    transitions = history(
+        *[(a, [("todo", 0), ("done", 2 + i * day)]) for i in range(10)],
+        (b, [("todo", 0), ("doing", 1), ("done", 100)]),
+        (b, [("todo", 0), ("done", 40 * day)]),  # after the period
+    )
+    report = flow_report(transitions, date(2024, 1, 1), date(2024, 1, 10), 7, 3)
+    assert report.transitions == 25
+    assert [(p.project_id, p.completed) for p in report.projects] == [(a, 10), (b, 1)]
+
+    first = report.projects[0]
+    assert first.percentiles == {"p50": 98.0, "p75": 170.0, "p85": 194.0, "p95": 218.0}
+    assert first.mean_hours == 110.0
+    assert [bin.count for bin in first.histogram] == [0, 1, 0, 0, 2, 4, 3, 0, 0, 0]
+    assert [(t.day, t.completed, t.rolling_per_day) for t in first.throughput] == [
+        (date(2024, 1, 7), 7, 1.0),
+        (date(2024, 1, 10), 3, 1.0),
+    ]
+    assert report.total.completed == 11
+    assert [t.completed for t in report.total.throughput] == [8, 3]
+    assert report.total.histogram[5].count == 5
+
+    empty = flow_report(reports.empty_transitions(), date(2024, 1, 1), date(2024, 1, 1))
+    assert (
+        empty.total.completed == 0
+        and empty.total.percentiles == {}
+        and empty.projects == []
+    )
+
+
+@pytest.mark.asyncio
+async def test_load_transitions_from_task_events():
+    service, project, (todo, doing, done) = await make_board("Flow report")
+    task = await service.create_task(project.id, todo.id, "t")
+    await service.move_task(task.id, doing.id)
+    await service.move_task(task.id, done.id)
+    other = await service.create_task(project.id, done.id, "already done")
+    await service.delete_task(other.id)
+
+    async with session_scope() as session:
+        transitions = await reports.load_transitions(
+            session, [project.id], batch_size=2
+        )
+    assert transitions.projects == [project.id]
+    assert len(set(transitions.task.tolist())) == 2
+    assert sorted(transitions.state.tolist()) == [0, 1, 2, 2, 3]
+
+    today = str(datetime.utcnow().date())
+    response = client.get(
+        "/api/reports/flow",
+        params={
+            "project_id": str(project.id),
+            "since": today,
+            "until": today,
+            "interval": 1,
+        },
+    )
+    assert response.status_code == 200, response.text
+    body = response.json()
+    assert body["total"]["completed"] == 1
+    assert body["projects"][0]["project_id"] == str(project.id)
+    assert body["total"]["throughput"] == [
+        {"day": today, "completed": 1, "rolling_per_day": 1.0}
+    ]
+
+
+def test_flow_report_rejects_bad_periods():
+    today = date.today()
+    for params in (
+        {"since": str(today), "until": str(today - timedelta(days=1))},
+        {"since": "2000-01-01", "until": "2020-01-01"},
+    ):
+        assert client.get("/api/reports/flow", params=params).status_code == 400
+    assert client.get("/api/reports/flow", params={"interval": 0}).status_code == 422
@@ -0,0 +1,81 @@
+"""
+Unit tests for the orjson response path.
+"""
+
+import dataclasses
+import json
+from datetime import datetime
+
+import pytest
+
+from src.board import schemas
+from src.board.engine import BoardEngine, Task
+from src.core.responses import encode
+
+
+@pytest.fixture
+def board():
+    engine = BoardEngine()
+    project = engine.create_project("Encoding", "Ünïcode ✓")
+    todo = engine.create_column(project.id, "To Do", color="#ff0000")
+    engine.create_column(project.id, "Empty")
+    first = engine.create_task(project.id, todo.id, "First")
+    engine.create_task(
+        project.id,
+        todo.id,
+        "Second",
+        description='with "quotes" and\nnewlines',
+        metadata={
+            "points": 2.5,
+            "labels": ["a", "b"],
+            "nested": {"ok": True, "none": None},
+        },
+    )
+    first.updated_at = datetime(2024, 1, 2, 3, 4, 5)  # no microseconds
+    return engine, project.id
+
+
+def test_engine_tasks_have_exactly_the_schema_fields():
+    # encode_board writes engine tasks as they are, so the shapes must agree.
+    assert {f.name for f in dataclasses.fields(Task)} == set(schemas.Task.model_fields)
+
+
+def test_encode_board_matches_validated_models(board):
+    engine, project_id = board
+    payload = schemas.encode_board(engine, project_id)
+    validated = schemas.Board(
+        project=schemas.Project.model_validate(engine.get_project(project_id)),
+        columns=[
+            schemas.BoardColumn(
+                **schemas.Column.model_validate(column).model_dump(),
+                tasks=[
+                    schemas.Task.model_validate(t) for t in engine.iter_tasks(column.id)
+                ],
+            )
+            for column in engine.iter_columns(project_id)
+        ],
+    )
+    assert json.loads(payload) == json.loads(validated.model_dump_json())
+    assert schemas.Board.model_validate_json(payload) == validated
+
+
+def test_encode_delta(board):
+    engine, project_id = board
+    since = engine.get_project(project_id).version
+    task = next(engine.iter_tasks(next(engine.iter_columns(project_id)).id))
+    engine.update_task(task.id, title="Renamed")
+    changes = engine.changes_since(project_id, since)
+    delta = schemas.BoardDelta.model_validate_json(
+        schemas.encode_delta(engine, project_id, since, changes)
+    )
+    assert [t.title for t in delta.tasks] == ["Renamed"] and delta.since == since
+
+
+def test_encode_mappings_and_models():
+    project = schemas.ProjectCreate(name="p")
+    assert json.loads(encode({"rows": [{"a": 1}], "model": project})) == {
+        "rows": [{"a": 1}],
+        "model": {"name": "p", "description": None},
+    }
+    with pytest.raises(TypeError):
+        encode({"value": object()})
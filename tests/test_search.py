@@ -0,0 +1,122 @@
+"""
+Unit tests for task full-text search.
+"""
+
+import uuid
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy.dialects import postgresql
+
+from src.board.search import (
+    InvertedIndex,
+    LocalSearch,
+    PostgresSearch,
+    create_search_backend,
+)
+from src.main import app
+
+client = TestClient(app)
+
+
+@pytest.fixture
+def index():
+    index = InvertedIndex()
+    project = uuid.uuid4()
+    ids = {}
+    for title, description in [
+        ("Deploy staging", "Roll out the release"),
+        ("Design login page", "Deploy behind a flag"),
+        ("Fix deployment script", None),
+        ("Write docs", "Describe the design"),
+    ]:
+        ids[title] = uuid.uuid4()
+        index.add(ids[title], project, title, description)
+    return index, project, ids
+
+
+def titles(hits):
+    return [hit.title for hit in hits]
+
+
+def test_prefix_matches_rank_titles_first(index):
+    index, _, _ = index
+    assert titles(index.search("depl")) == [
+        "Deploy staging",
+        "Fix deployment script",
+        "Design login page",
+    ]
+
+
+def test_all_words_required(index):
+    index, _, _ = index
+    assert titles(index.search("deploy stag")) == ["Deploy staging"]
+    assert index.search("missing depl") == []
+    assert index.search("  !! ") == []
+
+
+def test_updates_and_removals(index):
+    index, project, ids = index
+    index.add(ids["Write docs"], project, "Write deploy docs", None)
+    assert "Write deploy docs" in titles(index.search("deploy"))
+    assert "Write docs" not in titles(index.search("docs"))
+    index.remove(ids["Deploy staging"])
+    assert titles(index.search("stag")) == []
+    index.compact()
+    assert len(index) == 3
+    assert titles(index.search("write")) == ["Write deploy docs"]
+
+
+def test_project_filter(index):
+    index, project, _ = index
+    other = uuid.uuid4()
+    index.add(uuid.uuid4(), other, "Deploy other board", None)
+    assert all(
+        hit.project_id == other for hit in index.search("deploy", project_id=other)
+    )
+    assert len(index.search("deploy", project_id=project)) == 3
+
+
+def test_postgres_query_uses_indexed_expression():
+    backend = PostgresSearch()
+    assert backend.tsquery("Login page de") == "login & page & de:*"
+    assert backend.tsquery("%%") is None
+    sql = str(
+        backend.statement("login:*").compile(
+            dialect=postgresql.asyncpg.dialect(),
+            compile_kwargs={"render_postcompile": True},
+        )
+    )
+    assert "setweight(to_tsvector('simple', coalesce(tasks.title, '')), 'A')" in sql
+    assert "@@ to_tsquery('simple'" in sql
+
+
+def test_backend_selection():
+    assert isinstance(
+        create_search_backend("auto", "postgresql+asyncpg://db/k"), PostgresSearch
+    )
+    assert isinstance(
+        create_search_backend("auto", "sqlite+aiosqlite:///k.db"), LocalSearch
+    )
+    with pytest.raises(ValueError):
+        create_search_backend("elastic", "sqlite://")
+
+
+def test_search_api_follows_task_writes():
+    pid = client.post("/api/projects", json={"name": "Search"}).json()["id"]
+    column = client.post(f"/api/projects/{pid}/columns", json={"name": "To Do"}).json()
+    task = client.post(
+        f"/api/projects/{pid}/tasks",
+        json={"title": "Quokka migration", "column_id": column["id"]},
+    ).json()
+    params = {"q": "quok", "project_id": pid}
+    assert [
+        hit["id"] for hit in client.get("/api/search/tasks", params=params).json()
+    ] == [task["id"]]
+
+    client.put(f"/api/tasks/{task['id']}", json={"title": "Wombat migration"})
+    assert client.get("/api/search/tasks", params=params).json() == []
+    client.delete(f"/api/tasks/{task['id']}")
+    params["q"] = "wombat"
+    assert client.get("/api/search/tasks", params=params).json() == []
+    assert client.get("/api/search/tasks", params={"q": ""}).status_code == 422
@@ -0,0 +1,127 @@
+"""
+Unit tests for token verification, the verified-token cache and password hashing.
+"""
+
+import asyncio
+import threading
+import time
+from datetime import timedelta
+
+import pytest
+from fastapi import HTTPException
+from passlib.context import CryptContext
+
+from src.core import security
+from src.core.hashing import HashingExecutor, HashingOverloadedError
+from src.core.token_cache import TokenCache
+
+
+@pytest.fixture(autouse=True)
+def fresh_cache(monkeypatch):
+    cache = TokenCache(maxsize=100, max_ttl=300)
+    monkeypatch.setattr(security, "token_cache", cache)
+    return cache
+
+
+def test_verify_token_caches_repeat_decodes(fresh_cache, monkeypatch):
+    token = security.create_access_token({"sub": "alice"})
+    decodes = []
+    real_decode = security.jwt.decode
+    monkeypatch.setattr(
+        security.jwt,
+        "decode",
+        lambda *a, **kw: decodes.append(1) or real_decode(*a, **kw),
+    )
+    for _ in range(5):
+        assert security.verify_token(token)["sub"] == "alice"
+    assert len(decodes) == 1
+    assert fresh_cache.stats()["hits"] == 4
+    assert fresh_cache.stats()["misses"] == 1
+
+
+def test_cached_payload_is_a_copy(fresh_cache):
+    token = security.create_access_token({"sub": "alice"})
+    security.verify_token(token)["sub"] = "mallory"
+    assert security.verify_token(token)["sub"] == "alice"
+
+
+def test_invalid_token_is_not_cached(fresh_cache):
+    with pytest.raises(HTTPException) as exc:
+        security.verify_token("not-a-jwt")
+    assert exc.value.status_code == 401
+    assert len(fresh_cache) == 0
+
+
+def test_revoked_token_is_rejected(fresh_cache):
+    token = security.create_access_token({"sub": "alice"})
+    security.verify_token(token)
+    security.revoke_token(token)
+    with pytest.raises(HTTPException):
+        security.verify_token(token)
+    assert fresh_cache.stats()["revoked"] == 1
+
+
+def test_entries_expire_at_token_exp():
+    cache = TokenCache(maxsize=10, max_ttl=300)
+    cache.put("short", {"exp": time.time() + 0.05})
+    cache.put("expired", {"exp": time.time() - 1})
+    assert cache.get("short") is not None
+    assert cache.get("expired") is None
+    time.sleep(0.06)
+    assert cache.get("short") is None
+
+
+def test_cache_is_bounded_lru():
+    cache = TokenCache(maxsize=2, max_ttl=300)
+    cache.put("a", {"sub": "a"})
+    cache.put("b", {"sub": "b"})
+    cache.get("a")
+    cache.put("c", {"sub": "c"})
+    assert cache.get("b") is None
+    assert cache.get("a") == {"sub": "a"}
+    assert cache.evictions == 1
+
+
+def test_expired_jwt_fails_verification():
+    token = security.create_access_token({"sub": "alice"}, timedelta(seconds=-1))
+    with pytest.raises(HTTPException):
+        security.verify_token(token)
+
+
+@pytest.mark.asyncio
+async def test_async_hash_and_verify_run_off_loop(monkeypatch):
+    monkeypatch.setattr(
+        security, "pwd_context", CryptContext(schemes=["bcrypt"], bcrypt__rounds=4)
+    )
+    hashed = await security.get_password_hash_async("s3cret")
+    assert await security.verify_password_async("s3cret", hashed)
+    assert not await security.verify_password_async("wrong", hashed)
+    assert security.hashing_executor.pending == 0
+
+
+@pytest.mark.asyncio
+async def test_login_rehashes_outdated_rounds(monkeypatch):
+    old_hash = CryptContext(schemes=["bcrypt"], bcrypt__rounds=4).hash("s3cret")
+    monkeypatch.setattr(
+        security, "pwd_context", CryptContext(schemes=["bcrypt"], bcrypt__rounds=5)
+    )
+    valid, new_hash = await security.verify_and_update_password("s3cret", old_hash)
+    assert valid
+    assert new_hash is not None and new_hash.startswith("$2b$05$")
+    assert await security.verify_and_update_password("s3cret", new_hash) == (True, None)
+    assert await security.verify_and_update_password("wrong", old_hash) == (False, None)
+
+
+@pytest.mark.asyncio
+async def test_hashing_executor_rejects_when_full():
+    executor = HashingExecutor(max_workers=1, max_pending=1)
+    gate = threading.Event()
+    blocked = asyncio.ensure_future(executor.run(gate.wait))
+    await asyncio.sleep(0.01)
+    with pytest.raises(HashingOverloadedError) as exc:
+        await executor.run(lambda: None)
+    assert exc.value.status_code == 503
+    gate.set()
+    assert await blocked is True
+    assert executor.pending == 0
+    executor.shutdown()
@@ -0,0 +1,127 @@
+"""
+Unit tests for the production server runner.
+"""
+
+import os
+import signal
+import subprocess
+import sys
+import time
+
+import httpx
+import pytest
+
+from benchmarks.bench_api import free_port
+from src.core import server
+from src.core.config import Settings
+
+
+def cgroup(tmp_path, files):
+    for name, content in files.items():
+        path = tmp_path / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(content)
+    return tmp_path
+
+
+def test_cpu_quota_from_cgroup_v2_and_v1(tmp_path):
+    assert (
+        server.cpu_quota(cgroup(tmp_path / "v2", {"cpu.max": "250000 100000\n"})) == 2.5
+    )
+    assert (
+        server.cpu_quota(cgroup(tmp_path / "unlimited", {"cpu.max": "max 100000"}))
+        is None
+    )
+    v1 = {"cpu/cpu.cfs_quota_us": "50000", "cpu/cpu.cfs_period_us": "100000"}
+    assert server.cpu_quota(cgroup(tmp_path / "v1", v1)) == 0.5
+    v1["cpu/cpu.cfs_quota_us"] = "-1"
+    assert server.cpu_quota(cgroup(tmp_path / "v1-unlimited", v1)) is None
+    assert server.cpu_quota(tmp_path / "missing") is None
+
+
+def test_worker_count_follows_quota(tmp_path, monkeypatch):
+    monkeypatch.setattr(
+        os, "sched_getaffinity", lambda pid: set(range(8)), raising=False
+    )
+    root = cgroup(tmp_path, {"cpu.max": "250000 100000"})
+    assert server.worker_count(Settings(redis_enabled=True), root) == 3
+    assert server.worker_count(Settings(redis_enabled=True), tmp_path / "missing") == 8
+    assert server.worker_count(Settings(redis_enabled=True, workers=2), root) == 2
+    # Without Redis workers cannot see each other's writes.
+    assert server.worker_count(Settings(redis_enabled=False), root) == 1
+    assert server.worker_count(Settings(redis_enabled=False, workers=1), root) == 1
+    with pytest.raises(ValueError, match="needs Redis"):
+        server.worker_count(Settings(redis_enabled=False, workers=2), root)
+
+
+def test_gunicorn_options(tmp_path):
+    config = Settings(
+        host="127.0.0.1",
+        port=9000,
+        workers=4,
+        graceful_timeout=20,
+        worker_max_requests=500,
+        redis_enabled=True,
+    )
+    options = server.gunicorn_options(config, tmp_path)
+    assert options["bind"] == "127.0.0.1:9000"
+    assert options["workers"] == 4
+    assert options["preload_app"] is True
+    assert options["max_requests"] == 500
+    assert options["graceful_timeout"] == 25
+    assert options["worker_class"] == "src.core.server.KanbanWorker"
+    assert server.KanbanWorker.CONFIG_KWARGS["loop"] == server.event_loop()
+
+
+def test_serve_refuses_several_workers_without_redis():
+    result = subprocess.run(
+        [sys.executable, "-m", "src.cli", "serve", "--workers", "3"],
+        env=dict(os.environ, REDIS_ENABLED="false"),
+        capture_output=True,
+        text=True,
+        timeout=60,
+    )
+    assert result.returncode == 2
+    assert "WORKERS=3 needs Redis" in result.stderr
+
+
+@pytest.mark.skipif(not hasattr(signal, "SIGTERM"), reason="needs POSIX signals")
+def test_serve_runs_workers_and_drains_on_sigterm(tmp_path):
+    port, metrics_port = free_port(), free_port()
+    env = dict(
+        os.environ,
+        PORT=str(port),
+        HOST="127.0.0.1",
+        ENABLE_METRICS="true",
+        METRICS_PORT=str(metrics_port),
+        PROMETHEUS_MULTIPROC_DIR=str(tmp_path),
+        # Several workers need Redis; none is listening, which only delays board events.
+        REDIS_ENABLED="true",
+        REDIS_URL=f"redis://127.0.0.1:{free_port()}/0",
+    )
+    process = subprocess.Popen(
+        [sys.executable, "-m", "src.cli", "serve", "--workers", "2"],
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        deadline = time.monotonic() + 30
+        while True:
+            try:
+                if httpx.get(f"http://127.0.0.1:{port}/health").status_code == 200:
+                    break
+            except httpx.TransportError:
+                pass
+            assert process.poll() is None and time.monotonic() < deadline
+            time.sleep(0.1)
+        for _ in range(4):
+            httpx.get(f"http://127.0.0.1:{port}/health")
+        # The master's metrics server reports every worker's requests.
+        body = httpx.get(f"http://127.0.0.1:{metrics_port}/metrics").text
+        assert (
+            'http_requests_total{method="GET",route="/health",status="200"} 5.0' in body
+        )
+    finally:
+        process.send_signal(signal.SIGTERM)
+        assert process.wait(timeout=30) == 0
@@ -0,0 +1,65 @@
+"""
+Cold start regression tests for the application factory.
+"""
+
+import os
+
+import pytest
+
+from src.core.startup import (
+    ModuleTime,
+    format_profile,
+    package_totals,
+    parse_importtime,
+    profile_startup,
+)
+
+# Import plus ``create_app()`` in a fresh interpreter; override for slow CI runners.
+STARTUP_BUDGET_SECONDS = float(os.environ.get("STARTUP_BUDGET_SECONDS", "3.0"))
+
+# Optional subsystems that must not load until first used.
+DEFERRED = (
+    "numpy",
+    "jose",
+    "passlib",
+    "redis",
+    "src.core.security",
+    "src.board.reports",
+)
+
+
+@pytest.fixture(scope="module")
+def profile():
+    return profile_startup()
+
+
+def test_cold_start_within_budget(profile):
+    assert profile.total_seconds < STARTUP_BUDGET_SECONDS, format_profile(profile)
+
+
+def test_optional_subsystems_load_lazily(profile):
+    assert profile.loaded("fastapi") and profile.loaded("src.api.board")
+    assert [module for module in DEFERRED if profile.loaded(module)] == []
+
+
+def test_importing_main_does_not_build_the_app(profile):
+    # Routers are imported by create_app(), not by ``import src.main``.
+    names = [m.module for m in profile.modules]
+    assert names.index("src.main") < names.index("src.api.board")
+
+
+def test_parse_importtime():
+    lines = [
+        "import time: self [us] | cumulative | imported package",
+        "import time:       120 |        120 |     numpy._core",
+        "import time:        30 |        150 |   numpy",
+        "import time:        45 |         45 | json",
+        "unrelated output",
+    ]
+    modules = parse_importtime(lines)
+    assert modules == [
+        ModuleTime("numpy._core", 120, 120),
+        ModuleTime("numpy", 30, 150),
+        ModuleTime("json", 45, 45),
+    ]
+    assert package_totals(modules) == {"numpy": 150, "json": 45}
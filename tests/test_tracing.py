@@ -0,0 +1,157 @@
+"""
+Unit tests for tracing, tail sampling and request correlation.
+"""
+
+import asyncio
+import logging
+
+import pytest
+from fastapi.testclient import TestClient
+from opentelemetry.sdk.trace import TracerProvider
+from opentelemetry.sdk.trace.export import SimpleSpanProcessor
+from opentelemetry.sdk.trace.export.in_memory_span_exporter import InMemorySpanExporter
+from opentelemetry.trace import Status, StatusCode
+
+from src.core import tracing
+from src.core.config import Settings
+from src.core.database import dispose_engine
+from src.core.tail_sampling import TailSamplingProcessor
+from src.main import create_app
+
+MS = 1_000_000  # nanoseconds
+
+
+def traced_client(**overrides):
+    # Engines created before tracing was configured are not instrumented.
+    asyncio.run(dispose_engine())
+    settings = Settings(tracing_enabled=True, tracing_exporter="memory", **overrides)
+    return TestClient(create_app(settings))
+
+
+@pytest.fixture
+def client():
+    yield traced_client()
+    tracing.shutdown_tracing()
+    asyncio.run(dispose_engine())
+
+
+def spans_by_name():
+    return {span.name: span for span in tracing.span_exporter().get_finished_spans()}
+
+
+def test_disabled_tracing_is_a_no_op():
+    assert not tracing.enabled()
+    with tracing.span("anything", {"a": 1}) as current:
+        current.set_attribute("b", 2)
+    assert tracing.span_exporter() is None
+
+
+def test_board_request_traced_end_to_end(client):
+    pid = client.post("/api/projects", json={"name": "Traced"}).json()["id"]
+    (insert,) = [s for name, s in spans_by_name().items() if name.startswith("INSERT")]
+    assert insert.attributes["db.system"] == "sqlite"
+    assert insert.attributes["db.statement"].startswith("INSERT INTO projects")
+    client.post(f"/api/projects/{pid}/columns", json={"name": "To Do"})
+    tracing.span_exporter().clear()
+
+    response = client.get(
+        f"/api/projects/{pid}/board", headers={"X-Request-ID": "req-42"}
+    )
+    assert response.headers["x-request-id"] == "req-42"
+    spans = spans_by_name()
+    server = spans["GET /api/projects/{project_id}/board"]
+    cache = spans["cache.board_snapshot"]
+    encode = spans["board.encode"]
+    assert server.attributes["http.request_id"] == "req-42"
+    assert cache.attributes["cache.result"] == "miss"
+    assert encode.attributes["board.bytes"] == len(response.content)
+    assert encode.parent.span_id == cache.context.span_id
+    assert {span.context.trace_id for span in spans.values()} == {
+        server.context.trace_id
+    }
+
+    tracing.span_exporter().clear()
+    client.get(f"/api/projects/{pid}/board")
+    assert spans_by_name()["cache.board_snapshot"].attributes["cache.result"] == "hit"
+
+
+def test_request_ids_generated_and_validated(client):
+    generated = client.get("/health").headers["x-request-id"]
+    assert len(generated) == 32
+    replaced = client.get("/health", headers={"X-Request-ID": "bad id\n"})
+    assert replaced.headers["x-request-id"] not in ("bad id\n", generated)
+    # Probes are not traced.
+    assert "GET /health" not in spans_by_name()
+
+
+def test_correlation_filter_adds_request_and_trace_ids(client):
+    record = logging.LogRecord("test", logging.INFO, __file__, 1, "message", (), None)
+    token = tracing.request_id.set("req-7")
+    try:
+        with tracing.span("work") as current:
+            tracing.CorrelationFilter().filter(record)
+    finally:
+        tracing.request_id.reset(token)
+    assert record.request_id == "req-7"
+    assert record.trace_id == format(current.get_span_context().trace_id, "032x")
+    assert record.span_id == format(current.get_span_context().span_id, "016x")
+
+    tracing.CorrelationFilter().filter(record)
+    assert (record.request_id, record.trace_id) == ("-", "-")
+
+
+def test_head_sampling_ratio():
+    client = traced_client(tracing_sample_ratio=0.0)
+    try:
+        client.get("/")
+        assert tracing.span_exporter().get_finished_spans() == ()
+    finally:
+        tracing.shutdown_tracing()
+        asyncio.run(dispose_engine())
+
+
+def test_tail_sampling_keeps_slow_and_failed_traces():
+    exporter = InMemorySpanExporter()
+    provider = TracerProvider()
+    provider.add_span_processor(
+        TailSamplingProcessor(
+            SimpleSpanProcessor(exporter), slow_seconds=0.1, ratio=0.0
+        )
+    )
+    tracer = provider.get_tracer("test")
+
+    def trace(name, duration_ms, error=False):
+        root = tracer.start_span(name, start_time=0)
+        with tracing_context(root):
+            child = tracer.start_span(f"{name}.child", start_time=1)
+            if error:
+                child.set_status(Status(StatusCode.ERROR))
+            child.end(end_time=2)
+        root.end(end_time=duration_ms * MS)
+        return root
+
+    trace("fast", 5)
+    trace("slow", 150)
+    failed = trace("failed", 5, error=True)
+    # A span ending after its root follows the decision made for the trace.
+    with tracing_context(failed):
+        tracer.start_span("late", start_time=3).end(end_time=6 * MS)
+
+    names = sorted(span.name for span in exporter.get_finished_spans())
+    assert names == ["failed", "failed.child", "late", "slow", "slow.child"]
+
+    everything = InMemorySpanExporter()
+    provider = TracerProvider()
+    provider.add_span_processor(
+        TailSamplingProcessor(
+            SimpleSpanProcessor(everything), slow_seconds=1, ratio=1.0
+        )
+    )
+    provider.get_tracer("test").start_span("fast", start_time=0).end(end_time=MS)
+    assert [span.name for span in everything.get_finished_spans()] == ["fast"]
+
+
+def tracing_context(span):
+    from opentelemetry import trace
+
+    return trace.use_span(span, end_on_exit=False)
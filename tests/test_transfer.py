@@ -0,0 +1,135 @@
+"""
+Unit tests for streaming board export and import.
+"""
+
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+
+from src.board.transfer import iter_lines
+from src.core.config import settings
+from src.main import app
+
+client = TestClient(app)
+
+
+def make_board(name, titles):
+    pid = client.post("/api/projects", json={"name": name}).json()["id"]
+    for column_name, column_titles in titles.items():
+        column = client.post(
+            f"/api/projects/{pid}/columns", json={"name": column_name}
+        ).json()
+        for title in column_titles:
+            client.post(
+                f"/api/projects/{pid}/tasks",
+                json={
+                    "title": title,
+                    "column_id": column["id"],
+                    "metadata": {"n": title},
+                },
+            )
+    return pid
+
+
+def board_titles(pid):
+    board = client.get(f"/api/projects/{pid}/board").json()
+    return {
+        column["name"]: [t["title"] for t in column["tasks"]]
+        for column in board["columns"]
+    }
+
+
+def test_export_streams_ndjson_in_board_order():
+    pid = make_board("Export", {"To Do": ["a", "b"], "Done": ["c"]})
+    response = client.get(f"/api/projects/{pid}/export")
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-ndjson"
+    records = [json.loads(line) for line in response.text.splitlines()]
+    assert [r["type"] for r in records] == [
+        "project",
+        "column",
+        "column",
+        "task",
+        "task",
+        "task",
+    ]
+    assert records[0]["name"] == "Export"
+    assert [r["title"] for r in records[3:]] == ["a", "b", "c"]
+    assert records[3]["metadata"] == {"n": "a"}
+
+
+def test_export_unknown_project():
+    response = client.get("/api/projects/00000000-0000-0000-0000-000000000000/export")
+    assert response.status_code == 404
+
+
+def test_import_round_trip(monkeypatch):
+    monkeypatch.setattr(settings, "import_batch_size", 2)
+    source = make_board("Source", {"To Do": ["a", "b", "c"], "Done": ["d", "e"]})
+    export = client.get(f"/api/projects/{source}/export").content
+
+    target = make_board("Target", {"Backlog": ["existing"]})
+    response = client.post(f"/api/projects/{target}/import", content=export)
+    assert response.status_code == 200
+    result = response.json()
+    assert (result["columns"], result["tasks"]) == (2, 5)
+    assert result["rows_per_second"] > 0
+    assert board_titles(target) == {
+        "Backlog": ["existing"],
+        "To Do": ["a", "b", "c"],
+        "Done": ["d", "e"],
+    }
+    # Imported rows get fresh ids; the source board is untouched.
+    assert board_titles(source) == {"To Do": ["a", "b", "c"], "Done": ["d", "e"]}
+
+
+def test_import_into_existing_column():
+    pid = make_board("Append", {"To Do": ["first"]})
+    column_id = client.get(f"/api/projects/{pid}/board").json()["columns"][0]["id"]
+    body = json.dumps({"type": "task", "title": "second", "column_id": column_id})
+    assert client.post(f"/api/projects/{pid}/import", content=body).status_code == 200
+    assert board_titles(pid) == {"To Do": ["first", "second"]}
+
+
+def test_invalid_import_is_rolled_back(monkeypatch):
+    monkeypatch.setattr(settings, "import_batch_size", 1)
+    source = make_board("Valid", {"To Do": ["a", "b"]})
+    lines = client.get(f"/api/projects/{source}/export").text.splitlines()
+    lines.insert(3, json.dumps({"type": "task", "column_id": "not-a-uuid"}))
+
+    target = make_board("Rollback", {})
+    response = client.post(f"/api/projects/{target}/import", content="\n".join(lines))
+    assert response.status_code == 422
+    detail = response.json()["detail"]
+    assert detail["line"] == 4
+    assert {tuple(error["loc"]) for error in detail["errors"]} >= {("task", "title")}
+    assert board_titles(target) == {}
+
+
+def test_import_rejects_unknown_column():
+    pid = make_board("Orphans", {})
+    body = json.dumps(
+        {
+            "type": "task",
+            "title": "x",
+            "column_id": "00000000-0000-0000-0000-000000000000",
+        }
+    )
+    response = client.post(f"/api/projects/{pid}/import", content=body)
+    assert response.status_code == 422
+    assert response.json()["detail"]["line"] == 1
+
+
+@pytest.mark.asyncio
+async def test_iter_lines_handles_split_chunks():
+    async def chunks():
+        for chunk in (b'{"a"', b": 1}\n{", b'"b": 2}\n\n{"c": 3}'):
+            yield chunk
+
+    assert [line async for line in iter_lines(chunks())] == [
+        (1, b'{"a": 1}'),
+        (2, b'{"b": 2}'),
+        (3, b""),
+        (4, b'{"c": 3}'),
+    ]